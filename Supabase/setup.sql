@@ -32,3 +32,295 @@ ON public.tickets
 FOR INSERT
 TO anon, authenticated
 WITH CHECK (true);
+
+
+-- ============================================
+-- Backlog de tickets sin procesar
+-- ============================================
+
+-- Índice parcial para paginar por (created_at, id) solo sobre los pendientes
+create index if not exists tickets_unprocessed_created_at_id_idx
+on public.tickets (created_at, id)
+where processed is not true;
+
+
+-- Actualiza la clasificación de varios tickets en una sola llamada.
+-- payload: [{"id": "...", "category": "...", "sentiment": "..."}, ...]
+-- Retorna los IDs efectivamente actualizados.
+create or replace function public.bulk_update_classifications(payload jsonb)
+returns table (id uuid)
+language sql
+as $$
+  update public.tickets as t
+  set category = r.category,
+      sentiment = r.sentiment,
+      processed = true
+  from jsonb_to_recordset(payload) as r(id uuid, category text, sentiment text)
+  where t.id = r.id
+  returning t.id;
+$$;
+
+
+-- ============================================
+-- Listado paginado de tickets (GET /tickets)
+-- ============================================
+
+-- El listado ordena por (created_at, id) y pagina por keyset, en ambos
+-- sentidos (un índice B-tree se recorre también hacia atrás). Cada filtro
+-- tiene un índice que empieza por su columna y sigue con la clave del
+-- cursor, de modo que la página se lee en orden sin ordenar ni saltar filas.
+-- Los pendientes (processed = false) usan el índice parcial del backlog.
+create index if not exists tickets_created_at_id_idx
+on public.tickets (created_at, id);
+
+create index if not exists tickets_processed_created_at_id_idx
+on public.tickets (created_at, id)
+where processed;
+
+create index if not exists tickets_category_created_at_id_idx
+on public.tickets (category, created_at, id);
+
+create index if not exists tickets_sentiment_created_at_id_idx
+on public.tickets (sentiment, created_at, id);
+
+
+-- ============================================
+-- Agregados para el dashboard (/stats y /trends)
+-- ============================================
+
+-- Conteo de tickets por hora de creación (UTC), categoría, sentimiento y estado.
+-- Los triggers de abajo lo mantienen al insertar, actualizar o borrar tickets,
+-- de modo que las estadísticas se leen de unas pocas filas en lugar de
+-- recorrer la tabla de tickets. Categoría y sentimiento vacíos ('') = sin clasificar.
+create table if not exists public.ticket_stats (
+  bucket timestamp with time zone not null,
+  category text not null default '',
+  sentiment text not null default '',
+  processed boolean not null default false,
+  tickets bigint not null default 0,
+  primary key (bucket, category, sentiment, processed)
+);
+
+alter table public.ticket_stats enable row level security;
+
+DROP POLICY IF EXISTS "Ticket stats: public select" ON public.ticket_stats;
+CREATE POLICY "Ticket stats: public select"
+ON public.ticket_stats
+FOR SELECT
+TO anon, authenticated
+USING (true);
+
+
+-- Aplica al agregado las filas afectadas por una sentencia, restando las
+-- anteriores y sumando las nuevas. Es un trigger por sentencia con tablas de
+-- transición: un UPDATE masivo (p. ej. bulk_update_classifications) hace un
+-- solo upsert agrupado en lugar de uno por fila.
+create or replace function public.apply_ticket_stats()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if tg_op = 'INSERT' then
+    insert into public.ticket_stats as s (bucket, category, sentiment, processed, tickets)
+    select date_trunc('hour', created_at, 'UTC'), coalesce(category, ''), coalesce(sentiment, ''),
+           coalesce(processed, false), count(*)
+    from new_rows
+    group by 1, 2, 3, 4
+    on conflict (bucket, category, sentiment, processed)
+    do update set tickets = s.tickets + excluded.tickets;
+
+  elsif tg_op = 'DELETE' then
+    insert into public.ticket_stats as s (bucket, category, sentiment, processed, tickets)
+    select date_trunc('hour', created_at, 'UTC'), coalesce(category, ''), coalesce(sentiment, ''),
+           coalesce(processed, false), -count(*)
+    from old_rows
+    group by 1, 2, 3, 4
+    on conflict (bucket, category, sentiment, processed)
+    do update set tickets = s.tickets + excluded.tickets;
+
+  else
+    insert into public.ticket_stats as s (bucket, category, sentiment, processed, tickets)
+    select bucket, category, sentiment, processed, sum(delta)
+    from (
+      select date_trunc('hour', created_at, 'UTC') as bucket, coalesce(category, '') as category,
+             coalesce(sentiment, '') as sentiment, coalesce(processed, false) as processed, -1 as delta
+      from old_rows
+      union all
+      select date_trunc('hour', created_at, 'UTC'), coalesce(category, ''), coalesce(sentiment, ''),
+             coalesce(processed, false), 1
+      from new_rows
+    ) as changes
+    group by 1, 2, 3, 4
+    having sum(delta) <> 0
+    on conflict (bucket, category, sentiment, processed)
+    do update set tickets = s.tickets + excluded.tickets;
+  end if;
+
+  return null;
+end;
+$$;
+
+drop trigger if exists tickets_stats_insert on public.tickets;
+create trigger tickets_stats_insert
+after insert on public.tickets
+referencing new table as new_rows
+for each statement execute function public.apply_ticket_stats();
+
+drop trigger if exists tickets_stats_update on public.tickets;
+create trigger tickets_stats_update
+after update on public.tickets
+referencing old table as old_rows new table as new_rows
+for each statement execute function public.apply_ticket_stats();
+
+drop trigger if exists tickets_stats_delete on public.tickets;
+create trigger tickets_stats_delete
+after delete on public.tickets
+referencing old table as old_rows
+for each statement execute function public.apply_ticket_stats();
+
+
+-- Recalcula el agregado desde cero. Se ejecuta una vez al crear la tabla
+-- sobre tickets existentes, o para corregirlo si se desincronizara.
+create or replace function public.rebuild_ticket_stats()
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  lock table public.tickets in share mode;
+  delete from public.ticket_stats;
+  insert into public.ticket_stats (bucket, category, sentiment, processed, tickets)
+  select date_trunc('hour', created_at, 'UTC'), coalesce(category, ''), coalesce(sentiment, ''),
+         coalesce(processed, false), count(*)
+  from public.tickets
+  group by 1, 2, 3, 4;
+end;
+$$;
+
+select public.rebuild_ticket_stats();
+
+
+-- Totales por categoría, sentimiento y estado (una fila por combinación).
+create or replace function public.ticket_stats_totals()
+returns table (category text, sentiment text, processed boolean, tickets bigint)
+language sql
+stable
+as $$
+  select category, sentiment, processed, sum(tickets)::bigint
+  from public.ticket_stats
+  group by category, sentiment, processed
+  having sum(tickets) <> 0;
+$$;
+
+
+-- Serie temporal en intervalos de p_bucket ('hour' o 'day') en la zona p_tz,
+-- entre [p_since, p_until). Una fila por intervalo con sus celdas
+-- [categoría, sentimiento, procesado, tickets] en un arreglo JSON, para no
+-- multiplicar las filas por cada combinación.
+create or replace function public.ticket_stats_series(
+  p_bucket text,
+  p_since timestamp with time zone,
+  p_until timestamp with time zone,
+  p_tz text default 'UTC'
+)
+returns table (bucket timestamp with time zone, cells jsonb)
+language sql
+stable
+as $$
+  select b.bucket, jsonb_agg(jsonb_build_array(b.category, b.sentiment, b.processed, b.tickets))
+  from (
+    select date_trunc(p_bucket, s.bucket, p_tz) as bucket, s.category, s.sentiment, s.processed,
+           sum(s.tickets)::bigint as tickets
+    from public.ticket_stats as s
+    where s.bucket >= p_since and s.bucket < p_until
+    group by 1, 2, 3, 4
+    having sum(s.tickets) <> 0
+  ) as b
+  group by b.bucket
+  order by b.bucket;
+$$;
+
+
+-- ============================================
+-- Eventos en tiempo real (GET /events)
+-- ============================================
+
+-- Con EVENTS_SOURCE=realtime la API abre una sola suscripción a los cambios
+-- de la tabla y los reparte a sus clientes, así que los tickets deben
+-- publicarse en Supabase Realtime. Si la tabla ya está en la publicación,
+-- no se hace nada.
+do $$
+begin
+  if not exists (
+    select 1 from pg_publication_tables
+    where pubname = 'supabase_realtime' and schemaname = 'public' and tablename = 'tickets'
+  ) then
+    alter publication supabase_realtime add table public.tickets;
+  end if;
+end;
+$$;
+
+
+-- ============================================
+-- Webhook firmado hacia la API (POST /webhooks/supabase)
+-- ============================================
+
+-- Envía cada ticket insertado sin procesar a la API, con el mismo payload
+-- que los Database Webhooks de Supabase y firmado con HMAC-SHA256 sobre
+-- "<timestamp>.<cuerpo>". La URL y el secreto (el mismo WEBHOOK_SECRET de la
+-- API) se configuran con:
+--   alter database postgres set app.webhook_url = 'https://api.ejemplo.com/webhooks/supabase?async=true';
+--   alter database postgres set app.webhook_secret = '...';
+-- Con ?async=true la API encola el ticket y responde de inmediato, dentro
+-- del timeout de pg_net. Mientras no estén definidos, el trigger no envía nada.
+create extension if not exists pg_net;
+create extension if not exists pgcrypto with schema extensions;
+
+create or replace function public.notify_ticket_webhook()
+returns trigger
+language plpgsql
+security definer
+set search_path = public, extensions
+as $$
+declare
+  v_url text := nullif(current_setting('app.webhook_url', true), '');
+  v_secret text := nullif(current_setting('app.webhook_secret', true), '');
+  v_timestamp text := extract(epoch from now())::bigint::text;
+  v_body jsonb;
+begin
+  if v_url is null or v_secret is null then
+    return null;
+  end if;
+
+  v_body := jsonb_build_object(
+    'type', tg_op,
+    'table', tg_table_name,
+    'schema', tg_table_schema,
+    'record', to_jsonb(new),
+    'old_record', null
+  );
+  -- pg_net envía el cuerpo como jsonb::text, el mismo texto que se firma
+  perform net.http_post(
+    url := v_url,
+    body := v_body,
+    headers := jsonb_build_object(
+      'Content-Type', 'application/json',
+      'X-Webhook-Timestamp', v_timestamp,
+      'X-Webhook-Signature',
+      'sha256=' || encode(hmac(v_timestamp || '.' || v_body::text, v_secret, 'sha256'), 'hex')
+    ),
+    timeout_milliseconds := 5000
+  );
+  return null;
+end;
+$$;
+
+drop trigger if exists tickets_webhook on public.tickets;
+create trigger tickets_webhook
+after insert on public.tickets
+for each row
+when (not coalesce(new.processed, false))
+execute function public.notify_ticket_webhook();
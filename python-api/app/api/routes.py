@@ -1,17 +1,127 @@
-from fastapi import APIRouter, HTTPException, status
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Awaitable, Callable
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from fastapi import APIRouter, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import ValidationError
+from starlette.types import Receive, Scope, Send
 from app.models.schemas import (
     ProcessTicketRequest,
     ProcessTicketResponse,
     AnalyzeTextRequest,
     AnalyzeTextResponse,
     CreateTicketRequest,
-    CreateTicketResponse
+    CreateTicketResponse,
+    AnalyzeBatchRequest,
+    AnalyzeBatchResponse,
+    BacklogRunRequest,
+    BacklogStatusResponse,
+    CreateTicketsRequest,
+    CreateTicketsResponse,
+    CreatedTicket,
+    BulkRowError,
+    RuntimeStatsResponse,
+    ModelRouterResponse,
+    JobAcceptedResponse,
+    JobStatusResponse,
+    StatsResponse,
+    SupabaseWebhookPayload,
+    TicketListResponse,
+    TrendsResponse,
+    WebhookIgnoredResponse
 )
-from app.services.ticket_service import get_ticket_by_id, update_ticket, create_ticket
-from app.services.ai_service import analyze_ticket
+from app.services.ticket_service import (
+    TICKET_COLUMNS,
+    get_ticket_by_id,
+    update_ticket,
+    create_ticket,
+    bulk_create_tickets,
+    decode_cursor,
+    encode_cursor,
+    list_tickets
+)
+from app.core.config import get_settings
+from app.core.events import Subscription
+from app.core.limiter import get_llm_limiter
+from app.core.metrics import CONTENT_TYPE, REGISTRY, SUPABASE_FETCH_SECONDS, SUPABASE_UPDATE_SECONDS
+from app.core.model_router import get_model_router
+from app.core.resilience import CircuitOpenError, get_llm_caller
+from app.core.tracing import finish_stage
+from app.core.webhooks import SIGNATURE_HEADER, TIMESTAMP_HEADER, WebhookSignatureError, verify_signature
+from app.core.singleflight import SingleFlight
+from app.services.ai_service import analyze_ticket, analyze_batch, analysis_flights
+from app.services.prompts import CATEGORIES, SENTIMENTS
+from app.services.cache_service import get_analysis_cache
+from app.services.local_classifier import fast_path_stats
+from app.services.job_queue import DeferJobError, PermanentJobError, get_job_queue, job_handler
+from app.services.idempotency import (
+    IDEMPOTENCY_HEADER,
+    REPLAYED_HEADER,
+    VALID_IDEMPOTENCY_KEY,
+    IdempotencyConflictError,
+    get_idempotency_store,
+    request_fingerprint
+)
+from app.services.notifier import dispatch_negative_alert
+from app.services.stats_service import (
+    BUCKET_SIZES,
+    NEGATIVE_SENTIMENT,
+    CachedPayload,
+    fetch_stats,
+    fetch_trends,
+    get_stats_cache,
+    trends_range
+)
+from app.services.ticket_events import get_event_broker
+from app.services.export_service import EXPORT_FORMATS, EXPORT_MEDIA_TYPES, export_tickets
+from app.services.import_service import IMPORT_FORMATS, format_from_content_type, import_tickets
+from app.services.backlog_service import get_backlog_progress, is_backlog_running, start_backlog_run
 
 router = APIRouter()
 
+# Procesamientos de /process-ticket en vuelo, por ID de ticket y opciones (ver process_flight_key)
+process_flights = SingleFlight("process_ticket")
+
+
+def process_flight_key(ticket_id: str, use_cache: bool = True, model: str | None = None) -> str:
+    """
+    Clave de coalescencia de un procesamiento: solo se une a uno en curso
+    quien pidió el mismo ticket con la misma caché y el mismo modelo.
+    """
+    return f"{ticket_id}:{'cached' if use_cache else 'fresh'}:{model or ''}"
+
+BYPASS_CACHE_QUERY = Query(
+    default=False,
+    description="Si es true, ignora la caché de análisis y fuerza una nueva llamada al LLM"
+)
+
+ASYNC_QUERY = Query(
+    default=False,
+    alias="async",
+    description="Si es true, encola el procesamiento y responde 202 con el ID del trabajo"
+)
+
+MODEL_QUERY = Query(
+    default=None,
+    description="Nombre del endpoint de modelo a usar (ver GET /debug/models); por defecto lo elige el router"
+)
+
+
+def validate_model(model: str | None) -> None:
+    """Rechaza con 400 un endpoint de modelo que no está configurado."""
+    if model is None:
+        return
+    try:
+        get_model_router().get(model)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Modelo desconocido: {model}"
+        ) from None
+
 
 @router.post(
     "/process-ticket",
@@ -41,6 +151,10 @@ router = APIRouter()
                 }
             }
         },
+        202: {
+            "description": "Procesamiento encolado (con `?async=true`, o con el LLM no disponible)",
+            "model": JobAcceptedResponse
+        },
         400: {
             "description": "Ticket sin descripción",
             "content": {
@@ -51,7 +165,12 @@ router = APIRouter()
         }
     }
 )
-def process_ticket(request: ProcessTicketRequest):
+async def process_ticket(
+    request: ProcessTicketRequest,
+    bypass_cache: bool = BYPASS_CACHE_QUERY,
+    run_async: bool = ASYNC_QUERY,
+    model: str | None = MODEL_QUERY
+):
     """
     Procesa un ticket de soporte existente en Supabase.
 
@@ -64,19 +183,57 @@ def process_ticket(request: ProcessTicketRequest):
     5. **Actualiza el ticket** en Supabase marcándolo como `processed: true`
 
     Si el ticket ya fue procesado anteriormente, retorna los resultados existentes
-    sin volver a procesarlo.
+    sin volver a procesarlo. Las peticiones simultáneas para el mismo ticket
+    comparten un único procesamiento.
+
+    Con `?async=true` el ticket se encola en la cola durable y se responde
+    **202** de inmediato con el ID del trabajo; el estado se consulta en
+    `GET /jobs/{job_id}`. Reenviar el mismo ticket mientras su trabajo sigue
+    pendiente retorna el mismo ID.
+
+    Si el circuito hacia el LLM está abierto y no hay clasificador local para
+    responder, el ticket también se encola y se responde **202** en lugar de
+    esperar a un proveedor caído.
     """
-    ticket = get_ticket_by_id(request.ticket_id)
+    validate_model(model)
+    if run_async:
+        return await enqueue_process_ticket(request.ticket_id, use_cache=not bypass_cache, model=model)
+
+    try:
+        return await process_flights.do(
+            process_flight_key(request.ticket_id, use_cache=not bypass_cache, model=model),
+            lambda: run_process_ticket(request.ticket_id, use_cache=not bypass_cache, model=model)
+        )
+    except CircuitOpenError:
+        return await enqueue_process_ticket(request.ticket_id, use_cache=not bypass_cache, model=model)
+
+
+async def enqueue_process_ticket(ticket_id: str, use_cache: bool, model: str | None = None) -> JSONResponse:
+    """Encola el procesamiento de un ticket y responde 202 con el ID del trabajo."""
+    job = await get_job_queue().enqueue(
+        "process_ticket",
+        {"ticket_id": ticket_id, "use_cache": use_cache, "model": model},
+        dedupe_key=f"process_ticket:{ticket_id}"
+    )
+    accepted = JobAcceptedResponse(job_id=job["id"], status=job["status"], status_url=f"/jobs/{job['id']}")
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=accepted.model_dump())
+
+
+async def run_process_ticket(ticket_id: str, use_cache: bool, model: str | None = None) -> ProcessTicketResponse:
+    """Obtiene, analiza y actualiza un ticket existente."""
+    start = time.perf_counter()
+    ticket = await get_ticket_by_id(ticket_id)
+    finish_stage("supabase_fetch", SUPABASE_FETCH_SECONDS, start)
 
     if not ticket:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Ticket con ID {request.ticket_id} no encontrado"
+            detail=f"Ticket con ID {ticket_id} no encontrado"
         )
 
     if ticket.get("processed"):
         return ProcessTicketResponse(
-            ticket_id=request.ticket_id,
+            ticket_id=ticket_id,
             category=ticket.get("category", ""),
             sentiment=ticket.get("sentiment", ""),
             processed=True,
@@ -90,16 +247,18 @@ def process_ticket(request: ProcessTicketRequest):
             detail="El ticket no tiene descripción para analizar"
         )
 
-    analysis = analyze_ticket(description)
+    analysis = await analyze_ticket(description, use_cache=use_cache, model=model)
 
-    update_ticket(
-        ticket_id=request.ticket_id,
+    start = time.perf_counter()
+    await update_ticket(
+        ticket_id=ticket_id,
         category=analysis["category"],
         sentiment=analysis["sentiment"]
     )
+    finish_stage("supabase_update", SUPABASE_UPDATE_SECONDS, start)
 
     return ProcessTicketResponse(
-        ticket_id=request.ticket_id,
+        ticket_id=ticket_id,
         category=analysis["category"],
         sentiment=analysis["sentiment"],
         processed=True,
@@ -107,6 +266,207 @@ def process_ticket(request: ProcessTicketRequest):
     )
 
 
+async def run_ticket_job(flight_key: str, run: Callable[[], Awaitable[ProcessTicketResponse]]) -> dict:
+    """
+    Procesa un ticket encolado, coalescido bajo `flight_key`. Los errores 4xx
+    no se reintentan; con el circuito abierto el trabajo espera a que se
+    cierre sin gastar intentos.
+    """
+    try:
+        response = await process_flights.do(flight_key, run)
+    except CircuitOpenError as exc:
+        raise DeferJobError(exc.retry_after, str(exc)) from exc
+    except HTTPException as exc:
+        if exc.status_code < 500:
+            raise PermanentJobError(exc.detail) from exc
+        raise
+    return response.model_dump()
+
+
+@job_handler("process_ticket")
+async def process_ticket_job(payload: dict) -> dict:
+    ticket_id = payload["ticket_id"]
+    use_cache = payload.get("use_cache", True)
+    model = payload.get("model")
+    return await run_ticket_job(
+        process_flight_key(ticket_id, use_cache, model),
+        lambda: run_process_ticket(ticket_id, use_cache=use_cache, model=model)
+    )
+
+
+async def run_webhook_ticket(ticket_id: str, description: str) -> ProcessTicketResponse:
+    """
+    Clasifica un ticket recibido por webhook, con la fila que ya trae el
+    payload (sin volver a leerla), y encola la alerta si es negativo.
+    """
+    analysis = await analyze_ticket(description)
+
+    start = time.perf_counter()
+    await update_ticket(
+        ticket_id=ticket_id,
+        category=analysis["category"],
+        sentiment=analysis["sentiment"]
+    )
+    finish_stage("supabase_update", SUPABASE_UPDATE_SECONDS, start)
+
+    if analysis["sentiment"] == NEGATIVE_SENTIMENT:
+        await dispatch_negative_alert({"id": ticket_id, "description": description, **analysis})
+
+    return ProcessTicketResponse(
+        ticket_id=ticket_id,
+        category=analysis["category"],
+        sentiment=analysis["sentiment"],
+        processed=True,
+        message="Ticket procesado desde el webhook"
+    )
+
+
+@job_handler("webhook_ticket")
+async def webhook_ticket_job(payload: dict) -> dict:
+    ticket_id = payload["ticket_id"]
+    return await run_ticket_job(f"webhook:{ticket_id}", lambda: run_webhook_ticket(ticket_id, payload["description"]))
+
+
+async def enqueue_webhook_ticket(ticket_id: str, description: str) -> JSONResponse:
+    """Encola un ticket recibido por webhook (con su descripción) y responde 202."""
+    job = await get_job_queue().enqueue(
+        "webhook_ticket",
+        {"ticket_id": ticket_id, "description": description},
+        dedupe_key=f"process_ticket:{ticket_id}"
+    )
+    accepted = JobAcceptedResponse(job_id=job["id"], status=job["status"], status_url=f"/jobs/{job['id']}")
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=accepted.model_dump())
+
+
+@router.post(
+    "/webhooks/supabase",
+    response_model=ProcessTicketResponse | WebhookIgnoredResponse,
+    summary="Procesar un ticket recibido por webhook de Supabase",
+    responses={
+        202: {
+            "description": "Procesamiento encolado (con `?async=true`, o con el LLM no disponible)",
+            "model": JobAcceptedResponse
+        },
+        400: {"description": "Cuerpo que no es un webhook de Supabase"},
+        401: {
+            "description": "Firma ausente, inválida o vencida",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Firma del webhook inválida"}
+                }
+            }
+        },
+        503: {"description": "WEBHOOK_SECRET no está configurado"}
+    }
+)
+async def supabase_webhook(
+    request: Request,
+    run_async: bool = ASYNC_QUERY,
+    signature: str | None = Header(default=None, alias=SIGNATURE_HEADER),
+    timestamp: str | None = Header(default=None, alias=TIMESTAMP_HEADER)
+):
+    """
+    Recibe el webhook de inserción en `tickets` y clasifica el ticket.
+
+    Reemplaza el salto webhook → n8n → `/process-ticket`: la fila llega en
+    `record`, así que no se vuelve a leer de Supabase. Si el ticket resulta
+    negativo, la alerta se encola y la envía el notificador configurado en
+    `ALERT_NOTIFIER` (log o SMTP).
+
+    El cuerpo debe venir firmado: `X-Webhook-Signature: sha256=<hex>` es el
+    HMAC-SHA256 con `WEBHOOK_SECRET` de `<X-Webhook-Timestamp>.<cuerpo>`, y
+    el timestamp (epoch en segundos) no puede diferir más de
+    `WEBHOOK_TOLERANCE` segundos del reloj del servidor.
+
+    Los eventos que no son inserciones de tickets pendientes se ignoran con
+    200. Con `?async=true`, o con el circuito del LLM abierto, el ticket se
+    encola y se responde **202**.
+    """
+    settings = get_settings()
+    if not settings.webhook_secret:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="WEBHOOK_SECRET no está configurado"
+        )
+
+    body = await request.body()
+    try:
+        verify_signature(settings.webhook_secret, body, signature, timestamp, settings.webhook_tolerance)
+    except WebhookSignatureError as exc:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(exc)) from None
+
+    try:
+        payload = SupabaseWebhookPayload.model_validate_json(body)
+    except ValidationError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El cuerpo no es un webhook de Supabase"
+        ) from None
+
+    record = payload.record or {}
+    if payload.type != "INSERT" or payload.table != "tickets":
+        return WebhookIgnoredResponse(reason=f"Evento {payload.type} sobre {payload.table} no requiere procesamiento")
+    if record.get("processed"):
+        return WebhookIgnoredResponse(reason="El ticket ya fue procesado")
+
+    ticket_id = str(record.get("id") or "")
+    description = (record.get("description") or "").strip()
+    if not ticket_id or not description:
+        return WebhookIgnoredResponse(reason="El ticket no tiene ID o descripción para analizar")
+
+    if run_async:
+        return await enqueue_webhook_ticket(ticket_id, description)
+    try:
+        # Clave propia: unirse a un /process-ticket en curso omitiría la alerta de ticket negativo
+        return await process_flights.do(f"webhook:{ticket_id}", lambda: run_webhook_ticket(ticket_id, description))
+    except CircuitOpenError:
+        return await enqueue_webhook_ticket(ticket_id, description)
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=JobStatusResponse,
+    summary="Consultar un trabajo en segundo plano",
+    responses={
+        404: {
+            "description": "Trabajo no encontrado",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Trabajo 3f2a... no encontrado"}
+                }
+            }
+        }
+    }
+)
+async def get_job(job_id: str):
+    """
+    Retorna el estado de un trabajo encolado con `/process-ticket?async=true`.
+
+    - **queued**: esperando un worker (o un reintento tras un fallo)
+    - **running**: en proceso
+    - **succeeded**: terminado; `result` trae la misma respuesta que el modo síncrono
+    - **dead**: agotó los reintentos o falló de forma permanente; ver `error`
+    """
+    job = await get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Trabajo {job_id} no encontrado"
+        )
+
+    return JobStatusResponse(
+        job_id=job["id"],
+        kind=job["kind"],
+        status=job["status"],
+        attempts=job["attempts"],
+        max_attempts=job["max_attempts"],
+        result=job["result"],
+        error=job["error"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"]
+    )
+
+
 @router.post(
     "/analyze-text",
     response_model=AnalyzeTextResponse,
@@ -153,7 +513,11 @@ def process_ticket(request: ProcessTicketRequest):
         }
     }
 )
-def analyze_text(request: AnalyzeTextRequest):
+async def analyze_text(
+    request: AnalyzeTextRequest,
+    bypass_cache: bool = BYPASS_CACHE_QUERY,
+    model: str | None = MODEL_QUERY
+):
     """
     Analiza un texto directamente sin persistirlo en la base de datos.
 
@@ -171,8 +535,9 @@ def analyze_text(request: AnalyzeTextRequest):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="El texto no puede estar vacío"
         )
+    validate_model(model)
 
-    analysis = analyze_ticket(request.text)
+    analysis = await analyze_ticket(request.text, use_cache=not bypass_cache, model=model)
 
     return AnalyzeTextResponse(
         category=analysis["category"],
@@ -180,6 +545,76 @@ def analyze_text(request: AnalyzeTextRequest):
     )
 
 
+@router.post(
+    "/analyze-batch",
+    response_model=AnalyzeBatchResponse,
+    summary="Analizar varios textos en lote",
+    response_description="Categoría y sentimiento de cada texto, en orden",
+    responses={
+        200: {
+            "description": "Textos analizados exitosamente",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "results": [
+                            {"category": "soporte técnico", "sentiment": "negativo"},
+                            {"category": "facturación", "sentiment": "negativo"}
+                        ]
+                    }
+                }
+            }
+        },
+        400: {
+            "description": "Lote vacío, demasiado grande o con textos vacíos",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "El lote admite como máximo 100 textos"}
+                }
+            }
+        }
+    }
+)
+async def analyze_batch_endpoint(
+    request: AnalyzeBatchRequest,
+    bypass_cache: bool = BYPASS_CACHE_QUERY,
+    model: str | None = MODEL_QUERY
+):
+    """
+    Analiza varios textos sin persistirlos en la base de datos.
+
+    A diferencia de llamar N veces a `/analyze-text`, este endpoint:
+
+    - **Reutiliza la caché** para los textos ya analizados
+    - **Agrupa los textos restantes** en pocos prompts con respuesta JSON indexada
+    - **Reintenta individualmente** los textos que el modelo omita o devuelva malformados
+
+    Los resultados se devuelven en el mismo orden que los textos enviados.
+    """
+    max_texts = get_settings().analyze_batch_max_texts
+    if len(request.texts) > max_texts:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El lote admite como máximo {max_texts} textos"
+        )
+
+    for position, text in enumerate(request.texts):
+        if not text.strip():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"El texto en la posición {position} no puede estar vacío"
+            )
+    validate_model(model)
+
+    analyses = await analyze_batch(request.texts, use_cache=not bypass_cache, model=model)
+
+    return AnalyzeBatchResponse(
+        results=[
+            AnalyzeTextResponse(category=analysis["category"], sentiment=analysis["sentiment"])
+            for analysis in analyses
+        ]
+    )
+
+
 @router.post(
     "/create-ticket",
     response_model=CreateTicketResponse,
@@ -219,16 +654,32 @@ def analyze_text(request: AnalyzeTextRequest):
             }
         },
         400: {
-            "description": "Descripción vacía",
+            "description": "Descripción vacía o Idempotency-Key inválida",
             "content": {
                 "application/json": {
                     "example": {"detail": "La descripción no puede estar vacía"}
                 }
             }
+        },
+        422: {
+            "description": "Idempotency-Key ya usada con otro cuerpo",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "La Idempotency-Key ya se usó con una petición distinta"}
+                }
+            }
         }
     }
 )
-def create_ticket_endpoint(request: CreateTicketRequest):
+async def create_ticket_endpoint(
+    request: CreateTicketRequest,
+    bypass_cache: bool = BYPASS_CACHE_QUERY,
+    idempotency_key: str | None = Header(
+        default=None,
+        alias=IDEMPOTENCY_HEADER,
+        description="Clave única por ticket; un reintento con la misma clave recibe la respuesta original"
+    )
+):
     """
     Crea un nuevo ticket de soporte en Supabase.
 
@@ -241,6 +692,13 @@ def create_ticket_endpoint(request: CreateTicketRequest):
     5. **Supabase notifica** a sistemas externos (n8n) via Realtime/Webhooks
 
     El ticket se procesa automáticamente si no se envían categoría y sentimiento.
+
+    Con la cabecera `Idempotency-Key`, repetir la petición (p. ej. tras un
+    timeout) retorna la respuesta original con `Idempotent-Replayed: true`
+    sin volver a llamar al LLM ni insertar otro ticket; si la primera sigue
+    en curso, la repetición espera su resultado. Las claves se recuerdan
+    `IDEMPOTENCY_TTL` segundos y reutilizar una con otro cuerpo responde
+    **422**.
     """
     if not request.description.strip():
         raise HTTPException(
@@ -248,6 +706,37 @@ def create_ticket_endpoint(request: CreateTicketRequest):
             detail="La descripción no puede estar vacía"
         )
 
+    if idempotency_key is None:
+        return await run_create_ticket(request, use_cache=not bypass_cache)
+
+    if not VALID_IDEMPOTENCY_KEY.match(idempotency_key):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Idempotency-Key debe tener entre 1 y 255 caracteres ASCII imprimibles"
+        )
+
+    async def create() -> dict:
+        response = await run_create_ticket(request, use_cache=not bypass_cache)
+        return response.model_dump()
+
+    try:
+        content, replayed = await get_idempotency_store().run(
+            f"create-ticket:{idempotency_key}",
+            request_fingerprint("/create-ticket", request.model_dump()),
+            create
+        )
+    except IdempotencyConflictError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from None
+
+    return JSONResponse(
+        status_code=status.HTTP_201_CREATED,
+        content=content,
+        headers={REPLAYED_HEADER: "true" if replayed else "false"}
+    )
+
+
+async def run_create_ticket(request: CreateTicketRequest, use_cache: bool) -> CreateTicketResponse:
+    """Clasifica (si hace falta) e inserta un ticket nuevo."""
     description = request.description.strip()
     category = request.category
     sentiment = request.sentiment
@@ -255,12 +744,12 @@ def create_ticket_endpoint(request: CreateTicketRequest):
 
     # Si no se proporcionan categoría y sentimiento, procesar con IA
     if category is None and sentiment is None:
-        analysis = analyze_ticket(description)
+        analysis = await analyze_ticket(description, use_cache=use_cache)
         category = analysis["category"]
         sentiment = analysis["sentiment"]
         processed_with_ai = True
 
-    ticket = create_ticket(
+    ticket = await create_ticket(
         description=description,
         category=category,
         sentiment=sentiment,
@@ -277,3 +766,765 @@ def create_ticket_endpoint(request: CreateTicketRequest):
         processed=True,
         message=message
     )
+
+
+@router.post(
+    "/create-tickets",
+    response_model=CreateTicketsResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Crear varios tickets en una sola petición",
+    response_description="Tickets creados y filas que fallaron",
+    responses={
+        400: {
+            "description": "Lote demasiado grande o con descripciones vacías",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "La descripción en la posición 3 no puede estar vacía"}
+                }
+            }
+        }
+    }
+)
+async def create_tickets_endpoint(request: CreateTicketsRequest, bypass_cache: bool = BYPASS_CACHE_QUERY):
+    """
+    Crea varios tickets en Supabase con pocas llamadas a la base de datos.
+
+    - Los tickets **sin categoría ni sentimiento** se analizan juntos con IA en modo lote
+    - Las filas se insertan con **INSERT multi-fila** por bloques de `BULK_CHUNK_SIZE`
+    - Las filas que fallan se reportan en `failed` con su posición, sin abortar el resto
+    """
+    max_tickets = get_settings().bulk_create_max_tickets
+    if len(request.tickets) > max_tickets:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Se admiten como máximo {max_tickets} tickets por solicitud"
+        )
+
+    rows = []
+    for position, ticket in enumerate(request.tickets):
+        description = ticket.description.strip()
+        if not description:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"La descripción en la posición {position} no puede estar vacía"
+            )
+        rows.append({
+            "description": description,
+            "category": ticket.category,
+            "sentiment": ticket.sentiment,
+            "processed": True
+        })
+
+    to_analyze = [row for row in rows if row["category"] is None and row["sentiment"] is None]
+    if to_analyze:
+        analyses = await analyze_batch([row["description"] for row in to_analyze], use_cache=not bypass_cache)
+        for row, analysis in zip(to_analyze, analyses):
+            row.update(analysis)
+
+    result = await bulk_create_tickets(rows)
+
+    return CreateTicketsResponse(
+        created=[
+            CreatedTicket(
+                ticket_id=ticket["id"],
+                description=ticket["description"],
+                category=ticket.get("category"),
+                sentiment=ticket.get("sentiment")
+            )
+            for ticket in result["created"]
+        ],
+        failed=[BulkRowError(**failure) for failure in result["failed"]]
+    )
+
+
+IMPORT_FORMAT_QUERY = Query(
+    default=None,
+    alias="format",
+    description="Formato del cuerpo (`csv` o `ndjson`); por defecto se deduce del Content-Type"
+)
+
+
+async def ndjson_lines(events):
+    """Serializa cada evento de la importación como una línea NDJSON."""
+    async for event in events:
+        yield (json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class RequestBodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse cuyo cuerpo se genera mientras se lee el de la petición.
+
+    StreamingResponse escucha la desconexión del cliente consumiendo
+    `receive` en paralelo al cuerpo, y así se queda con los mensajes
+    `http.request` que necesita `request.stream()`. Esta variante deja
+    `receive` solo para el generador: una desconexión durante la subida la
+    detecta `request.stream()` (ClientDisconnect) y corta el generador.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+@router.post(
+    "/import",
+    summary="Importar tickets desde un CSV o NDJSON",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Stream `application/x-ndjson` con eventos `error`, `progress` y un `summary` final",
+            "content": {"application/x-ndjson": {}}
+        },
+        400: {
+            "description": "Formato no indicado o no soportado",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Indica ?format=csv|ndjson o un Content-Type text/csv o application/x-ndjson"}
+                }
+            }
+        }
+    }
+)
+async def import_endpoint(
+    request: Request,
+    import_format: str | None = IMPORT_FORMAT_QUERY,
+    bypass_cache: bool = BYPASS_CACHE_QUERY
+):
+    """
+    Importa tickets desde el cuerpo crudo de la petición, leído por partes.
+
+    - **CSV** con encabezado (`description`, y opcionalmente `category` y `sentiment`) o **NDJSON** con un objeto por línea
+    - Cada fila se valida como en `/create-ticket`; las inválidas se reportan y no detienen la importación
+    - Las filas se agrupan en bloques de `IMPORT_CHUNK_SIZE`: las que no traen categoría ni sentimiento se
+      clasifican en modo lote y el bloque se inserta con un INSERT multi-fila, con hasta
+      `IMPORT_CONCURRENCY` bloques en paralelo
+    - Si la clasificación falla, las filas se insertan con `processed = false` y las toma el backlog
+
+    La respuesta es NDJSON y avanza junto con la importación: un evento
+    `error` por fila rechazada (`line`, `error`), un `progress` por bloque y
+    un `summary` final. La memoria no crece con el tamaño del archivo.
+    """
+    import_format = (import_format or format_from_content_type(request.headers.get("content-type")) or "").lower()
+    if import_format not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Indica ?format=csv|ndjson o un Content-Type text/csv o application/x-ndjson"
+        )
+
+    settings = get_settings()
+    events = import_tickets(
+        request.stream(),
+        import_format,
+        chunk_size=settings.import_chunk_size,
+        concurrency=settings.import_concurrency,
+        use_cache=not bypass_cache
+    )
+    return RequestBodyStreamingResponse(ndjson_lines(events), media_type="application/x-ndjson")
+
+
+@router.post(
+    "/backlog/process",
+    response_model=BacklogStatusResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Procesar el backlog de tickets pendientes",
+    response_description="Corrida iniciada en segundo plano",
+    responses={
+        409: {
+            "description": "Ya hay una corrida en curso",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Ya hay una corrida del backlog en curso"}
+                }
+            }
+        }
+    }
+)
+async def process_backlog_endpoint(request: BacklogRunRequest | None = None):
+    """
+    Inicia en segundo plano la clasificación de todos los tickets con `processed = false`.
+
+    La corrida:
+
+    1. **Recorre los pendientes** por páginas ordenadas por `(created_at, id)`
+    2. **Clasifica en lotes** con concurrencia acotada, reutilizando la caché
+    3. **Guarda los resultados** con una sola escritura por página
+
+    El avance se consulta en `GET /backlog/status`. Si se configura
+    `BACKLOG_CHECKPOINT_PATH`, una corrida interrumpida se reanuda desde el
+    último cursor guardado.
+    """
+    request = request or BacklogRunRequest()
+    settings = get_settings()
+
+    if is_backlog_running():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ya hay una corrida del backlog en curso"
+        )
+
+    progress = start_backlog_run(
+        page_size=request.page_size or settings.backlog_page_size,
+        concurrency=request.concurrency or settings.backlog_concurrency,
+        limit=request.limit
+    )
+    return BacklogStatusResponse(**progress.to_dict())
+
+
+@router.get(
+    "/backlog/status",
+    response_model=BacklogStatusResponse,
+    summary="Consultar el progreso del backlog",
+    response_description="Progreso de la última corrida"
+)
+async def backlog_status():
+    """
+    Retorna el progreso de la última corrida del backlog: tickets procesados,
+    fallidos, páginas, cursor actual y velocidad en tickets por segundo.
+    """
+    return BacklogStatusResponse(**get_backlog_progress().to_dict())
+
+
+def validate_ticket_query(category: str | None, sentiment: str | None, fields: str | None) -> list[str] | None:
+    """
+    Valida los filtros y columnas de /tickets y /tickets/export.
+
+    Returns:
+        Las columnas pedidas en `fields`, o None si se piden todas.
+    """
+    if category is not None and category not in CATEGORIES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Categoría desconocida: {category}")
+    if sentiment is not None and sentiment not in SENTIMENTS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Sentimiento desconocido: {sentiment}")
+
+    columns = [column.strip() for column in fields.split(",") if column.strip()] if fields else None
+    unknown = [column for column in columns or [] if column not in TICKET_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Columnas desconocidas: {', '.join(unknown)}")
+    return columns
+
+
+@router.get(
+    "/tickets",
+    response_model=TicketListResponse,
+    summary="Listar tickets con filtros y paginación por cursor",
+    responses={
+        400: {
+            "description": "Filtro, columna o cursor inválido",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Columnas desconocidas: prioridad"}
+                }
+            }
+        }
+    }
+)
+async def list_tickets_endpoint(
+    category: str | None = Query(default=None, description="Filtra por categoría"),
+    sentiment: str | None = Query(default=None, description="Filtra por sentimiento"),
+    processed: bool | None = Query(default=None, description="Filtra por tickets procesados (true) o pendientes (false)"),
+    created_from: datetime | None = Query(default=None, description="Creados desde esta fecha (inclusive)"),
+    created_to: datetime | None = Query(default=None, description="Creados antes de esta fecha (exclusivo)"),
+    fields: str | None = Query(
+        default=None,
+        description=f"Columnas a incluir, separadas por coma ({', '.join(TICKET_COLUMNS)}); id y created_at siempre se incluyen"
+    ),
+    order: str = Query(default="desc", pattern="^(asc|desc)$", description="Orden por fecha de creación"),
+    limit: int | None = Query(default=None, ge=1, description="Tamaño de página; por defecto TICKETS_PAGE_SIZE"),
+    cursor: str | None = Query(default=None, description="`next_cursor` de la página anterior")
+):
+    """
+    Lista tickets de a una página, del más reciente al más antiguo por defecto.
+
+    La paginación es por cursor sobre `(created_at, id)` en lugar de OFFSET:
+    cada página usa los índices de `Supabase/setup.sql` y cuesta lo mismo sea
+    la primera o la número diez mil. Para seguir, se pasa el `next_cursor`
+    recibido con los mismos filtros; cuando es `null` no hay más tickets.
+
+    Con `fields` se piden solo algunas columnas (por ejemplo
+    `fields=category,sentiment` evita traer las descripciones).
+    """
+    settings = get_settings()
+    limit = min(limit or settings.tickets_page_size, settings.tickets_max_page_size)
+
+    columns = validate_ticket_query(category, sentiment, fields)
+
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from None
+
+    # Una fila de más indica si hay otra página sin tener que contar
+    rows = await list_tickets(
+        limit + 1,
+        after=after,
+        fields=columns,
+        category=category,
+        sentiment=sentiment,
+        processed=processed,
+        created_from=created_from.isoformat() if created_from else None,
+        created_to=created_to.isoformat() if created_to else None,
+        descending=order == "desc"
+    )
+    items = rows[:limit]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > limit else None
+    return TicketListResponse(items=items, next_cursor=next_cursor, limit=limit)
+
+
+@router.get(
+    "/tickets/export",
+    summary="Exportar tickets como NDJSON o CSV",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Todos los tickets filtrados, enviados página a página",
+            "content": {"application/x-ndjson": {}, "text/csv": {}}
+        },
+        400: {
+            "description": "Formato, filtro o columna inválido",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Formato de exportación no soportado: xlsx"}
+                }
+            }
+        }
+    }
+)
+async def export_tickets_endpoint(
+    export_format: str = Query(default="ndjson", alias="format", description="Formato: `ndjson` o `csv`"),
+    category: str | None = Query(default=None, description="Filtra por categoría"),
+    sentiment: str | None = Query(default=None, description="Filtra por sentimiento"),
+    processed: bool | None = Query(default=None, description="Filtra por tickets procesados (true) o pendientes (false)"),
+    created_from: datetime | None = Query(default=None, description="Creados desde esta fecha (inclusive)"),
+    created_to: datetime | None = Query(default=None, description="Creados antes de esta fecha (exclusivo)"),
+    fields: str | None = Query(
+        default=None,
+        description=f"Columnas a exportar, separadas por coma ({', '.join(TICKET_COLUMNS)}); por defecto todas"
+    ),
+    order: str = Query(default="desc", pattern="^(asc|desc)$", description="Orden por fecha de creación")
+):
+    """
+    Exporta todos los tickets que cumplen los filtros de `GET /tickets`.
+
+    Las filas se leen por páginas de `EXPORT_PAGE_SIZE` con paginación por
+    keyset y cada página se escribe en la respuesta apenas llega, así que la
+    memoria no depende de cuántos tickets haya. Con `fields` se exportan solo
+    esas columnas, en el orden de la tabla.
+    """
+    export_format = export_format.lower()
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Formato de exportación no soportado: {export_format}"
+        )
+    columns = validate_ticket_query(category, sentiment, fields)
+
+    body = export_tickets(
+        export_format,
+        get_settings().export_page_size,
+        columns=columns,
+        category=category,
+        sentiment=sentiment,
+        processed=processed,
+        created_from=created_from.isoformat() if created_from else None,
+        created_to=created_to.isoformat() if created_to else None,
+        descending=order == "desc"
+    )
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="tickets.{export_format}"'}
+    )
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Indica si If-None-Match incluye el ETag actual (o es `*`)."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag == "*" or tag.removeprefix("W/") == etag for tag in tags)
+
+
+def cached_json_response(payload: CachedPayload, if_none_match: str | None) -> Response:
+    """Responde el cuerpo cacheado con su ETag, o 304 si el cliente ya lo tiene."""
+    headers = {
+        "ETag": payload.etag,
+        "Cache-Control": f"private, max-age={int(get_settings().stats_cache_ttl)}"
+    }
+    if etag_matches(if_none_match, payload.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(payload.body, media_type="application/json", headers=headers)
+
+
+@router.get(
+    "/stats",
+    response_model=StatsResponse,
+    summary="Totales para el dashboard",
+    responses={304: {"description": "Sin cambios desde el ETag enviado en If-None-Match"}}
+)
+async def stats(if_none_match: str | None = Header(default=None)):
+    """
+    Retorna los totales de tickets: creados, pendientes, procesados y
+    negativos, y los analizados por categoría, por sentimiento y por ambos.
+
+    Se calculan sobre la tabla `ticket_stats`, que la base de datos mantiene
+    con triggers al crear, procesar o borrar tickets, de modo que el costo no
+    crece con la tabla de tickets. La respuesta se cachea `STATS_CACHE_TTL`
+    segundos e incluye un `ETag`; con `If-None-Match` se responde **304** si
+    nada cambió.
+    """
+    payload = await get_stats_cache().get("stats", fetch_stats)
+    return cached_json_response(payload, if_none_match)
+
+
+@router.get(
+    "/trends",
+    response_model=TrendsResponse,
+    summary="Serie temporal de tickets creados",
+    responses={
+        304: {"description": "Sin cambios desde el ETag enviado en If-None-Match"},
+        400: {
+            "description": "Zona horaria desconocida o rango inválido",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Zona horaria desconocida: Marte/Olympus"}
+                }
+            }
+        }
+    }
+)
+async def trends(
+    bucket: str = Query(default="day", pattern="^(hour|day)$", description="Tamaño del intervalo"),
+    since: datetime | None = Query(default=None, description="Inicio del rango; por defecto 24 horas o 7 días atrás"),
+    until: datetime | None = Query(default=None, description="Fin del rango (exclusivo); por defecto el intervalo en curso"),
+    tz: str = Query(default="UTC", description="Zona horaria IANA en la que se cortan los días, p. ej. America/Bogota"),
+    if_none_match: str | None = Header(default=None)
+):
+    """
+    Retorna, por hora o por día, los tickets creados en cada intervalo con
+    los mismos conteos que `/stats`. Los intervalos sin tickets aparecen con
+    ceros. Fechas sin zona horaria se interpretan en `tz`.
+
+    Se calcula sobre `ticket_stats` (agregado por hora) y se cachea con
+    `ETag` igual que `/stats`.
+    """
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Zona horaria desconocida: {tz}"
+        ) from None
+
+    since, until = trends_range(
+        bucket,
+        since.replace(tzinfo=zone) if since and since.tzinfo is None else since,
+        until.replace(tzinfo=zone) if until and until.tzinfo is None else until,
+        zone
+    )
+    if since >= until:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="`since` debe ser anterior a `until`")
+
+    max_buckets = get_settings().trends_max_buckets
+    if (until - since) / BUCKET_SIZES[bucket] > max_buckets:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El rango abarca más de {max_buckets} intervalos de {bucket}"
+        )
+
+    key = f"trends:{bucket}:{zone.key}:{since.isoformat()}:{until.isoformat()}"
+    payload = await get_stats_cache().get(key, lambda: fetch_trends(bucket, since, until, zone))
+    return cached_json_response(payload, if_none_match)
+
+
+# Pausa que el navegador espera antes de reconectarse a /events (campo `retry` de SSE), en ms
+SSE_RETRY_MS = 3000
+
+# Sin buffering en proxies (nginx) ni cachés intermedias
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+WS_KEEPALIVE_MESSAGE = '{"type":"keepalive"}'
+
+LAST_EVENT_ID_QUERY = Query(
+    default=None,
+    description="ID del último evento recibido, para reanudar (la cabecera Last-Event-ID tiene prioridad)"
+)
+
+
+def parse_last_event_id(value: str | None) -> int | None:
+    """
+    Convierte el ID desde el que reanudar un stream de eventos.
+
+    Raises:
+        ValueError: Si no es un entero.
+    """
+    if value is None or not value.strip():
+        return None
+    return int(value)
+
+
+async def sse_stream(last_event_id: int | None):
+    """
+    Cuerpo de /events: los eventos pendientes del cliente y luego los nuevos,
+    con un comentario de keepalive cada EVENTS_KEEPALIVE segundos sin eventos.
+    Termina si el broker desconecta al cliente por lento; el navegador se
+    reconecta solo con Last-Event-ID y recupera lo que se perdió.
+    """
+    broker = get_event_broker()
+    keepalive = get_settings().events_keepalive
+    subscription = broker.subscribe(last_event_id)
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n".encode()
+        if subscription.gap:
+            yield broker.resync_event().sse
+        while True:
+            try:
+                event = await subscription.get(keepalive)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if event is None:
+                break
+            yield event.sse
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@router.get(
+    "/events",
+    summary="Eventos de tickets en tiempo real (SSE)",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Stream `text/event-stream` con eventos `ticket.created`, `ticket.processed` y `resync`",
+            "content": {"text/event-stream": {}}
+        },
+        400: {
+            "description": "Last-Event-ID inválido",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Last-Event-ID inválido: abc"}
+                }
+            }
+        }
+    }
+)
+async def events(
+    last_event_id: str | None = LAST_EVENT_ID_QUERY,
+    last_event_id_header: str | None = Header(default=None, alias="Last-Event-ID")
+):
+    """
+    Stream de Server-Sent Events con los tickets creados (`ticket.created`) y
+    procesados (`ticket.processed`); cada evento trae el ticket en `data`.
+
+    Todos los clientes comparten una única fuente (las escrituras de esta API
+    o, con `EVENTS_SOURCE=realtime`, una sola suscripción a Supabase
+    Realtime). Cada cliente tiene un buffer de `EVENTS_CLIENT_BUFFER`
+    eventos; si se llena, se le cierra el stream en lugar de frenar al resto.
+
+    Al reconectarse, `EventSource` envía `Last-Event-ID` y se reenvían los
+    eventos posteriores que sigan en el historial (`EVENTS_HISTORY_SIZE`). Si
+    ya no están, se envía un evento `resync` y el cliente debe recargar el
+    listado con `GET /tickets`.
+    """
+    value = last_event_id_header or last_event_id
+    try:
+        resume_from = parse_last_event_id(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Last-Event-ID inválido: {value}"
+        ) from None
+
+    return StreamingResponse(sse_stream(resume_from), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+async def close_on_disconnect(websocket: WebSocket, subscription: Subscription) -> None:
+    """Cierra la suscripción cuando el cliente se desconecta; sus mensajes se ignoran."""
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        subscription.close()
+
+
+@router.websocket("/ws/events")
+async def events_websocket(websocket: WebSocket, last_event_id: str | None = None):
+    """
+    Los mismos eventos que `/events` por WebSocket, como mensajes JSON
+    `{"id", "type", "data"}`. Se reanuda con `?last_event_id=`; un cliente
+    lento se desconecta con el código 1013.
+    """
+    try:
+        resume_from = parse_last_event_id(last_event_id)
+    except ValueError:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="last_event_id inválido")
+        return
+
+    await websocket.accept()
+    broker = get_event_broker()
+    keepalive = get_settings().events_keepalive
+    subscription = broker.subscribe(resume_from)
+    reader = asyncio.create_task(close_on_disconnect(websocket, subscription))
+    try:
+        if subscription.gap:
+            await websocket.send_text(broker.resync_event().message)
+        while True:
+            try:
+                event = await subscription.get(keepalive)
+            except asyncio.TimeoutError:
+                await websocket.send_text(WS_KEEPALIVE_MESSAGE)
+                continue
+            if event is None:
+                if not reader.done():
+                    await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Cliente demasiado lento")
+                break
+            await websocket.send_text(event.message)
+    except (WebSocketDisconnect, OSError):
+        pass
+    finally:
+        reader.cancel()
+        broker.unsubscribe(subscription)
+
+
+@router.get(
+    "/debug/stats",
+    response_model=RuntimeStatsResponse,
+    tags=["debug"],
+    summary="Contadores internos de caché y coalescencia"
+)
+async def runtime_stats():
+    """
+    Expone contadores del proceso actual útiles para diagnosticar rendimiento.
+
+    - **cache**: aciertos, fallos y tamaño de la caché de análisis
+    - **coalescing**: llamadas reales, llamadas coalescidas y trabajos en vuelo
+      para los análisis de texto y para `/process-ticket`
+    - **local_classifier**: tickets resueltos sin LLM frente a los delegados
+    - **jobs**: workers activos y trabajos por estado en la cola durable
+    - **llm_limiter**: límite de concurrencia actual, peticiones en vuelo y en
+      cola, rechazos por plazo y respuestas 429/5xx observadas
+    - **llm_resilience**: estado del circuit breaker, reintentos, hedges
+      lanzados y ganados, y p95 de latencia observado
+    - **events**: clientes conectados a `/events`, eventos publicados y
+      clientes desconectados por lentos
+    """
+    return RuntimeStatsResponse(
+        cache=get_analysis_cache().stats(),
+        local_classifier=fast_path_stats.stats(),
+        jobs=await get_job_queue().stats(),
+        llm_limiter=get_llm_limiter().stats(),
+        llm_resilience=get_llm_caller().stats(),
+        events=get_event_broker().stats(),
+        coalescing={flight.name: flight.stats() for flight in (analysis_flights, process_flights)}
+    )
+
+
+@router.get(
+    "/debug/models",
+    response_model=ModelRouterResponse,
+    tags=["debug"],
+    summary="Estado del router de modelos"
+)
+async def model_router_state():
+    """
+    Muestra los endpoints de modelo configurados y lo que el router sabe de ellos.
+
+    Por endpoint: `latency_ewma` y `error_rate_ewma` (medias móviles de las
+    últimas respuestas), `score` (menor es mejor), peticiones, errores y veces
+    que fue elegido. Cualquier endpoint puede forzarse por petición con
+    `?model=<name>` en `/process-ticket`, `/analyze-text` y `/analyze-batch`.
+    """
+    router_state = get_model_router()
+    return ModelRouterResponse(
+        endpoints=router_state.stats(),
+        fallback_latency=router_state.fallback_latency,
+        exploration=router_state.exploration
+    )
+
+
+# Métricas leídas al exportar de los contadores que ya mantiene cada componente
+REGISTRY.callback(
+    "analysis_cache_hits_total", "Aciertos de la caché de análisis, en memoria o compartida",
+    lambda: get_analysis_cache().hits, type="counter"
+)
+REGISTRY.callback(
+    "analysis_cache_shared_hits_total", "Aciertos servidos por la caché SQLite compartida",
+    lambda: get_analysis_cache().shared_hits, type="counter"
+)
+REGISTRY.callback(
+    "analysis_cache_misses_total", "Fallos de la caché de análisis",
+    lambda: get_analysis_cache().misses, type="counter"
+)
+REGISTRY.callback(
+    "analysis_cache_hit_ratio", "Aciertos sobre consultas a la caché de análisis desde el arranque",
+    lambda: get_analysis_cache().stats()["hit_rate"]
+)
+REGISTRY.callback(
+    "analysis_cache_entries", "Entradas en la caché de análisis en memoria",
+    lambda: get_analysis_cache().stats()["size"]
+)
+REGISTRY.callback(
+    "local_classifier_tickets_total", "Tickets resueltos por el clasificador local, delegados al LLM o estimados con el circuito abierto",
+    lambda: {(result,): fast_path_stats.stats()[result] for result in ("local", "delegated", "fallback")},
+    ("result",), type="counter"
+)
+REGISTRY.callback(
+    "coalescing_in_flight", "Trabajos coalescidos en vuelo",
+    lambda: {(flight.name,): flight.in_flight for flight in (analysis_flights, process_flights)},
+    ("flight",)
+)
+REGISTRY.callback(
+    "coalescing_coalesced_total", "Llamadas que se unieron a un trabajo ya en vuelo",
+    lambda: {(flight.name,): flight.coalesced for flight in (analysis_flights, process_flights)},
+    ("flight",), type="counter"
+)
+REGISTRY.callback("llm_in_flight", "Peticiones al LLM en vuelo", lambda: get_llm_limiter().stats()["in_flight"])
+REGISTRY.callback("llm_queue_depth", "Peticiones esperando turno hacia el LLM", lambda: get_llm_limiter().stats()["queue_depth"])
+REGISTRY.callback("llm_concurrency_limit", "Límite adaptativo de concurrencia hacia el LLM", lambda: get_llm_limiter().stats()["limit"])
+REGISTRY.callback(
+    "llm_circuit_open", "1 si el circuito hacia el LLM está abierto o a prueba",
+    lambda: int(get_llm_caller().breaker.state != "closed")
+)
+REGISTRY.callback(
+    "idempotency_replays_total", "Peticiones con Idempotency-Key respondidas sin volver a ejecutarse",
+    lambda: get_idempotency_store().replays, type="counter"
+)
+REGISTRY.callback("events_subscribers", "Clientes conectados a /events y /ws/events", lambda: get_event_broker().stats()["subscribers"])
+REGISTRY.callback(
+    "events_published_total", "Eventos de tickets publicados",
+    lambda: get_event_broker().published, type="counter"
+)
+REGISTRY.callback(
+    "events_dropped_subscribers_total", "Clientes de eventos desconectados por no vaciar su buffer a tiempo",
+    lambda: get_event_broker().dropped, type="counter"
+)
+REGISTRY.callback(
+    "jobs", "Trabajos en la cola durable por estado",
+    lambda: {(state,): count for state, count in get_job_queue().counts.items()},
+    ("status",)
+)
+
+
+@router.get(
+    "/metrics",
+    tags=["debug"],
+    summary="Métricas en formato Prometheus",
+    response_class=Response
+)
+async def metrics():
+    """
+    Exporta las métricas del proceso en el formato de texto de Prometheus.
+
+    - **ticket_stage_duration_seconds**: histograma por etapa (`supabase_fetch`,
+      `llm_call`, `parse`, `supabase_update`)
+    - **ticket_analyses_total**: análisis por categoría y sentimiento
+    - **llm_parse_fallbacks_total**: respuestas sin JSON (`response`) o con una
+      categoría o sentimiento fuera de la lista, reemplazados por otros/neutro
+    - caché de análisis, clasificador local, coalescencia, limitador, circuito,
+      cola de trabajos y clientes de `/events`, leídos de sus contadores al
+      momento de exportar
+    """
+    # El conteo de la cola sale de SQLite: se lee fuera del event loop antes de exportar
+    await get_job_queue().stats()
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,148 @@
+"""
+Comandos de línea para tareas de mantenimiento.
+
+Uso:
+    python -m app.cli backlog --page-size 500 --concurrency 8 --checkpoint backlog.json
+    python -m app.cli train-classifier --output local_classifier.json
+    python -m app.cli import tickets.csv --chunk-size 500 --concurrency 4 > reporte.ndjson
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from app.core.config import get_settings
+from app.core.database import init_supabase_client, close_supabase_client
+from app.core.http_client import close_http_client
+from app.services.backlog_service import BacklogProgress, process_backlog
+from app.services.import_service import EXTENSION_FORMATS, IMPORT_FORMATS, import_tickets
+from app.services.local_classifier import train_local_classifier
+
+
+def print_progress(progress: BacklogProgress) -> None:
+    data = progress.to_dict()
+    print(
+        f"página {data['pages']}: {data['processed']} procesados, "
+        f"{data['failed']} fallidos, {data['tickets_per_second']} tickets/s",
+        file=sys.stderr
+    )
+
+
+async def run_backlog(args: argparse.Namespace) -> int:
+    settings = get_settings()
+    await init_supabase_client()
+    try:
+        progress = await process_backlog(
+            page_size=args.page_size or settings.backlog_page_size,
+            concurrency=args.concurrency or settings.backlog_concurrency,
+            checkpoint_path=args.checkpoint or settings.backlog_checkpoint_path,
+            limit=args.limit,
+            on_page=print_progress
+        )
+    finally:
+        await close_http_client()
+        await close_supabase_client()
+
+    data = progress.to_dict()
+    print(
+        f"backlog {data['status']}: {data['processed']} procesados, "
+        f"{data['failed']} fallidos en {data['elapsed_seconds']} s",
+        file=sys.stderr
+    )
+    return 0 if data["status"] == "completed" and data["failed"] == 0 else 1
+
+
+async def run_train_classifier(args: argparse.Namespace) -> int:
+    settings = get_settings()
+    output = args.output or settings.local_classifier_path
+    if not output:
+        print("Indica --output o LOCAL_CLASSIFIER_PATH", file=sys.stderr)
+        return 2
+
+    await init_supabase_client()
+    try:
+        classifier = await train_local_classifier(args.rows or settings.local_classifier_training_rows)
+    finally:
+        await close_supabase_client()
+
+    classifier.save(output)
+    print(f"clasificador entrenado con {classifier.samples} tickets en {output}", file=sys.stderr)
+    return 0
+
+
+async def read_file(path: str, size: int):
+    """Lee el archivo por bloques de `size` bytes sin bloquear el loop."""
+    with open(path, "rb") as file:
+        while chunk := await asyncio.to_thread(file.read, size):
+            yield chunk
+
+
+async def run_import(args: argparse.Namespace) -> int:
+    settings = get_settings()
+    import_format = args.format or EXTENSION_FORMATS.get(os.path.splitext(args.path)[1].lower())
+    if not import_format:
+        print("Indica --format csv|ndjson o usa una extensión .csv, .ndjson o .jsonl", file=sys.stderr)
+        return 2
+
+    summary: dict = {}
+    await init_supabase_client()
+    try:
+        async for event in import_tickets(
+            read_file(args.path, settings.import_read_size),
+            import_format,
+            chunk_size=args.chunk_size or settings.import_chunk_size,
+            concurrency=args.concurrency or settings.import_concurrency,
+            use_cache=not args.bypass_cache
+        ):
+            # El reporte va a stdout como NDJSON, igual que la respuesta de POST /import
+            print(json.dumps(event, ensure_ascii=False), flush=True)
+            if event["type"] == "summary":
+                summary = event
+    finally:
+        await close_http_client()
+        await close_supabase_client()
+
+    if not summary:
+        return 1
+    print(
+        f"importación {summary['status']}: {summary['created']} creados, "
+        f"{summary['failed']} fallidos en {summary['elapsed_seconds']} s",
+        file=sys.stderr
+    )
+    return 0 if summary["status"] == "completed" and summary["failed"] == 0 else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backlog = commands.add_parser("backlog", help="Clasifica los tickets con processed = false")
+    backlog.add_argument("--page-size", type=int, help="Tickets por página (BACKLOG_PAGE_SIZE)")
+    backlog.add_argument("--concurrency", type=int, help="Lotes en paralelo (BACKLOG_CONCURRENCY)")
+    backlog.add_argument("--checkpoint", help="Archivo para reanudar la corrida (BACKLOG_CHECKPOINT_PATH)")
+    backlog.add_argument("--limit", type=int, default=None, help="Máximo de tickets a recorrer")
+    backlog.set_defaults(handler=run_backlog)
+
+    train = commands.add_parser("train-classifier", help="Entrena el clasificador local con los tickets clasificados")
+    train.add_argument("--output", help="Archivo del modelo (LOCAL_CLASSIFIER_PATH)")
+    train.add_argument("--rows", type=int, help="Tickets a usar (LOCAL_CLASSIFIER_TRAINING_ROWS)")
+    train.set_defaults(handler=run_train_classifier)
+
+    importer = commands.add_parser("import", help="Importa tickets desde un CSV o NDJSON")
+    importer.add_argument("path", help="Archivo a importar")
+    importer.add_argument("--format", choices=IMPORT_FORMATS, help="Formato; por defecto se deduce de la extensión")
+    importer.add_argument("--chunk-size", type=int, help="Filas por bloque (IMPORT_CHUNK_SIZE)")
+    importer.add_argument("--concurrency", type=int, help="Bloques en paralelo (IMPORT_CONCURRENCY)")
+    importer.add_argument("--bypass-cache", action="store_true", help="Ignora la caché de análisis")
+    importer.set_defaults(handler=run_import)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,149 @@
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
 
+class LLMEndpoint(BaseModel):
+    """Un modelo/proveedor al que se pueden enviar los prompts."""
+
+    name: str
+    model: str
+    url: str | None = None
+    timeout: float | None = None
+    cost: float = 1.0
+    weight: float = 1.0
+    fallback: bool = False
+
+
 class Settings(BaseSettings):
     supabase_url: str
     supabase_key: str
     huggingface_api_token: str
 
+    # Cliente HTTP compartido hacia Hugging Face
+    hf_max_connections: int = 100
+    hf_max_keepalive_connections: int = 20
+    hf_keepalive_expiry: float = 30.0
+    hf_connect_timeout: float = 5.0
+    hf_read_timeout: float = 120.0
+    hf_http2: bool = True
+
+    # Control adaptativo de concurrencia y tasa hacia el LLM
+    llm_initial_concurrency: int = 20
+    llm_min_concurrency: int = 1
+    llm_latency_target: float | None = None
+    llm_queue_deadline: float = 30.0
+    llm_rate_limit: float | None = None
+    llm_rate_burst: int = 10
+
+    # Reintentos, hedging y circuit breaker de las llamadas al LLM
+    llm_max_attempts: int = 3
+    llm_retry_base_delay: float = 0.5
+    llm_retry_max_delay: float = 8.0
+    llm_deadline: float = 150.0
+    llm_hedge_enabled: bool = False
+    llm_hedge_min_samples: int = 20
+    llm_breaker_failure_threshold: int = 5
+    llm_breaker_reset_timeout: float = 30.0
+
+    # Enrutamiento entre modelos/proveedores (JSON); vacío usa solo HF_MODEL
+    llm_endpoints: list[LLMEndpoint] = []
+    llm_router_alpha: float = 0.2
+    llm_router_exploration: float = 0.05
+    llm_fallback_latency: float | None = None
+
+    # Respuestas por streaming (SSE) con corte en cuanto llega el JSON
+    llm_streaming: bool = False
+
+    # Recorte de tickets largos antes de enviarlos al LLM (0 = sin límite)
+    ticket_max_tokens: int = 800
+    ticket_head_ratio: float = 0.7
+    ticket_strip_replies: bool = True
+
+    # Pool de conexiones hacia Supabase (PostgREST)
+    supabase_max_connections: int = 50
+    supabase_max_keepalive_connections: int = 20
+
+    # Caché de análisis (en memoria + SQLite opcional)
+    analysis_cache_enabled: bool = True
+    analysis_cache_max_entries: int = 10000
+    analysis_cache_ttl: float = 86400.0
+    analysis_cache_path: str | None = None
+
+    # Clasificación por lotes
+    analyze_batch_max_texts: int = 100
+    llm_batch_size: int = 20
+
+    # Respuestas guardadas por Idempotency-Key en /create-ticket
+    idempotency_max_entries: int = 10000
+    idempotency_ttl: float = 86400.0
+
+    # Escrituras masivas en Supabase
+    bulk_chunk_size: int = 500
+    bulk_create_max_tickets: int = 1000
+
+    # Procesamiento del backlog de tickets sin procesar
+    backlog_page_size: int = 500
+    backlog_concurrency: int = 8
+    backlog_checkpoint_path: str | None = None
+
+    # Importación de CSV/NDJSON (POST /import y `python -m app.cli import`)
+    import_chunk_size: int = 500
+    import_concurrency: int = 4
+    import_read_size: int = 65536
+
+    # Clasificador local previo al LLM
+    local_classifier_enabled: bool = False
+    local_classifier_threshold: float = 0.9
+    local_classifier_path: str | None = None
+    local_classifier_training_rows: int = 5000
+    local_classifier_min_samples: int = 200
+
+    # Cola durable de trabajos en segundo plano (SQLite local)
+    job_queue_path: str = "jobs.sqlite3"
+    job_workers: int = 4
+    job_max_attempts: int = 3
+    job_retry_base_delay: float = 2.0
+    job_lease_seconds: float = 300.0
+    job_poll_interval: float = 1.0
+
+    # Listado paginado de tickets (GET /tickets)
+    tickets_page_size: int = 50
+    tickets_max_page_size: int = 500
+
+    # Exportación de tickets (GET /tickets/export): filas por página leída de Supabase
+    export_page_size: int = 1000
+
+    # Estadísticas del dashboard (/stats y /trends)
+    stats_cache_ttl: float = 10.0
+    trends_max_buckets: int = 1000
+
+    # Eventos de tickets en tiempo real (GET /events y /ws/events)
+    events_source: str = "api"
+    events_history_size: int = 1000
+    events_client_buffer: int = 256
+    events_keepalive: float = 15.0
+
+    # Webhook de inserciones de Supabase (POST /webhooks/supabase), firmado con HMAC-SHA256
+    webhook_secret: str | None = None
+    webhook_tolerance: float = 300.0
+
+    # Alertas de tickets con sentimiento negativo ("log" o "smtp")
+    alert_notifier: str = "log"
+    alert_email_from: str = "alertas@ejemplo.com"
+    alert_email_to: list[str] = []
+    smtp_host: str = "localhost"
+    smtp_port: int = 25
+    smtp_username: str | None = None
+    smtp_password: str | None = None
+    smtp_starttls: bool = False
+    smtp_timeout: float = 10.0
+
+    # Trazas por petición: spans a un archivo OTLP/JSON y log de peticiones lentas
+    trace_export_path: str | None = None
+    trace_service_name: str = "api-support-ticket-ai"
+    slow_request_threshold: float | None = 2.0
+
     class Config:
         env_file = ".env"
 
@@ -1,7 +1,80 @@
-from supabase import create_client, Client
+import asyncio
+import httpx
+from postgrest import AsyncPostgrestClient
+from supabase import AsyncClient
 from app.core.config import get_settings
 
 
-def get_supabase_client() -> Client:
-    settings = get_settings()
-    return create_client(settings.supabase_url, settings.supabase_key)
+_client: AsyncClient | None = None
+_lock = asyncio.Lock()
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """Cliente PostgREST cuya sesión HTTP usa los límites de pool configurados."""
+
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None) -> httpx.AsyncClient:
+        settings = get_settings()
+        limits = httpx.Limits(
+            max_connections=settings.supabase_max_connections,
+            max_keepalive_connections=settings.supabase_max_keepalive_connections
+        )
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy,
+            limits=limits,
+            follow_redirects=True,
+            http2=True
+        )
+
+
+class PooledSupabaseClient(AsyncClient):
+    """Cliente de Supabase que construye su PostgREST con pool propio."""
+
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout, verify=True, proxy=None) -> AsyncPostgrestClient:
+        return PooledPostgrestClient(
+            rest_url,
+            headers=headers,
+            schema=schema,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy
+        )
+
+
+async def init_supabase_client() -> AsyncClient:
+    """Crea el cliente de Supabase compartido si aún no existe."""
+    global _client
+    async with _lock:
+        if _client is None:
+            settings = get_settings()
+            _client = await PooledSupabaseClient.create(settings.supabase_url, settings.supabase_key)
+    return _client
+
+
+async def get_supabase_client() -> AsyncClient:
+    """Retorna el cliente de Supabase compartido por todo el proceso."""
+    if _client is not None:
+        return _client
+    return await init_supabase_client()
+
+
+def set_supabase_client(client: AsyncClient | None) -> None:
+    """Reemplaza el cliente compartido (útil para inyectar dobles en tests)."""
+    global _client
+    _client = client
+
+
+async def close_supabase_client() -> None:
+    """Cierra las conexiones del cliente compartido y lo descarta."""
+    global _client
+    if _client is None:
+        return
+
+    client, _client = _client, None
+    if client._postgrest is not None:
+        await client._postgrest.aclose()
+    await client.auth.close()
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import time
+from collections import deque
+from itertools import islice
+
+# Evento que indica al cliente que perdió eventos y debe recargar el estado completo
+RESYNC = "resync"
+
+
+class Event:
+    """
+    Evento publicado, serializado una sola vez.
+
+    Con miles de suscriptores, cada envío es copiar bytes ya armados: el JSON
+    se genera al publicar y se reutiliza para SSE y para WebSocket.
+    """
+
+    __slots__ = ("id", "type", "data", "sse", "message")
+
+    def __init__(self, event_id: int, type: str, data: dict):
+        self.id = event_id
+        self.type = type
+        self.data = data
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        self.sse = f"id: {event_id}\nevent: {type}\ndata: {payload}\n\n".encode("utf-8")
+        self.message = f'{{"id":{event_id},"type":{json.dumps(type)},"data":{payload}}}'
+
+
+class Subscription:
+    """
+    Buffer acotado de un cliente.
+
+    `push` nunca espera: si el buffer está lleno el cliente no da abasto y el
+    broker lo desconecta en lugar de frenar al resto o acumular memoria.
+    """
+
+    __slots__ = ("maxsize", "queue", "closed", "gap", "_wakeup")
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.queue: deque[Event] = deque()
+        self.closed = False
+        # El cliente pidió reanudar desde un evento que ya no está en el historial
+        self.gap = False
+        self._wakeup = asyncio.Event()
+
+    def push(self, event: Event) -> bool:
+        if len(self.queue) >= self.maxsize:
+            return False
+        self.queue.append(event)
+        self._wakeup.set()
+        return True
+
+    def close(self) -> None:
+        self.closed = True
+        self.queue.clear()
+        self._wakeup.set()
+
+    async def get(self, timeout: float | None = None) -> Event | None:
+        """
+        Retorna el siguiente evento, o None si la suscripción se cerró.
+
+        Raises:
+            asyncio.TimeoutError: Si no llega nada en `timeout` segundos (para enviar un keepalive).
+        """
+        while not self.queue:
+            if self.closed:
+                return None
+            self._wakeup.clear()
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        return self.queue.popleft()
+
+
+class EventBroker:
+    """
+    Reparte eventos de una fuente a muchos suscriptores.
+
+    Cada evento recibe un ID creciente y se guarda en un historial acotado;
+    un cliente que se reconecta con el último ID que recibió obtiene lo que
+    se perdió mientras siga en el historial. Si ya no está (o el ID es de
+    otro arranque del proceso), la suscripción se marca con `gap` para que
+    el cliente recargue el estado completo.
+    """
+
+    def __init__(self, history_size: int, buffer_size: int, first_id: int | None = None):
+        self.buffer_size = buffer_size
+        # Los IDs arrancan en los microsegundos actuales: tras reiniciar el
+        # proceso quedan por encima de los anteriores y un Last-Event-ID viejo
+        # se detecta como hueco en lugar de confundirse con un evento nuevo
+        self.last_id = time.time_ns() // 1000 if first_id is None else first_id
+        self.history: deque[Event] = deque(maxlen=history_size)
+        self.subscribers: set[Subscription] = set()
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, type: str, data: dict) -> Event:
+        self.last_id += 1
+        event = Event(self.last_id, type, data)
+        self.history.append(event)
+        self.published += 1
+        for subscription in [s for s in self.subscribers if not s.push(event)]:
+            self.drop(subscription)
+        return event
+
+    def subscribe(self, last_event_id: int | None = None) -> Subscription:
+        """Registra un suscriptor y le encola los eventos posteriores a `last_event_id`."""
+        subscription = Subscription(self.buffer_size)
+        if last_event_id is not None:
+            # Los IDs del historial son consecutivos: el primero a reenviar se ubica por posición
+            oldest = self.history[0].id if self.history else self.last_id + 1
+            if oldest - 1 <= last_event_id <= self.last_id:
+                subscription.queue.extend(islice(self.history, last_event_id - oldest + 1, None))
+            else:
+                subscription.gap = True
+        self.subscribers.add(subscription)
+        return subscription
+
+    def resync_event(self) -> Event:
+        """Evento RESYNC (no se publica) con el último ID, para que la próxima reconexión siga desde aquí."""
+        return Event(self.last_id, RESYNC, {})
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscribers.discard(subscription)
+
+    def drop(self, subscription: Subscription) -> None:
+        """Desconecta a un suscriptor lento."""
+        self.unsubscribe(subscription)
+        subscription.close()
+        self.dropped += 1
+
+    def close(self) -> None:
+        """Cierra todas las suscripciones (al apagar el proceso)."""
+        for subscription in self.subscribers:
+            subscription.close()
+        self.subscribers.clear()
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+            "last_id": self.last_id
+        }
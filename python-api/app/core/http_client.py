@@ -0,0 +1,51 @@
+import httpx
+from app.core.config import get_settings
+
+
+_client: httpx.AsyncClient | None = None
+
+
+def http2_available() -> bool:
+    """Indica si el paquete `h2` está instalado para habilitar HTTP/2."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_http_client() -> httpx.AsyncClient:
+    """Construye un cliente HTTP asíncrono con pool de conexiones keep-alive."""
+    settings = get_settings()
+
+    limits = httpx.Limits(
+        max_connections=settings.hf_max_connections,
+        max_keepalive_connections=settings.hf_max_keepalive_connections,
+        keepalive_expiry=settings.hf_keepalive_expiry
+    )
+    timeout = httpx.Timeout(
+        settings.hf_read_timeout,
+        connect=settings.hf_connect_timeout
+    )
+
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=timeout,
+        http2=settings.hf_http2 and http2_available()
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Retorna el cliente HTTP compartido, creándolo si no existe."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = build_http_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    """Cierra el cliente HTTP compartido y libera sus conexiones."""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
@@ -0,0 +1,279 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
+import httpx
+from app.core.config import get_settings
+
+
+class LLMOverloadedError(Exception):
+    """La petición no alcanzaría a salir hacia el LLM dentro del plazo."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Proveedor LLM saturado, reintentar en {math.ceil(retry_after)} s")
+
+
+class AdaptiveLimiter:
+    """
+    Límite de concurrencia AIMD (incremento aditivo, decremento multiplicativo).
+
+    Como en el arranque lento de TCP, hasta la primera señal de sobrecarga
+    cada respuesta sana suma 1 al límite (se duplica por ventana); después
+    suma 1/limit (≈ +1 por ventana completa). Cada 429, 5xx, error de
+    transporte o latencia sobre el objetivo lo multiplica por `backoff`, como
+    mucho una vez por `cooldown` segundos para que una ráfaga de errores
+    simultáneos no lo desplome.
+
+    El límite nunca supera `max_limit` (el tamaño del pool HTTP): las
+    peticiones sobrantes esperan aquí, en una cola FIFO, y no en la cola
+    interna de httpcore, cuyo reparto de conexiones recorre todas las
+    peticiones encoladas en cada evento y se degrada con cientos en vuelo.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        latency_target: float | None = None,
+        backoff: float = 0.5,
+        cooldown: float = 1.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.rejected = 0
+        self.overloads = 0
+        self.avg_latency: float | None = None
+        self._clock = clock
+        self._last_decrease = -math.inf
+        self._slow_start = True
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def estimated_wait(self, position: int) -> float:
+        """Espera estimada para quien entra en la cola detrás de `position` peticiones."""
+        if self.avg_latency is None:
+            return 0.0
+        return (position + 1) * self.avg_latency / max(int(self.limit), 1)
+
+    async def acquire(self, deadline: float | None = None) -> None:
+        """
+        Toma un cupo, esperando en la cola si hace falta.
+
+        Raises:
+            LLMOverloadedError: Si la espera estimada o real supera `deadline`.
+        """
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+
+        wait = self.estimated_wait(len(self._waiters))
+        if deadline is not None and wait > deadline:
+            self.rejected += 1
+            raise LLMOverloadedError(wait)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, deadline)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.done() and not waiter.cancelled():
+                # El cupo llegó justo al vencer el plazo: se devuelve
+                self.release()
+            if isinstance(exc, asyncio.TimeoutError):
+                self.rejected += 1
+                raise LLMOverloadedError(self.estimated_wait(len(self._waiters))) from None
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self) -> None:
+        """Devuelve un cupo sin registrar ninguna observación."""
+        self.in_flight -= 1
+        self._wake()
+
+    def observe(self, latency: float, overloaded: bool) -> None:
+        """Ajusta el límite con el resultado de una petición y devuelve su cupo."""
+        self.avg_latency = latency if self.avg_latency is None else 0.8 * self.avg_latency + 0.2 * latency
+        too_slow = self.latency_target is not None and latency > self.latency_target
+
+        if overloaded or too_slow:
+            if overloaded:
+                self.overloads += 1
+            now = self._clock()
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                self._last_decrease = now
+                self._slow_start = False
+        else:
+            increase = 1.0 if self._slow_start else 1 / self.limit
+            self.limit = min(float(self.max_limit), self.limit + increase)
+
+        self.release()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "rejected": self.rejected,
+            "overloads": self.overloads,
+            "avg_latency": round(self.avg_latency, 4) if self.avg_latency is not None else None
+        }
+
+
+class TokenBucket:
+    """Límite de tasa con ráfaga; las reservas pueden dejar el saldo en negativo."""
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._clock = clock
+        self._updated = clock()
+
+    def reserve(self) -> float:
+        """Reserva un token y retorna cuántos segundos hay que esperar para usarlo."""
+        now = self._clock()
+        self.tokens = min(float(self.burst), self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def cancel(self) -> None:
+        """Devuelve un token reservado que no se va a usar."""
+        self.tokens += 1
+
+
+class SlotObservation:
+    """Lo que la llamada informa al limitador al terminar."""
+
+    def __init__(self):
+        self.status_code: int | None = None
+
+
+class LLMLimiter:
+    """Límite de tasa por modelo más límite adaptativo de concurrencia, con plazo de espera."""
+
+    def __init__(
+        self,
+        concurrency: AdaptiveLimiter,
+        deadline: float | None,
+        rate: float | None = None,
+        burst: int = 10
+    ):
+        self.concurrency = concurrency
+        self.deadline = deadline
+        self.rate = rate
+        self.burst = burst
+        self.buckets: dict[str, TokenBucket] = {}
+
+    async def _wait_for_rate(self, model: str) -> float:
+        if not self.rate:
+            return 0.0
+        bucket = self.buckets.setdefault(model, TokenBucket(self.rate, self.burst))
+        wait = bucket.reserve()
+        if self.deadline is not None and wait > self.deadline:
+            bucket.cancel()
+            self.concurrency.rejected += 1
+            raise LLMOverloadedError(wait)
+        if wait:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                bucket.cancel()
+                raise
+        return wait
+
+    @asynccontextmanager
+    async def slot(self, model: str) -> AsyncIterator[SlotObservation]:
+        """
+        Espera turno para llamar a `model` y registra el resultado al salir.
+
+        La llamada debe asignar `status_code` en la observación; los errores
+        de transporte y las respuestas 429 o 5xx cuentan como sobrecarga.
+
+        Si la petición no llega a salir (rechazo por concurrencia o
+        cancelación en la cola), el token de tasa se devuelve al modelo.
+
+        Raises:
+            LLMOverloadedError: Si no hay turno dentro de `deadline` segundos.
+        """
+        waited = await self._wait_for_rate(model)
+        remaining = None if self.deadline is None else max(self.deadline - waited, 0.0)
+        try:
+            await self.concurrency.acquire(remaining)
+        except (LLMOverloadedError, asyncio.CancelledError):
+            if self.rate:
+                self.buckets[model].cancel()
+            raise
+
+        observation = SlotObservation()
+        start = time.perf_counter()
+        try:
+            yield observation
+        except httpx.TransportError:
+            self.concurrency.observe(time.perf_counter() - start, overloaded=True)
+            raise
+        except BaseException:
+            self.concurrency.release()
+            raise
+        else:
+            status_code = observation.status_code or 200
+            overloaded = status_code == 429 or status_code >= 500
+            self.concurrency.observe(time.perf_counter() - start, overloaded)
+
+    def stats(self) -> dict:
+        return {
+            **self.concurrency.stats(),
+            "rate_limit": self.rate,
+            "rate_tokens": {model: round(bucket.tokens, 2) for model, bucket in self.buckets.items()}
+        }
+
+
+_limiter: LLMLimiter | None = None
+
+
+def get_llm_limiter() -> LLMLimiter:
+    """Retorna el limitador del proceso, creándolo según la configuración."""
+    global _limiter
+    if _limiter is None:
+        settings = get_settings()
+        _limiter = LLMLimiter(
+            concurrency=AdaptiveLimiter(
+                initial_limit=settings.llm_initial_concurrency,
+                min_limit=settings.llm_min_concurrency,
+                max_limit=settings.hf_max_connections,
+                latency_target=settings.llm_latency_target
+            ),
+            deadline=settings.llm_queue_deadline,
+            rate=settings.llm_rate_limit,
+            burst=settings.llm_rate_burst
+        )
+    return _limiter
+
+
+def reset_llm_limiter() -> None:
+    """Descarta el limitador (sus colas pertenecen al event loop que se cierra)."""
+    global _limiter
+    _limiter = None
@@ -0,0 +1,272 @@
+import math
+from bisect import bisect_left
+from typing import Callable
+
+# Content-Type del formato de texto de Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Desde el parseo (µs) hasta una llamada lenta al LLM (decenas de segundos)
+STAGE_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """
+    Base de las métricas: nombre, ayuda, tipo y un hijo por combinación de
+    etiquetas.
+
+    `labels()` crea el hijo la primera vez y luego solo lo busca en un dict;
+    en el camino caliente conviene resolverlo una vez al importar el módulo
+    (p. ej. `FETCH = STAGE_SECONDS.labels("supabase_fetch")`) para que cada
+    observación sea solo una suma.
+    """
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        """Retorna el hijo de esas etiquetas, creándolo la primera vez."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        """Pone a cero los hijos sin descartarlos, para no invalidar los ya resueltos."""
+        for child in self._children.values():
+            child.reset()
+
+    def samples(self) -> list[tuple[str, float]]:
+        """Muestras (sufijo + etiquetas, valor) en el formato de exposición."""
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{self.name}{suffix} {format_value(value)}" for suffix, value in self.samples())
+        return lines
+
+
+class CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def reset(self) -> None:
+        self.value = 0.0
+
+
+class Counter(Metric):
+    """Contador monótono (nombre terminado en `_total`); sin etiquetas se usa directamente con `inc`."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        if not self.labelnames:
+            self.labels()
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def samples(self) -> list[tuple[str, float]]:
+        return [(format_labels(self.labelnames, values), child.value) for values, child in self._children.items()]
+
+
+class HistogramChild:
+    """
+    Conteos por bucket sin acumular: `observe` hace una búsqueda binaria y
+    dos sumas; los acumulados se calculan al exportar.
+    """
+
+    __slots__ = ("upper_bounds", "counts", "sum")
+
+    def __init__(self, upper_bounds: tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def reset(self) -> None:
+        self.counts = [0] * len(self.counts)
+        self.sum = 0.0
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = STAGE_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        if not self.labelnames:
+            self.labels()
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self) -> list[tuple[str, float]]:
+        samples = []
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), child.counts):
+                cumulative += count
+                bucket_labels = format_labels(self.labelnames + ("le",), values + (format_value(bound),))
+                samples.append((f"_bucket{bucket_labels}", cumulative))
+            labels = format_labels(self.labelnames, values)
+            samples.append((f"_sum{labels}", child.sum))
+            samples.append((f"_count{labels}", cumulative))
+        return samples
+
+
+class CallbackMetric(Metric):
+    """
+    Métrica leída al exportar desde los contadores que ya existen (caché,
+    limitador, coalescencia...), sin costo por petición.
+
+    El callback retorna un valor, o un dict de tuplas de etiquetas a valores.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], float | dict[tuple[str, ...], float]],
+        labelnames: tuple[str, ...] = (),
+        type: str = "gauge"
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.type = type
+
+    def samples(self) -> list[tuple[str, float]]:
+        result = self.callback()
+        if not isinstance(result, dict):
+            result = {(): result}
+        return [
+            (format_labels(self.labelnames, values), float(value))
+            for values, value in result.items() if value is not None
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"La métrica {metric.name} ya está registrada")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = STAGE_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], float | dict[tuple[str, ...], float]],
+        labelnames: tuple[str, ...] = (),
+        type: str = "gauge"
+    ) -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, callback, labelnames, type))
+
+    def reset(self) -> None:
+        """Pone a cero contadores e histogramas; las métricas por callback no guardan estado."""
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def render(self) -> str:
+        """Exporta todas las métricas en el formato de texto de Prometheus."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "ticket_stage_duration_seconds",
+    "Duración de cada etapa del procesamiento de un ticket",
+    ("stage",)
+)
+
+ANALYSES = REGISTRY.counter(
+    "ticket_analyses_total",
+    "Análisis producidos por categoría y sentimiento",
+    ("category", "sentiment")
+)
+
+PARSE_FALLBACKS = REGISTRY.counter(
+    "llm_parse_fallbacks_total",
+    "Respuestas del LLM con un campo reemplazado por otros/neutro",
+    ("field",)
+)
+
+# Hijos resueltos de antemano: observar una etapa no busca etiquetas
+SUPABASE_FETCH_SECONDS = STAGE_SECONDS.labels("supabase_fetch")
+LLM_CALL_SECONDS = STAGE_SECONDS.labels("llm_call")
+PARSE_SECONDS = STAGE_SECONDS.labels("parse")
+SUPABASE_UPDATE_SECONDS = STAGE_SECONDS.labels("supabase_update")
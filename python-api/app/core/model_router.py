@@ -0,0 +1,154 @@
+import random
+from app.core.config import LLMEndpoint, get_settings
+
+# Nombre del endpoint implícito cuando no se configura LLM_ENDPOINTS
+DEFAULT_ENDPOINT = "default"
+
+# Cuánto encarece una tasa de error del 100 % frente a la latencia pura
+ERROR_PENALTY = 10.0
+
+# Segundos que suma una tasa de error del 100 %, para que los errores pesen
+# aunque el endpoint falle tan rápido que su latencia sea casi cero
+ERROR_SECONDS = 5.0
+
+
+class EndpointState:
+    """Medias móviles exponenciales de latencia y errores de un endpoint."""
+
+    def __init__(self, endpoint: LLMEndpoint):
+        self.endpoint = endpoint
+        self.requests = 0
+        self.errors = 0
+        self.selected = 0
+        self.latency: float | None = None
+        self.error_rate = 0.0
+
+    def score(self) -> float:
+        """
+        Costo esperado de enviar aquí la próxima petición; menor es mejor.
+
+        Solo un endpoint que todavía no recibió peticiones puntúa 0 (se prueba
+        primero); los fallos también aportan su latencia y además suman
+        ERROR_SECONDS según la tasa de error.
+        """
+        if self.requests == 0:
+            return 0.0
+        latency = self.latency or 0.0
+        penalty = 1 + ERROR_PENALTY * self.error_rate
+        expected = latency * penalty + ERROR_SECONDS * self.error_rate
+        return expected * self.endpoint.cost / max(self.endpoint.weight, 1e-9)
+
+    def stats(self) -> dict:
+        return {
+            **self.endpoint.model_dump(exclude={"url"}),
+            "requests": self.requests,
+            "errors": self.errors,
+            "selected": self.selected,
+            "latency_ewma": round(self.latency, 4) if self.latency is not None else None,
+            "error_rate_ewma": round(self.error_rate, 4),
+            "score": round(self.score(), 4)
+        }
+
+
+class ModelRouter:
+    """
+    Elige a qué modelo/proveedor enviar cada prompt.
+
+    Entre los endpoints principales gana el de menor puntaje: latencia EWMA
+    penalizada por la tasa de errores, multiplicada por `cost` y dividida por
+    `weight`. Un endpoint sin peticiones puntúa 0, así que se prueba
+    primero, y con probabilidad `exploration` se elige uno al azar (según su
+    peso) para que las medias de los demás no queden obsoletas.
+
+    Si la latencia del principal elegido supera `fallback_latency`, la
+    petición va al mejor endpoint marcado como `fallback` (un modelo más
+    pequeño y rápido).
+    """
+
+    def __init__(
+        self,
+        endpoints: list[LLMEndpoint],
+        alpha: float = 0.2,
+        exploration: float = 0.0,
+        fallback_latency: float | None = None,
+        rng: random.Random | None = None
+    ):
+        if not endpoints:
+            raise ValueError("Se necesita al menos un endpoint de modelo")
+        self.states = {endpoint.name: EndpointState(endpoint) for endpoint in endpoints}
+        self.alpha = alpha
+        self.exploration = exploration
+        self.fallback_latency = fallback_latency
+        self._random = rng or random.Random()
+
+    def get(self, name: str) -> LLMEndpoint:
+        """
+        Raises:
+            KeyError: Si no hay un endpoint con ese nombre.
+        """
+        return self.states[name].endpoint
+
+    def choose(self, override: str | None = None) -> LLMEndpoint:
+        """Retorna el endpoint para la próxima petición, o `override` si se indica."""
+        if override is not None:
+            state = self.states[override]
+        else:
+            primaries = [state for state in self.states.values() if not state.endpoint.fallback]
+            primaries = primaries or list(self.states.values())
+            if len(primaries) > 1 and self._random.random() < self.exploration:
+                state = self._random.choices(primaries, weights=[s.endpoint.weight for s in primaries])[0]
+            else:
+                state = min(primaries, key=EndpointState.score)
+            state = self._maybe_fallback(state)
+
+        state.selected += 1
+        return state.endpoint
+
+    def _maybe_fallback(self, state: EndpointState) -> EndpointState:
+        if self.fallback_latency is None or state.latency is None or state.latency <= self.fallback_latency:
+            return state
+        fallbacks = [other for other in self.states.values() if other.endpoint.fallback]
+        return min(fallbacks, key=EndpointState.score) if fallbacks else state
+
+    def observe(self, name: str, latency: float, ok: bool) -> None:
+        """Registra el resultado de una petición al endpoint `name`."""
+        state = self.states[name]
+        state.requests += 1
+        state.error_rate += self.alpha * ((0.0 if ok else 1.0) - state.error_rate)
+        # Un fallo también cuenta su duración (hasta el timeout): un endpoint que
+        # nunca responde no puede quedar con latencia desconocida
+        state.latency = latency if state.latency is None else state.latency + self.alpha * (latency - state.latency)
+        if not ok:
+            state.errors += 1
+
+    def stats(self) -> list[dict]:
+        return [state.stats() for state in self.states.values()]
+
+
+_router: ModelRouter | None = None
+
+
+def get_model_router() -> ModelRouter:
+    """
+    Retorna el router del proceso, creándolo según la configuración.
+
+    Sin `LLM_ENDPOINTS` hay un único endpoint, `default`, sin modelo ni URL
+    propios: quien llama usa `HF_MODEL` y `HF_API_URL`.
+    """
+    global _router
+    if _router is None:
+        settings = get_settings()
+        endpoints = settings.llm_endpoints or [LLMEndpoint(name=DEFAULT_ENDPOINT, model="")]
+        _router = ModelRouter(
+            endpoints,
+            alpha=settings.llm_router_alpha,
+            exploration=settings.llm_router_exploration,
+            fallback_latency=settings.llm_fallback_latency
+        )
+    return _router
+
+
+def reset_model_router() -> None:
+    """Descarta las medias observadas (usado por los tests)."""
+    global _router
+    _router = None
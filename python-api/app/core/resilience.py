@@ -0,0 +1,285 @@
+import asyncio
+import math
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+import httpx
+from app.core.config import get_settings
+from app.core.limiter import LLMOverloadedError
+
+T = TypeVar("T")
+
+# Respuestas del proveedor que suelen resolverse solas al reintentar
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(LLMOverloadedError):
+    """El circuito hacia el LLM está abierto; no se envían peticiones."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(retry_after)
+        self.args = (f"Proveedor LLM no disponible, reintentar en {math.ceil(retry_after)} s",)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Errores transitorios: de transporte, timeouts o estados en RETRYABLE_STATUS."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS
+    return isinstance(exc, httpx.TransportError)
+
+
+def retry_after_hint(exc: BaseException) -> float | None:
+    """Lee la cabecera Retry-After (en segundos) de una respuesta 429/503."""
+    if not isinstance(exc, httpx.HTTPStatusError):
+        return None
+    value = exc.response.headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    """
+    Corta las llamadas tras `failure_threshold` fallos transitorios seguidos.
+
+    Abierto, rechaza de inmediato durante `reset_timeout` segundos; luego
+    deja pasar una sola petición de prueba (semiabierto) y se cierra si tiene
+    éxito o vuelve a abrirse si falla.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._clock = clock
+
+    def remaining_open(self) -> float:
+        return max(0.0, self._opened_at + self.reset_timeout - self._clock())
+
+    def before_call(self) -> bool:
+        """
+        Returns:
+            True si la llamada es la prueba del estado semiabierto; quien la
+            hace debe liberarla con `release_probe` al terminar.
+
+        Raises:
+            CircuitOpenError: Si el circuito está abierto o ya hay una prueba en curso.
+        """
+        if self.state == "open":
+            if self.remaining_open() > 0:
+                raise CircuitOpenError(self.remaining_open())
+            self.state = "half_open"
+            self._probing = False
+        if self.state == "half_open":
+            if self._probing:
+                raise CircuitOpenError(self.reset_timeout)
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        """
+        Libera la prueba en curso si terminó sin veredicto (rechazo del
+        limitador, cancelación): la siguiente llamada vuelve a probar.
+        """
+        self._probing = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.state = "closed"
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened += 1
+            self.state = "open"
+            self._opened_at = self._clock()
+            self._probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.opened,
+            "retry_in": round(self.remaining_open(), 2) if self.state == "open" else 0.0
+        }
+
+
+class LatencyTracker:
+    """Ventana de latencias recientes de respuestas exitosas."""
+
+    def __init__(self, size: int = 200):
+        self.samples: deque[float] = deque(maxlen=size)
+
+    def record(self, latency: float) -> None:
+        self.samples.append(latency)
+
+    def percentile(self, pct: float) -> float | None:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class ResilientCaller:
+    """
+    Envuelve una llamada idempotente al LLM con reintentos, hedging y circuit breaker.
+
+    - Reintenta errores transitorios con backoff exponencial y jitter
+      completo, respetando `Retry-After` y sin pasarse del presupuesto total
+      `deadline` (cada intento recibe como timeout el tiempo restante).
+    - Con `hedge` activo y suficientes muestras, si un intento tarda más que
+      el p95 observado lanza una segunda petición y se queda con la primera
+      respuesta válida.
+    - Cada intento fallido cuenta para el circuit breaker; con el circuito
+      abierto la llamada falla de inmediato con CircuitOpenError.
+    """
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        deadline: float,
+        hedge: bool = False,
+        hedge_min_samples: int = 20
+    ):
+        self.breaker = breaker
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = LatencyTracker()
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def hedge_delay(self) -> float | None:
+        if not self.hedge or len(self.latencies.samples) < self.hedge_min_samples:
+            return None
+        return self.latencies.percentile(95)
+
+    async def _attempt(self, call: Callable[[float], Awaitable[T]], timeout: float) -> T:
+        probe = self.breaker.before_call()
+        start = time.monotonic()
+        try:
+            result = await call(timeout)
+        except Exception as exc:
+            if is_retryable(exc):
+                self.breaker.record_failure()
+            elif isinstance(exc, httpx.HTTPStatusError):
+                # El proveedor respondió (400, 401...): la petición falló, pero el servicio está disponible
+                self.breaker.record_success()
+            raise
+        finally:
+            # Sin esto, una prueba que termina de otra forma dejaría el circuito semiabierto para siempre
+            if probe:
+                self.breaker.release_probe()
+        self.breaker.record_success()
+        self.latencies.record(time.monotonic() - start)
+        return result
+
+    async def _hedged(self, call: Callable[[float], Awaitable[T]], timeout: float, delay: float) -> T:
+        first = asyncio.ensure_future(self._attempt(call, timeout))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        self.hedges += 1
+        second = asyncio.ensure_future(self._attempt(call, max(timeout - delay, 0.001)))
+        pending = {first, second}
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def call(self, call: Callable[[float], Awaitable[T]]) -> T:
+        """
+        Ejecuta `call(timeout)` con la política de reintentos.
+
+        Raises:
+            CircuitOpenError: Si el circuito está abierto.
+            LLMOverloadedError: Si el limitador rechaza la petición (no se reintenta).
+            httpx.HTTPError: El último error si se agotan intentos o presupuesto.
+        """
+        expires = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = expires - time.monotonic()
+            try:
+                delay = self.hedge_delay()
+                if delay is not None and delay < remaining:
+                    return await self._hedged(call, remaining, delay)
+                return await self._attempt(call, remaining)
+            except LLMOverloadedError:
+                raise
+            except Exception as exc:
+                if not is_retryable(exc) or attempt >= self.max_attempts:
+                    raise
+                wait = retry_after_hint(exc) or self.backoff(attempt)
+                if time.monotonic() + wait >= expires:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(wait)
+
+    def stats(self) -> dict:
+        p95 = self.latencies.percentile(95)
+        return {
+            "breaker": self.breaker.stats(),
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p95_latency": round(p95, 4) if p95 is not None else None
+        }
+
+
+_caller: ResilientCaller | None = None
+
+
+def get_llm_caller() -> ResilientCaller:
+    """Retorna la política de resiliencia del proceso, creándola según la configuración."""
+    global _caller
+    if _caller is None:
+        settings = get_settings()
+        _caller = ResilientCaller(
+            breaker=CircuitBreaker(settings.llm_breaker_failure_threshold, settings.llm_breaker_reset_timeout),
+            max_attempts=settings.llm_max_attempts,
+            base_delay=settings.llm_retry_base_delay,
+            max_delay=settings.llm_retry_max_delay,
+            deadline=settings.llm_deadline,
+            hedge=settings.llm_hedge_enabled,
+            hedge_min_samples=settings.llm_hedge_min_samples
+        )
+    return _caller
+
+
+def reset_llm_caller() -> None:
+    """Descarta el estado del circuito y las latencias observadas."""
+    global _caller
+    _caller = None
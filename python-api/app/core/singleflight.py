@@ -0,0 +1,51 @@
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Deduplica llamadas concurrentes con la misma clave.
+
+    La primera llamada para una clave lanza el trabajo como tarea; las que
+    llegan mientras sigue en vuelo esperan esa misma tarea y reciben su
+    resultado (o su excepción). La tarea se protege con `shield`, así que si
+    el cliente que la originó se desconecta el resto sigue esperando.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Marca la excepción como observada aunque nadie siga esperando
+            task.exception()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight
+        }
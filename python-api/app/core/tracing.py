@@ -0,0 +1,308 @@
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Un ID recibido del cliente solo se reutiliza si es corto y seguro para logs y cabeceras
+VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:\-]{1,128}$")
+
+# traceparent de W3C Trace Context: versión-trace_id-parent_id-flags
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+# Respuestas que duran lo que el stream (SSE de /events, reporte de /import, /tickets/export)
+STREAMING_CONTENT_TYPES = ("text/event-stream", "application/x-ndjson", "text/csv")
+
+# Tipos de span de OTLP
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+# Código de estado de error de OTLP
+STATUS_ERROR = 2
+
+
+class Span:
+    __slots__ = ("name", "start", "end")
+
+    def __init__(self, name: str, start: float, end: float):
+        self.name = name
+        self.start = start
+        self.end = end
+
+
+class Trace:
+    """
+    Etapas de una petición HTTP, medidas con `time.perf_counter`.
+
+    Se crea una por petición en el middleware y se comparte por contextvar con
+    el código que la atiende, incluidas las tareas que este lance; fuera de
+    una petición (workers de la cola, CLI) no hay traza y registrar una etapa
+    no hace nada.
+    """
+
+    def __init__(self, method: str, path: str, request_id: str, trace_id: str, parent_span_id: str | None = None):
+        self.method = method
+        self.path = path
+        self.request_id = request_id
+        self.trace_id = trace_id
+        self.parent_span_id = parent_span_id
+        self.wall_start_ns = time.time_ns()
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.status_code: int | None = None
+        # Respuesta en stream (SSE, importación): dura lo que el envío, no es una petición lenta
+        self.streaming = False
+        self.spans: list[Span] = []
+
+    @classmethod
+    def from_scope(cls, scope: Scope) -> "Trace":
+        """Crea la traza reutilizando X-Request-ID y traceparent si vienen en la petición."""
+        request_id = trace_id = parent_span_id = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if VALID_REQUEST_ID.match(candidate):
+                    request_id = candidate
+            elif name == b"traceparent":
+                match = TRACEPARENT.match(value.decode("latin-1"))
+                if match:
+                    trace_id, parent_span_id = match.groups()
+
+        trace_id = trace_id or uuid.uuid4().hex
+        return cls(scope["method"], scope["path"], request_id or trace_id, trace_id, parent_span_id)
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def stage_totals(self) -> dict[str, float]:
+        """Segundos por etapa, sumando las que se repiten (p. ej. varias llamadas al LLM)."""
+        totals: dict[str, float] = {}
+        for span in self.spans:
+            totals[span.name] = totals.get(span.name, 0.0) + span.end - span.start
+        return totals
+
+    def server_timing(self) -> str:
+        """Valor de la cabecera Server-Timing: cada etapa y el total, en ms."""
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stage_totals().items()]
+        entries.append(f"total;dur={self.duration * 1000:.1f}")
+        return ", ".join(entries)
+
+    def unix_nanos(self, instant: float) -> int:
+        return self.wall_start_ns + round((instant - self.start) * 1e9)
+
+
+current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+
+
+def record_span(name: str, start: float, end: float) -> None:
+    """Agrega una etapa a la traza de la petición en curso, si la hay."""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.spans.append(Span(name, start, end))
+
+
+def finish_stage(name: str, histogram, start: float) -> None:
+    """
+    Cierra una etapa que empezó en `start`: la observa en su histograma de
+    métricas y la registra como span de la petición en curso.
+    """
+    end = time.perf_counter()
+    histogram.observe(end - start)
+    record_span(name, start, end)
+
+
+def otlp_attribute(key: str, value: str | int) -> dict:
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    return {"key": key, "value": {"stringValue": value}}
+
+
+def span_id() -> str:
+    return os.urandom(8).hex()
+
+
+def trace_to_otlp(trace: Trace, service_name: str) -> dict:
+    """
+    Convierte una traza al formato OTLP/JSON: un span SERVER para la petición
+    y uno INTERNAL por etapa. Es el formato que escribe el file exporter del
+    OpenTelemetry Collector y que su receiver `otlpjsonfile` puede leer.
+    """
+    root_id = span_id()
+    end = trace.end or time.perf_counter()
+    root = {
+        "traceId": trace.trace_id,
+        "spanId": root_id,
+        "name": f"{trace.method} {trace.path}",
+        "kind": SPAN_KIND_SERVER,
+        "startTimeUnixNano": str(trace.wall_start_ns),
+        "endTimeUnixNano": str(trace.unix_nanos(end)),
+        "attributes": [
+            otlp_attribute("http.request.method", trace.method),
+            otlp_attribute("url.path", trace.path),
+            otlp_attribute("http.response.status_code", trace.status_code or 0),
+            otlp_attribute("request.id", trace.request_id)
+        ],
+        "status": {"code": STATUS_ERROR} if trace.status_code is None or trace.status_code >= 500 else {}
+    }
+    if trace.parent_span_id:
+        root["parentSpanId"] = trace.parent_span_id
+
+    stages = [
+        {
+            "traceId": trace.trace_id,
+            "spanId": span_id(),
+            "parentSpanId": root_id,
+            "name": span.name,
+            "kind": SPAN_KIND_INTERNAL,
+            "startTimeUnixNano": str(trace.unix_nanos(span.start)),
+            "endTimeUnixNano": str(trace.unix_nanos(span.end))
+        }
+        for span in trace.spans
+    ]
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [otlp_attribute("service.name", service_name)]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": [root, *stages]}]
+        }]
+    }
+
+
+class FileSpanExporter:
+    """
+    Agrega cada traza como una línea OTLP/JSON a un archivo local.
+
+    `export` corre en el middleware, sobre el event loop: solo encola la
+    traza. Un hilo propio la serializa y escribe por lotes, con un flush por
+    lote, así que ninguna petición espera al disco. Si el disco no da abasto
+    y la cola se llena, las trazas nuevas se descartan y se cuentan en
+    `dropped`.
+    """
+
+    def __init__(self, path: str, service_name: str, max_pending: int = 10000):
+        self.path = path
+        self.service_name = service_name
+        self.dropped = 0
+        self._queue: queue.Queue[Trace | None] = queue.Queue(maxsize=max_pending)
+        self._file = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._write_loop, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, trace: Trace) -> None:
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            traces = [trace for trace in batch if trace is not None]
+            try:
+                self._file.write("".join(
+                    json.dumps(trace_to_otlp(trace, self.service_name), separators=(",", ":")) + "\n"
+                    for trace in traces
+                ))
+                self._file.flush()
+            except Exception:
+                logger.exception("No se pudieron escribir %d trazas en %s", len(traces), self.path)
+            if len(traces) < len(batch):
+                return
+
+    def close(self) -> None:
+        """Escribe las trazas pendientes y cierra el archivo."""
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+
+
+_exporter: FileSpanExporter | None = None
+
+
+def get_span_exporter() -> FileSpanExporter | None:
+    """Retorna el exportador del proceso, o None si TRACE_EXPORT_PATH no está definido."""
+    global _exporter
+    settings = get_settings()
+    if _exporter is None and settings.trace_export_path:
+        _exporter = FileSpanExporter(settings.trace_export_path, settings.trace_service_name)
+    return _exporter
+
+
+def close_span_exporter() -> None:
+    global _exporter
+    if _exporter is not None:
+        _exporter.close()
+        _exporter = None
+
+
+def finish_trace(trace: Trace) -> None:
+    """Registra la petición como lenta si supera el umbral y la exporta si hay exportador."""
+    settings = get_settings()
+    threshold = settings.slow_request_threshold
+    if threshold and not trace.streaming and trace.duration >= threshold:
+        breakdown = " ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in trace.stage_totals().items())
+        logger.warning(
+            "Petición lenta %s %s: %.1f ms, status %s, request_id=%s [%s]",
+            trace.method, trace.path, trace.duration * 1000, trace.status_code,
+            trace.request_id, breakdown or "sin etapas"
+        )
+
+    exporter = get_span_exporter()
+    if exporter is not None:
+        try:
+            exporter.export(trace)
+        except (OSError, ValueError):
+            logger.exception("No se pudo exportar la traza %s", trace.trace_id)
+
+
+class TracingMiddleware:
+    """
+    Middleware ASGI que abre una traza por petición HTTP.
+
+    Responde con X-Request-ID (el recibido o uno nuevo) y con Server-Timing
+    con la duración de cada etapa registrada hasta que empieza la respuesta.
+    Al terminar, loguea la petición si fue lenta y la exporta como spans.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace.from_scope(scope)
+        token = current_trace.set(trace)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                trace.status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                trace.streaming = headers.get("content-type", "").startswith(STREAMING_CONTENT_TYPES)
+                headers.append(REQUEST_ID_HEADER, trace.request_id)
+                headers.append("Server-Timing", trace.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_trace.reset(token)
+            trace.end = time.perf_counter()
+            finish_trace(trace)
@@ -0,0 +1,57 @@
+import hashlib
+import hmac
+import time
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+TIMESTAMP_HEADER = "X-Webhook-Timestamp"
+
+SIGNATURE_PREFIX = "sha256="
+
+
+class WebhookSignatureError(Exception):
+    """La firma del webhook falta, no coincide o está fuera de la ventana de tolerancia."""
+
+
+def sign_payload(secret: str, timestamp: str, body: bytes) -> str:
+    """
+    Firma HMAC-SHA256 de `<timestamp>.<cuerpo>`, como `sha256=<hex>`.
+
+    Incluir el timestamp en lo firmado impide reenviar un cuerpo capturado
+    con una fecha nueva.
+    """
+    digest = hmac.new(secret.encode(), timestamp.encode() + b"." + body, hashlib.sha256).hexdigest()
+    return SIGNATURE_PREFIX + digest
+
+
+def verify_signature(
+    secret: str,
+    body: bytes,
+    signature: str | None,
+    timestamp: str | None,
+    tolerance: float,
+    now: float | None = None
+) -> None:
+    """
+    Comprueba la firma de un webhook sobre el cuerpo crudo recibido.
+
+    Args:
+        tolerance: Segundos de diferencia admitidos entre el timestamp y el
+            reloj local (0 no limita); acota la ventana para reenvíos.
+
+    Raises:
+        WebhookSignatureError: Si la firma falta, está vencida o no coincide.
+    """
+    if not signature or not timestamp:
+        raise WebhookSignatureError("Falta la firma del webhook")
+    try:
+        sent_at = float(timestamp)
+    except ValueError:
+        raise WebhookSignatureError("Timestamp del webhook inválido") from None
+
+    now = time.time() if now is None else now
+    if tolerance and abs(now - sent_at) > tolerance:
+        raise WebhookSignatureError("Firma del webhook fuera de la ventana de tolerancia")
+
+    # Comparación en tiempo constante para no filtrar cuántos caracteres coinciden
+    if not hmac.compare_digest(sign_payload(secret, timestamp, body), signature.strip()):
+        raise WebhookSignatureError("Firma del webhook inválida")
@@ -1,7 +1,21 @@
-from fastapi import FastAPI
+import math
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 from app.api.routes import router
+from app.core.database import init_supabase_client, close_supabase_client
+from app.core.http_client import close_http_client
+from app.core.limiter import LLMOverloadedError, reset_llm_limiter
+from app.core.resilience import reset_llm_caller
+from app.core.tracing import REQUEST_ID_HEADER, TracingMiddleware, close_span_exporter
+from app.services.backlog_service import cancel_backlog_run
+from app.services.cache_service import close_analysis_cache
+from app.services.idempotency import REPLAYED_HEADER
+from app.services.local_classifier import init_local_classifier
+from app.services.job_queue import start_job_workers, close_job_queue
+from app.services.ticket_events import start_ticket_events, stop_ticket_events
 
 DESCRIPTION = """
 ## API de Procesamiento de Tickets con IA
@@ -38,13 +52,38 @@ tags_metadata = [
         "name": "tickets",
         "description": "Operaciones de procesamiento de tickets con IA",
     },
+    {
+        "name": "debug",
+        "description": "Contadores internos para diagnóstico de rendimiento",
+    },
 ]
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Gestiona los recursos compartidos durante el ciclo de vida de la app."""
+    await init_supabase_client()
+    await init_local_classifier()
+    start_job_workers()
+    await start_ticket_events()
+    yield
+    await stop_ticket_events()
+    await close_job_queue()
+    await cancel_backlog_run()
+    await close_http_client()
+    reset_llm_limiter()
+    reset_llm_caller()
+    await close_supabase_client()
+    close_analysis_cache()
+    close_span_exporter()
+
+
 app = FastAPI(
     title="API Support Ticket AI",
     description=DESCRIPTION,
     version="1.0.0",
     openapi_tags=tags_metadata,
+    lifespan=lifespan,
     contact={
         "name": "Soporte API",
         "email": "soporte@ejemplo.com",
@@ -60,8 +99,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[REQUEST_ID_HEADER, "Server-Timing", "ETag", REPLAYED_HEADER],
 )
 
+# Se agrega después de CORS para quedar por fuera y medir la petición completa
+app.add_middleware(TracingMiddleware)
+
+
+@app.exception_handler(LLMOverloadedError)
+async def llm_overloaded_handler(request: Request, exc: LLMOverloadedError):
+    """
+    Responde 503 con Retry-After cuando el LLM no admite más peticiones a
+    tiempo o su circuito está abierto.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))}
+    )
+
 
 @app.get("/", tags=["health"])
 def root():
@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel, Field
 
 
@@ -161,3 +162,237 @@ class AnalyzeTextResponse(BaseModel):
             ]
         }
     }
+
+
+class AnalyzeBatchRequest(BaseModel):
+    """Solicitud para analizar varios textos en una sola petición."""
+
+    texts: list[str] = Field(
+        ...,
+        min_length=1,
+        description="Textos de los tickets a analizar",
+        json_schema_extra={"example": ["No puedo acceder a mi cuenta", "Me cobraron dos veces"]}
+    )
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "texts": [
+                        "No puedo acceder a mi cuenta desde hace 2 días",
+                        "Me cobraron dos veces la suscripción",
+                        "Quisiera información sobre los planes para empresas"
+                    ]
+                }
+            ]
+        }
+    }
+
+
+class AnalyzeBatchResponse(BaseModel):
+    """Respuesta del análisis por lotes."""
+
+    results: list[AnalyzeTextResponse] = Field(
+        ...,
+        description="Análisis de cada texto, en el mismo orden de la solicitud"
+    )
+
+
+class BacklogRunRequest(BaseModel):
+    """Solicitud para procesar el backlog de tickets sin procesar."""
+
+    page_size: int | None = Field(
+        default=None,
+        ge=1,
+        le=1000,
+        description="Tickets leídos por página (por defecto BACKLOG_PAGE_SIZE)"
+    )
+    concurrency: int | None = Field(
+        default=None,
+        ge=1,
+        le=64,
+        description="Lotes clasificándose en paralelo (por defecto BACKLOG_CONCURRENCY)"
+    )
+    limit: int | None = Field(
+        default=None,
+        ge=1,
+        description="Máximo de tickets a recorrer en esta corrida"
+    )
+
+
+class BacklogStatusResponse(BaseModel):
+    """Progreso de la corrida del backlog."""
+
+    status: str = Field(
+        ...,
+        description="Estado de la corrida: idle, running, completed, paused (LLM no disponible), failed o cancelled",
+        json_schema_extra={"example": "running"}
+    )
+    processed: int = Field(..., description="Tickets clasificados y guardados")
+    failed: int = Field(..., description="Tickets que no se pudieron clasificar o guardar")
+    pages: int = Field(..., description="Páginas completadas")
+    cursor: dict | None = Field(
+        default=None,
+        description="Último (created_at, id) procesado",
+        json_schema_extra={"example": {"created_at": "2024-01-01T00:00:00+00:00", "id": "550e8400-e29b-41d4-a716-446655440000"}}
+    )
+    elapsed_seconds: float = Field(..., description="Tiempo transcurrido en segundos")
+    tickets_per_second: float = Field(..., description="Tickets procesados por segundo")
+    error: str | None = Field(default=None, description="Error que detuvo la corrida, si lo hubo")
+
+
+class CreateTicketsRequest(BaseModel):
+    """Solicitud para crear varios tickets en una sola petición."""
+
+    tickets: list[CreateTicketRequest] = Field(
+        ...,
+        min_length=1,
+        description="Tickets a crear; los que no traen categoría ni sentimiento se analizan con IA"
+    )
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "tickets": [
+                        {"description": "No puedo acceder a mi cuenta"},
+                        {"description": "Consulta sobre precios", "category": "ventas", "sentiment": "neutro"}
+                    ]
+                }
+            ]
+        }
+    }
+
+
+class CreatedTicket(BaseModel):
+    """Ticket creado dentro de una creación masiva."""
+
+    ticket_id: str = Field(..., description="UUID del ticket creado")
+    description: str = Field(..., description="Descripción del ticket")
+    category: str | None = Field(default=None, description="Categoría del ticket")
+    sentiment: str | None = Field(default=None, description="Sentimiento del ticket")
+
+
+class BulkRowError(BaseModel):
+    """Fila que no se pudo procesar en una operación masiva."""
+
+    index: int = Field(..., description="Posición de la fila en la solicitud")
+    error: str = Field(..., description="Motivo del fallo")
+
+
+class CreateTicketsResponse(BaseModel):
+    """Respuesta de la creación masiva de tickets."""
+
+    created: list[CreatedTicket] = Field(..., description="Tickets creados")
+    failed: list[BulkRowError] = Field(..., description="Tickets que no se pudieron crear")
+
+
+class RuntimeStatsResponse(BaseModel):
+    """Contadores internos del proceso."""
+
+    cache: dict = Field(..., description="Estadísticas de la caché de análisis")
+    local_classifier: dict = Field(..., description="Tickets resueltos por el clasificador local y delegados al LLM")
+    jobs: dict = Field(..., description="Workers activos y trabajos por estado en la cola durable")
+    llm_limiter: dict = Field(..., description="Límite adaptativo, cola y rechazos hacia el LLM")
+    llm_resilience: dict = Field(..., description="Circuit breaker, reintentos y hedging de las llamadas al LLM")
+    events: dict = Field(..., description="Suscriptores de /events, eventos publicados y clientes lentos desconectados")
+    coalescing: dict[str, dict] = Field(
+        ...,
+        description="Llamadas reales, coalescidas y en vuelo por tipo de operación"
+    )
+
+
+class ModelRouterResponse(BaseModel):
+    """Endpoints de modelo configurados y su estado en el router."""
+
+    endpoints: list[dict] = Field(..., description="Configuración, medias de latencia/errores y puntaje por endpoint")
+    fallback_latency: float | None = Field(
+        None,
+        description="Latencia (s) del principal a partir de la cual se usa un endpoint de fallback"
+    )
+    exploration: float = Field(..., description="Probabilidad de elegir un endpoint al azar para refrescar sus medias")
+
+
+class JobAcceptedResponse(BaseModel):
+    """Respuesta al encolar un procesamiento en segundo plano."""
+
+    job_id: str = Field(..., description="ID del trabajo encolado")
+    status: str = Field(..., description="Estado actual del trabajo")
+    status_url: str = Field(..., description="URL para consultar el estado del trabajo")
+
+
+class JobStatusResponse(BaseModel):
+    """Estado de un trabajo de la cola."""
+
+    job_id: str = Field(..., description="ID del trabajo")
+    kind: str = Field(..., description="Tipo de trabajo")
+    status: str = Field(..., description="queued, running, succeeded o dead")
+    attempts: int = Field(..., description="Intentos realizados")
+    max_attempts: int = Field(..., description="Intentos permitidos antes de pasar a dead")
+    result: dict | None = Field(default=None, description="Resultado si el trabajo terminó con éxito")
+    error: str | None = Field(default=None, description="Último error registrado")
+    created_at: float = Field(..., description="Fecha de creación (epoch en segundos)")
+    updated_at: float = Field(..., description="Última actualización (epoch en segundos)")
+
+
+class TicketCounts(BaseModel):
+    """Conteos de tickets en un período."""
+
+    total: int = Field(..., description="Tickets creados")
+    processed: int = Field(..., description="Tickets ya analizados")
+    pending: int = Field(..., description="Tickets sin analizar")
+    negative: int = Field(..., description="Tickets con sentimiento negativo")
+    by_category: dict[str, int] = Field(..., description="Tickets analizados por categoría")
+    by_sentiment: dict[str, int] = Field(..., description="Tickets analizados por sentimiento")
+
+
+class StatsResponse(TicketCounts):
+    """Totales para las tarjetas del dashboard."""
+
+    by_category_sentiment: dict[str, dict[str, int]] = Field(
+        ...,
+        description="Tickets analizados por categoría y, dentro de cada una, por sentimiento"
+    )
+
+
+class TrendPoint(TicketCounts):
+    """Conteos de los tickets creados en un intervalo."""
+
+    start: datetime = Field(..., description="Inicio del intervalo")
+
+
+class TrendsResponse(BaseModel):
+    """Serie temporal de tickets creados por intervalo."""
+
+    bucket: str = Field(..., description="Tamaño del intervalo: hour o day")
+    tz: str = Field(..., description="Zona horaria en la que se cortan los intervalos")
+    since: datetime = Field(..., description="Inicio del primer intervalo")
+    until: datetime = Field(..., description="Fin (exclusivo) del último intervalo")
+    points: list[TrendPoint] = Field(..., description="Un punto por intervalo, incluidos los vacíos")
+
+
+class TicketListResponse(BaseModel):
+    """Una página del listado de tickets."""
+
+    items: list[dict] = Field(..., description="Tickets de la página, con las columnas pedidas en `fields`")
+    next_cursor: str | None = Field(
+        default=None,
+        description="Cursor para pedir la página siguiente; null si no hay más"
+    )
+    limit: int = Field(..., description="Tamaño de página usado")
+
+
+class SupabaseWebhookPayload(BaseModel):
+    """Cuerpo de un webhook de base de datos de Supabase."""
+
+    type: str = Field(..., description="Operación: INSERT, UPDATE o DELETE")
+    table: str = Field(..., description="Tabla modificada")
+    record: dict | None = Field(default=None, description="Fila nueva, con todas sus columnas")
+    old_record: dict | None = Field(default=None, description="Fila anterior en UPDATE y DELETE")
+
+
+class WebhookIgnoredResponse(BaseModel):
+    """Webhook recibido que no requiere procesamiento."""
+
+    ignored: bool = Field(default=True)
+    reason: str = Field(..., description="Motivo por el que no se procesó")
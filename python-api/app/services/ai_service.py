@@ -1,72 +1,406 @@
+import asyncio
 import json
 import re
+import time
 import httpx
 from app.core.config import get_settings
+from app.core.http_client import get_http_client
+from app.core.limiter import get_llm_limiter
+from app.core.metrics import ANALYSES, LLM_CALL_SECONDS, PARSE_FALLBACKS, PARSE_SECONDS
+from app.core.model_router import get_model_router
+from app.core.resilience import CircuitOpenError, get_llm_caller
+from app.core.singleflight import SingleFlight
+from app.core.tracing import finish_stage
+from app.services.local_classifier import classify_fallback, classify_locally
+from app.services.prompts import ANALYSIS_PROMPT, CATEGORIES, SENTIMENTS, SYSTEM_PROMPT, prompt_version, render_batch
+from app.services.stream_parser import SSE_DONE, AnalysisStreamParser, sse_delta
+from app.services.ticket_text import prepare_ticket_text
+from app.services.cache_service import cache_key, get_analysis_cache
 
 
-CATEGORIES = [
-    "facturación",
-    "soporte técnico",
-    "ventas",
-    "devoluciones",
-    "información general",
-    "quejas",
-    "otros"
-]
+HF_API_URL = "https://router.huggingface.co/v1/chat/completions"
 
-SENTIMENTS = ["positivo", "negativo", "neutro"]
+HF_MODEL = "deepseek-ai/DeepSeek-V3:fastest"
 
-HF_API_URL = "https://router.huggingface.co/v1/chat/completions"
+# Análisis idénticos en vuelo, por hash del contenido
+analysis_flights = SingleFlight("analysis")
+
+# Un contador por combinación válida, creados de antemano para exportar también los ceros
+ANALYSIS_COUNTERS = {
+    (category, sentiment): ANALYSES.labels(category, sentiment)
+    for category in CATEGORIES
+    for sentiment in SENTIMENTS
+}
+
+# Motivos de fallback del parseo: respuesta sin JSON, o un campo fuera de la lista
+UNPARSED_FALLBACKS = PARSE_FALLBACKS.labels("response")
+CATEGORY_FALLBACKS = PARSE_FALLBACKS.labels("category")
+SENTIMENT_FALLBACKS = PARSE_FALLBACKS.labels("sentiment")
 
 
-def analyze_ticket(ticket_text: str) -> dict:
+async def analyze_ticket(ticket_text: str, use_cache: bool = True, model: str | None = None) -> dict:
     """
     Analiza un ticket de soporte y extrae la categoría y el sentimiento.
 
+    Los resultados se cachean por hash del texto normalizado, el modelo y la
+    versión de las plantillas de prompt, de modo que los tickets repetidos no
+    llaman al LLM.
+    Las llamadas concurrentes con el mismo hash comparten una sola petición.
+    Si el clasificador local está cargado y su confianza supera el umbral,
+    el ticket se resuelve sin llamar al LLM. Con el circuito hacia el LLM
+    abierto se usa su mejor estimación, que no se cachea.
+
+    Args:
+        ticket_text: El texto del ticket a analizar.
+        use_cache: Si es False, ignora la caché y el clasificador local y
+            fuerza la llamada al LLM.
+        model: Nombre del endpoint de modelo a usar; por defecto lo elige el
+            router. Con un modelo explícito no se usa el clasificador local.
+
+    Returns:
+        Un diccionario con 'category' y 'sentiment'.
+
+    Raises:
+        CircuitOpenError: Si el circuito está abierto y no hay clasificador local.
+    """
+    analysis = await resolve_analysis(ticket_text, use_cache, model)
+    count_analysis(analysis)
+    return analysis
+
+
+async def resolve_analysis(ticket_text: str, use_cache: bool, model: str | None) -> dict:
+    """Obtiene el análisis de la caché, el clasificador local o el LLM, en ese orden."""
+    settings = get_settings()
+    key = cache_key(ticket_text, model_cache_name(model), prompt_version())
+
+    # Solo se comparte un análisis en vuelo con quien pidió lo mismo: mismo
+    # endpoint explícito (o el router) y misma política de caché
+    flight_key = f"{model or ''}:{key}"
+
+    if not (use_cache and settings.analysis_cache_enabled):
+        analysis = await analysis_flights.do(f"fresh:{flight_key}", lambda: request_analysis(ticket_text, model))
+        return dict(analysis)
+
+    cache = get_analysis_cache()
+    cached = await cache.get(key)
+    if cached is not None:
+        return cached
+
+    local = classify_locally(ticket_text) if model is None else None
+    if local is not None:
+        return local
+
+    async def analyze_and_store() -> dict:
+        try:
+            analysis = await request_analysis(ticket_text, model)
+        except CircuitOpenError:
+            fallback = classify_fallback(ticket_text)
+            if fallback is None:
+                raise
+            return fallback
+        await cache.set(key, analysis)
+        return analysis
+
+    return dict(await analysis_flights.do(f"cached:{flight_key}", analyze_and_store))
+
+
+def count_analysis(analysis: dict) -> None:
+    """Suma el análisis al contador de su categoría y sentimiento."""
+    ANALYSIS_COUNTERS[analysis["category"], analysis["sentiment"]].inc()
+
+
+def model_cache_name(model: str | None) -> str:
+    """
+    Modelo con el que se indexa la caché.
+
+    Con un endpoint explícito es su modelo. Sin él, el router elige recién
+    al enviar la petición (y puede cambiar de endpoint en un reintento), así
+    que la clave no puede depender de esa elección: se indexa por el
+    conjunto de modelos configurados. Un análisis de cualquiera de ellos
+    sirve para los demás; cambiar `LLM_ENDPOINTS` invalida esas entradas.
+    Con un único endpoint la clave es su modelo (HF_MODEL por defecto).
+    """
+    router = get_model_router()
+    if model is not None:
+        return router.get(model).model or HF_MODEL
+    models = sorted({state.endpoint.model or HF_MODEL for state in router.states.values()})
+    return models[0] if len(models) == 1 else "router:" + ",".join(models)
+
+
+async def request_analysis(ticket_text: str, model: str | None = None) -> dict:
+    """
+    Envía el ticket al LLM y parsea su respuesta, sin pasar por la caché.
+
+    Con `LLM_STREAMING` la respuesta se lee por SSE y la conexión se cierra
+    en cuanto llega el objeto JSON, sin esperar a que el modelo termine.
+
     Args:
         ticket_text: El texto del ticket a analizar.
+        model: Nombre del endpoint de modelo; None deja elegir al router.
 
     Returns:
         Un diccionario con 'category' y 'sentiment'.
     """
+    start = time.perf_counter()
+    generated_text = await complete_chat(
+        build_analysis_prompt(ticket_text),
+        max_tokens=100,
+        model=model,
+        stream=get_settings().llm_streaming
+    )
+    finish_stage("llm_call", LLM_CALL_SECONDS, start)
+    if generated_text is None:
+        UNPARSED_FALLBACKS.inc()
+        return {"category": "otros", "sentiment": "neutro"}
+
+    start = time.perf_counter()
+    analysis = parse_llm_response(generated_text)
+    finish_stage("parse", PARSE_SECONDS, start)
+    return analysis
+
+
+async def analyze_batch(texts: list[str], use_cache: bool = True, model: str | None = None) -> list[dict]:
+    """
+    Analiza varios tickets empaquetando los no cacheados en pocos prompts.
+
+    Cada prompt agrupa hasta `llm_batch_size` tickets y pide un arreglo JSON
+    indexado, de modo que las instrucciones se pagan una vez por lote y no
+    por ticket. Los elementos que falten o lleguen malformados se reintentan
+    con una llamada individual. Los textos que el clasificador local resuelve
+    con confianza suficiente no se envían, y si el circuito hacia el LLM se
+    abre, los lotes afectados reciben su mejor estimación sin cachearla.
+
+    Args:
+        texts: Los textos de los tickets a analizar.
+        use_cache: Si es False, ignora la caché y fuerza la llamada al LLM.
+        model: Nombre del endpoint de modelo; None deja elegir al router.
+
+    Returns:
+        Una lista de diccionarios con 'category' y 'sentiment', en el mismo
+        orden que `texts`.
+    """
+    settings = get_settings()
+    use_cache = use_cache and settings.analysis_cache_enabled
+    cache = get_analysis_cache()
+
+    results: list[dict | None] = [None] * len(texts)
+    pending: dict[str, list[int]] = {}
+
+    model_name = model_cache_name(model)
+    version = prompt_version()
+    for position, text in enumerate(texts):
+        key = cache_key(text, model_name, version)
+        if use_cache:
+            cached = await cache.get(key)
+            if cached is not None:
+                results[position] = cached
+                continue
+            if key not in pending and model is None:
+                local = classify_locally(text)
+                if local is not None:
+                    results[position] = local
+                    continue
+        pending.setdefault(key, []).append(position)
+
+    keys = list(pending)
+    chunks = [
+        keys[i:i + settings.llm_batch_size]
+        for i in range(0, len(keys), settings.llm_batch_size)
+    ]
+
+    async def analyze_chunk(chunk: list[str]) -> tuple[list[dict], bool]:
+        chunk_texts = [texts[pending[key][0]] for key in chunk]
+        try:
+            analyses = await request_batch_analysis(chunk_texts, model) if len(chunk) > 1 else [None]
+
+            missing = [index for index, analysis in enumerate(analyses) if analysis is None]
+            fallbacks = await asyncio.gather(*(request_analysis(chunk_texts[index], model) for index in missing))
+        except CircuitOpenError:
+            degraded = [classify_fallback(text) for text in chunk_texts] if use_cache else [None]
+            if None in degraded:
+                raise
+            return degraded, False
+
+        for index, analysis in zip(missing, fallbacks):
+            analyses[index] = analysis
+        return analyses, True
+
+    chunk_results = await asyncio.gather(*(analyze_chunk(chunk) for chunk in chunks))
+
+    for chunk, (analyses, cacheable) in zip(chunks, chunk_results):
+        for key, analysis in zip(chunk, analyses):
+            if use_cache and cacheable:
+                await cache.set(key, analysis)
+            for position in pending[key]:
+                results[position] = dict(analysis)
+
+    for analysis in results:
+        count_analysis(analysis)
+    return results
+
+
+async def request_batch_analysis(texts: list[str], model: str | None = None) -> list[dict | None]:
+    """
+    Envía varios tickets en un único prompt y parsea la respuesta por índice.
+
+    Args:
+        texts: Los textos de los tickets a analizar.
+        model: Nombre del endpoint de modelo; None deja elegir al router.
+
+    Returns:
+        Una lista del mismo tamaño que `texts`; cada posición contiene el
+        análisis del ticket o None si el modelo no lo devolvió.
+    """
+    start = time.perf_counter()
+    generated_text = await complete_chat(build_batch_prompt(texts), max_tokens=40 * len(texts) + 20, model=model)
+    finish_stage("llm_call", LLM_CALL_SECONDS, start)
+    if generated_text is None:
+        return [None] * len(texts)
+
+    start = time.perf_counter()
+    analyses = parse_batch_response(generated_text, len(texts))
+    finish_stage("parse", PARSE_SECONDS, start)
+    return analyses
+
+
+def build_analysis_prompt(ticket_text: str) -> str:
+    """Construye el prompt para clasificar un único ticket, ya recortado."""
+    return ANALYSIS_PROMPT.render(trim_ticket(ticket_text))
+
+
+def build_batch_prompt(texts: list[str]) -> str:
+    """Construye el prompt que clasifica varios tickets con respuesta indexada."""
+    return render_batch([trim_ticket(text) for text in texts])
+
+
+def trim_ticket(ticket_text: str) -> str:
+    """
+    Quita hilos citados y firmas y ajusta el ticket a `TICKET_MAX_TOKENS`,
+    para que un correo o un log pegado no infle la latencia ni el costo.
+    """
     settings = get_settings()
+    return prepare_ticket_text(
+        ticket_text,
+        settings.ticket_max_tokens,
+        settings.ticket_head_ratio,
+        strip=settings.ticket_strip_replies
+    )
 
-    system_prompt = "Eres un asistente que analiza tickets de soporte al cliente. Responde ÚNICAMENTE con JSON válido."
 
-    user_prompt = f"""Analiza el siguiente ticket y responde con un JSON con dos campos:
-- "category": una de estas categorías: {", ".join(CATEGORIES)}
-- "sentiment": uno de estos sentimientos: {", ".join(SENTIMENTS)}
+async def complete_chat(
+    user_prompt: str,
+    max_tokens: int,
+    model: str | None = None,
+    stream: bool = False
+) -> str | None:
+    """
+    Envía un prompt al endpoint de chat-completions.
+
+    Con `stream=True` pide la respuesta por SSE, la parsea a medida que llega
+    y corta la conexión en cuanto hay un objeto JSON con 'category' y
+    'sentiment', de modo que no se espera ni se pagan los tokens que el
+    modelo siga generando después.
 
-Ticket: "{ticket_text}"
+    Cada intento pide un endpoint al router de modelos, que elige según la
+    latencia y los errores recientes (o usa `model` si se indica), así que un
+    reintento puede ir a otro proveedor.
 
-Responde SOLO con el JSON, ejemplo: {{"category": "soporte técnico", "sentiment": "negativo"}}"""
+    La llamada pasa por el limitador adaptativo, que espera turno según la
+    concurrencia y la tasa permitidas y ajusta el límite con cada respuesta,
+    y por la política de resiliencia: los 429, 5xx y errores de transporte se
+    reintentan con backoff dentro de `LLM_DEADLINE` segundos en total, y tras
+    `LLM_BREAKER_FAILURE_THRESHOLD` fallos seguidos el circuito se abre.
+
+    Args:
+        user_prompt: El mensaje del usuario.
+        max_tokens: Límite de tokens de la respuesta.
+        model: Nombre del endpoint de modelo; None deja elegir al router.
+        stream: Si es True, lee la respuesta por SSE con corte temprano.
+
+    Returns:
+        El contenido generado (en streaming, el objeto JSON detectado o todo
+        lo recibido si no apareció), o None si la respuesta no trae opciones.
+
+    Raises:
+        LLMOverloadedError: Si no hay turno dentro de `LLM_QUEUE_DEADLINE`.
+        CircuitOpenError: Si el circuito hacia el LLM está abierto.
+        httpx.HTTPError: Si se agotan los reintentos o el plazo total.
+    """
+    settings = get_settings()
 
     headers = {
         "Authorization": f"Bearer {settings.huggingface_api_token}",
         "Content-Type": "application/json"
     }
 
-    payload = {
-        "model": "deepseek-ai/DeepSeek-V3:fastest",
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
-        "max_tokens": 100,
-        "temperature": 0.1
-    }
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
 
-    with httpx.Client(timeout=120.0) as client:
-        response = client.post(HF_API_URL, headers=headers, json=payload)
+    client = get_http_client()
+    limiter = get_llm_limiter()
+    router = get_model_router()
+
+    async def send(remaining: float) -> str | None:
+        endpoint = router.choose(model)
+        model_id = endpoint.model or HF_MODEL
+        url = endpoint.url or HF_API_URL
+        payload = {"model": model_id, "messages": messages, "max_tokens": max_tokens, "temperature": 0.1}
+        if stream:
+            payload["stream"] = True
+        timeout = httpx.Timeout(
+            min(endpoint.timeout or settings.hf_read_timeout, remaining),
+            connect=min(settings.hf_connect_timeout, remaining)
+        )
+        async with limiter.slot(model_id) as slot:
+            start = time.perf_counter()
+            try:
+                if stream:
+                    async with client.stream("POST", url, headers=headers, json=payload, timeout=timeout) as response:
+                        slot.status_code = response.status_code
+                        content = await read_analysis_stream(response) if response.status_code < 400 else None
+                else:
+                    response = await client.post(url, headers=headers, json=payload, timeout=timeout)
+                    slot.status_code = response.status_code
+            except httpx.HTTPError:
+                router.observe(endpoint.name, time.perf_counter() - start, ok=False)
+                raise
+        router.observe(endpoint.name, time.perf_counter() - start, ok=response.status_code < 400)
         response.raise_for_status()
+        return content if stream else completion_content(response.json())
+
+    return await get_llm_caller().call(send)
 
-    result = response.json()
 
+def completion_content(result: dict) -> str | None:
+    """Extrae el texto generado de una respuesta de chat-completions."""
     if "choices" in result and len(result["choices"]) > 0:
-        generated_text = result["choices"][0].get("message", {}).get("content", "")
-        return parse_llm_response(generated_text)
+        return result["choices"][0].get("message", {}).get("content", "")
+
+    return None
+
 
-    return {"category": "otros", "sentiment": "neutro"}
+async def read_analysis_stream(response: httpx.Response) -> str:
+    """
+    Lee deltas SSE hasta completar un objeto con 'category' y 'sentiment'.
+
+    Retornar antes del final deja el cuerpo sin leer: al salir del bloque
+    `client.stream` httpx cierra esa conexión y el proveedor deja de generar.
+    """
+    parser = AnalysisStreamParser()
+    received: list[str] = []
+    async for line in response.aiter_lines():
+        delta = sse_delta(line)
+        if delta == SSE_DONE:
+            break
+        if delta is None:
+            continue
+        received.append(delta)
+        match = parser.feed(delta)
+        if match is not None:
+            return match
+    return "".join(received)
 
 
 def parse_llm_response(response: str) -> dict:
@@ -82,24 +416,76 @@ def parse_llm_response(response: str) -> dict:
     try:
         json_match = re.search(r'\{[^}]+\}', response)
         if json_match:
-            result = json.loads(json_match.group())
-
-            category = result.get("category", "otros").lower()
-            sentiment = result.get("sentiment", "neutro").lower()
-
-            if category not in CATEGORIES:
-                category = "otros"
-            if sentiment not in SENTIMENTS:
-                sentiment = "neutro"
-
-            return {
-                "category": category,
-                "sentiment": sentiment
-            }
+            return normalize_analysis(json.loads(json_match.group()))
     except (json.JSONDecodeError, AttributeError):
         pass
 
+    UNPARSED_FALLBACKS.inc()
     return {
         "category": "otros",
         "sentiment": "neutro"
     }
+
+
+def parse_batch_response(response: str, size: int) -> list[dict | None]:
+    """
+    Parsea la respuesta de un lote y extrae un análisis por índice.
+
+    Args:
+        response: La respuesta del modelo LLM con un arreglo JSON.
+        size: Número de tickets enviados en el lote.
+
+    Returns:
+        Una lista de tamaño `size` con el análisis de cada ticket, o None en
+        las posiciones que falten o no se puedan interpretar.
+    """
+    results: list[dict | None] = [None] * size
+
+    try:
+        json_match = re.search(r'\[.*\]', response, re.DOTALL)
+        if not json_match:
+            return results
+        items = json.loads(json_match.group())
+    except json.JSONDecodeError:
+        return results
+
+    if not isinstance(items, list):
+        return results
+
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        index = item.get("index", position)
+        if isinstance(index, int) and 0 <= index < size and results[index] is None:
+            try:
+                results[index] = normalize_analysis(item)
+            except AttributeError:
+                continue
+
+    return results
+
+
+def normalize_analysis(result: dict) -> dict:
+    """
+    Normaliza un análisis a valores válidos de categoría y sentimiento.
+
+    Args:
+        result: El objeto JSON devuelto por el modelo.
+
+    Returns:
+        Un diccionario con 'category' y 'sentiment'.
+    """
+    category = result.get("category", "otros").lower()
+    sentiment = result.get("sentiment", "neutro").lower()
+
+    if category not in CATEGORIES:
+        category = "otros"
+        CATEGORY_FALLBACKS.inc()
+    if sentiment not in SENTIMENTS:
+        sentiment = "neutro"
+        SENTIMENT_FALLBACKS.inc()
+
+    return {
+        "category": category,
+        "sentiment": sentiment
+    }
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable
+from app.core.config import get_settings
+from app.core.resilience import CircuitOpenError
+from app.services.ai_service import analyze_batch
+from app.services.ticket_service import list_unprocessed_tickets, bulk_update_classifications
+
+
+@dataclass
+class BacklogProgress:
+    """Estado de una corrida del procesador de backlog."""
+
+    status: str = "idle"
+    processed: int = 0
+    failed: int = 0
+    pages: int = 0
+    cursor: dict | None = None
+    started_at: float | None = None
+    finished_at: float | None = None
+    error: str | None = None
+
+    def to_dict(self) -> dict:
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "status": self.status,
+            "processed": self.processed,
+            "failed": self.failed,
+            "pages": self.pages,
+            "cursor": self.cursor,
+            "elapsed_seconds": round(elapsed, 3),
+            "tickets_per_second": round(self.processed / elapsed, 2) if elapsed else 0.0,
+            "error": self.error
+        }
+
+
+def load_checkpoint(path: str) -> dict | None:
+    """Lee el cursor guardado por una corrida anterior, si existe."""
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file).get("cursor")
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path: str, cursor: dict) -> None:
+    """Guarda el cursor de forma atómica para poder reanudar la corrida."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump({"cursor": cursor}, file)
+    os.replace(tmp_path, path)
+
+
+async def process_backlog(
+    page_size: int,
+    concurrency: int,
+    checkpoint_path: str | None = None,
+    limit: int | None = None,
+    progress: BacklogProgress | None = None,
+    on_page: Callable[[BacklogProgress], None] | None = None
+) -> BacklogProgress:
+    """
+    Clasifica los tickets con `processed = false` página por página.
+
+    Recorre la tabla con paginación por keyset sobre (created_at, id),
+    pidiendo la página siguiente mientras se clasifica la actual. Cada página
+    se divide en lotes de `llm_batch_size` que se clasifican en paralelo,
+    con a lo sumo `concurrency` lotes en vuelo, y los resultados se guardan
+    con escrituras masivas por bloque.
+
+    Si el circuito hacia el LLM se abre (y no hay clasificador local de
+    respaldo), la corrida se detiene con estado "paused" sin avanzar el
+    cursor; lo clasificado de la página en curso se guarda igual.
+
+    Si se indica `checkpoint_path`, el cursor se guarda tras cada página y
+    una corrida interrumpida continúa desde ahí. Al terminar el backlog el
+    checkpoint se elimina, así la siguiente corrida vuelve a recorrer los
+    tickets que hayan fallado.
+
+    Args:
+        page_size: Tickets leídos por página.
+        concurrency: Máximo de lotes clasificándose a la vez.
+        checkpoint_path: Archivo donde guardar el cursor entre páginas.
+        limit: Máximo de tickets a recorrer en esta corrida.
+        progress: Objeto de progreso a actualizar (se crea si no se pasa).
+        on_page: Callback invocado tras cada página con el progreso.
+
+    Returns:
+        El progreso final de la corrida.
+    """
+    progress = progress or BacklogProgress()
+    progress.status = "running"
+    progress.started_at = time.time()
+
+    batch_size = get_settings().llm_batch_size
+    semaphore = asyncio.Semaphore(concurrency)
+    cursor = load_checkpoint(checkpoint_path) if checkpoint_path else None
+    progress.cursor = cursor
+
+    async def classify(tickets: list[dict]) -> list[dict]:
+        async with semaphore:
+            return await analyze_batch([ticket["description"] for ticket in tickets])
+
+    exhausted = False
+    next_page = asyncio.ensure_future(list_unprocessed_tickets(page_size, cursor))
+    try:
+        while next_page is not None:
+            page = await next_page
+            next_page = None
+            exhausted = len(page) < page_size
+            if limit is not None:
+                page = page[:limit - progress.processed - progress.failed]
+            if not page:
+                break
+
+            cursor = {"created_at": page[-1]["created_at"], "id": page[-1]["id"]}
+            seen = progress.processed + progress.failed + len(page)
+            if not exhausted and (limit is None or seen < limit):
+                next_page = asyncio.ensure_future(list_unprocessed_tickets(page_size, cursor))
+
+            tickets = [ticket for ticket in page if (ticket.get("description") or "").strip()]
+            progress.failed += len(page) - len(tickets)
+
+            groups = [tickets[i:i + batch_size] for i in range(0, len(tickets), batch_size)]
+            results = await asyncio.gather(*(classify(group) for group in groups), return_exceptions=True)
+
+            classifications = []
+            circuit_open: CircuitOpenError | None = None
+            for group, analyses in zip(groups, results):
+                if isinstance(analyses, CircuitOpenError):
+                    # No es un fallo de estos tickets: quedan pendientes para la próxima corrida
+                    circuit_open = analyses
+                    continue
+                if isinstance(analyses, Exception):
+                    progress.failed += len(group)
+                    continue
+                classifications.extend(
+                    {"id": ticket["id"], "category": analysis["category"], "sentiment": analysis["sentiment"]}
+                    for ticket, analysis in zip(group, analyses)
+                )
+
+            result = await bulk_update_classifications(classifications)
+            progress.processed += len(result["updated"])
+            progress.failed += len(result["failed"])
+            if circuit_open is not None:
+                # El LLM no está disponible: seguir marcaría como fallidas todas las
+                # páginas restantes. El cursor se queda en la página anterior, así la
+                # próxima corrida vuelve a leer los tickets de esta que no se guardaron.
+                progress.status = "paused"
+                progress.error = str(circuit_open)
+                return progress
+
+            progress.pages += 1
+            progress.cursor = cursor
+
+            if checkpoint_path:
+                save_checkpoint(checkpoint_path, cursor)
+            if on_page:
+                on_page(progress)
+
+        if checkpoint_path and exhausted and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        progress.status = "completed"
+    except asyncio.CancelledError:
+        progress.status = "cancelled"
+        raise
+    except Exception as exc:
+        progress.status = "failed"
+        progress.error = str(exc)
+        raise
+    finally:
+        if next_page is not None:
+            next_page.cancel()
+        progress.finished_at = time.time()
+
+    return progress
+
+
+_progress = BacklogProgress()
+_task: asyncio.Task | None = None
+
+
+def get_backlog_progress() -> BacklogProgress:
+    """Retorna el progreso de la última corrida lanzada desde la API."""
+    return _progress
+
+
+def is_backlog_running() -> bool:
+    return _task is not None and not _task.done()
+
+
+def start_backlog_run(page_size: int, concurrency: int, limit: int | None = None) -> BacklogProgress:
+    """Lanza una corrida en segundo plano dentro del event loop de la API."""
+    global _progress, _task
+    if is_backlog_running():
+        raise RuntimeError("Ya hay una corrida del backlog en curso")
+
+    _progress = BacklogProgress(status="running", started_at=time.time())
+
+    async def run() -> None:
+        try:
+            await process_backlog(
+                page_size=page_size,
+                concurrency=concurrency,
+                checkpoint_path=get_settings().backlog_checkpoint_path,
+                limit=limit,
+                progress=_progress
+            )
+        except Exception:
+            # El error queda registrado en el progreso
+            pass
+
+    _task = asyncio.create_task(run())
+    return _progress
+
+
+async def cancel_backlog_run() -> None:
+    """Cancela la corrida en curso, si la hay."""
+    global _task
+    if is_backlog_running():
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+    _task = None
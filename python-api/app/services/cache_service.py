@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from app.core.config import get_settings
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza el texto de un ticket para que repeticiones casi idénticas compartan clave."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def cache_key(text: str, model: str, prompt_version: str) -> str:
+    """Clave de caché: hash del texto normalizado, el modelo y la versión del prompt."""
+    material = "\x00".join([model, prompt_version, normalize_text(text)])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class SQLiteCacheBackend:
+    """Backend compartido sobre un archivo SQLite local, sin servicios externos."""
+
+    def __init__(self, path: str, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM analysis_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + self.ttl)
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM analysis_cache")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class AnalysisCache:
+    """Caché LRU en proceso con TTL y backend compartido opcional."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float,
+        backend: SQLiteCacheBackend | None = None,
+        clock=time.monotonic
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _get_local(self, key: str) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_local(self, key: str, value: dict) -> None:
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> dict | None:
+        """Busca un análisis en memoria y, si falla, en el backend compartido."""
+        value = self._get_local(key)
+        if value is not None:
+            self.hits += 1
+            return dict(value)
+
+        if self.backend is not None:
+            value = await asyncio.to_thread(self.backend.get, key)
+            if value is not None:
+                self._set_local(key, value)
+                self.hits += 1
+                self.shared_hits += 1
+                return dict(value)
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: dict) -> None:
+        """Guarda un análisis en memoria y en el backend compartido."""
+        self._set_local(key, dict(value))
+        if self.backend is not None:
+            await asyncio.to_thread(self.backend.set, key, value)
+
+    def clear(self) -> None:
+        """Vacía la caché y reinicia los contadores."""
+        self._entries.clear()
+        self.hits = self.shared_hits = self.misses = 0
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> dict:
+        """Contadores de aciertos y fallos de la caché."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+_cache: AnalysisCache | None = None
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """Retorna la caché de análisis del proceso, creándola según la configuración."""
+    global _cache
+    if _cache is None:
+        settings = get_settings()
+        backend = None
+        if settings.analysis_cache_path:
+            backend = SQLiteCacheBackend(settings.analysis_cache_path, settings.analysis_cache_ttl)
+        _cache = AnalysisCache(
+            max_entries=settings.analysis_cache_max_entries,
+            ttl=settings.analysis_cache_ttl,
+            backend=backend
+        )
+    return _cache
+
+
+def close_analysis_cache() -> None:
+    """Cierra el backend compartido y descarta la caché del proceso."""
+    global _cache
+    if _cache is not None and _cache.backend is not None:
+        _cache.backend.close()
+    _cache = None
@@ -0,0 +1,76 @@
+import asyncio
+import csv
+import io
+import json
+from typing import AsyncIterator
+from app.services.ticket_service import TICKET_COLUMNS, list_tickets
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+async def iter_ticket_pages(page_size: int, fields: list[str] | None = None, **filters) -> AsyncIterator[list[dict]]:
+    """
+    Recorre todos los tickets filtrados de a una página, por keyset.
+
+    La página siguiente se pide en cuanto llega la actual (su cursor es la
+    última fila), así la consulta a Supabase corre mientras se envía la
+    página anterior. Nunca hay más de dos páginas en memoria.
+    """
+    def fetch(after: dict | None) -> asyncio.Task:
+        return asyncio.create_task(list_tickets(page_size, after=after, fields=fields, **filters))
+
+    next_page = fetch(None)
+    try:
+        while True:
+            rows = await next_page
+            if len(rows) < page_size:
+                if rows:
+                    yield rows
+                return
+            next_page = fetch({"created_at": rows[-1]["created_at"], "id": rows[-1]["id"]})
+            yield rows
+    finally:
+        # El cliente cortó la descarga: la página pedida por adelantado ya no hace falta
+        next_page.cancel()
+
+
+def csv_value(value) -> object:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+
+async def export_tickets(
+    format: str,
+    page_size: int,
+    columns: list[str] | None = None,
+    **filters
+) -> AsyncIterator[bytes]:
+    """
+    Serializa los tickets como NDJSON o CSV, una página por bloque de bytes.
+
+    Solo se envían las columnas de `columns` (todas si es None), en el orden
+    de TICKET_COLUMNS. El encabezado del CSV sale antes de la primera
+    consulta, así el cliente recibe bytes de inmediato.
+    """
+    columns = [column for column in TICKET_COLUMNS if not columns or column in columns]
+
+    if format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(columns)
+        yield buffer.getvalue().encode("utf-8")
+
+    async for rows in iter_ticket_pages(page_size, fields=columns, **filters):
+        if format == "csv":
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([csv_value(row.get(column)) for column in columns] for row in rows)
+            yield buffer.getvalue().encode("utf-8")
+        else:
+            yield "".join(
+                json.dumps({column: row.get(column) for column in columns}, ensure_ascii=False, separators=(",", ":")) + "\n"
+                for row in rows
+            ).encode("utf-8")
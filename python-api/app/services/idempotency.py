@@ -0,0 +1,117 @@
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+from app.core.config import get_settings
+from app.core.singleflight import SingleFlight
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+# Cabecera de las respuestas que se sirven desde el almacén en lugar de ejecutarse
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Claves de cliente admitidas: un UUID o cualquier token imprimible corto
+VALID_IDEMPOTENCY_KEY = re.compile(r"^[\x21-\x7e]{1,255}$")
+
+
+class IdempotencyConflictError(Exception):
+    """La clave ya se usó con una petición distinta."""
+
+
+def request_fingerprint(*parts) -> str:
+    """Hash de una petición (ruta, cuerpo, parámetros) para detectar claves reutilizadas con otro contenido."""
+    material = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Respuestas guardadas por clave de idempotencia, en memoria, con LRU y TTL.
+
+    La primera petición con una clave se ejecuta y su respuesta se guarda;
+    las repeticiones la reciben sin volver a ejecutarse. Las que llegan
+    mientras la primera sigue en curso esperan su resultado. Si la primera
+    falla no se guarda nada y el cliente puede reintentar con la misma clave.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, str, dict]] = OrderedDict()
+        # Huella de las peticiones en curso, para rechazar una clave reutilizada antes de que termine
+        self._pending: dict[str, str] = {}
+        self.flights = SingleFlight("idempotency")
+        self.replays = 0
+
+    def _get(self, key: str) -> tuple[float, str, dict] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _set(self, key: str, fingerprint: str, value: dict) -> None:
+        self._entries[key] = (self._clock() + self.ttl, fingerprint, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def run(self, key: str, fingerprint: str, compute: Callable[[], Awaitable[dict]]) -> tuple[dict, bool]:
+        """
+        Ejecuta `compute` una sola vez por clave.
+
+        Returns:
+            La respuesta y si fue repetida (guardada o compartida con la
+            petición en curso) en lugar de ejecutada por esta llamada.
+
+        Raises:
+            IdempotencyConflictError: Si la clave se usó con otra huella.
+        """
+        entry = self._get(key)
+        pending = self._pending.get(key)
+        stored = entry[1] if entry is not None else pending
+        if stored is not None and stored != fingerprint:
+            raise IdempotencyConflictError("La Idempotency-Key ya se usó con una petición distinta")
+
+        if entry is not None:
+            self.replays += 1
+            return entry[2], True
+
+        async def first() -> dict:
+            try:
+                value = await compute()
+                self._set(key, fingerprint, value)
+                return value
+            finally:
+                self._pending.pop(key, None)
+
+        if pending is None:
+            self._pending[key] = fingerprint
+        else:
+            self.replays += 1
+        return await self.flights.do(key, first), pending is not None
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.replays = 0
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "replays": self.replays, "in_flight": self.flights.in_flight}
+
+
+_store: IdempotencyStore | None = None
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """Retorna el almacén de respuestas idempotentes del proceso."""
+    global _store
+    if _store is None:
+        settings = get_settings()
+        _store = IdempotencyStore(settings.idempotency_max_entries, settings.idempotency_ttl)
+    return _store
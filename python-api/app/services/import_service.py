@@ -0,0 +1,300 @@
+import asyncio
+import codecs
+import csv
+import json
+import time
+from collections import deque
+from typing import AsyncIterator
+from pydantic import ValidationError
+from app.models.schemas import CreateTicketRequest
+from app.services.ai_service import analyze_batch
+from app.services.ticket_service import bulk_create_tickets
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# Content-Types que identifican el formato cuando no se indica `format`
+CONTENT_TYPE_FORMATS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/x-jsonlines": "ndjson"
+}
+
+# Extensiones de archivo que identifican el formato en la CLI
+EXTENSION_FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+TICKET_FIELDS = ("description", "category", "sentiment")
+
+# Tope de un registro CSV de varias líneas (campo entre comillas con saltos de línea)
+MAX_RECORD_LINES = 200
+MAX_RECORD_CHARS = 65536
+
+
+def format_from_content_type(content_type: str | None) -> str | None:
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return CONTENT_TYPE_FORMATS.get(media_type)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Parte un flujo de bytes UTF-8 en líneas sin cargarlo entero.
+
+    Un carácter multibyte o una línea pueden quedar repartidos entre dos
+    bloques: el decodificador incremental y el resto pendiente los unen.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    rest = ""
+    async for chunk in chunks:
+        text = rest + decoder.decode(chunk)
+        lines = text.split("\n")
+        rest = lines.pop()
+        for line in lines:
+            yield line.removesuffix("\r")
+    rest += decoder.decode(b"", final=True)
+    if rest:
+        yield rest.removesuffix("\r")
+
+
+async def iter_csv_records(
+    chunks: AsyncIterator[bytes],
+    max_record_lines: int = MAX_RECORD_LINES,
+    max_record_chars: int = MAX_RECORD_CHARS
+) -> AsyncIterator[tuple[int, dict | None, str | None]]:
+    """
+    Filas de un CSV con encabezado como (línea, fila, error).
+
+    Un campo entre comillas puede ocupar varias líneas: se acumulan hasta que
+    las comillas quedan balanceadas (las escapadas, `""`, no cambian la
+    paridad) y el registro completo se parsea con el módulo csv.
+
+    Una comilla suelta en un campo sin comillas nunca se balancea: si el
+    registro supera `max_record_lines` líneas o `max_record_chars`
+    caracteres, o llega el fin del archivo, se reporta error en la línea
+    donde empezó y las líneas siguientes se vuelven a leer como registros
+    nuevos. Así el buffer queda acotado y el error no arrastra al resto.
+    """
+    lines = iter_lines(chunks)
+    number = 0
+    # Líneas ya leídas que se reprocesan tras descartar un registro sin cerrar
+    pending: deque[tuple[int, str]] = deque()
+    header: list[str] | None = None
+    record: list[tuple[int, str]] = []
+    quotes = size = 0
+    exhausted = False
+
+    while True:
+        if pending:
+            line_number, line = pending.popleft()
+        elif not exhausted:
+            try:
+                line = await anext(lines)
+            except StopAsyncIteration:
+                exhausted = True
+                line_number = 0
+            else:
+                number += 1
+                line_number = number
+        else:
+            line_number = 0
+
+        if line_number:
+            record.append((line_number, line))
+            quotes += line.count('"')
+            size += len(line) + 1
+            if quotes % 2 and len(record) < max_record_lines and size < max_record_chars:
+                continue
+        if not record:
+            break
+
+        start = record[0][0]
+        if quotes % 2:
+            yield start, None, "Campo entre comillas sin cerrar"
+            pending.extendleft(reversed(record[1:]))
+            record, quotes, size = [], 0, 0
+            continue
+
+        text = "\n".join(text for _, text in record)
+        record, quotes, size = [], 0, 0
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            if "description" not in header:
+                yield start, None, "El encabezado del CSV no tiene la columna description"
+                return
+            continue
+        if len(values) != len(header):
+            yield start, None, f"Se esperaban {len(header)} columnas y hay {len(values)}"
+            continue
+        yield start, dict(zip(header, values)), None
+
+
+async def iter_ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, dict | None, str | None]]:
+    """Objetos de un archivo NDJSON (uno por línea) como (línea, fila, error)."""
+    number = 0
+    async for line in iter_lines(chunks):
+        number += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, None, f"JSON inválido: {exc}"
+            continue
+        if not isinstance(row, dict):
+            yield number, None, "Cada línea debe ser un objeto JSON"
+            continue
+        yield number, row, None
+
+
+def validate_row(row: dict) -> dict:
+    """
+    Valida una fila contra CreateTicketRequest y la deja lista para insertar.
+
+    En un CSV las celdas vacías de categoría o sentimiento cuentan como
+    ausentes, igual que en /create-ticket.
+
+    Raises:
+        ValueError: Si la fila no es un ticket válido.
+    """
+    values = {field: row.get(field) for field in TICKET_FIELDS}
+    for field in ("category", "sentiment"):
+        if isinstance(values[field], str) and not values[field].strip():
+            values[field] = None
+    try:
+        ticket = CreateTicketRequest.model_validate(values)
+    except ValidationError as exc:
+        error = exc.errors()[0]
+        location = ".".join(str(part) for part in error["loc"])
+        raise ValueError(f"{location}: {error['msg']}") from None
+
+    description = ticket.description.strip()
+    if not description:
+        raise ValueError("La descripción no puede estar vacía")
+    return {"description": description, "category": ticket.category, "sentiment": ticket.sentiment}
+
+
+class ImportProgress:
+    """Conteos de una importación en curso."""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.unclassified = 0
+        self.failed = 0
+        self.started_at = time.perf_counter()
+
+    def to_dict(self) -> dict:
+        elapsed = time.perf_counter() - self.started_at
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "unclassified": self.unclassified,
+            "failed": self.failed,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.rows / elapsed, 2) if elapsed else 0.0
+        }
+
+
+async def import_chunk(rows: list[tuple[int, dict]], use_cache: bool) -> dict:
+    """
+    Clasifica e inserta un bloque de filas validadas.
+
+    Las filas sin categoría ni sentimiento se analizan en modo lote. Si el
+    análisis falla, el bloque se inserta igual con `processed = false` para
+    que lo clasifique el backlog en lugar de perder las filas.
+    """
+    tickets = [dict(row, processed=True) for _, row in rows]
+    to_analyze = [ticket for ticket in tickets if ticket["category"] is None and ticket["sentiment"] is None]
+    unclassified = 0
+    if to_analyze:
+        try:
+            analyses = await analyze_batch([ticket["description"] for ticket in to_analyze], use_cache=use_cache)
+        except Exception:
+            for ticket in to_analyze:
+                ticket["processed"] = False
+            unclassified = len(to_analyze)
+        else:
+            for ticket, analysis in zip(to_analyze, analyses):
+                ticket.update(analysis)
+
+    result = await bulk_create_tickets(tickets)
+    return {
+        "created": len(result["created"]),
+        "unclassified": unclassified,
+        "errors": [{"line": rows[failure["index"]][0], "error": failure["error"]} for failure in result["failed"]]
+    }
+
+
+async def import_tickets(
+    chunks: AsyncIterator[bytes],
+    format: str,
+    chunk_size: int,
+    concurrency: int,
+    use_cache: bool = True
+) -> AsyncIterator[dict]:
+    """
+    Importa tickets desde un flujo CSV o NDJSON y va informando el avance.
+
+    Las filas se leen y validan a medida que llegan y se agrupan en bloques
+    de `chunk_size`; cada bloque se clasifica e inserta con una escritura
+    masiva, con a lo sumo `concurrency` bloques en vuelo. Mientras el cupo
+    está lleno no se lee más entrada, así que la memoria depende del tamaño
+    y número de bloques, no del archivo.
+
+    Produce un evento `error` por fila rechazada ({"line", "error"}), uno
+    `progress` por bloque terminado y un `summary` final con `status`
+    "completed", o "aborted" si el archivo no es UTF-8 válido.
+    """
+    records = iter_csv_records(chunks) if format == "csv" else iter_ndjson_records(chunks)
+    progress = ImportProgress()
+    in_flight: deque[asyncio.Task] = deque()
+    chunk: list[tuple[int, dict]] = []
+
+    def finished(result: dict) -> list[dict]:
+        progress.created += result["created"]
+        progress.unclassified += result["unclassified"]
+        progress.failed += len(result["errors"])
+        events = [{"type": "error", **error} for error in result["errors"]]
+        events.append({"type": "progress", **progress.to_dict()})
+        return events
+
+    status = "completed"
+    try:
+        try:
+            async for line, row, error in records:
+                progress.rows += 1
+                if error is None:
+                    try:
+                        chunk.append((line, validate_row(row)))
+                    except ValueError as exc:
+                        error = str(exc)
+                if error is not None:
+                    progress.failed += 1
+                    yield {"type": "error", "line": line, "error": error}
+
+                if len(chunk) >= chunk_size:
+                    in_flight.append(asyncio.create_task(import_chunk(chunk, use_cache)))
+                    chunk = []
+                    if len(in_flight) >= concurrency:
+                        for event in finished(await in_flight.popleft()):
+                            yield event
+        except UnicodeDecodeError:
+            # Lo leído hasta aquí se inserta igual; el resto del archivo no se puede interpretar
+            status = "aborted"
+            yield {"type": "error", "line": None, "error": "El archivo no está codificado en UTF-8"}
+
+        if chunk:
+            in_flight.append(asyncio.create_task(import_chunk(chunk, use_cache)))
+        while in_flight:
+            for event in finished(await in_flight.popleft()):
+                yield event
+
+        yield {"type": "summary", "status": status, **progress.to_dict()}
+    finally:
+        # El cliente se desconectó o hubo un error: no se insertan más bloques
+        for task in in_flight:
+            task.cancel()
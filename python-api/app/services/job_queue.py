@@ -0,0 +1,322 @@
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[dict], Awaitable[dict]]
+
+# Handlers por tipo de trabajo, registrados con @job_handler
+JOB_HANDLERS: dict[str, JobHandler] = {}
+
+JOB_STATUSES = ("queued", "running", "succeeded", "dead")
+
+
+class PermanentJobError(Exception):
+    """Error que no se resuelve reintentando; el trabajo pasa directo a `dead`."""
+
+
+class DeferJobError(Exception):
+    """El trabajo no puede correr todavía; se reprograma sin consumir un intento."""
+
+    def __init__(self, delay: float, reason: str = ""):
+        self.delay = delay
+        super().__init__(reason or f"Reprogramado en {delay:.0f} s")
+
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """Registra la corrutina que procesa los trabajos de tipo `kind`."""
+    def register(handler: JobHandler) -> JobHandler:
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return register
+
+
+class SQLiteJobStore:
+    """
+    Cola durable sobre un archivo SQLite en modo WAL, sin broker externo.
+
+    Un trabajo `running` guarda en `available_at` el fin de su lease: si el
+    proceso muere a mitad de un trabajo, otro worker lo vuelve a tomar cuando
+    el lease vence. Como el reclamo se hace con `BEGIN IMMEDIATE`, varios
+    procesos pueden compartir el mismo archivo.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, dedupe_key TEXT, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, "
+            "result TEXT, error TEXT, available_at REAL NOT NULL, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_available_idx ON jobs (status, available_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedupe_key_idx ON jobs (dedupe_key)")
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row | None) -> dict | None:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def enqueue(self, kind: str, payload: dict, max_attempts: int, dedupe_key: str | None = None) -> dict:
+        """
+        Encola un trabajo. Si ya hay uno pendiente o en curso con la misma
+        `dedupe_key`, retorna ese en lugar de crear otro.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if dedupe_key is not None:
+                    row = self._conn.execute(
+                        "SELECT * FROM jobs WHERE dedupe_key = ? AND status IN ('queued', 'running')",
+                        (dedupe_key,)
+                    ).fetchone()
+                    if row is not None:
+                        self._conn.execute("COMMIT")
+                        return self._to_dict(row)
+
+                job_id = uuid.uuid4().hex
+                self._conn.execute(
+                    "INSERT INTO jobs (id, kind, payload, dedupe_key, status, max_attempts, available_at, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?)",
+                    (job_id, kind, json.dumps(payload), dedupe_key, max_attempts, now, now, now)
+                )
+                row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._to_dict(row)
+
+    def claim(self, lease: float) -> dict | None:
+        """Toma el trabajo disponible más antiguo (o uno con el lease vencido)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status IN ('queued', 'running') AND available_at <= ? "
+                    "ORDER BY available_at LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, available_at = ?, updated_at = ? "
+                    "WHERE id = ?",
+                    (now + lease, now, row["id"])
+                )
+                job = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._to_dict(job)
+
+    def complete(self, job_id: str, result: dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'succeeded', result = ?, error = NULL, updated_at = ? WHERE id = ?",
+                (json.dumps(result), time.time(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str, retry_at: float | None) -> None:
+        """Reprograma el trabajo para `retry_at`, o lo manda a `dead` si es None."""
+        now = time.time()
+        with self._lock:
+            if retry_at is None:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'dead', error = ?, updated_at = ? WHERE id = ?",
+                    (error, now, job_id)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', error = ?, available_at = ?, updated_at = ? WHERE id = ?",
+                    (error, retry_at, now, job_id)
+                )
+
+    def release(self, job_id: str, available_at: float | None = None) -> None:
+        """Devuelve a la cola un trabajo sin contar el intento, disponible desde `available_at`."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), available_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'running'",
+                (available_at or now, now, job_id)
+            )
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS total FROM jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        counts.update({row["status"]: row["total"] for row in rows})
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """Pool de workers asíncronos que consume la cola durable."""
+
+    def __init__(
+        self,
+        store: SQLiteJobStore,
+        concurrency: int,
+        max_attempts: int,
+        retry_base_delay: float,
+        lease: float,
+        poll_interval: float
+    ):
+        self.store = store
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._workers: list[asyncio.Task] = []
+        # Último conteo por estado leído por `stats`, para el callback de /metrics (que es síncrono)
+        self.counts = dict.fromkeys(JOB_STATUSES, 0)
+
+    async def enqueue(self, kind: str, payload: dict, dedupe_key: str | None = None) -> dict:
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Tipo de trabajo desconocido: {kind}")
+        job = await asyncio.to_thread(self.store.enqueue, kind, payload, self.max_attempts, dedupe_key)
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> dict | None:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    def retry_delay(self, attempts: int) -> float:
+        """Backoff exponencial con jitter completo."""
+        return random.uniform(0, self.retry_base_delay * 2 ** (attempts - 1))
+
+    async def run_job(self, job: dict) -> None:
+        """Ejecuta un trabajo reclamado y registra su resultado."""
+        handler = JOB_HANDLERS.get(job["kind"])
+        if handler is None:
+            await asyncio.to_thread(self.store.fail, job["id"], f"Tipo de trabajo desconocido: {job['kind']}", None)
+            return
+
+        try:
+            result = await handler(job["payload"])
+        except asyncio.CancelledError:
+            await asyncio.to_thread(self.store.release, job["id"])
+            raise
+        except PermanentJobError as exc:
+            await asyncio.to_thread(self.store.fail, job["id"], str(exc), None)
+        except DeferJobError as exc:
+            await asyncio.to_thread(self.store.release, job["id"], time.time() + exc.delay)
+        except Exception as exc:
+            error = str(exc) or type(exc).__name__
+            retry_at = None
+            if job["attempts"] < job["max_attempts"]:
+                retry_at = time.time() + self.retry_delay(job["attempts"])
+            else:
+                logger.warning("Trabajo %s enviado a dead-letter tras %d intentos: %s", job["id"], job["attempts"], error)
+            await asyncio.to_thread(self.store.fail, job["id"], error, retry_at)
+        else:
+            await asyncio.to_thread(self.store.complete, job["id"], result)
+
+    async def claim(self) -> dict | None:
+        claim = asyncio.ensure_future(asyncio.to_thread(self.store.claim, self.lease))
+        try:
+            return await asyncio.shield(claim)
+        except asyncio.CancelledError:
+            # El hilo termina el reclamo aunque se cancele el worker; se devuelve el trabajo
+            job = await claim
+            if job is not None:
+                await asyncio.to_thread(self.store.release, job["id"])
+            raise
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self.claim()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if job["attempts"] > job["max_attempts"]:
+                # Lease vencido en el último intento: el proceso murió a mitad del trabajo
+                await asyncio.to_thread(self.store.fail, job["id"], "Se agotaron los intentos", None)
+                continue
+
+            await self.run_job(job)
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def stats(self) -> dict:
+        self.counts = await asyncio.to_thread(self.store.counts)
+        return {"workers": len(self._workers), **self.counts}
+
+
+_queue: JobQueue | None = None
+
+
+def get_job_queue() -> JobQueue:
+    """Retorna la cola de trabajos del proceso, creándola según la configuración."""
+    global _queue
+    if _queue is None:
+        settings = get_settings()
+        _queue = JobQueue(
+            store=SQLiteJobStore(settings.job_queue_path),
+            concurrency=settings.job_workers,
+            max_attempts=settings.job_max_attempts,
+            retry_base_delay=settings.job_retry_base_delay,
+            lease=settings.job_lease_seconds,
+            poll_interval=settings.job_poll_interval
+        )
+    return _queue
+
+
+def start_job_workers() -> None:
+    """Arranca los workers dentro del event loop de la API."""
+    get_job_queue().start()
+
+
+async def close_job_queue() -> None:
+    """Detiene los workers (los trabajos en curso vuelven a la cola) y cierra el archivo."""
+    global _queue
+    if _queue is not None:
+        await _queue.stop()
+        _queue.store.close()
+    _queue = None
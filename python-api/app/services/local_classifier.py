@@ -0,0 +1,310 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from app.core.config import get_settings
+from app.services.cache_service import normalize_text
+from app.services.ticket_service import list_classified_tickets
+from app.services.prompts import CATEGORIES, SENTIMENTS
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Convierte un texto en términos: palabras sin acentos y sus prefijos.
+
+    Se quitan los acentos porque los clientes escriben "facturacion" y
+    "facturación" indistintamente, y el prefijo de cinco letras agrupa
+    variantes como "cobraron"/"cobro" o "devolver"/"devolución".
+    """
+    text = unicodedata.normalize("NFD", normalize_text(text))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    words = [word for word in TOKEN_PATTERN.findall(text) if len(word) > 1 or word.isdigit()]
+    return words + [f"{word[:5]}~" for word in words if len(word) > 5]
+
+
+def softmax(scores: list[float]) -> list[float]:
+    top = max(scores)
+    exps = [math.exp(score - top) for score in scores]
+    total = sum(exps)
+    return [value / total for value in exps]
+
+
+class SoftmaxModel:
+    """
+    Regresión logística multiclase sobre vectores TF-IDF normalizados.
+
+    Predecir cuesta una búsqueda en diccionario por término y una suma por
+    etiqueta; la probabilidad resultante está razonablemente calibrada, que
+    es lo que permite usarla como umbral para decidir si llamar al LLM.
+    """
+
+    def __init__(self, labels: list[str], bias: list[float], weights: dict[str, list[float]], idf: dict[str, float]):
+        self.labels = labels
+        self.bias = bias
+        self.weights = weights
+        self.idf = idf
+
+    def vectorize(self, terms: list[str]) -> dict[str, float]:
+        counts = Counter(term for term in terms if term in self.idf)
+        vector = {term: (1 + math.log(count)) * self.idf[term] for term, count in counts.items()}
+        norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+        return {term: value / norm for term, value in vector.items()}
+
+    def scores(self, vector: dict[str, float]) -> list[float]:
+        scores = list(self.bias)
+        for term, value in vector.items():
+            for position, weight in enumerate(self.weights[term]):
+                scores[position] += weight * value
+        return scores
+
+    @classmethod
+    def fit(
+        cls,
+        documents: list[list[str]],
+        targets: list[str],
+        epochs: int = 15,
+        learning_rate: float = 0.5,
+        l2: float = 1e-4,
+        seed: int = 0
+    ) -> "SoftmaxModel":
+        """Entrena con descenso por gradiente estocástico."""
+        labels = sorted(set(targets))
+        index = {label: position for position, label in enumerate(labels)}
+
+        document_frequency = Counter(term for terms in documents for term in set(terms))
+        total_documents = len(documents)
+        idf = {
+            term: math.log((1 + total_documents) / (1 + frequency)) + 1
+            for term, frequency in document_frequency.items()
+        }
+
+        model = cls(labels, [0.0] * len(labels), {term: [0.0] * len(labels) for term in idf}, idf)
+        vectors = [model.vectorize(terms) for terms in documents]
+        order = list(range(total_documents))
+        rng = random.Random(seed)
+
+        for _ in range(epochs):
+            rng.shuffle(order)
+            for position in order:
+                vector = vectors[position]
+                gradient = softmax(model.scores(vector))
+                gradient[index[targets[position]]] -= 1.0
+                for term, value in vector.items():
+                    weights = model.weights[term]
+                    for label, error in enumerate(gradient):
+                        weights[label] -= learning_rate * (error * value + l2 * weights[label])
+                for label, error in enumerate(gradient):
+                    model.bias[label] -= learning_rate * error
+
+        return model
+
+    def predict(self, terms: list[str]) -> tuple[str, float]:
+        """Retorna la etiqueta más probable y su probabilidad."""
+        probabilities = softmax(self.scores(self.vectorize(terms)))
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        return self.labels[best], probabilities[best]
+
+    def to_dict(self) -> dict:
+        return {"labels": self.labels, "bias": self.bias, "weights": self.weights, "idf": self.idf}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SoftmaxModel":
+        return cls(data["labels"], data["bias"], data["weights"], data["idf"])
+
+
+@dataclass
+class LocalPrediction:
+    """Resultado del clasificador local."""
+
+    category: str
+    sentiment: str
+    confidence: float
+
+    def to_analysis(self) -> dict:
+        return {"category": self.category, "sentiment": self.sentiment}
+
+
+class LocalClassifier:
+    """Clasificador local de categoría y sentimiento entrenado con tickets ya clasificados."""
+
+    def __init__(self, category_model: SoftmaxModel, sentiment_model: SoftmaxModel, samples: int):
+        """
+        Raises:
+            ValueError: Si algún modelo tiene una sola etiqueta; su softmax
+                daría siempre probabilidad 1 y ningún ticket llegaría al LLM.
+        """
+        if len(category_model.labels) < 2 or len(sentiment_model.labels) < 2:
+            raise ValueError("Se necesitan al menos dos categorías y dos sentimientos distintos para entrenar")
+        self.category_model = category_model
+        self.sentiment_model = sentiment_model
+        self.samples = samples
+
+    @classmethod
+    def train(cls, rows: list[dict]) -> "LocalClassifier":
+        """
+        Entrena con filas que tengan 'description', 'category' y 'sentiment'.
+
+        Las filas con valores fuera de CATEGORIES o SENTIMENTS se descartan.
+        """
+        rows = [
+            row for row in rows
+            if (row.get("description") or "").strip()
+            and row.get("category") in CATEGORIES
+            and row.get("sentiment") in SENTIMENTS
+        ]
+        if not rows:
+            raise ValueError("No hay tickets clasificados para entrenar")
+
+        documents = [tokenize(row["description"]) for row in rows]
+        return cls(
+            SoftmaxModel.fit(documents, [row["category"] for row in rows]),
+            SoftmaxModel.fit(documents, [row["sentiment"] for row in rows]),
+            samples=len(rows)
+        )
+
+    def predict(self, text: str) -> LocalPrediction:
+        """
+        Clasifica un texto. La confianza es la menor de las dos probabilidades,
+        de modo que basta con que una de las etiquetas sea dudosa para
+        delegar en el LLM.
+        """
+        terms = tokenize(text)
+        category, category_probability = self.category_model.predict(terms)
+        sentiment, sentiment_probability = self.sentiment_model.predict(terms)
+        return LocalPrediction(category, sentiment, min(category_probability, sentiment_probability))
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({
+                "samples": self.samples,
+                "category": self.category_model.to_dict(),
+                "sentiment": self.sentiment_model.to_dict()
+            }, file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalClassifier":
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+        return cls(
+            SoftmaxModel.from_dict(data["category"]),
+            SoftmaxModel.from_dict(data["sentiment"]),
+            samples=data["samples"]
+        )
+
+
+class FastPathStats:
+    """Contadores de tickets resueltos localmente frente a los delegados al LLM."""
+
+    def __init__(self):
+        self.local = 0
+        self.delegated = 0
+        self.fallback = 0
+
+    def stats(self) -> dict:
+        total = self.local + self.delegated
+        return {
+            "local": self.local,
+            "delegated": self.delegated,
+            "fallback": self.fallback,
+            "avoided_rate": round(self.local / total, 4) if total else 0.0
+        }
+
+
+_classifier: LocalClassifier | None = None
+fast_path_stats = FastPathStats()
+
+
+def get_local_classifier() -> LocalClassifier | None:
+    """Retorna el clasificador local cargado, o None si está desactivado."""
+    return _classifier
+
+
+def set_local_classifier(classifier: LocalClassifier | None) -> None:
+    """Reemplaza el clasificador local (usado por los tests)."""
+    global _classifier
+    _classifier = classifier
+
+
+def classify_locally(text: str) -> dict | None:
+    """
+    Intenta clasificar un texto sin llamar al LLM.
+
+    Returns:
+        El análisis si la confianza alcanza `LOCAL_CLASSIFIER_THRESHOLD`, o
+        None si el clasificador no está cargado o la confianza es baja.
+    """
+    if _classifier is None:
+        return None
+
+    prediction = _classifier.predict(text)
+    if prediction.confidence >= get_settings().local_classifier_threshold:
+        fast_path_stats.local += 1
+        return prediction.to_analysis()
+
+    fast_path_stats.delegated += 1
+    return None
+
+
+def classify_fallback(text: str) -> dict | None:
+    """
+    Mejor estimación local, sin umbral, para cuando el LLM no está disponible.
+
+    Returns:
+        El análisis del clasificador local, o None si no está cargado.
+    """
+    if _classifier is None:
+        return None
+
+    fast_path_stats.fallback += 1
+    return _classifier.predict(text).to_analysis()
+
+
+async def train_local_classifier(rows_limit: int) -> LocalClassifier:
+    """Entrena un clasificador con los tickets ya clasificados en Supabase."""
+    rows = await list_classified_tickets(rows_limit)
+    return await asyncio.to_thread(LocalClassifier.train, rows)
+
+
+async def init_local_classifier() -> LocalClassifier | None:
+    """
+    Carga el clasificador local al arrancar, si está habilitado.
+
+    Usa el modelo guardado en `LOCAL_CLASSIFIER_PATH` si existe; si no,
+    entrena con los tickets clasificados de Supabase y lo guarda ahí. Un fallo
+    no impide arrancar: todos los tickets siguen yendo al LLM.
+    """
+    settings = get_settings()
+    if not settings.local_classifier_enabled:
+        return None
+
+    path = settings.local_classifier_path
+    try:
+        if path and os.path.exists(path):
+            classifier = await asyncio.to_thread(LocalClassifier.load, path)
+        else:
+            classifier = await train_local_classifier(settings.local_classifier_training_rows)
+            if classifier.samples < settings.local_classifier_min_samples:
+                logger.warning(
+                    "Clasificador local desactivado: solo %d tickets clasificados", classifier.samples
+                )
+                return None
+            if path:
+                await asyncio.to_thread(classifier.save, path)
+    except Exception:
+        logger.exception("No se pudo cargar el clasificador local")
+        return None
+
+    set_local_classifier(classifier)
+    return classifier
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import smtplib
+from email.message import EmailMessage
+from html import escape
+from typing import Callable
+from app.core.config import Settings, get_settings
+from app.services.job_queue import PermanentJobError, get_job_queue, job_handler
+
+logger = logging.getLogger(__name__)
+
+ALERT_SUBJECT = "[ALERTA] Ticket con sentimiento negativo detectado"
+
+# Campos del ticket que viajan en la alerta
+ALERT_FIELDS = ("id", "description", "category", "sentiment", "created_at")
+
+
+class Notifier:
+    """Destino de las alertas de tickets con sentimiento negativo."""
+
+    name = ""
+
+    async def notify(self, ticket: dict) -> None:
+        raise NotImplementedError
+
+
+NotifierFactory = Callable[[Settings], Notifier]
+
+# Notificadores por nombre (ALERT_NOTIFIER), registrados con @notifier_backend
+NOTIFIER_BACKENDS: dict[str, NotifierFactory] = {}
+
+
+def notifier_backend(name: str) -> Callable[[NotifierFactory], NotifierFactory]:
+    """Registra la fábrica que construye el notificador `name` a partir de la configuración."""
+    def register(factory: NotifierFactory) -> NotifierFactory:
+        NOTIFIER_BACKENDS[name] = factory
+        return factory
+    return register
+
+
+class LogNotifier(Notifier):
+    """Deja la alerta en el log; es el notificador por defecto."""
+
+    name = "log"
+
+    async def notify(self, ticket: dict) -> None:
+        logger.warning(
+            "Ticket con sentimiento negativo %s (%s): %s",
+            ticket.get("id"), ticket.get("category"), (ticket.get("description") or "")[:200]
+        )
+
+
+class SmtpNotifier(Notifier):
+    """
+    Envía la alerta por correo, con el mismo contenido que mandaba el flujo
+    de n8n. smtplib es bloqueante, así que el envío corre en un hilo.
+    """
+
+    name = "smtp"
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        sender: str,
+        recipients: list[str],
+        username: str | None = None,
+        password: str | None = None,
+        starttls: bool = False,
+        timeout: float = 10.0
+    ):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = recipients
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def build_message(self, ticket: dict) -> EmailMessage:
+        message = EmailMessage()
+        message["Subject"] = ALERT_SUBJECT
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.recipients)
+
+        fields = [
+            ("ID del Ticket", ticket.get("id")),
+            ("Categoría", ticket.get("category")),
+            ("Sentimiento", ticket.get("sentiment"))
+        ]
+        description = ticket.get("description") or ""
+        message.set_content(
+            "Se detectó un ticket con sentimiento negativo.\n\n"
+            + "".join(f"{label}: {value}\n" for label, value in fields)
+            + f"\nDescripción del ticket:\n{description}\n"
+        )
+        message.add_alternative(
+            "<h2>🚨 Alerta de Ticket Negativo</h2>\n"
+            "<p>Se detectó un ticket con <strong>sentimiento negativo</strong>.</p>\n<hr />\n"
+            + "".join(f"<p><strong>{label}:</strong> {escape(str(value))}</p>\n" for label, value in fields)
+            + f"<p><strong>Descripción del ticket:</strong></p>\n<blockquote>{escape(description)}</blockquote>\n",
+            subtype="html"
+        )
+        return message
+
+    def send(self, message: EmailMessage) -> None:
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            smtp.send_message(message)
+
+    async def notify(self, ticket: dict) -> None:
+        if not self.recipients:
+            raise PermanentJobError("ALERT_EMAIL_TO no tiene destinatarios")
+        try:
+            await asyncio.to_thread(self.send, self.build_message(ticket))
+        except smtplib.SMTPResponseException as exc:
+            # Un rechazo 5xx (destinatario o remitente inválido) no se arregla reintentando
+            if exc.smtp_code >= 500:
+                raise PermanentJobError(f"SMTP rechazó la alerta: {exc.smtp_code} {exc.smtp_error!r}") from exc
+            raise
+        except smtplib.SMTPRecipientsRefused as exc:
+            raise PermanentJobError(f"SMTP rechazó los destinatarios: {list(exc.recipients)}") from exc
+
+
+@notifier_backend("log")
+def build_log_notifier(settings: Settings) -> Notifier:
+    return LogNotifier()
+
+
+@notifier_backend("smtp")
+def build_smtp_notifier(settings: Settings) -> Notifier:
+    return SmtpNotifier(
+        host=settings.smtp_host,
+        port=settings.smtp_port,
+        sender=settings.alert_email_from,
+        recipients=settings.alert_email_to,
+        username=settings.smtp_username,
+        password=settings.smtp_password,
+        starttls=settings.smtp_starttls,
+        timeout=settings.smtp_timeout
+    )
+
+
+_notifier: Notifier | None = None
+
+
+def get_notifier() -> Notifier:
+    """Retorna el notificador configurado en ALERT_NOTIFIER."""
+    global _notifier
+    if _notifier is None:
+        settings = get_settings()
+        factory = NOTIFIER_BACKENDS.get(settings.alert_notifier)
+        if factory is None:
+            raise ValueError(f"Notificador desconocido: {settings.alert_notifier}")
+        _notifier = factory(settings)
+    return _notifier
+
+
+def set_notifier(notifier: Notifier | None) -> None:
+    """Reemplaza el notificador (útil para inyectar dobles en tests)."""
+    global _notifier
+    _notifier = notifier
+
+
+async def dispatch_negative_alert(ticket: dict) -> dict:
+    """
+    Encola la alerta de un ticket negativo en la cola durable.
+
+    La respuesta no espera al envío, un fallo del SMTP se reintenta con
+    backoff y un mismo ticket no se alerta dos veces mientras su alerta siga
+    pendiente.
+    """
+    payload = {field: ticket.get(field) for field in ALERT_FIELDS}
+    return await get_job_queue().enqueue("negative_alert", {"ticket": payload}, dedupe_key=f"negative_alert:{ticket['id']}")
+
+
+@job_handler("negative_alert")
+async def negative_alert_job(payload: dict) -> dict:
+    notifier = get_notifier()
+    await notifier.notify(payload["ticket"])
+    return {"notifier": notifier.name}
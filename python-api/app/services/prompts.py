@@ -0,0 +1,82 @@
+import hashlib
+import json
+from app.core.config import get_settings
+
+CATEGORIES = [
+    "facturación",
+    "soporte técnico",
+    "ventas",
+    "devoluciones",
+    "información general",
+    "quejas",
+    "otros"
+]
+
+SENTIMENTS = ["positivo", "negativo", "neutro"]
+
+SYSTEM_PROMPT = "Eres un asistente que analiza tickets de soporte al cliente. Responde ÚNICAMENTE con JSON válido."
+
+
+class PromptTemplate:
+    """
+    Prompt con las partes fijas ya construidas.
+
+    Las listas de categorías y sentimientos se insertan una sola vez al
+    definir la plantilla y `render` solo concatena el texto variable entre un
+    prefijo y un sufijo precalculados. La versión es un hash del contenido:
+    cualquier cambio en el texto cambia la clave de la caché sin tener que
+    acordarse de incrementar un número.
+    """
+
+    PLACEHOLDER = "{input}"
+
+    def __init__(self, name: str, system: str, user: str):
+        if user.count(self.PLACEHOLDER) != 1:
+            raise ValueError(f"La plantilla {name} debe contener {self.PLACEHOLDER} exactamente una vez")
+        self.name = name
+        self.system = system
+        self._prefix, self._suffix = user.split(self.PLACEHOLDER)
+        digest = hashlib.sha256(f"{system}\0{user}".encode()).hexdigest()[:8]
+        self.version = f"{name}-{digest}"
+
+    def render(self, value: str) -> str:
+        return self._prefix + value + self._suffix
+
+
+ANALYSIS_PROMPT = PromptTemplate("analysis", SYSTEM_PROMPT, f"""Analiza el siguiente ticket y responde con un JSON con dos campos:
+- "category": una de estas categorías: {", ".join(CATEGORIES)}
+- "sentiment": uno de estos sentimientos: {", ".join(SENTIMENTS)}
+
+Ticket: "{{input}}"
+
+Responde SOLO con el JSON, ejemplo: {{"category": "soporte técnico", "sentiment": "negativo"}}""")
+
+BATCH_PROMPT = PromptTemplate("batch", SYSTEM_PROMPT, f"""Analiza cada uno de los siguientes tickets y responde con un arreglo JSON con un objeto por ticket:
+- "index": el número del ticket
+- "category": una de estas categorías: {", ".join(CATEGORIES)}
+- "sentiment": uno de estos sentimientos: {", ".join(SENTIMENTS)}
+
+Tickets:
+{{input}}
+
+Responde SOLO con el arreglo JSON, ejemplo: [{{"index": 0, "category": "soporte técnico", "sentiment": "negativo"}}]""")
+
+
+def render_batch(texts: list[str]) -> str:
+    """Construye el prompt por lotes con un ticket indexado por línea."""
+    return BATCH_PROMPT.render("\n".join(
+        f"[{index}] {json.dumps(text, ensure_ascii=False)}"
+        for index, text in enumerate(texts)
+    ))
+
+
+def prompt_version() -> str:
+    """
+    Versión de las plantillas y del recorte de tickets, para la clave de la caché.
+
+    Incluye la configuración del recorte porque cambiarla cambia lo que el
+    modelo ve de un ticket largo y, por tanto, su análisis.
+    """
+    settings = get_settings()
+    trimming = f"r{int(settings.ticket_strip_replies)}t{settings.ticket_max_tokens}h{settings.ticket_head_ratio}"
+    return f"{ANALYSIS_PROMPT.version}.{BATCH_PROMPT.version}.{trimming}"
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+from zoneinfo import ZoneInfo
+from app.core.config import get_settings
+from app.core.database import get_supabase_client
+from app.core.singleflight import SingleFlight
+
+# Tamaño de cada intervalo de /trends
+BUCKET_SIZES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+# Rango por defecto de /trends cuando no se indica `since`
+DEFAULT_SPANS = {"hour": timedelta(hours=24), "day": timedelta(days=7)}
+
+NEGATIVE_SENTIMENT = "negativo"
+
+# Consultas distintas que se guardan a la vez; /trends admite rangos arbitrarios
+MAX_CACHED_QUERIES = 256
+
+# Recálculos de una misma consulta en vuelo, por clave de caché
+stats_flights = SingleFlight("stats")
+
+
+def empty_counts() -> dict:
+    return {"total": 0, "processed": 0, "pending": 0, "negative": 0, "by_category": {}, "by_sentiment": {}}
+
+
+def add_cell(counts: dict, category: str, sentiment: str, processed: bool, tickets: int) -> None:
+    """Suma una celda del agregado (categoría × sentimiento × estado) a unos conteos."""
+    counts["total"] += tickets
+    counts["processed" if processed else "pending"] += tickets
+    if sentiment == NEGATIVE_SENTIMENT:
+        counts["negative"] += tickets
+    if category:
+        counts["by_category"][category] = counts["by_category"].get(category, 0) + tickets
+    if sentiment:
+        counts["by_sentiment"][sentiment] = counts["by_sentiment"].get(sentiment, 0) + tickets
+
+
+async def fetch_stats() -> dict:
+    """Totales del dashboard a partir de las filas agregadas de `ticket_stats`."""
+    client = await get_supabase_client()
+    response = await client.rpc("ticket_stats_totals", {}).execute()
+
+    counts = empty_counts()
+    matrix: dict[str, dict[str, int]] = {}
+    for row in response.data or []:
+        category, sentiment, tickets = row["category"], row["sentiment"], int(row["tickets"])
+        add_cell(counts, category, sentiment, row["processed"], tickets)
+        if category and sentiment:
+            by_sentiment = matrix.setdefault(category, {})
+            by_sentiment[sentiment] = by_sentiment.get(sentiment, 0) + tickets
+
+    return {**counts, "by_category_sentiment": matrix}
+
+
+def floor_to_bucket(moment: datetime, bucket: str, tz: ZoneInfo) -> datetime:
+    """Inicio, en la zona `tz`, del intervalo que contiene `moment`."""
+    local = moment.astimezone(tz)
+    if bucket == "day":
+        return local.replace(hour=0, minute=0, second=0, microsecond=0)
+    return local.replace(minute=0, second=0, microsecond=0)
+
+
+def next_bucket(start: datetime, bucket: str, tz: ZoneInfo) -> datetime:
+    """
+    Inicio del intervalo siguiente. Los días avanzan en hora local (un día
+    con cambio de horario dura 23 o 25 horas); las horas, en UTC.
+    """
+    if bucket == "day":
+        # Con tzinfo de zoneinfo la suma es en hora local y el offset se recalcula
+        return start + BUCKET_SIZES["day"]
+    return (start.astimezone(timezone.utc) + BUCKET_SIZES["hour"]).astimezone(tz)
+
+
+def bucket_starts(since: datetime, until: datetime, bucket: str, tz: ZoneInfo) -> list[datetime]:
+    starts = []
+    current = floor_to_bucket(since, bucket, tz)
+    while current < until:
+        starts.append(current)
+        current = next_bucket(current, bucket, tz)
+    return starts
+
+
+def trends_range(
+    bucket: str,
+    since: datetime | None,
+    until: datetime | None,
+    tz: ZoneInfo,
+    now: datetime | None = None
+) -> tuple[datetime, datetime]:
+    """
+    Rango alineado a intervalos completos: `until` se redondea hacia arriba
+    (por defecto cubre el intervalo en curso) y `since` hacia abajo (por
+    defecto abarca DEFAULT_SPANS hacia atrás).
+    """
+    until = until or now or datetime.now(timezone.utc)
+    floor = floor_to_bucket(until, bucket, tz)
+    until = floor if floor == until else next_bucket(floor, bucket, tz)
+    since = floor_to_bucket(since or until - DEFAULT_SPANS[bucket], bucket, tz)
+    return since, until
+
+
+async def fetch_trends(bucket: str, since: datetime, until: datetime, tz: ZoneInfo) -> dict:
+    """
+    Serie por intervalo de los tickets creados entre `since` y `until`.
+
+    Los intervalos sin tickets se completan con ceros para que el gráfico no
+    tenga huecos.
+    """
+    client = await get_supabase_client()
+    response = await client.rpc("ticket_stats_series", {
+        "p_bucket": bucket,
+        "p_since": since.isoformat(),
+        "p_until": until.isoformat(),
+        "p_tz": tz.key
+    }).execute()
+
+    cells_by_start = {
+        datetime.fromisoformat(row["bucket"]): row["cells"]
+        for row in response.data or []
+    }
+
+    points = []
+    for start in bucket_starts(since, until, bucket, tz):
+        counts = empty_counts()
+        for category, sentiment, processed, tickets in cells_by_start.get(start, []):
+            add_cell(counts, category, sentiment, processed, int(tickets))
+        points.append({"start": start.isoformat(), **counts})
+
+    return {
+        "bucket": bucket,
+        "tz": tz.key,
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "points": points
+    }
+
+
+class CachedPayload:
+    """Respuesta ya serializada con su ETag."""
+
+    __slots__ = ("body", "etag", "expires_at")
+
+    def __init__(self, body: bytes, expires_at: float):
+        self.body = body
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        self.expires_at = expires_at
+
+
+class StatsCache:
+    """
+    Caché en memoria de las respuestas de /stats y /trends por consulta.
+
+    Guarda el cuerpo ya serializado y su ETag (hash del contenido): mientras
+    los datos no cambien, el ETag se mantiene aunque la entrada se recalcule,
+    y el dashboard puede revalidar con If-None-Match y recibir un 304. Las
+    peticiones simultáneas sobre una entrada vencida comparten un recálculo.
+    """
+
+    def __init__(self, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: dict[str, CachedPayload] = {}
+
+    async def get(self, key: str, compute: Callable[[], Awaitable[dict]]) -> CachedPayload:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > self.clock():
+            return entry
+
+        async def refresh() -> CachedPayload:
+            payload = await compute()
+            body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            self._entries.pop(key, None)
+            if len(self._entries) >= MAX_CACHED_QUERIES:
+                # Las entradas están en orden de inserción: la primera es la más antigua
+                del self._entries[next(iter(self._entries))]
+            entry = self._entries[key] = CachedPayload(body, self.clock() + self.ttl)
+            return entry
+
+        return await stats_flights.do(key, refresh)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_cache: StatsCache | None = None
+
+
+def get_stats_cache() -> StatsCache:
+    global _cache
+    if _cache is None:
+        _cache = StatsCache(get_settings().stats_cache_ttl)
+    return _cache
+
+
+def invalidate_stats() -> None:
+    """Descarta las respuestas cacheadas tras una escritura de tickets desde esta API."""
+    if _cache is not None:
+        _cache.clear()
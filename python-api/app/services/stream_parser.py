@@ -0,0 +1,108 @@
+import json
+
+# Marca con la que el endpoint de chat-completions cierra un stream SSE
+SSE_DONE = "[DONE]"
+
+
+class JsonObjectScanner:
+    """
+    Máquina de estados que detecta objetos JSON completos en texto por partes.
+
+    Solo sigue llaves, comillas y escapes, sin construir el objeto: cada
+    carácter se mira una vez, de modo que alimentar el scanner delta a delta
+    cuesta lo mismo que recorrer la respuesta completa. El texto fuera de un
+    objeto (prosa antes o después del JSON) se descarta.
+    """
+
+    def __init__(self):
+        self._parts: list[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> list[str]:
+        """Consume un fragmento y retorna los objetos de primer nivel que quedaron completos."""
+        completed = []
+        start = 0 if self._depth else None
+
+        for position, char in enumerate(chunk):
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                    start = position
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(chunk[start:position + 1])
+                    completed.append("".join(self._parts))
+                    self._parts = []
+                    start = None
+
+        if self._depth and start is not None:
+            self._parts.append(chunk[start:])
+        return completed
+
+
+class AnalysisStreamParser:
+    """
+    Acumula los deltas de una respuesta y detecta el primer objeto con
+    'category' y 'sentiment', para poder cerrar el stream en ese momento.
+    """
+
+    def __init__(self):
+        self.scanner = JsonObjectScanner()
+        self.match: str | None = None
+        self.received = 0
+
+    def feed(self, delta: str) -> str | None:
+        """
+        Returns:
+            El texto del objeto completo en cuanto llega, o None mientras tanto.
+        """
+        self.received += len(delta)
+        for candidate in self.scanner.feed(delta):
+            try:
+                data = json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(data, dict) and "category" in data and "sentiment" in data:
+                self.match = candidate
+                return candidate
+        return None
+
+
+def sse_delta(line: str) -> str | None:
+    """
+    Extrae el contenido generado de una línea SSE de chat-completions.
+
+    Returns:
+        El fragmento de `choices[0].delta.content`, SSE_DONE al final del
+        stream, o None para líneas vacías, comentarios o eventos sin texto.
+    """
+    if not line.startswith("data:"):
+        return None
+    data = line[5:].strip()
+    if data == SSE_DONE:
+        return SSE_DONE
+
+    try:
+        event = json.loads(data)
+    except json.JSONDecodeError:
+        return None
+    choices = event.get("choices") if isinstance(event, dict) else None
+    if not choices:
+        return None
+    return (choices[0].get("delta") or {}).get("content") or None
@@ -0,0 +1,109 @@
+import logging
+from app.core.config import get_settings
+from app.core.database import get_supabase_client
+from app.core.events import EventBroker
+
+logger = logging.getLogger(__name__)
+
+TICKET_CREATED = "ticket.created"
+TICKET_PROCESSED = "ticket.processed"
+
+# Columnas de un ticket que viajan en cada evento
+EVENT_FIELDS = ("id", "created_at", "description", "category", "sentiment", "processed")
+
+# EVENTS_SOURCE: "api" publica solo lo que escribe esta API; "realtime" se
+# suscribe además a los cambios de la tabla (frontend, n8n, otras réplicas)
+SOURCE_REALTIME = "realtime"
+
+_broker: EventBroker | None = None
+_channel = None
+
+
+def get_event_broker() -> EventBroker:
+    """Retorna el broker de eventos de tickets compartido por todo el proceso."""
+    global _broker
+    if _broker is None:
+        settings = get_settings()
+        _broker = EventBroker(settings.events_history_size, settings.events_client_buffer)
+    return _broker
+
+
+def reset_event_broker() -> None:
+    """Descarta el broker (y desconecta a sus suscriptores); el siguiente se crea con la configuración vigente."""
+    global _broker
+    if _broker is not None:
+        _broker.close()
+    _broker = None
+
+
+def ticket_payload(row: dict) -> dict:
+    return {field: row[field] for field in EVENT_FIELDS if field in row}
+
+
+def publish_ticket(type: str, row: dict) -> None:
+    get_event_broker().publish(type, ticket_payload(row))
+
+
+def publish_local(type: str, rows: list[dict]) -> None:
+    """
+    Publica las escrituras hechas por esta API.
+
+    Con la suscripción a Supabase Realtime activa no hace nada: esas mismas
+    escrituras llegan por ella y se publicarían dos veces.
+    """
+    if _channel is not None:
+        return
+    for row in rows:
+        publish_ticket(type, row)
+
+
+def handle_postgres_change(payload: dict) -> None:
+    """
+    Traduce un cambio de Supabase Realtime sobre `tickets` a un evento.
+
+    Un INSERT es `ticket.created`; un UPDATE que deja el ticket procesado es
+    `ticket.processed`. Sin REPLICA IDENTITY FULL el registro anterior solo
+    trae la clave, así que cualquier UPDATE de un ticket procesado se publica
+    (con la clasificación vigente).
+    """
+    data = payload.get("data") or {}
+    record = data.get("record") or {}
+    change = (data.get("type") or "").upper()
+    if change == "INSERT":
+        publish_ticket(TICKET_CREATED, record)
+    elif change == "UPDATE" and record.get("processed") and not (data.get("old_record") or {}).get("processed"):
+        publish_ticket(TICKET_PROCESSED, record)
+
+
+async def start_ticket_events() -> None:
+    """
+    Abre la única suscripción del proceso a los cambios de `tickets` si
+    EVENTS_SOURCE=realtime. Un fallo no impide arrancar: /events solo
+    recibirá lo que se escriba por esta API.
+    """
+    global _channel
+    if get_settings().events_source != SOURCE_REALTIME or _channel is not None:
+        return
+
+    try:
+        client = await get_supabase_client()
+        channel = client.channel("tickets-events")
+        for change in ("INSERT", "UPDATE"):
+            channel.on_postgres_changes(change, handle_postgres_change, table="tickets", schema="public")
+        await channel.subscribe()
+        _channel = channel
+    except Exception:
+        logger.exception("No se pudo suscribir a los cambios de tickets en Supabase Realtime")
+
+
+async def stop_ticket_events() -> None:
+    """Cierra la suscripción a Supabase Realtime y desconecta a los clientes de /events."""
+    global _channel
+    if _channel is not None:
+        channel, _channel = _channel, None
+        try:
+            await channel.unsubscribe()
+            await channel.socket.close()
+        except Exception:
+            logger.exception("Error al cerrar la suscripción de eventos de tickets")
+    reset_event_broker()
@@ -1,24 +1,30 @@
+import base64
+import binascii
+import json
+from app.core.config import get_settings
 from app.core.database import get_supabase_client
+from app.services.stats_service import invalidate_stats
+from app.services.ticket_events import TICKET_CREATED, TICKET_PROCESSED, publish_local
 
 
-def get_ticket_by_id(ticket_id: str) -> dict | None:
+async def get_ticket_by_id(ticket_id: str) -> dict | None:
     """Obtiene un ticket por su ID."""
-    client = get_supabase_client()
-    response = client.table("tickets").select("*").eq("id", ticket_id).execute()
+    client = await get_supabase_client()
+    response = await client.table("tickets").select("*").eq("id", ticket_id).execute()
 
     if response.data and len(response.data) > 0:
         return response.data[0]
     return None
 
 
-def create_ticket(
+async def create_ticket(
     description: str,
     category: str | None = None,
     sentiment: str | None = None,
     processed: bool = False
 ) -> dict:
     """Crea un nuevo ticket en la base de datos."""
-    client = get_supabase_client()
+    client = await get_supabase_client()
 
     ticket_data = {
         "description": description,
@@ -30,22 +36,233 @@ def create_ticket(
     if sentiment:
         ticket_data["sentiment"] = sentiment
 
-    response = client.table("tickets").insert(ticket_data).execute()
+    response = await client.table("tickets").insert(ticket_data).execute()
+    invalidate_stats()
 
     if response.data and len(response.data) > 0:
+        publish_local(TICKET_CREATED, response.data[:1])
         return response.data[0]
     raise Exception("No se pudo crear el ticket")
 
 
-def update_ticket(ticket_id: str, category: str, sentiment: str) -> dict:
+async def update_ticket(ticket_id: str, category: str, sentiment: str) -> dict:
     """Actualiza un ticket con la categoría, sentimiento y marca como procesado."""
-    client = get_supabase_client()
-    response = client.table("tickets").update({
+    client = await get_supabase_client()
+    response = await client.table("tickets").update({
         "category": category,
         "sentiment": sentiment,
         "processed": True
     }).eq("id", ticket_id).execute()
+    invalidate_stats()
 
     if response.data and len(response.data) > 0:
+        publish_local(TICKET_PROCESSED, response.data[:1])
         return response.data[0]
     raise Exception(f"No se pudo actualizar el ticket con ID: {ticket_id}")
+
+
+# Columnas que se pueden pedir en el listado; id y created_at van siempre porque forman el cursor
+TICKET_COLUMNS = ("id", "created_at", "description", "category", "sentiment", "processed")
+
+CURSOR_COLUMNS = ("id", "created_at")
+
+
+def keyset_filter(created_at: str, ticket_id: str, descending: bool = False) -> str:
+    """Filtro PostgREST para las filas posteriores a (created_at, id) en el orden dado."""
+    op = "lt" if descending else "gt"
+    return f'created_at.{op}."{created_at}",and(created_at.eq."{created_at}",id.{op}.{ticket_id})'
+
+
+def encode_cursor(row: dict) -> str:
+    """Cursor opaco con la posición (created_at, id) de la última fila de una página."""
+    raw = json.dumps([row["created_at"], row["id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    Retorna {"created_at", "id"} a partir de un cursor de `encode_cursor`.
+
+    Raises:
+        ValueError: Si el cursor no es válido.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, ticket_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError("Cursor inválido") from None
+    if not isinstance(created_at, str) or not isinstance(ticket_id, str):
+        raise ValueError("Cursor inválido")
+    return {"created_at": created_at, "id": ticket_id}
+
+
+async def list_tickets(
+    limit: int,
+    after: dict | None = None,
+    fields: list[str] | None = None,
+    category: str | None = None,
+    sentiment: str | None = None,
+    processed: bool | None = None,
+    created_from: str | None = None,
+    created_to: str | None = None,
+    descending: bool = True
+) -> list[dict]:
+    """
+    Obtiene una página de tickets filtrados, ordenados por (created_at, id).
+
+    Pagina por keyset a partir de `after` (la posición de la última fila de
+    la página anterior), de modo que cada página cuesta lo mismo en
+    cualquier punto de la tabla. Solo trae las columnas de `fields`, más id y
+    created_at. `created_from` es inclusivo y `created_to` exclusivo.
+    """
+    columns = [column for column in TICKET_COLUMNS if column in CURSOR_COLUMNS or not fields or column in fields]
+    client = await get_supabase_client()
+    query = client.table("tickets").select(*columns)
+
+    if category is not None:
+        query = query.eq("category", category)
+    if sentiment is not None:
+        query = query.eq("sentiment", sentiment)
+    if processed is True:
+        query = query.eq("processed", True)
+    elif processed is False:
+        query = query.not_.is_("processed", "true")
+    if created_from is not None:
+        query = query.gte("created_at", created_from)
+    if created_to is not None:
+        query = query.lt("created_at", created_to)
+    if after:
+        query = query.or_(keyset_filter(after["created_at"], after["id"], descending))
+
+    response = await query.order("created_at", desc=descending).order("id", desc=descending).limit(limit).execute()
+    return response.data or []
+
+
+async def list_unprocessed_tickets(limit: int, after: dict | None = None) -> list[dict]:
+    """
+    Obtiene una página de tickets sin procesar ordenados por (created_at, id).
+
+    `after` es el cursor de la página anterior ({"created_at": ..., "id": ...});
+    se usa paginación por keyset para que cada página cueste lo mismo sin
+    importar cuántas filas se hayan recorrido.
+    """
+    client = await get_supabase_client()
+    query = (
+        client.table("tickets")
+        .select("id", "description", "created_at")
+        .not_.is_("processed", "true")
+        .order("created_at")
+        .order("id")
+        .limit(limit)
+    )
+    if after:
+        query = query.or_(keyset_filter(after["created_at"], after["id"]))
+
+    response = await query.execute()
+    return response.data or []
+
+
+async def list_classified_tickets(limit: int) -> list[dict]:
+    """
+    Obtiene los tickets procesados más recientes con su categoría y sentimiento.
+
+    Se usa para entrenar el clasificador local.
+    """
+    client = await get_supabase_client()
+    response = await (
+        client.table("tickets")
+        .select("description", "category", "sentiment")
+        .eq("processed", True)
+        .not_.is_("category", "null")
+        .not_.is_("sentiment", "null")
+        .order("created_at", desc=True)
+        .limit(limit)
+        .execute()
+    )
+    return response.data or []
+
+
+def chunked(rows: list, size: int) -> list[list]:
+    """Divide una lista en bloques de a lo sumo `size` elementos."""
+    return [rows[i:i + size] for i in range(0, len(rows), size)]
+
+
+async def bulk_create_tickets(tickets: list[dict], chunk_size: int | None = None) -> dict:
+    """
+    Inserta varios tickets con un INSERT multi-fila por bloque.
+
+    Cada ticket es un diccionario con "description" y, opcionalmente,
+    "category", "sentiment" y "processed"; los campos ausentes toman el valor
+    por defecto de la columna.
+
+    Returns:
+        Un diccionario con "created" (filas insertadas) y "failed" (lista de
+        {"index", "error"} con la posición de cada ticket no insertado).
+    """
+    chunk_size = chunk_size or get_settings().bulk_chunk_size
+    created: list[dict] = []
+    failed: list[dict] = []
+
+    if not tickets:
+        return {"created": created, "failed": failed}
+
+    client = await get_supabase_client()
+    for offset, chunk in zip(range(0, len(tickets), chunk_size), chunked(tickets, chunk_size)):
+        try:
+            response = await client.table("tickets").insert(chunk, default_to_null=False).execute()
+        except Exception as exc:
+            failed.extend({"index": offset + i, "error": str(exc)} for i in range(len(chunk)))
+            continue
+
+        invalidate_stats()
+        rows = response.data or []
+        publish_local(TICKET_CREATED, rows)
+        created.extend(rows)
+        failed.extend(
+            {"index": offset + i, "error": "No se pudo crear el ticket"}
+            for i in range(len(rows), len(chunk))
+        )
+
+    return {"created": created, "failed": failed}
+
+
+async def bulk_update_classifications(classifications: list[dict], chunk_size: int | None = None) -> dict:
+    """
+    Guarda categoría y sentimiento de varios tickets con una llamada por bloque.
+
+    Recibe una lista de {"id", "category", "sentiment"} y marca cada ticket
+    como procesado.
+
+    Returns:
+        Un diccionario con "updated" (IDs actualizados) y "failed" (lista de
+        {"id", "error"} con los tickets que no se pudieron actualizar).
+    """
+    chunk_size = chunk_size or get_settings().bulk_chunk_size
+    updated: list[str] = []
+    failed: list[dict] = []
+
+    if not classifications:
+        return {"updated": updated, "failed": failed}
+
+    client = await get_supabase_client()
+    for chunk in chunked(classifications, chunk_size):
+        try:
+            response = await client.rpc(
+                "bulk_update_classifications",
+                {"payload": chunk}
+            ).execute()
+        except Exception as exc:
+            failed.extend({"id": row["id"], "error": str(exc)} for row in chunk)
+            continue
+
+        invalidate_stats()
+        chunk_updated = {row["id"] for row in response.data or []}
+        processed = [{**row, "processed": True} for row in chunk if row["id"] in chunk_updated]
+        publish_local(TICKET_PROCESSED, processed)
+        updated.extend(row["id"] for row in processed)
+        failed.extend(
+            {"id": row["id"], "error": f"Ticket con ID {row['id']} no encontrado"}
+            for row in chunk if row["id"] not in chunk_updated
+        )
+
+    return {"updated": updated, "failed": failed}
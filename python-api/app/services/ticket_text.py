@@ -0,0 +1,104 @@
+import re
+
+# Aproximación habitual para texto en español con tokenizadores BPE
+CHARS_PER_TOKEN = 4
+
+# Marca que reemplaza la parte central de un ticket recortado
+TRIM_MARKER = "\n[…]\n"
+
+# Caracteres sin procesar que se conservan de cada extremo, en múltiplos del presupuesto
+RAW_WINDOW_FACTOR = 4
+
+# Encabezados con los que los clientes de correo introducen el mensaje citado
+# ("El ... escribió:", "----- Mensaje original -----", "De: ... Enviado:") y
+# delimitador de firma ("-- "). Van en una sola alternancia para recorrer el
+# ticket una vez: con `re.M` cada patrón por separado es un barrido completo.
+REPLY_BOUNDARY = re.compile(
+    r"^[ \t]*-{2,}[ \t]*(?:Original Message|Mensaje original|Forwarded message|Mensaje reenviado)[ \t]*-{2,}"
+    r"|^[ \t]*(?:El|On)\b[^\n]*(?:\n[^\n]*)?\b(?:escribió|wrote)[ \t]*:[ \t]*$"
+    r"|^[ \t]*(?:De|From)[ \t]*:[^\n]*\n[ \t]*(?:Enviado|Sent|Fecha|Date)[ \t]*:"
+    r"|^-- ?$",
+    re.I | re.M
+)
+
+# Líneas citadas con ">" y pies de "Enviado desde mi ..."
+QUOTED_OR_FOOTER = re.compile(r"^[ \t]*(?:>|(?:Enviado desde mi|Sent from my)\b).*(?:\n|$)", re.I | re.M)
+
+# Solo secuencias que realmente se acortan: reemplazar cada espacio suelto cuesta más que el resto del recorte
+EXTRA_SPACES = re.compile(r"[ \t]{2,}|\t")
+
+BLANK_LINES = re.compile(r"\n[ \t]*\n\s*")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def cut_at_first(text: str, pattern: re.Pattern) -> str:
+    """Corta en la primera coincidencia que tenga texto antes."""
+    for match in pattern.finditer(text):
+        if text[:match.start()].strip():
+            return text[:match.start()]
+    return text
+
+
+def strip_replies(text: str) -> str:
+    """
+    Quita el hilo citado y la firma de un ticket pegado desde un correo.
+
+    Corta en el primer encabezado de respuesta ("El ... escribió:", "-----
+    Mensaje original -----", "De: ... Enviado:") o delimitador de firma
+    ("-- "), descarta las líneas citadas con ">" y los pies de "Enviado
+    desde mi ...". Si el ticket no tiene texto propio antes del hilo, se deja
+    como está.
+    """
+    stripped = cut_at_first(text, REPLY_BOUNDARY)
+    unquoted = QUOTED_OR_FOOTER.sub("", stripped)
+    return unquoted if unquoted.strip() else stripped
+
+
+def collapse_whitespace(text: str) -> str:
+    """Colapsa espacios y líneas en blanco repetidos, que solo gastan tokens."""
+    text = EXTRA_SPACES.sub(" ", text.replace("\r\n", "\n"))
+    return BLANK_LINES.sub("\n\n", text).strip()
+
+
+def fit_token_budget(text: str, max_tokens: int, head_ratio: float = 0.7) -> str:
+    """
+    Recorta un texto a unos `max_tokens` tokens conservando inicio y final.
+
+    El inicio suele traer el problema y el final la última petición o el
+    error de un log pegado; lo del medio se reemplaza por TRIM_MARKER. Los
+    cortes se mueven al espacio más cercano para no partir palabras.
+    """
+    budget = max_tokens * CHARS_PER_TOKEN
+    if max_tokens <= 0 or len(text) <= budget:
+        return text
+
+    head_size = int(budget * head_ratio)
+    tail_size = budget - head_size
+
+    head = text[:head_size]
+    space = head.rfind(" ", head_size // 2)
+    if space > 0:
+        head = head[:space]
+
+    tail = text[len(text) - tail_size:] if tail_size else ""
+    space = tail.find(" ", 0, tail_size // 2)
+    if space >= 0:
+        tail = tail[space + 1:]
+
+    return head.rstrip() + TRIM_MARKER + tail.lstrip()
+
+
+def prepare_ticket_text(text: str, max_tokens: int, head_ratio: float = 0.7, strip: bool = True) -> str:
+    """Limpia un ticket y lo ajusta al presupuesto de tokens antes de enviarlo al LLM."""
+    if strip:
+        text = strip_replies(text)
+
+    # Con un log de decenas de KB, colapsar espacios sobre todo el texto cuesta
+    # más que el resto del recorte: basta con ventanas holgadas de cada extremo
+    window = max_tokens * CHARS_PER_TOKEN * RAW_WINDOW_FACTOR
+    if max_tokens > 0 and len(text) > 2 * window:
+        text = text[:window] + TRIM_MARKER + text[-window:]
+    return fit_token_budget(collapse_whitespace(text), max_tokens, head_ratio)
@@ -0,0 +1,74 @@
+"""
+Compara el throughput del camino síncrono anterior (handlers `def` sobre el
+threadpool de Starlette, 40 hilos) con el pipeline asíncrono actual.
+
+Uso:
+    python -m benchmarks.bench_concurrency --tickets 1000 --latency 0.2
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import httpx
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "bench")
+os.environ.setdefault("HUGGINGFACE_API_TOKEN", "bench")
+
+from app.core.http_client import close_http_client  # noqa: E402
+from app.services import ai_service  # noqa: E402
+from benchmarks.stub_server import StubServer  # noqa: E402
+
+# Tamaño por defecto del threadpool de AnyIO que usa Starlette para handlers `def`
+STARLETTE_THREADPOOL_SIZE = 40
+
+
+def sync_analyze(client: httpx.Client, url: str, text: str) -> dict:
+    """Versión síncrona equivalente al `analyze_ticket` anterior."""
+    response = client.post(url, json={"model": "stub", "messages": [{"role": "user", "content": text}]})
+    response.raise_for_status()
+    content = response.json()["choices"][0]["message"]["content"]
+    return ai_service.parse_llm_response(content)
+
+
+def run_sync(url: str, tickets: int) -> float:
+    limits = httpx.Limits(max_connections=STARLETTE_THREADPOOL_SIZE)
+    with httpx.Client(limits=limits, timeout=120.0) as client:
+        with ThreadPoolExecutor(max_workers=STARLETTE_THREADPOOL_SIZE) as pool:
+            start = time.perf_counter()
+            list(pool.map(lambda i: sync_analyze(client, url, f"ticket {i}"), range(tickets)))
+            return time.perf_counter() - start
+
+
+async def run_async(url: str, tickets: int) -> float:
+    with patch.object(ai_service, "HF_API_URL", url):
+        start = time.perf_counter()
+        await asyncio.gather(*(ai_service.analyze_ticket(f"ticket {i}") for i in range(tickets)))
+        elapsed = time.perf_counter() - start
+    await close_http_client()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickets", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.2, help="Latencia simulada del LLM en segundos")
+    parser.add_argument("--connections", type=int, default=100, help="Tamaño del pool del cliente asíncrono")
+    args = parser.parse_args()
+
+    os.environ["HF_MAX_CONNECTIONS"] = str(args.connections)
+
+    with StubServer(latency=args.latency) as server:
+        sync_elapsed = run_sync(server.url, args.tickets)
+        async_elapsed = asyncio.run(run_async(server.url, args.tickets))
+
+    print(f"tickets={args.tickets} latencia_llm={args.latency * 1000:.0f} ms")
+    print(f"síncrono (threadpool {STARLETTE_THREADPOOL_SIZE}) {args.tickets / sync_elapsed:8.1f} tickets/s  ({sync_elapsed:.2f} s)")
+    print(f"asíncrono                   {args.tickets / async_elapsed:8.1f} tickets/s  ({async_elapsed:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compara la latencia de `analyze_ticket` con un cliente HTTP por llamada
+frente al cliente compartido con pool keep-alive.
+
+Uso:
+    python -m benchmarks.bench_http_client --requests 500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from unittest.mock import patch
+
+import httpx
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "bench")
+os.environ.setdefault("HUGGINGFACE_API_TOKEN", "bench")
+
+from app.core.http_client import close_http_client  # noqa: E402
+from app.services import ai_service  # noqa: E402
+from benchmarks.metrics import percentile  # noqa: E402
+from benchmarks.stub_server import StubServer  # noqa: E402
+
+
+def per_call_client() -> httpx.AsyncClient:
+    """Reproduce el comportamiento anterior: un cliente nuevo en cada llamada."""
+    client = httpx.AsyncClient(timeout=120.0)
+    original_post = client.post
+
+    async def post_and_close(*args, **kwargs):
+        try:
+            return await original_post(*args, **kwargs)
+        finally:
+            await client.aclose()
+
+    client.post = post_and_close
+    return client
+
+
+async def run(requests: int, per_call: bool) -> list[float]:
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        if per_call:
+            with patch.object(ai_service, "get_http_client", per_call_client):
+                await ai_service.analyze_ticket("No puedo acceder a mi cuenta", use_cache=False)
+        else:
+            await ai_service.analyze_ticket("No puedo acceder a mi cuenta", use_cache=False)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(label: str, samples: list[float]) -> None:
+    print(
+        f"{label:<18} p50={percentile(samples, 50):7.2f} ms  "
+        f"p99={percentile(samples, 99):7.2f} ms  "
+        f"media={statistics.mean(samples):7.2f} ms"
+    )
+
+
+async def bench(args: argparse.Namespace) -> None:
+    with StubServer(latency=args.latency) as server:
+        with patch.object(ai_service, "HF_API_URL", server.url):
+            per_call = await run(args.requests, per_call=True)
+            pooled = await run(args.requests, per_call=False)
+            await close_http_client()
+
+    report("cliente por llamada", per_call)
+    report("cliente compartido", pooled)
+    gain = percentile(per_call, 50) / max(percentile(pooled, 50), 1e-9)
+    print(f"mejora p50: x{gain:.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia simulada del stub en segundos")
+    args = parser.parse_args()
+
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Mide el clasificador local frente a las etiquetas de referencia del LLM.
+
+Con validación cruzada sobre el corpus etiquetado reporta, para cada umbral
+de confianza, qué fracción de llamadas al LLM se evita y con qué exactitud se
+clasifican esos tickets resueltos localmente, además del costo por ticket.
+
+Uso:
+    python -m benchmarks.bench_local_classifier --folds 5
+    python -m benchmarks.bench_local_classifier --corpus tickets_exportados.jsonl
+"""
+import argparse
+import random
+import time
+
+from app.services.local_classifier import LocalClassifier
+from benchmarks.corpus import CORPUS_PATH, load_corpus
+
+THRESHOLDS = (0.5, 0.7, 0.8, 0.9, 0.95, 0.99)
+
+
+def cross_validate(rows: list[dict], folds: int, seed: int) -> tuple[list[tuple[dict, object]], float]:
+    """Retorna (fila, predicción) para cada fila y el tiempo medio de predicción en µs."""
+    rows = list(rows)
+    random.Random(seed).shuffle(rows)
+
+    predictions = []
+    predict_seconds = 0.0
+    for fold in range(folds):
+        test = rows[fold::folds]
+        train = [row for position, row in enumerate(rows) if position % folds != fold]
+        classifier = LocalClassifier.train(train)
+
+        start = time.perf_counter()
+        fold_predictions = [classifier.predict(row["description"]) for row in test]
+        predict_seconds += time.perf_counter() - start
+
+        predictions.extend(zip(test, fold_predictions))
+
+    return predictions, predict_seconds / len(rows) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--corpus", default=CORPUS_PATH, help="JSONL con description, category y sentiment")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rows = load_corpus(args.corpus)
+    predictions, micros = cross_validate(rows, args.folds, args.seed)
+
+    category_hits = sum(prediction.category == row["category"] for row, prediction in predictions)
+    sentiment_hits = sum(prediction.sentiment == row["sentiment"] for row, prediction in predictions)
+    total = len(predictions)
+
+    print(f"tickets={total} folds={args.folds} predicción={micros:.1f} µs/ticket")
+    print(f"exactitud sin umbral: categoría {category_hits / total:.1%}  sentimiento {sentiment_hits / total:.1%}")
+    print()
+    print("umbral  llamadas evitadas  exactitud local (ambas etiquetas)")
+    for threshold in THRESHOLDS:
+        resolved = [(row, prediction) for row, prediction in predictions if prediction.confidence >= threshold]
+        correct = sum(
+            prediction.category == row["category"] and prediction.sentiment == row["sentiment"]
+            for row, prediction in resolved
+        )
+        accuracy = f"{correct / len(resolved):.1%}" if resolved else "-"
+        print(f"{threshold:>6}  {len(resolved) / total:>17.1%}  {accuracy:>10}")
+
+
+if __name__ == "__main__":
+    main()
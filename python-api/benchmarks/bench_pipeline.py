@@ -0,0 +1,284 @@
+"""
+Evalúa throughput, latencia, tokens y exactitud del pipeline de clasificación.
+
+Corre el corpus etiquetado contra el servidor stub en cuatro modos:
+
+- sync: el camino anterior, un hilo por petición (threadpool de Starlette)
+- async: `analyze_ticket` con el cliente compartido, sin caché
+- batch: `analyze_batch` con textos agrupados en prompts por lotes, sin caché
+- cached: `analyze_ticket` con la caché ya caliente
+
+El stub responde con la etiqueta de referencia de cada ticket, así que la
+exactitud mide lo que el pipeline pierde por el camino (parseo, índices de
+lote, fallbacks). Los resultados se guardan en JSON para comparar corridas.
+
+Uso:
+    python -m benchmarks.bench_pipeline --repeat 5 --latency 0.2 --jitter 0.1 --error-rate 0.02
+    python -m benchmarks.bench_pipeline --modes async batch --output resultados.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import httpx
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "bench")
+os.environ.setdefault("HUGGINGFACE_API_TOKEN", "bench")
+
+from app.core.config import get_settings  # noqa: E402
+from app.core.http_client import close_http_client  # noqa: E402
+from app.services import ai_service  # noqa: E402
+from app.services.cache_service import get_analysis_cache, normalize_text  # noqa: E402
+from benchmarks.corpus import CORPUS_PATH, load_corpus  # noqa: E402
+from benchmarks.metrics import summarize_latencies  # noqa: E402
+from benchmarks.stub_server import StubServer  # noqa: E402
+
+MODES = ("sync", "async", "batch", "cached")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+class ModeRun:
+    """Muestras de una corrida: latencias en ms y análisis por ticket (None si falló)."""
+
+    def __init__(self, tickets: int):
+        self.latencies: list[float] = []
+        self.analyses: list[dict | None] = [None] * tickets
+        self.elapsed = 0.0
+
+
+def sync_analyze(client: httpx.Client, url: str, text: str) -> dict:
+    """Versión síncrona equivalente al `analyze_ticket` anterior."""
+    payload = {
+        "model": ai_service.HF_MODEL,
+        "messages": [
+            {"role": "system", "content": ai_service.SYSTEM_PROMPT},
+            {"role": "user", "content": ai_service.build_analysis_prompt(text)}
+        ],
+        "max_tokens": 100
+    }
+    response = client.post(url, json=payload)
+    response.raise_for_status()
+    content = response.json()["choices"][0]["message"]["content"]
+    return ai_service.parse_llm_response(content)
+
+
+def run_sync(url: str, texts: list[str], concurrency: int) -> ModeRun:
+    run = ModeRun(len(texts))
+
+    def worker(client: httpx.Client, position: int) -> None:
+        start = time.perf_counter()
+        try:
+            run.analyses[position] = sync_analyze(client, url, texts[position])
+        except httpx.HTTPError:
+            pass
+        run.latencies.append((time.perf_counter() - start) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    with httpx.Client(limits=limits, timeout=120.0) as client:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            start = time.perf_counter()
+            list(pool.map(lambda position: worker(client, position), range(len(texts))))
+            run.elapsed = time.perf_counter() - start
+    return run
+
+
+async def run_concurrently(units: list[list[int]], concurrency: int, call) -> float:
+    """Ejecuta `call(unit)` con `concurrency` clientes en bucle cerrado; retorna el tiempo total."""
+    queue: asyncio.Queue = asyncio.Queue()
+    for unit in units:
+        queue.put_nowait(unit)
+
+    async def client() -> None:
+        while not queue.empty():
+            await call(queue.get_nowait())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def run_single(texts: list[str], concurrency: int, use_cache: bool) -> ModeRun:
+    run = ModeRun(len(texts))
+
+    async def call(unit: list[int]) -> None:
+        position = unit[0]
+        start = time.perf_counter()
+        try:
+            run.analyses[position] = await ai_service.analyze_ticket(texts[position], use_cache=use_cache)
+        except httpx.HTTPError:
+            pass
+        run.latencies.append((time.perf_counter() - start) * 1000)
+
+    run.elapsed = await run_concurrently([[position] for position in range(len(texts))], concurrency, call)
+    return run
+
+
+async def run_batch(texts: list[str], concurrency: int, batch_size: int) -> ModeRun:
+    run = ModeRun(len(texts))
+
+    async def call(unit: list[int]) -> None:
+        start = time.perf_counter()
+        try:
+            analyses = await ai_service.analyze_batch([texts[position] for position in unit], use_cache=False)
+            for position, analysis in zip(unit, analyses):
+                run.analyses[position] = analysis
+        except httpx.HTTPError:
+            pass
+        run.latencies.append((time.perf_counter() - start) * 1000)
+
+    units = [list(range(start, min(start + batch_size, len(texts)))) for start in range(0, len(texts), batch_size)]
+    run.elapsed = await run_concurrently(units, concurrency, call)
+    return run
+
+
+async def warm_cache(texts: list[str]) -> None:
+    await asyncio.gather(*(ai_service.analyze_ticket(text) for text in set(texts)), return_exceptions=True)
+
+
+def score(run: ModeRun, rows: list[dict], server: StubServer) -> dict:
+    tickets = len(rows)
+    answered = [(row, analysis) for row, analysis in zip(rows, run.analyses) if analysis is not None]
+    correct = sum(
+        analysis["category"] == row["category"] and analysis["sentiment"] == row["sentiment"]
+        for row, analysis in answered
+    )
+    stats = server.stats
+    return {
+        "tickets": tickets,
+        "failed_tickets": tickets - len(answered),
+        "elapsed_seconds": round(run.elapsed, 3),
+        "tickets_per_second": round(tickets / run.elapsed, 2) if run.elapsed else None,
+        "latency_ms": summarize_latencies(run.latencies),
+        "llm_requests": stats.requests,
+        "llm_errors": stats.errors,
+        "tokens_per_ticket": {
+            "prompt": round(stats.prompt_tokens / tickets, 1),
+            "completion": round(stats.completion_tokens / tickets, 1)
+        },
+        "accuracy": round(correct / len(answered), 4) if answered else None
+    }
+
+
+async def run_mode(mode: str, rows: list[dict], server: StubServer, args: argparse.Namespace) -> dict:
+    texts = [row["description"] for row in rows]
+    get_analysis_cache().clear()
+    server.reset_stats()
+
+    if mode == "sync":
+        run = await asyncio.to_thread(run_sync, server.url, texts, args.concurrency)
+    elif mode == "async":
+        run = await run_single(texts, args.concurrency, use_cache=False)
+    elif mode == "batch":
+        run = await run_batch(texts, args.concurrency, args.batch_size)
+    else:
+        await warm_cache(texts)
+        server.reset_stats()
+        run = await run_single(texts, args.concurrency, use_cache=True)
+
+    return score(run, rows, server)
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def bench(args: argparse.Namespace) -> dict:
+    corpus = load_corpus(args.corpus)
+    rows = corpus * args.repeat
+    labels = {
+        normalize_text(row["description"]): {"category": row["category"], "sentiment": row["sentiment"]}
+        for row in corpus
+    }
+
+    results = {}
+    with StubServer(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        labels=labels,
+        seed=args.seed
+    ) as server:
+        with patch.object(ai_service, "HF_API_URL", server.url):
+            for mode in args.modes:
+                results[mode] = await run_mode(mode, rows, server, args)
+                await close_http_client()
+
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "params": {
+            "corpus": os.path.basename(args.corpus),
+            "tickets": len(rows),
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "error_rate": args.error_rate,
+            "concurrency": args.concurrency,
+            "batch_size": args.batch_size,
+            "llm_batch_size": get_settings().llm_batch_size
+        },
+        "modes": results
+    }
+
+
+def print_report(report: dict) -> None:
+    params = report["params"]
+    print(
+        f"tickets={params['tickets']} latencia={params['latency'] * 1000:.0f}±{params['jitter'] * 1000:.0f} ms "
+        f"errores={params['error_rate']:.0%} concurrencia={params['concurrency']}"
+    )
+    print(f"{'modo':<7} {'tickets/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'llamadas':>9} {'tokens/ticket':>14} {'exactitud':>10} {'fallidos':>9}")
+    for mode, result in report["modes"].items():
+        latency = result["latency_ms"]
+        tokens = result["tokens_per_ticket"]["prompt"] + result["tokens_per_ticket"]["completion"]
+        accuracy = f"{result['accuracy']:.1%}" if result["accuracy"] is not None else "-"
+        print(
+            f"{mode:<7} {result['tickets_per_second']:>10} {latency['p50']:>9} {latency['p95']:>9} "
+            f"{latency['p99']:>9} {result['llm_requests']:>9} {tokens:>14.1f} {accuracy:>10} "
+            f"{result['failed_tickets']:>9}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS_PATH, help="JSONL con description, category y sentiment")
+    parser.add_argument("--repeat", type=int, default=3, help="Veces que se recorre el corpus")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--latency", type=float, default=0.2, help="Latencia base del stub en segundos")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Latencia extra aleatoria máxima en segundos")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de respuestas 503")
+    parser.add_argument("--concurrency", type=int, default=40, help="Clientes concurrentes por modo")
+    parser.add_argument("--batch-size", type=int, default=100, help="Textos por llamada en el modo batch")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Archivo JSON de resultados (por defecto benchmarks/results/)")
+    args = parser.parse_args()
+
+    report = asyncio.run(bench(args))
+    print_report(report)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"pipeline-{stamp}.json")
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+    print(f"resultados en {output}")
+
+
+if __name__ == "__main__":
+    main()
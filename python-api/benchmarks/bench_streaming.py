@@ -0,0 +1,189 @@
+"""
+Compara la respuesta completa + regex con el streaming con corte temprano.
+
+Dos mediciones:
+
+- parser: costo por respuesta de `parse_llm_response` sobre el texto
+  completo frente a decodificar los eventos SSE y alimentar el
+  `AnalysisStreamParser` delta a delta, con y sin texto extra tras el JSON.
+- e2e: `analyze_ticket` contra el stub, que genera token a token y sigue
+  escribiendo después del JSON (`--trailing-tokens`). Reporta tiempo hasta
+  el resultado, tokens generados por ticket y exactitud con y sin
+  `LLM_STREAMING`.
+
+Uso:
+    python -m benchmarks.bench_streaming --token-delay 0.02 --trailing-tokens 40
+    python -m benchmarks.bench_streaming --output resultados.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from unittest.mock import patch
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "bench")
+os.environ.setdefault("HUGGINGFACE_API_TOKEN", "bench")
+
+from app.core.config import get_settings  # noqa: E402
+from app.core.http_client import close_http_client  # noqa: E402
+from app.services import ai_service  # noqa: E402
+from app.services.cache_service import normalize_text  # noqa: E402
+from app.services.stream_parser import AnalysisStreamParser, sse_delta  # noqa: E402
+from benchmarks.corpus import CORPUS_PATH, load_corpus  # noqa: E402
+from benchmarks.metrics import summarize_latencies  # noqa: E402
+from benchmarks.stub_server import CHARS_PER_TOKEN, StubServer, build_delta  # noqa: E402
+
+TRAILING_SENTENCE = " El cliente describe el problema con detalle y la categoría asignada refleja el motivo principal."
+
+
+def trailing_text(tokens: int) -> str:
+    """Texto que el modelo sigue generando tras el JSON, de unos `tokens` tokens."""
+    text = ""
+    while len(text) < tokens * CHARS_PER_TOKEN:
+        text += TRAILING_SENTENCE
+    return text[:tokens * CHARS_PER_TOKEN]
+
+
+def bench_parser(rows: list[dict], trailing: str, rounds: int) -> dict:
+    """µs por respuesta de cada camino de parseo."""
+    answers = [
+        json.dumps({"category": row["category"], "sentiment": row["sentiment"]}, ensure_ascii=False) + trailing
+        for row in rows
+    ]
+    events = [
+        [build_delta(answer[start:start + CHARS_PER_TOKEN]).decode().rstrip("\n") for start in range(0, len(answer), CHARS_PER_TOKEN)]
+        for answer in answers
+    ]
+
+    def regex_path() -> None:
+        for answer in answers:
+            ai_service.parse_llm_response(answer)
+
+    def stream_path() -> None:
+        for answer_events in events:
+            parser = AnalysisStreamParser()
+            for line in answer_events:
+                if parser.feed(sse_delta(line)) is not None:
+                    break
+            ai_service.parse_llm_response(parser.match)
+
+    results = {}
+    for name, path in (("regex_full_response", regex_path), ("sse_stream_parser", stream_path)):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            path()
+        results[name] = round((time.perf_counter() - start) / (rounds * len(answers)) * 1e6, 2)
+    return results
+
+
+async def run_e2e(rows: list[dict], server: StubServer, concurrency: int, streaming: bool) -> dict:
+    texts = [row["description"] for row in rows]
+    analyses: list[dict | None] = [None] * len(texts)
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(position: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                analyses[position] = await ai_service.analyze_ticket(texts[position], use_cache=False)
+            except Exception:
+                pass
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    server.reset_stats()
+    with patch.object(get_settings(), "llm_streaming", streaming):
+        start = time.perf_counter()
+        await asyncio.gather(*(call(position) for position in range(len(texts))))
+        elapsed = time.perf_counter() - start
+    await close_http_client()
+    # El stub puede terminar de contar el token que estaba enviando al cortar
+    await asyncio.sleep(server.token_delay + 0.05)
+
+    answered = [(row, analysis) for row, analysis in zip(rows, analyses) if analysis is not None]
+    correct = sum(
+        analysis["category"] == row["category"] and analysis["sentiment"] == row["sentiment"]
+        for row, analysis in answered
+    )
+    return {
+        "tickets_per_second": round(len(texts) / elapsed, 2),
+        "time_to_result_ms": summarize_latencies(latencies),
+        "completion_tokens_per_ticket": round(server.stats.completion_tokens / len(texts), 1),
+        "accuracy": round(correct / len(answered), 4) if answered else None,
+        "failed_tickets": len(texts) - len(answered)
+    }
+
+
+async def bench(args: argparse.Namespace) -> dict:
+    corpus = load_corpus(args.corpus)
+    trailing = trailing_text(args.trailing_tokens)
+    labels = {
+        normalize_text(row["description"]): {"category": row["category"], "sentiment": row["sentiment"]}
+        for row in corpus
+    }
+
+    report = {
+        "params": {
+            "tickets": len(corpus),
+            "latency": args.latency,
+            "token_delay": args.token_delay,
+            "trailing_tokens": args.trailing_tokens,
+            "concurrency": args.concurrency
+        },
+        "parser_us_per_response": {
+            "json_only": bench_parser(corpus, "", args.rounds),
+            "with_trailing_text": bench_parser(corpus, trailing, args.rounds)
+        },
+        "e2e": {}
+    }
+
+    with StubServer(latency=args.latency, token_delay=args.token_delay, trailing=trailing, labels=labels) as server:
+        with patch.object(ai_service, "HF_API_URL", server.url):
+            for mode, streaming in (("full_response", False), ("streaming", True)):
+                report["e2e"][mode] = await run_e2e(corpus, server, args.concurrency, streaming)
+    return report
+
+
+def print_report(report: dict) -> None:
+    params = report["params"]
+    print(
+        f"tickets={params['tickets']} latencia={params['latency'] * 1000:.0f} ms "
+        f"token={params['token_delay'] * 1000:.0f} ms texto extra={params['trailing_tokens']} tokens"
+    )
+    print("\nparseo (µs por respuesta)")
+    for case, paths in report["parser_us_per_response"].items():
+        print(f"  {case:<20} " + "  ".join(f"{name}={value}" for name, value in paths.items()))
+
+    print(f"\n{'modo':<14} {'tickets/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'tokens/ticket':>14} {'exactitud':>10}")
+    for mode, result in report["e2e"].items():
+        latency = result["time_to_result_ms"]
+        accuracy = f"{result['accuracy']:.1%}" if result["accuracy"] is not None else "-"
+        print(
+            f"{mode:<14} {result['tickets_per_second']:>10} {latency['p50']:>9} {latency['p95']:>9} "
+            f"{result['completion_tokens_per_ticket']:>14} {accuracy:>10}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS_PATH, help="JSONL con description, category y sentiment")
+    parser.add_argument("--latency", type=float, default=0.1, help="Latencia hasta el primer token, en segundos")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Segundos por token generado")
+    parser.add_argument("--trailing-tokens", type=int, default=40, help="Tokens que el modelo genera tras el JSON")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=50, help="Repeticiones del benchmark de parseo")
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados")
+    args = parser.parse_args()
+
+    report = asyncio.run(bench(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+        print(f"resultados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
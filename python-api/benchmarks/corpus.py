@@ -0,0 +1,11 @@
+"""Corpus etiquetado de tickets en español usado por los benchmarks."""
+import json
+import os
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "tickets_es.jsonl")
+
+
+def load_corpus(path: str = CORPUS_PATH) -> list[dict]:
+    """Lee el corpus: una fila JSON por ticket con description, category y sentiment."""
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
@@ -0,0 +1,20 @@
+"""Utilidades de medición compartidas por los benchmarks."""
+import statistics
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize_latencies(samples: list[float]) -> dict:
+    """Resume latencias en milisegundos."""
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    return {
+        "p50": round(percentile(samples, 50), 3),
+        "p95": round(percentile(samples, 95), 3),
+        "p99": round(percentile(samples, 99), 3),
+        "mean": round(statistics.mean(samples), 3)
+    }
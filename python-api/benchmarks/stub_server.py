@@ -0,0 +1,242 @@
+"""
+Servidor local que imita el endpoint de chat-completions de Hugging Face.
+
+Permite medir el cliente HTTP y el pipeline de clasificación sin depender
+de la red ni de un token real. Corre sobre asyncio en un hilo propio para
+soportar cientos de conexiones concurrentes sin un hilo por conexión.
+
+Con `labels` el stub responde con la etiqueta de referencia de cada ticket
+que reconoce en el prompt (individual o por lotes), de modo que los
+benchmarks pueden medir la exactitud de extremo a extremo del pipeline.
+
+Con `token_delay` y `trailing` imita a un modelo que genera token a token y
+sigue escribiendo después del JSON; con `"stream": true` en la petición
+responde por SSE y deja de generar cuando el cliente cierra la conexión.
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+
+from app.services.cache_service import normalize_text
+
+
+STUB_CONTENT = '{"category": "soporte técnico", "sentiment": "negativo"}'
+STUB_ANALYSIS = json.loads(STUB_CONTENT)
+
+SINGLE_TICKET = re.compile(r'^Ticket: "(.*)"$', re.MULTILINE)
+BATCH_TICKET = re.compile(r'^\[(\d+)\] (".*")$', re.MULTILINE)
+
+# Aproximación habitual para texto en español con tokenizadores BPE
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def build_delta(content: str) -> bytes:
+    """Evento SSE con un fragmento de la respuesta, como en chat-completions con stream."""
+    event = json.dumps({"choices": [{"delta": {"content": content}}]}, ensure_ascii=False)
+    return f"data: {event}\n\n".encode()
+
+
+def write_chunk(writer: asyncio.StreamWriter, data: bytes) -> None:
+    """Escribe un bloque con Transfer-Encoding: chunked."""
+    writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+
+def build_completion(content: str = STUB_CONTENT, prompt_tokens: int = 0) -> bytes:
+    return json.dumps({
+        "choices": [{"message": {"role": "assistant", "content": content}}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": estimate_tokens(content),
+            "total_tokens": prompt_tokens + estimate_tokens(content)
+        }
+    }, ensure_ascii=False).encode()
+
+
+class StubStats:
+    """Contadores del lado del servidor, para calcular tokens por ticket."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+
+class StubServer:
+    """
+    Ejecuta el servidor stub en un hilo de fondo con su propio event loop.
+
+    Args:
+        latency: Latencia base de cada respuesta, en segundos.
+        jitter: Latencia extra aleatoria, uniforme entre 0 y `jitter` segundos.
+        error_rate: Fracción de peticiones que responden 503.
+        labels: Etiquetas de referencia por texto normalizado.
+        seed: Semilla para que jitter y errores sean reproducibles.
+        token_delay: Segundos para generar cada token de la respuesta.
+        trailing: Texto que el modelo sigue generando después del JSON.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        labels: dict[str, dict] | None = None,
+        seed: int | None = None,
+        token_delay: float = 0.0,
+        trailing: str = "",
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.labels = labels or {}
+        self.token_delay = token_delay
+        self.trailing = trailing
+        self.stats = StubStats()
+        self._random = random.Random(seed)
+        self._host = host
+        self._port = port
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._server: asyncio.AbstractServer | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def reset_stats(self) -> None:
+        self.stats = StubStats()
+
+    def label_for(self, text: str) -> dict:
+        return self.labels.get(normalize_text(text), STUB_ANALYSIS)
+
+    def answer(self, prompt: str) -> str:
+        """Responde como lo haría el modelo, usando las etiquetas de referencia."""
+        batch = BATCH_TICKET.findall(prompt)
+        if batch:
+            return json.dumps([
+                {"index": int(index), **self.label_for(json.loads(text))}
+                for index, text in batch
+            ], ensure_ascii=False)
+
+        single = SINGLE_TICKET.search(prompt)
+        if single:
+            return json.dumps(self.label_for(single.group(1)), ensure_ascii=False)
+        return STUB_CONTENT
+
+    def generate(self, request: dict) -> tuple[str, int] | None:
+        """
+        Cuenta la petición y retorna (texto completo, tokens del prompt), o
+        None si toca responder 503.
+        """
+        self.stats.requests += 1
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.stats.errors += 1
+            return None
+
+        messages = request.get("messages", [])
+        prompt = "\n".join(message.get("content", "") for message in messages)
+        prompt_tokens = estimate_tokens(prompt)
+        self.stats.prompt_tokens += prompt_tokens
+        return self.answer(prompt) + self.trailing, prompt_tokens
+
+    def respond(self, body: bytes) -> tuple[bytes, bytes]:
+        """Retorna (línea de estado, cuerpo) para una petición sin streaming."""
+        generated = self.generate(json.loads(body) if body else {})
+        if generated is None:
+            return b"503 Service Unavailable", b'{"error": "Model is overloaded"}'
+
+        content, prompt_tokens = generated
+        self.stats.completion_tokens += estimate_tokens(content)
+        return b"200 OK", build_completion(content, prompt_tokens)
+
+    async def _stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, content: str) -> bool:
+        """Envía `content` token a token por SSE; retorna False si el cliente cortó antes."""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+        for start in range(0, len(content), CHARS_PER_TOKEN):
+            if reader.at_eof() or writer.is_closing():
+                return False
+            write_chunk(writer, build_delta(content[start:start + CHARS_PER_TOKEN]))
+            await writer.drain()
+            self.stats.completion_tokens += 1
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+
+        write_chunk(writer, b"data: [DONE]\n\n")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        return True
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n")[1:]:
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+                body = await reader.readexactly(length) if length else b""
+
+                delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+                await asyncio.sleep(delay)
+
+                request = json.loads(body) if body else {}
+                if request.get("stream"):
+                    generated = self.generate(request)
+                    if generated is not None:
+                        if not await self._stream(reader, writer, generated[0]):
+                            break
+                        continue
+                    status, payload = b"503 Service Unavailable", b'{"error": "Model is overloaded"}'
+                else:
+                    generated_before = self.stats.completion_tokens
+                    status, payload = self.respond(body)
+                    # Sin streaming la respuesta sale cuando el modelo terminó de generar todo
+                    await asyncio.sleep(self.token_delay * (self.stats.completion_tokens - generated_before))
+
+                writer.write(
+                    b"HTTP/1.1 " + status + b"\r\n"
+                    b"Content-Type: application/json\r\n"
+                    + f"Content-Length: {len(payload)}\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self._host, self._port, backlog=4096)
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        async def stop() -> None:
+            self._server.close()
+            await self._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
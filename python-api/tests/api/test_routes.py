@@ -1,7 +1,17 @@
+import asyncio
+import json
+import time
+import httpx
 import pytest
 from unittest.mock import patch, MagicMock
+from fastapi import WebSocketDisconnect
 from fastapi.testclient import TestClient
 from app.main import app
+from app.api.routes import events, sse_stream
+from app.core.config import get_settings
+from app.core.metrics import REGISTRY
+from app.core.webhooks import sign_payload
+from app.services.ticket_events import get_event_broker
 
 
 client = TestClient(app)
@@ -153,6 +163,17 @@ class TestAnalyzeTextEndpoint:
 
         assert response.status_code == 422
 
+    @patch("app.api.routes.analyze_ticket")
+    def test_analyze_text_bypass_cache(self, mock_analyze):
+        """El parámetro bypass_cache debe desactivar la caché."""
+        mock_analyze.return_value = {"category": "ventas", "sentiment": "neutro"}
+
+        client.post("/analyze-text?bypass_cache=true", json={"text": "Precios"})
+        client.post("/analyze-text", json={"text": "Precios"})
+
+        assert mock_analyze.call_args_list[0].kwargs["use_cache"] is False
+        assert mock_analyze.call_args_list[1].kwargs["use_cache"] is True
+
     @patch("app.api.routes.analyze_ticket")
     def test_analyze_text_returns_correct_structure(self, mock_analyze):
         """La respuesta debe tener la estructura correcta."""
@@ -170,3 +191,765 @@ class TestAnalyzeTextEndpoint:
         assert "category" in data
         assert "sentiment" in data
         assert len(data) == 2
+
+
+class TestAnalyzeBatchEndpoint:
+    """Tests para el endpoint /analyze-batch."""
+
+    @patch("app.api.routes.analyze_batch")
+    def test_analyze_batch_success(self, mock_analyze_batch):
+        """Debe devolver un resultado por texto, en orden."""
+        mock_analyze_batch.return_value = [
+            {"category": "facturación", "sentiment": "negativo"},
+            {"category": "ventas", "sentiment": "positivo"}
+        ]
+
+        response = client.post(
+            "/analyze-batch",
+            json={"texts": ["Me cobraron doble", "Quiero comprar"]}
+        )
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["category"] for r in results] == ["facturación", "ventas"]
+
+    def test_analyze_batch_too_many_texts(self):
+        """Debe retornar 400 si el lote supera el máximo configurado."""
+        response = client.post("/analyze-batch", json={"texts": ["hola"] * 101})
+
+        assert response.status_code == 400
+        assert "como máximo" in response.json()["detail"]
+
+    def test_analyze_batch_empty_text(self):
+        """Debe retornar 400 si algún texto está vacío."""
+        response = client.post("/analyze-batch", json={"texts": ["hola", "  "]})
+
+        assert response.status_code == 400
+        assert "posición 1" in response.json()["detail"]
+
+    def test_analyze_batch_empty_list(self):
+        """Debe retornar 422 si la lista está vacía."""
+        response = client.post("/analyze-batch", json={"texts": []})
+
+        assert response.status_code == 422
+
+
+class TestCreateTicketsEndpoint:
+    """Tests para el endpoint /create-tickets."""
+
+    @patch("app.api.routes.bulk_create_tickets")
+    @patch("app.api.routes.analyze_batch")
+    def test_create_tickets_analyzes_only_unlabeled(self, mock_analyze_batch, mock_bulk_create):
+        """Solo los tickets sin categoría ni sentimiento deben ir al modelo."""
+        mock_analyze_batch.return_value = [{"category": "soporte técnico", "sentiment": "negativo"}]
+        mock_bulk_create.return_value = {
+            "created": [
+                {"id": "a", "description": "No puedo entrar", "category": "soporte técnico", "sentiment": "negativo"},
+                {"id": "b", "description": "Precios", "category": "ventas", "sentiment": "neutro"}
+            ],
+            "failed": []
+        }
+
+        response = client.post("/create-tickets", json={"tickets": [
+            {"description": "No puedo entrar"},
+            {"description": "Precios", "category": "ventas", "sentiment": "neutro"}
+        ]})
+
+        assert response.status_code == 201
+        assert mock_analyze_batch.call_args.args[0] == ["No puedo entrar"]
+        rows = mock_bulk_create.call_args.args[0]
+        assert rows[0]["category"] == "soporte técnico"
+        assert rows[1]["category"] == "ventas"
+        assert [t["ticket_id"] for t in response.json()["created"]] == ["a", "b"]
+
+    @patch("app.api.routes.bulk_create_tickets")
+    def test_create_tickets_reports_failures(self, mock_bulk_create):
+        """Las filas fallidas deben devolverse con su posición."""
+        mock_bulk_create.return_value = {
+            "created": [],
+            "failed": [{"index": 0, "error": "No se pudo crear el ticket"}]
+        }
+
+        response = client.post("/create-tickets", json={"tickets": [
+            {"description": "Precios", "category": "ventas", "sentiment": "neutro"}
+        ]})
+
+        assert response.json()["failed"] == [{"index": 0, "error": "No se pudo crear el ticket"}]
+
+    def test_create_tickets_empty_description(self):
+        """Debe retornar 400 si alguna descripción está vacía."""
+        response = client.post("/create-tickets", json={"tickets": [{"description": "  "}]})
+
+        assert response.status_code == 400
+        assert "posición 0" in response.json()["detail"]
+
+
+class TestImportEndpoint:
+    """Tests para el endpoint /import."""
+
+    @patch("app.services.import_service.bulk_create_tickets")
+    @patch("app.services.import_service.analyze_batch")
+    def test_import_csv_streams_ndjson_report(self, mock_analyze_batch, mock_bulk_create):
+        """Debe responder NDJSON con los errores por línea y un resumen final."""
+        mock_analyze_batch.return_value = [{"category": "ventas", "sentiment": "neutro"}]
+        mock_bulk_create.side_effect = lambda tickets: {"created": tickets, "failed": []}
+
+        response = client.post(
+            "/import",
+            content=b"description,category,sentiment\nConsulta de precios,,\n ,,\n",
+            headers={"Content-Type": "text/csv"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert events[0] == {"type": "error", "line": 3, "error": "La descripción no puede estar vacía"}
+        assert events[-1]["type"] == "summary"
+        assert events[-1]["created"] == 1
+        assert mock_bulk_create.call_args.args[0][0]["category"] == "ventas"
+
+    @patch("app.services.import_service.bulk_create_tickets")
+    def test_import_format_query_overrides_content_type(self, mock_bulk_create):
+        mock_bulk_create.side_effect = lambda tickets: {"created": tickets, "failed": []}
+
+        response = client.post(
+            "/import?format=ndjson",
+            content=b'{"description": "Precios", "category": "ventas", "sentiment": "neutro"}\n',
+            headers={"Content-Type": "application/octet-stream"}
+        )
+
+        assert json.loads(response.text.splitlines()[-1])["created"] == 1
+
+    def test_import_requires_format(self):
+        response = client.post("/import", content=b"{}", headers={"Content-Type": "application/json"})
+
+        assert response.status_code == 400
+
+
+class TestBacklogEndpoints:
+    """Tests para los endpoints /backlog."""
+
+    @patch("app.api.routes.start_backlog_run")
+    @patch("app.api.routes.is_backlog_running", return_value=False)
+    def test_start_backlog_returns_202(self, _mock_running, mock_start):
+        """Debe iniciar la corrida y responder 202."""
+        from app.services.backlog_service import BacklogProgress
+        mock_start.return_value = BacklogProgress(status="running")
+
+        response = client.post("/backlog/process", json={"page_size": 200, "concurrency": 4})
+
+        assert response.status_code == 202
+        assert response.json()["status"] == "running"
+        assert mock_start.call_args.kwargs["page_size"] == 200
+        assert mock_start.call_args.kwargs["concurrency"] == 4
+
+    @patch("app.api.routes.is_backlog_running", return_value=True)
+    def test_start_backlog_conflict_when_running(self, _mock_running):
+        """Debe retornar 409 si ya hay una corrida en curso."""
+        response = client.post("/backlog/process")
+
+        assert response.status_code == 409
+
+    def test_backlog_status(self):
+        """Debe retornar el progreso actual."""
+        response = client.get("/backlog/status")
+
+        assert response.status_code == 200
+        assert "processed" in response.json()
+
+
+class TestCoalescing:
+    """Tests para la coalescencia de peticiones idénticas."""
+
+    @patch("app.api.routes.update_ticket")
+    @patch("app.api.routes.analyze_ticket")
+    @patch("app.api.routes.get_ticket_by_id")
+    async def test_concurrent_process_ticket_runs_once(self, mock_get_ticket, mock_analyze, mock_update):
+        """Las peticiones simultáneas para el mismo ticket deben procesarlo una vez."""
+        release = asyncio.Event()
+
+        async def slow_get(ticket_id):
+            await release.wait()
+            return {"id": ticket_id, "description": "Mi factura está mal", "processed": False}
+
+        mock_get_ticket.side_effect = slow_get
+        mock_analyze.return_value = {"category": "facturación", "sentiment": "negativo"}
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            body = {"ticket_id": "550e8400-e29b-41d4-a716-446655440000"}
+            requests = [asyncio.create_task(async_client.post("/process-ticket", json=body)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            release.set()
+            responses = await asyncio.gather(*requests)
+
+        assert [response.status_code for response in responses] == [200, 200, 200]
+        assert mock_get_ticket.await_count == 1
+        assert mock_update.await_count == 1
+
+    @patch("app.api.routes.update_ticket")
+    @patch("app.api.routes.analyze_ticket")
+    @patch("app.api.routes.get_ticket_by_id")
+    async def test_bypass_cache_does_not_join_cached_request(self, mock_get_ticket, mock_analyze, mock_update):
+        """Quien pide bypass_cache no debe recibir el resultado de una petición con caché en curso."""
+        release = asyncio.Event()
+
+        async def slow_get(ticket_id):
+            await release.wait()
+            return {"id": ticket_id, "description": "Mi factura está mal", "processed": False}
+
+        mock_get_ticket.side_effect = slow_get
+        mock_analyze.return_value = {"category": "facturación", "sentiment": "negativo"}
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            body = {"ticket_id": "550e8400-e29b-41d4-a716-446655440000"}
+            requests = [
+                asyncio.create_task(async_client.post("/process-ticket", json=body)),
+                asyncio.create_task(async_client.post("/process-ticket?bypass_cache=true", json=body))
+            ]
+            await asyncio.sleep(0.01)
+            release.set()
+            await asyncio.gather(*requests)
+
+        assert mock_get_ticket.await_count == 2
+        assert [call.kwargs["use_cache"] for call in mock_analyze.await_args_list] == [True, False]
+
+    def test_debug_stats(self):
+        """Debe exponer los contadores de caché y coalescencia."""
+        response = client.get("/debug/stats")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert "hit_rate" in data["cache"]
+        assert set(data["coalescing"]) == {"analysis", "process_ticket"}
+        assert "coalesced" in data["coalescing"]["process_ticket"]
+        assert data["llm_resilience"]["breaker"]["state"] == "closed"
+
+
+class TestAsyncProcessing:
+    """Tests para /process-ticket?async=true y /jobs/{job_id}."""
+
+    def test_async_process_returns_202_with_job(self):
+        """Debe encolar el ticket y responder 202 con el ID del trabajo."""
+        body = {"ticket_id": "11111111-e29b-41d4-a716-446655440000"}
+
+        response = client.post("/process-ticket?async=true", json=body)
+        repeated = client.post("/process-ticket?async=true", json=body)
+
+        assert response.status_code == 202
+        data = response.json()
+        assert data["status"] == "queued"
+        assert data["status_url"] == f"/jobs/{data['job_id']}"
+        assert repeated.json()["job_id"] == data["job_id"]
+
+        job = client.get(data["status_url"])
+        assert job.status_code == 200
+        assert job.json()["kind"] == "process_ticket"
+        assert job.json()["attempts"] == 0
+
+    def test_unknown_job_returns_404(self):
+        response = client.get("/jobs/no-existe")
+
+        assert response.status_code == 404
+
+    @patch("app.api.routes.get_ticket_by_id")
+    async def test_job_handler_marks_missing_ticket_as_permanent(self, mock_get_ticket):
+        """Un ticket inexistente no debe reintentarse."""
+        from app.api.routes import process_ticket_job
+        from app.services.job_queue import PermanentJobError
+        mock_get_ticket.return_value = None
+
+        with pytest.raises(PermanentJobError):
+            await process_ticket_job({"ticket_id": "no-existe"})
+
+
+class TestBackpressure:
+    """Tests para la respuesta 503 cuando el LLM está saturado."""
+
+    @patch("app.api.routes.analyze_ticket")
+    def test_overloaded_llm_returns_503_with_retry_after(self, mock_analyze):
+        from app.core.limiter import LLMOverloadedError
+        mock_analyze.side_effect = LLMOverloadedError(retry_after=12.3)
+
+        response = client.post("/analyze-text", json={"text": "Hola"})
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "13"
+
+
+class TestCircuitOpen:
+    """Tests para el comportamiento con el circuito hacia el LLM abierto."""
+
+    @patch("app.api.routes.get_ticket_by_id")
+    @patch("app.api.routes.analyze_ticket")
+    def test_process_ticket_is_queued_for_later(self, mock_analyze, mock_get_ticket, sample_ticket):
+        from app.core.resilience import CircuitOpenError
+        sample_ticket["id"] = "22222222-e29b-41d4-a716-446655440000"
+        mock_get_ticket.return_value = sample_ticket
+        mock_analyze.side_effect = CircuitOpenError(30.0)
+
+        response = client.post("/process-ticket", json={"ticket_id": sample_ticket["id"]})
+
+        assert response.status_code == 202
+        assert response.json()["status"] == "queued"
+
+    @patch("app.api.routes.analyze_ticket")
+    def test_analyze_text_returns_503(self, mock_analyze):
+        from app.core.resilience import CircuitOpenError
+        mock_analyze.side_effect = CircuitOpenError(29.2)
+
+        response = client.post("/analyze-text", json={"text": "Hola"})
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "30"
+
+    @patch("app.api.routes.get_ticket_by_id")
+    @patch("app.api.routes.analyze_ticket")
+    async def test_job_handler_defers_while_circuit_open(self, mock_analyze, mock_get_ticket, sample_ticket):
+        from app.api.routes import process_ticket_job
+        from app.core.resilience import CircuitOpenError
+        from app.services.job_queue import DeferJobError
+        mock_get_ticket.return_value = sample_ticket
+        mock_analyze.side_effect = CircuitOpenError(30.0)
+
+        with pytest.raises(DeferJobError) as exc:
+            await process_ticket_job({"ticket_id": sample_ticket["id"]})
+        assert exc.value.delay == 30.0
+
+
+class TestModelRouting:
+    """Tests para la selección de modelo por petición y /debug/models."""
+
+    def test_unknown_model_returns_400(self):
+        response = client.post("/analyze-text?model=no-existe", json={"text": "Hola"})
+
+        assert response.status_code == 400
+        assert "no-existe" in response.json()["detail"]
+
+    @patch("app.api.routes.analyze_ticket")
+    def test_model_override_is_forwarded(self, mock_analyze):
+        mock_analyze.return_value = {"category": "ventas", "sentiment": "positivo"}
+
+        response = client.post("/analyze-text?model=default", json={"text": "Hola"})
+
+        assert response.status_code == 200
+        assert mock_analyze.call_args.kwargs["model"] == "default"
+
+    def test_debug_models_lists_endpoints(self):
+        response = client.get("/debug/models")
+
+        assert response.status_code == 200
+        endpoints = response.json()["endpoints"]
+        assert [endpoint["name"] for endpoint in endpoints] == ["default"]
+        assert endpoints[0]["latency_ewma"] is None
+
+
+class TestMetricsEndpoint:
+    """Tests para /metrics."""
+
+    @patch("app.api.routes.update_ticket")
+    @patch("app.api.routes.get_ticket_by_id")
+    @patch("app.services.ai_service.complete_chat")
+    def test_process_ticket_records_stages(self, mock_complete, mock_get_ticket, mock_update):
+        REGISTRY.reset()
+        mock_get_ticket.return_value = {"id": "t-1", "description": "Me cobraron dos veces", "processed": False}
+        mock_complete.return_value = '{"category": "facturación", "sentiment": "enojado"}'
+
+        assert client.post("/process-ticket?bypass_cache=true", json={"ticket_id": "t-1"}).status_code == 200
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        for stage in ("supabase_fetch", "llm_call", "parse", "supabase_update"):
+            assert f'ticket_stage_duration_seconds_count{{stage="{stage}"}} 1' in text
+        assert 'ticket_analyses_total{category="facturación",sentiment="neutro"} 1' in text
+        assert 'ticket_analyses_total{category="ventas",sentiment="positivo"} 0' in text
+        assert 'llm_parse_fallbacks_total{field="sentiment"} 1' in text
+        assert 'llm_parse_fallbacks_total{field="category"} 0' in text
+
+    def test_exposes_runtime_gauges(self):
+        text = client.get("/metrics").text
+
+        for name in ("analysis_cache_hits_total", "analysis_cache_hit_ratio", "llm_in_flight", "llm_circuit_open"):
+            assert f"\n{name} " in text
+        assert 'coalescing_in_flight{flight="process_ticket"} 0' in text
+        assert 'jobs{status="queued"}' in text
+
+
+class TestTracing:
+    """Tests para X-Request-ID y Server-Timing."""
+
+    @patch("app.api.routes.update_ticket")
+    @patch("app.api.routes.get_ticket_by_id")
+    @patch("app.services.ai_service.complete_chat")
+    def test_process_ticket_reports_stages(self, mock_complete, mock_get_ticket, mock_update):
+        mock_get_ticket.return_value = {"id": "t-1", "description": "Me cobraron dos veces", "processed": False}
+        mock_complete.return_value = '{"category": "facturación", "sentiment": "negativo"}'
+
+        response = client.post(
+            "/process-ticket?bypass_cache=true",
+            json={"ticket_id": "t-1"},
+            headers={"X-Request-ID": "pedido-42"}
+        )
+
+        assert response.headers["X-Request-ID"] == "pedido-42"
+        stages = [entry.split(";")[0] for entry in response.headers["Server-Timing"].split(", ")]
+        assert stages == ["supabase_fetch", "llm_call", "parse", "supabase_update", "total"]
+
+    def test_request_id_is_generated(self):
+        response = client.get("/health")
+
+        assert len(response.headers["X-Request-ID"]) == 32
+        assert response.headers["Server-Timing"].startswith("total;dur=")
+
+
+class TestDashboardStats:
+    """Tests para /stats y /trends."""
+
+    @patch("app.api.routes.fetch_stats")
+    def test_stats_supports_etag(self, mock_fetch):
+        mock_fetch.return_value = {
+            "total": 3, "processed": 2, "pending": 1, "negative": 1,
+            "by_category": {"ventas": 2}, "by_sentiment": {"negativo": 1, "positivo": 1},
+            "by_category_sentiment": {"ventas": {"negativo": 1, "positivo": 1}}
+        }
+
+        first = client.get("/stats")
+        second = client.get("/stats", headers={"If-None-Match": first.headers["ETag"]})
+
+        assert first.status_code == 200
+        assert first.json()["total"] == 3
+        assert second.status_code == 304
+        assert second.content == b""
+        assert mock_fetch.await_count == 1
+
+    @patch("app.api.routes.fetch_trends")
+    def test_trends_passes_aligned_range(self, mock_fetch):
+        mock_fetch.return_value = {"bucket": "hour", "tz": "UTC", "since": "", "until": "", "points": []}
+
+        response = client.get("/trends?bucket=hour&since=2024-05-01T10:15:00Z&until=2024-05-01T12:05:00Z")
+
+        assert response.status_code == 200
+        bucket, since, until, zone = mock_fetch.await_args.args
+        assert (bucket, since.hour, until.hour, zone.key) == ("hour", 10, 13, "UTC")
+
+    def test_trends_rejects_invalid_queries(self):
+        assert client.get("/trends?bucket=week").status_code == 422
+        assert client.get("/trends?tz=Marte/Olympus").status_code == 400
+        assert client.get("/trends?since=2024-05-02T00:00:00Z&until=2024-05-01T00:00:00Z").status_code == 400
+        assert client.get("/trends?bucket=hour&since=2020-01-01T00:00:00Z&until=2024-01-01T00:00:00Z").status_code == 400
+
+
+class TestListTickets:
+    """Tests para GET /tickets."""
+
+    @patch("app.api.routes.list_tickets")
+    def test_returns_page_and_cursor(self, mock_list):
+        mock_list.return_value = [
+            {"id": f"t-{index}", "created_at": f"2024-01-0{9 - index}T00:00:00+00:00"} for index in range(3)
+        ]
+
+        response = client.get("/tickets?limit=2&fields=category&processed=true")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [item["id"] for item in data["items"]] == ["t-0", "t-1"]
+        assert data["limit"] == 2
+        assert mock_list.await_args.args == (3,)
+        assert mock_list.await_args.kwargs["fields"] == ["category"]
+        assert mock_list.await_args.kwargs["processed"] is True
+
+        mock_list.return_value = []
+        client.get(f"/tickets?limit=2&cursor={data['next_cursor']}")
+        assert mock_list.await_args.kwargs["after"] == {"created_at": "2024-01-08T00:00:00+00:00", "id": "t-1"}
+
+    @patch("app.api.routes.list_tickets")
+    def test_last_page_has_no_cursor(self, mock_list):
+        mock_list.return_value = [{"id": "t-0", "created_at": "2024-01-01T00:00:00+00:00"}]
+
+        data = client.get("/tickets").json()
+
+        assert data["next_cursor"] is None
+        assert data["limit"] == 50
+
+    @patch("app.api.routes.list_tickets")
+    def test_page_size_is_capped(self, mock_list):
+        mock_list.return_value = []
+
+        assert client.get("/tickets?limit=100000").json()["limit"] == 500
+
+    def test_rejects_invalid_filters(self):
+        assert client.get("/tickets?category=mascotas").status_code == 400
+        assert client.get("/tickets?sentiment=eufórico").status_code == 400
+        assert client.get("/tickets?fields=description,prioridad").status_code == 400
+        assert client.get("/tickets?cursor=no-es-un-cursor").status_code == 400
+        assert client.get("/tickets?order=random").status_code == 422
+
+
+class TestExportTickets:
+    """Tests para GET /tickets/export."""
+
+    @patch("app.services.export_service.list_tickets")
+    def test_streams_csv_with_filters(self, mock_list):
+        mock_list.return_value = [{"id": "t-0", "created_at": "2024-01-01T00:00:00+00:00", "category": "ventas"}]
+
+        response = client.get("/tickets/export?format=csv&fields=category&category=ventas&order=asc")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert 'filename="tickets.csv"' in response.headers["content-disposition"]
+        assert response.text == "category\nventas\n"
+        assert mock_list.await_args.kwargs["category"] == "ventas"
+        assert mock_list.await_args.kwargs["descending"] is False
+
+    @patch("app.services.export_service.list_tickets")
+    def test_defaults_to_ndjson(self, mock_list):
+        mock_list.return_value = []
+
+        response = client.get("/tickets/export")
+
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert response.text == ""
+
+    def test_rejects_invalid_format_and_filters(self):
+        assert client.get("/tickets/export?format=parquet").status_code == 400
+        assert client.get("/tickets/export?fields=prioridad").status_code == 400
+        assert client.get("/tickets/export?sentiment=eufórico").status_code == 400
+
+
+class TestTicketEvents:
+    """Tests para GET /events y /ws/events."""
+
+    async def test_sse_stream_sends_new_events(self):
+        broker = get_event_broker()
+        stream = sse_stream(None)
+
+        assert await anext(stream) == b"retry: 3000\n\n"
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        event = broker.publish("ticket.created", {"id": "t1"})
+
+        assert await pending == event.sse
+        await stream.aclose()
+        assert broker.stats()["subscribers"] == 0
+
+    async def test_sse_stream_resumes_or_resyncs(self):
+        """Con un Last-Event-ID reciente se reenvía lo perdido; con uno desconocido, un resync."""
+        broker = get_event_broker()
+        first = broker.publish("ticket.created", {"id": "t1"})
+        second = broker.publish("ticket.processed", {"id": "t1"})
+
+        stream = sse_stream(first.id)
+        assert await anext(stream) == b"retry: 3000\n\n"
+        assert await anext(stream) == second.sse
+        await stream.aclose()
+
+        stream = sse_stream(1)
+        await anext(stream)
+        assert await anext(stream) == f"id: {second.id}\nevent: resync\ndata: {{}}\n\n".encode()
+        await stream.aclose()
+
+    async def test_sse_stream_ends_for_slow_clients(self):
+        broker = get_event_broker()
+        stream = sse_stream(None)
+        await anext(stream)
+
+        for index in range(broker.buffer_size + 1):
+            broker.publish("ticket.created", {"id": index})
+
+        with pytest.raises(StopAsyncIteration):
+            await anext(stream)
+        assert broker.dropped == 1
+
+    async def test_events_endpoint_streams_sse(self):
+        response = await events(last_event_id=None, last_event_id_header=None)
+
+        assert response.media_type == "text/event-stream"
+        assert response.headers["cache-control"] == "no-cache"
+        await response.body_iterator.aclose()
+
+    def test_events_rejects_invalid_last_event_id(self):
+        assert client.get("/events?last_event_id=abc").status_code == 400
+        assert client.get("/events", headers={"Last-Event-ID": "abc"}).status_code == 400
+
+    def test_websocket_replays_missed_events(self):
+        broker = get_event_broker()
+        first = broker.publish("ticket.created", {"id": "t1"})
+        broker.publish("ticket.processed", {"id": "t1", "category": "ventas"})
+
+        with client.websocket_connect(f"/ws/events?last_event_id={first.id - 1}") as websocket:
+            assert websocket.receive_json()["type"] == "ticket.created"
+            assert websocket.receive_json()["data"] == {"id": "t1", "category": "ventas"}
+
+        assert broker.stats()["subscribers"] == 0
+
+    def test_websocket_rejects_invalid_last_event_id(self):
+        with pytest.raises(WebSocketDisconnect) as error:
+            with client.websocket_connect("/ws/events?last_event_id=abc"):
+                pass
+        assert error.value.code == 1008
+
+    def test_debug_stats_include_events(self):
+        get_event_broker().publish("ticket.created", {"id": "t1"})
+
+        assert client.get("/debug/stats").json()["events"]["published"] == 1
+
+
+class TestSupabaseWebhook:
+    """Tests para POST /webhooks/supabase."""
+
+    SECRET = "secreto-de-prueba"
+
+    def post_webhook(self, payload: dict, secret: str = SECRET, url: str = "/webhooks/supabase"):
+        body = json.dumps(payload).encode()
+        timestamp = str(int(time.time()))
+        headers = {
+            "Content-Type": "application/json",
+            "X-Webhook-Timestamp": timestamp,
+            "X-Webhook-Signature": sign_payload(secret, timestamp, body)
+        }
+        with patch.object(get_settings(), "webhook_secret", self.SECRET):
+            return client.post(url, content=body, headers=headers)
+
+    @staticmethod
+    def insert(record: dict) -> dict:
+        return {"type": "INSERT", "table": "tickets", "schema": "public", "record": record, "old_record": None}
+
+    @patch("app.api.routes.dispatch_negative_alert")
+    @patch("app.api.routes.update_ticket")
+    @patch("app.api.routes.analyze_ticket")
+    @patch("app.api.routes.get_ticket_by_id")
+    def test_classifies_record_without_refetch(self, mock_get_ticket, mock_analyze, mock_update, mock_alert):
+        """La fila del payload se clasifica directamente y un negativo encola la alerta."""
+        mock_analyze.return_value = {"category": "quejas", "sentiment": "negativo"}
+
+        response = self.post_webhook(self.insert({"id": "t1", "description": "Pésimo servicio", "processed": False}))
+
+        assert response.status_code == 200
+        assert response.json()["category"] == "quejas"
+        mock_get_ticket.assert_not_called()
+        mock_analyze.assert_awaited_once_with("Pésimo servicio")
+        mock_update.assert_awaited_once_with(ticket_id="t1", category="quejas", sentiment="negativo")
+        assert mock_alert.await_args.args[0]["id"] == "t1"
+
+    @patch("app.api.routes.dispatch_negative_alert")
+    @patch("app.api.routes.update_ticket")
+    @patch("app.api.routes.analyze_ticket")
+    def test_non_negative_ticket_sends_no_alert(self, mock_analyze, mock_update, mock_alert):
+        mock_analyze.return_value = {"category": "ventas", "sentiment": "positivo"}
+
+        response = self.post_webhook(self.insert({"id": "t2", "description": "Quiero comprar"}))
+
+        assert response.status_code == 200
+        mock_alert.assert_not_called()
+
+    @patch("app.api.routes.analyze_ticket")
+    def test_ignores_other_events(self, mock_analyze):
+        """UPDATE, otras tablas y tickets ya procesados no se clasifican."""
+        update = {**self.insert({"id": "t1", "description": "x"}), "type": "UPDATE"}
+        other_table = {**self.insert({"id": "t1", "description": "x"}), "table": "users"}
+        processed = self.insert({"id": "t1", "description": "x", "processed": True})
+
+        for payload in (update, other_table, processed):
+            response = self.post_webhook(payload)
+            assert response.status_code == 200
+            assert response.json()["ignored"] is True
+        mock_analyze.assert_not_called()
+
+    def test_rejects_invalid_signature(self):
+        response = self.post_webhook(self.insert({"id": "t1", "description": "x"}), secret="otro")
+
+        assert response.status_code == 401
+
+    def test_rejects_unsigned_request(self):
+        with patch.object(get_settings(), "webhook_secret", self.SECRET):
+            response = client.post("/webhooks/supabase", json=self.insert({"id": "t1", "description": "x"}))
+
+        assert response.status_code == 401
+
+    def test_rejects_body_that_is_not_a_webhook(self):
+        assert self.post_webhook({"hola": "mundo"}).status_code == 400
+
+    def test_disabled_without_secret(self):
+        response = client.post("/webhooks/supabase", json=self.insert({"id": "t1", "description": "x"}))
+
+        assert response.status_code == 503
+
+    def test_async_enqueues_record(self):
+        response = self.post_webhook(
+            self.insert({"id": "t-async", "description": "Sin acceso"}),
+            url="/webhooks/supabase?async=true"
+        )
+
+        assert response.status_code == 202
+        assert client.get(response.json()["status_url"]).json()["kind"] == "webhook_ticket"
+
+    @patch("app.api.routes.dispatch_negative_alert")
+    @patch("app.api.routes.update_ticket")
+    @patch("app.api.routes.analyze_ticket")
+    @patch("app.api.routes.get_ticket_by_id")
+    async def test_webhook_job_uses_queued_description(self, mock_get_ticket, mock_analyze, mock_update, mock_alert):
+        """El trabajo encolado clasifica la descripción guardada sin volver a leer el ticket."""
+        from app.api.routes import webhook_ticket_job
+        mock_analyze.return_value = {"category": "soporte técnico", "sentiment": "neutro"}
+
+        result = await webhook_ticket_job({"ticket_id": "t-async", "description": "Sin acceso"})
+
+        assert result["category"] == "soporte técnico"
+        mock_get_ticket.assert_not_called()
+        mock_analyze.assert_awaited_once_with("Sin acceso")
+
+
+class TestCreateTicketIdempotency:
+    """Tests para /create-ticket con Idempotency-Key."""
+
+    @patch("app.api.routes.create_ticket")
+    @patch("app.api.routes.analyze_ticket")
+    def test_retry_returns_original_response(self, mock_analyze, mock_create):
+        """Un reintento con la misma clave no vuelve a llamar al LLM ni a Supabase."""
+        mock_analyze.return_value = {"category": "facturación", "sentiment": "negativo"}
+        mock_create.return_value = {"id": "t1", "description": "Me cobraron doble"}
+        headers = {"Idempotency-Key": "7c2f-reintento"}
+        body = {"description": "Me cobraron doble"}
+
+        first = client.post("/create-ticket", json=body, headers=headers)
+        retry = client.post("/create-ticket", json=body, headers=headers)
+
+        assert first.status_code == retry.status_code == 201
+        assert retry.json() == first.json()
+        assert first.headers["Idempotent-Replayed"] == "false"
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert mock_analyze.await_count == 1
+        assert mock_create.await_count == 1
+
+    @patch("app.api.routes.create_ticket")
+    @patch("app.api.routes.analyze_ticket")
+    def test_key_reused_with_other_body_is_rejected(self, mock_analyze, mock_create):
+        mock_analyze.return_value = {"category": "ventas", "sentiment": "positivo"}
+        mock_create.return_value = {"id": "t1", "description": "Quiero comprar"}
+        headers = {"Idempotency-Key": "clave-1"}
+
+        client.post("/create-ticket", json={"description": "Quiero comprar"}, headers=headers)
+        response = client.post("/create-ticket", json={"description": "Otra cosa"}, headers=headers)
+
+        assert response.status_code == 422
+
+    @patch("app.api.routes.create_ticket")
+    @patch("app.api.routes.analyze_ticket")
+    def test_without_key_every_request_creates(self, mock_analyze, mock_create):
+        mock_analyze.return_value = {"category": "ventas", "sentiment": "positivo"}
+        mock_create.return_value = {"id": "t1", "description": "Quiero comprar"}
+
+        client.post("/create-ticket", json={"description": "Quiero comprar"})
+        response = client.post("/create-ticket", json={"description": "Quiero comprar"})
+
+        assert response.status_code == 201
+        assert "Idempotent-Replayed" not in response.headers
+        assert mock_create.await_count == 2
+
+    def test_rejects_invalid_key(self):
+        response = client.post("/create-ticket", json={"description": "x"}, headers={"Idempotency-Key": "a" * 300})
+
+        assert response.status_code == 400
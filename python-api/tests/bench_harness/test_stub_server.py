@@ -0,0 +1,66 @@
+import asyncio
+import json
+import httpx
+from app.services.ai_service import build_analysis_prompt, build_batch_prompt, parse_llm_response, parse_batch_response
+from app.services.stream_parser import AnalysisStreamParser, sse_delta
+from benchmarks.stub_server import StubServer, STUB_ANALYSIS
+
+LABELS = {
+    "me cobraron doble": {"category": "facturación", "sentiment": "negativo"},
+    "quiero comprar": {"category": "ventas", "sentiment": "positivo"}
+}
+
+
+class TestStubServerOracle:
+    """El stub debe reconocer los tickets en los prompts reales del servicio."""
+
+    def test_answers_single_prompt_with_reference_label(self):
+        server = StubServer(labels=LABELS)
+
+        content = server.answer(build_analysis_prompt("Me cobraron DOBLE"))
+
+        assert parse_llm_response(content) == LABELS["me cobraron doble"]
+
+    def test_answers_batch_prompt_by_index(self):
+        server = StubServer(labels=LABELS)
+
+        content = server.answer(build_batch_prompt(["Quiero comprar", "Me cobraron doble", "otro"]))
+
+        assert parse_batch_response(content, 3) == [
+            LABELS["quiero comprar"], LABELS["me cobraron doble"], STUB_ANALYSIS
+        ]
+
+    def test_error_rate_returns_503_and_counts_tokens(self):
+        failing = StubServer(error_rate=1.0, seed=1)
+        status, _ = failing.respond(b"{}")
+        assert status.startswith(b"503")
+        assert failing.stats.errors == 1
+
+        server = StubServer(labels=LABELS)
+        body = json.dumps({"messages": [{"role": "user", "content": build_analysis_prompt("Quiero comprar")}]})
+        status, _ = server.respond(body.encode())
+        assert status == b"200 OK"
+        assert server.stats.prompt_tokens > 0
+
+
+class TestStubServerStreaming:
+    """El stub debe dejar de generar cuando el cliente corta el stream."""
+
+    async def test_early_close_stops_generation(self):
+        with StubServer(labels=LABELS, token_delay=0.005, trailing=" relleno" * 40) as server:
+            body = {
+                "stream": True,
+                "messages": [{"role": "user", "content": build_analysis_prompt("Quiero comprar")}]
+            }
+            parser = AnalysisStreamParser()
+            async with httpx.AsyncClient() as client:
+                async with client.stream("POST", server.url, json=body) as response:
+                    async for line in response.aiter_lines():
+                        delta = sse_delta(line)
+                        if delta and parser.feed(delta):
+                            break
+            await asyncio.sleep(0.05)
+
+            assert parse_llm_response(parser.match) == LABELS["quiero comprar"]
+            full_tokens = len(json.dumps(LABELS["quiero comprar"], ensure_ascii=False) + " relleno" * 40) // 4
+            assert server.stats.completion_tokens < full_tokens / 2
@@ -1,7 +1,64 @@
+import os
 import pytest
 from unittest.mock import patch, MagicMock
 from fastapi.testclient import TestClient
-from app.main import app
+
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ.setdefault("HUGGINGFACE_API_TOKEN", "test-token")
+os.environ.setdefault("JOB_QUEUE_PATH", ":memory:")
+os.environ.setdefault("LLM_RETRY_BASE_DELAY", "0.01")
+
+from app.main import app  # noqa: E402
+from app.core.database import set_supabase_client  # noqa: E402
+from app.core.model_router import reset_model_router  # noqa: E402
+from app.core.resilience import reset_llm_caller  # noqa: E402
+from app.services.cache_service import get_analysis_cache  # noqa: E402
+from app.services.idempotency import get_idempotency_store  # noqa: E402
+from app.services.stats_service import invalidate_stats  # noqa: E402
+from app.services.ticket_events import reset_event_broker  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def clear_analysis_cache():
+    """Evita que un análisis cacheado en un test afecte a otro."""
+    get_analysis_cache().clear()
+    yield
+    get_analysis_cache().clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_stats_cache():
+    """Evita que /stats o /trends respondan con datos cacheados por otro test."""
+    invalidate_stats()
+    yield
+    invalidate_stats()
+
+
+@pytest.fixture(autouse=True)
+def clear_idempotency_store():
+    """Una Idempotency-Key usada en un test no debe responder en otro."""
+    get_idempotency_store().clear()
+    yield
+    get_idempotency_store().clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_event_broker():
+    """Cada test arranca sin suscriptores ni historial de eventos."""
+    reset_event_broker()
+    yield
+    reset_event_broker()
+
+
+@pytest.fixture(autouse=True)
+def reset_llm_resilience():
+    """Cada test arranca con el circuito cerrado y sin latencias observadas."""
+    reset_llm_caller()
+    reset_model_router()
+    yield
+    reset_llm_caller()
+    reset_model_router()
 
 
 @pytest.fixture
@@ -24,11 +81,11 @@ def mock_settings():
 
 @pytest.fixture
 def mock_supabase():
-    """Mock del cliente de Supabase."""
-    with patch("app.services.ticket_service.get_supabase_client") as mock:
-        client = MagicMock()
-        mock.return_value = client
-        yield client
+    """Mock del cliente de Supabase inyectado como cliente compartido."""
+    client = MagicMock()
+    set_supabase_client(client)
+    yield client
+    set_supabase_client(None)
 
 
 @pytest.fixture
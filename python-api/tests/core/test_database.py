@@ -0,0 +1,79 @@
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+from app.core import database
+from app.core.database import (
+    get_supabase_client,
+    set_supabase_client,
+    close_supabase_client
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_client():
+    """Garantiza que cada test parte sin cliente compartido."""
+    set_supabase_client(None)
+    yield
+    set_supabase_client(None)
+
+
+class TestGetSupabaseClient:
+    """Tests para el cliente de Supabase compartido."""
+
+    @patch.object(database.PooledSupabaseClient, "create", new_callable=AsyncMock)
+    async def test_client_is_created_once(self, mock_create):
+        """Debe crear el cliente una sola vez y reutilizarlo."""
+        mock_create.return_value = MagicMock()
+
+        first = await get_supabase_client()
+        second = await get_supabase_client()
+
+        assert first is second
+        mock_create.assert_awaited_once()
+
+    @patch.object(database.PooledSupabaseClient, "create", new_callable=AsyncMock)
+    async def test_override_skips_creation(self, mock_create):
+        """Un cliente inyectado debe usarse sin construir uno nuevo."""
+        fake = MagicMock()
+        set_supabase_client(fake)
+
+        assert await get_supabase_client() is fake
+        mock_create.assert_not_awaited()
+
+
+class TestCloseSupabaseClient:
+    """Tests para el cierre del cliente compartido."""
+
+    async def test_close_releases_connections(self):
+        """Debe cerrar PostgREST y auth, y descartar el cliente."""
+        fake = MagicMock()
+        fake._postgrest.aclose = AsyncMock()
+        fake.auth.close = AsyncMock()
+        set_supabase_client(fake)
+
+        await close_supabase_client()
+
+        fake._postgrest.aclose.assert_awaited_once()
+        fake.auth.close.assert_awaited_once()
+        assert database._client is None
+
+    async def test_close_without_client_is_noop(self):
+        """Cerrar sin cliente creado no debe fallar."""
+        await close_supabase_client()
+
+
+class TestPooledPostgrestClient:
+    """Tests para la sesión HTTP de PostgREST."""
+
+    async def test_session_uses_configured_limits(self):
+        """La sesión debe respetar el tamaño de pool configurado."""
+        with patch("app.core.database.get_settings") as mock_settings:
+            mock_settings.return_value = MagicMock(
+                supabase_max_connections=7,
+                supabase_max_keepalive_connections=3
+            )
+            client = database.PooledPostgrestClient("https://test.supabase.co/rest/v1")
+
+        pool = client.session._transport._pool
+        assert pool._max_connections == 7
+        assert pool._max_keepalive_connections == 3
+        await client.aclose()
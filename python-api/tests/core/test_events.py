@@ -0,0 +1,97 @@
+import asyncio
+import json
+import pytest
+from app.core.events import RESYNC, EventBroker
+
+
+class TestEventBroker:
+    """Tests para el reparto de eventos a suscriptores con buffer acotado."""
+
+    async def test_publish_fans_out_to_every_subscriber(self):
+        """Cada suscriptor debe recibir el mismo evento, serializado una sola vez."""
+        broker = EventBroker(history_size=10, buffer_size=10, first_id=0)
+        first, second = broker.subscribe(), broker.subscribe()
+
+        event = broker.publish("ticket.created", {"id": "t1"})
+
+        assert await first.get() is event
+        assert await second.get() is event
+        assert event.sse == b'id: 1\nevent: ticket.created\ndata: {"id":"t1"}\n\n'
+        assert json.loads(event.message) == {"id": 1, "type": "ticket.created", "data": {"id": "t1"}}
+
+    async def test_slow_subscriber_is_dropped(self):
+        """Un suscriptor con el buffer lleno se desconecta sin afectar a los demás."""
+        broker = EventBroker(history_size=10, buffer_size=2, first_id=0)
+        slow, fast = broker.subscribe(), broker.subscribe()
+
+        broker.publish("ticket.created", {"id": "t1"})
+        broker.publish("ticket.created", {"id": "t2"})
+        assert (await fast.get()).id == 1
+        assert (await fast.get()).id == 2
+        broker.publish("ticket.created", {"id": "t3"})
+
+        assert await slow.get() is None
+        assert (await fast.get()).id == 3
+        assert broker.stats()["subscribers"] == 1
+        assert broker.dropped == 1
+
+    async def test_resume_replays_missed_events(self):
+        """Con el último ID recibido se reenvían solo los eventos posteriores."""
+        broker = EventBroker(history_size=10, buffer_size=10, first_id=0)
+        for n in range(5):
+            broker.publish("ticket.created", {"n": n})
+
+        subscription = broker.subscribe(last_event_id=3)
+
+        assert not subscription.gap
+        assert [event.id for event in subscription.queue] == [4, 5]
+
+    async def test_resume_from_latest_id_replays_nothing(self):
+        broker = EventBroker(history_size=10, buffer_size=10, first_id=0)
+        broker.publish("ticket.created", {})
+
+        subscription = broker.subscribe(last_event_id=1)
+
+        assert not subscription.gap
+        assert not subscription.queue
+
+    @pytest.mark.parametrize("last_event_id", [1, 999])
+    async def test_resume_outside_history_marks_gap(self, last_event_id):
+        """Un ID ya descartado del historial, o de otro arranque, obliga a resincronizar."""
+        broker = EventBroker(history_size=2, buffer_size=10, first_id=0)
+        for n in range(5):
+            broker.publish("ticket.created", {"n": n})
+
+        subscription = broker.subscribe(last_event_id=last_event_id)
+
+        assert subscription.gap
+        assert not subscription.queue
+        resync = broker.resync_event()
+        assert (resync.id, resync.type) == (5, RESYNC)
+
+    def test_ids_start_above_previous_runs(self):
+        """Sin first_id, los IDs parten del reloj y superan a los de un broker anterior."""
+        previous = EventBroker(history_size=10, buffer_size=10)
+        previous.publish("ticket.created", {})
+
+        assert EventBroker(history_size=10, buffer_size=10).last_id >= previous.last_id
+
+    async def test_get_times_out_without_events(self):
+        broker = EventBroker(history_size=10, buffer_size=10)
+        subscription = broker.subscribe()
+
+        with pytest.raises(asyncio.TimeoutError):
+            await subscription.get(timeout=0.01)
+
+    async def test_close_wakes_waiting_subscribers(self):
+        """Cerrar el broker debe terminar a los suscriptores que esperan."""
+        broker = EventBroker(history_size=10, buffer_size=10)
+        subscription = broker.subscribe()
+        waiter = asyncio.create_task(subscription.get())
+        await asyncio.sleep(0)
+
+        broker.close()
+
+        assert await waiter is None
+        assert broker.stats()["subscribers"] == 0
+        assert broker.dropped == 0
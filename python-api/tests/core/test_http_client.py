@@ -0,0 +1,79 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from app.core import http_client
+from app.core.http_client import (
+    build_http_client,
+    get_http_client,
+    close_http_client
+)
+
+
+@pytest.fixture(autouse=True)
+async def reset_client():
+    """Garantiza que cada test parte sin cliente compartido."""
+    await close_http_client()
+    yield
+    await close_http_client()
+
+
+class TestGetHttpClient:
+    """Tests para el cliente HTTP compartido."""
+
+    def test_returns_same_instance(self):
+        """Debe reutilizar el mismo cliente entre llamadas."""
+        assert get_http_client() is get_http_client()
+
+    async def test_close_releases_client(self):
+        """Al cerrar, la siguiente llamada debe crear un cliente nuevo."""
+        first = get_http_client()
+        await close_http_client()
+
+        assert first.is_closed
+        assert get_http_client() is not first
+
+    async def test_recreates_client_if_closed_externally(self):
+        """Debe reconstruir el cliente si fue cerrado fuera del módulo."""
+        first = get_http_client()
+        await first.aclose()
+
+        assert get_http_client() is not first
+
+
+class TestBuildHttpClient:
+    """Tests para la construcción del cliente HTTP."""
+
+    @patch("app.core.http_client.get_settings")
+    async def test_uses_split_timeouts(self, mock_settings):
+        """Debe separar el timeout de conexión del de lectura."""
+        mock_settings.return_value = MagicMock(
+            hf_max_connections=10,
+            hf_max_keepalive_connections=5,
+            hf_keepalive_expiry=15.0,
+            hf_connect_timeout=2.0,
+            hf_read_timeout=60.0,
+            hf_http2=False
+        )
+
+        client = build_http_client()
+
+        assert client.timeout.connect == 2.0
+        assert client.timeout.read == 60.0
+        await client.aclose()
+
+    @patch("app.core.http_client.http2_available", return_value=False)
+    @patch("app.core.http_client.get_settings")
+    def test_http2_disabled_without_h2(self, mock_settings, _mock_h2):
+        """No debe habilitar HTTP/2 si el paquete h2 no está disponible."""
+        mock_settings.return_value = MagicMock(
+            hf_max_connections=10,
+            hf_max_keepalive_connections=5,
+            hf_keepalive_expiry=15.0,
+            hf_connect_timeout=2.0,
+            hf_read_timeout=60.0,
+            hf_http2=True
+        )
+
+        with patch.object(http_client.httpx, "AsyncClient") as mock_client_class:
+            build_http_client()
+
+        assert mock_client_class.call_args.kwargs["http2"] is False
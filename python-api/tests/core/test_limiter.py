@@ -0,0 +1,225 @@
+import asyncio
+import httpx
+import pytest
+from unittest.mock import patch, MagicMock
+from app.core.limiter import (
+    AdaptiveLimiter,
+    TokenBucket,
+    LLMLimiter,
+    LLMOverloadedError,
+    get_llm_limiter,
+    reset_llm_limiter
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestAdaptiveLimiter:
+    """Tests para el límite de concurrencia AIMD."""
+
+    async def test_slow_start_doubles_limit_per_window(self):
+        """Antes de la primera sobrecarga, cada respuesta sana debe sumar 1."""
+        limiter = AdaptiveLimiter(initial_limit=4, min_limit=1, max_limit=10)
+
+        for _ in range(4):
+            await limiter.acquire()
+            limiter.observe(0.1, overloaded=False)
+
+        assert limiter.limit == 8
+
+    async def test_success_increases_limit_additively_after_overload(self):
+        """Tras una sobrecarga, una ventana completa de respuestas sanas debe subir el límite en ~1."""
+        limiter = AdaptiveLimiter(initial_limit=8, min_limit=1, max_limit=10)
+        await limiter.acquire()
+        limiter.observe(0.1, overloaded=True)
+
+        for _ in range(4):
+            await limiter.acquire()
+            limiter.observe(0.1, overloaded=False)
+
+        assert 4.9 < limiter.limit < 5.1
+
+    async def test_overload_halves_limit_once_per_cooldown(self):
+        """Una ráfaga de 429 simultáneos debe reducir el límite una sola vez."""
+        clock = FakeClock()
+        limiter = AdaptiveLimiter(initial_limit=8, min_limit=1, max_limit=10, cooldown=1.0, clock=clock)
+
+        for _ in range(3):
+            await limiter.acquire()
+        for _ in range(3):
+            limiter.observe(0.1, overloaded=True)
+
+        assert limiter.limit == 4
+        assert limiter.overloads == 3
+
+        clock.now = 2.0
+        await limiter.acquire()
+        limiter.observe(0.1, overloaded=True)
+        assert limiter.limit == 2
+
+    async def test_slow_responses_reduce_limit(self):
+        """Superar la latencia objetivo debe contar como señal de sobrecarga."""
+        limiter = AdaptiveLimiter(initial_limit=8, min_limit=1, max_limit=10, latency_target=1.0)
+
+        await limiter.acquire()
+        limiter.observe(5.0, overloaded=False)
+
+        assert limiter.limit == 4
+        assert limiter.overloads == 0
+
+    async def test_limit_stays_within_bounds(self):
+        limiter = AdaptiveLimiter(initial_limit=50, min_limit=2, max_limit=3)
+        assert limiter.limit == 3
+
+        for _ in range(5):
+            await limiter.acquire()
+            limiter.observe(0.1, overloaded=True)
+            limiter._last_decrease = float("-inf")
+
+        assert limiter.limit == 2
+
+    async def test_waiters_are_served_in_order(self):
+        """Con el límite lleno, las peticiones deben esperar y salir en orden FIFO."""
+        limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1)
+        await limiter.acquire()
+        order = []
+
+        async def waiter(name):
+            await limiter.acquire()
+            order.append(name)
+
+        tasks = [asyncio.create_task(waiter(name)) for name in ("a", "b")]
+        await asyncio.sleep(0)
+        assert limiter.queue_depth == 2
+
+        limiter.release()
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(*tasks)
+
+        assert order == ["a", "b"]
+        assert limiter.in_flight == 1
+
+    async def test_rejects_immediately_when_estimated_wait_exceeds_deadline(self):
+        """Debe fallar rápido si la espera estimada supera el plazo."""
+        limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1)
+        await limiter.acquire()
+        limiter.avg_latency = 10.0
+
+        with pytest.raises(LLMOverloadedError) as error:
+            await limiter.acquire(deadline=5.0)
+
+        assert error.value.retry_after == 10.0
+        assert limiter.rejected == 1
+        assert limiter.queue_depth == 0
+
+    async def test_rejects_when_deadline_expires_in_queue(self):
+        limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1)
+        await limiter.acquire()
+
+        with pytest.raises(LLMOverloadedError):
+            await limiter.acquire(deadline=0.01)
+
+        assert limiter.queue_depth == 0
+        assert limiter.in_flight == 1
+
+
+class TestTokenBucket:
+    """Tests para el límite de tasa por modelo."""
+
+    def test_burst_then_wait(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2.0, burst=2, clock=clock)
+
+        assert bucket.reserve() == 0.0
+        assert bucket.reserve() == 0.0
+        assert bucket.reserve() == 0.5
+
+        clock.now = 1.5
+        assert bucket.reserve() == 0.0
+
+
+class TestLLMLimiter:
+    """Tests para el limitador combinado que usa complete_chat."""
+
+    async def test_error_status_counts_as_overload(self):
+        limiter = LLMLimiter(AdaptiveLimiter(initial_limit=4, min_limit=1, max_limit=4), deadline=None)
+
+        async with limiter.slot("modelo") as slot:
+            slot.status_code = 503
+
+        assert limiter.concurrency.overloads == 1
+        assert limiter.concurrency.limit == 2
+        assert limiter.concurrency.in_flight == 0
+
+    async def test_transport_error_counts_as_overload(self):
+        limiter = LLMLimiter(AdaptiveLimiter(initial_limit=4, min_limit=1, max_limit=4), deadline=None)
+
+        with pytest.raises(httpx.ReadTimeout):
+            async with limiter.slot("modelo"):
+                raise httpx.ReadTimeout("timeout")
+
+        assert limiter.concurrency.overloads == 1
+        assert limiter.concurrency.in_flight == 0
+
+    async def test_rate_limit_rejects_beyond_deadline(self):
+        """Si el token tardaría más que el plazo, debe rechazar sin esperar."""
+        limiter = LLMLimiter(
+            AdaptiveLimiter(initial_limit=4, min_limit=1, max_limit=4),
+            deadline=1.0,
+            rate=0.5,
+            burst=1
+        )
+
+        async with limiter.slot("modelo") as slot:
+            slot.status_code = 200
+        with pytest.raises(LLMOverloadedError):
+            async with limiter.slot("modelo"):
+                pass
+
+        assert limiter.concurrency.rejected == 1
+
+    async def test_concurrency_rejection_refunds_rate_token(self):
+        """Un rechazo por concurrencia no debe consumir el token de tasa del modelo."""
+        limiter = LLMLimiter(
+            AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1),
+            deadline=1.0,
+            rate=1.0,
+            burst=5
+        )
+        await limiter.concurrency.acquire()
+        limiter.concurrency.avg_latency = 10.0
+        limiter.buckets["modelo"] = TokenBucket(rate=1.0, burst=5, clock=FakeClock())
+
+        with pytest.raises(LLMOverloadedError):
+            async with limiter.slot("modelo"):
+                pass
+
+        assert limiter.buckets["modelo"].tokens == 5.0
+        assert limiter.concurrency.rejected == 1
+
+    @patch("app.core.limiter.get_settings")
+    def test_max_limit_matches_http_pool(self, mock_settings):
+        """El límite nunca debe superar el tamaño del pool HTTP."""
+        mock_settings.return_value = MagicMock(
+            llm_initial_concurrency=50,
+            llm_min_concurrency=1,
+            hf_max_connections=8,
+            llm_latency_target=None,
+            llm_queue_deadline=30.0,
+            llm_rate_limit=None,
+            llm_rate_burst=10
+        )
+        reset_llm_limiter()
+        try:
+            limiter = get_llm_limiter()
+            assert limiter.concurrency.max_limit == 8
+            assert limiter.concurrency.limit == 8
+        finally:
+            reset_llm_limiter()
@@ -0,0 +1,97 @@
+import pytest
+from app.core.metrics import Registry
+
+
+def sample_lines(registry: Registry) -> dict[str, str]:
+    lines = registry.render().splitlines()
+    return dict(line.rsplit(" ", 1) for line in lines if not line.startswith("#"))
+
+
+class TestCounter:
+    """Tests para los contadores."""
+
+    def test_unlabeled_counter_exports_zero(self):
+        registry = Registry()
+        registry.counter("requests_total", "Peticiones")
+
+        text = registry.render()
+
+        assert "# HELP requests_total Peticiones" in text
+        assert "# TYPE requests_total counter" in text
+        assert sample_lines(registry)["requests_total"] == "0"
+
+    def test_labeled_counter(self):
+        registry = Registry()
+        counter = registry.counter("analyses_total", "Análisis", ("category", "sentiment"))
+
+        counter.labels("ventas", "positivo").inc()
+        counter.labels("ventas", "positivo").inc(2)
+
+        assert sample_lines(registry)['analyses_total{category="ventas",sentiment="positivo"}'] == "3"
+
+    def test_wrong_label_count_raises(self):
+        counter = Registry().counter("analyses_total", "Análisis", ("category",))
+
+        with pytest.raises(ValueError):
+            counter.labels("ventas", "positivo")
+
+    def test_label_values_are_escaped(self):
+        registry = Registry()
+        registry.counter("errors_total", "Errores", ("reason",)).labels('dice "no"\n').inc()
+
+        assert 'errors_total{reason="dice \\"no\\"\\n"} 1' in registry.render()
+
+    def test_duplicate_name_raises(self):
+        registry = Registry()
+        registry.counter("requests_total", "Peticiones")
+
+        with pytest.raises(ValueError):
+            registry.counter("requests_total", "Otra vez")
+
+
+class TestHistogram:
+    def test_buckets_are_cumulative(self):
+        registry = Registry()
+        histogram = registry.histogram("stage_seconds", "Etapas", ("stage",), buckets=(0.1, 1.0))
+        child = histogram.labels("llm_call")
+
+        for value in (0.05, 0.1, 0.5, 3.0):
+            child.observe(value)
+
+        samples = sample_lines(registry)
+        assert samples['stage_seconds_bucket{stage="llm_call",le="0.1"}'] == "2"
+        assert samples['stage_seconds_bucket{stage="llm_call",le="1"}'] == "3"
+        assert samples['stage_seconds_bucket{stage="llm_call",le="+Inf"}'] == "4"
+        assert samples['stage_seconds_count{stage="llm_call"}'] == "4"
+        assert float(samples['stage_seconds_sum{stage="llm_call"}']) == pytest.approx(3.65)
+
+    def test_reset_keeps_resolved_children(self):
+        registry = Registry()
+        child = registry.histogram("stage_seconds", "Etapas", ("stage",)).labels("parse")
+        child.observe(0.001)
+
+        registry.reset()
+        child.observe(0.002)
+
+        assert child.count == 1
+        assert sample_lines(registry)['stage_seconds_count{stage="parse"}'] == "1"
+
+
+class TestCallbackMetric:
+    def test_reads_value_at_render(self):
+        registry = Registry()
+        state = {"in_flight": 1}
+        registry.callback("in_flight", "En vuelo", lambda: state["in_flight"])
+
+        state["in_flight"] = 4
+
+        assert "# TYPE in_flight gauge" in registry.render()
+        assert sample_lines(registry)["in_flight"] == "4"
+
+    def test_labeled_callback_skips_missing_values(self):
+        registry = Registry()
+        registry.callback("jobs", "Trabajos", lambda: {("queued",): 2, ("done",): None}, ("status",))
+
+        samples = sample_lines(registry)
+        assert samples['jobs{status="queued"}'] == "2"
+        assert 'jobs{status="done"}' not in samples
@@ -0,0 +1,112 @@
+import random
+import pytest
+from unittest.mock import patch, MagicMock
+from app.core.config import LLMEndpoint
+from app.core.model_router import ModelRouter, get_model_router, reset_model_router, DEFAULT_ENDPOINT
+
+
+def build_router(**overrides) -> ModelRouter:
+    options = {
+        "endpoints": [
+            LLMEndpoint(name="grande", model="org/grande:fastest"),
+            LLMEndpoint(name="alterno", model="org/grande:together"),
+            LLMEndpoint(name="chico", model="org/chico:fastest", fallback=True)
+        ],
+        "alpha": 0.5,
+        "rng": random.Random(0)
+    }
+    options.update(overrides)
+    return ModelRouter(**options)
+
+
+class TestModelRouter:
+    """Tests para la selección de endpoints por latencia y errores."""
+
+    def test_unobserved_endpoint_is_tried_first(self):
+        router = build_router()
+        router.observe("grande", 1.0, ok=True)
+
+        assert router.choose().name == "alterno"
+
+    def test_picks_lowest_latency(self):
+        router = build_router()
+        router.observe("grande", 2.0, ok=True)
+        router.observe("alterno", 0.5, ok=True)
+
+        assert router.choose().name == "alterno"
+
+    def test_errors_penalize_endpoint(self):
+        """Un endpoint rápido pero que falla debe perder frente a uno sano."""
+        router = build_router()
+        router.observe("grande", 1.0, ok=True)
+        router.observe("alterno", 0.5, ok=True)
+        router.observe("alterno", 0.5, ok=False)
+
+        assert router.choose().name == "grande"
+
+    def test_endpoint_that_only_fails_is_avoided(self):
+        """Un endpoint que nunca respondió bien no puede quedar con el mejor puntaje."""
+        router = build_router(endpoints=[LLMEndpoint(name="a", model="a"), LLMEndpoint(name="b", model="b")])
+        router.observe("b", 1.5, ok=True)
+        for _ in range(5):
+            router.observe("a", 0.0, ok=False)
+
+        assert router.choose().name == "b"
+
+    def test_weight_and_cost_scale_score(self):
+        router = build_router(endpoints=[
+            LLMEndpoint(name="caro", model="a", cost=4.0),
+            LLMEndpoint(name="barato", model="b")
+        ])
+        router.observe("caro", 1.0, ok=True)
+        router.observe("barato", 2.0, ok=True)
+
+        assert router.choose().name == "barato"
+
+    def test_fallback_when_primary_is_slow(self):
+        router = build_router(fallback_latency=1.0)
+        router.observe("grande", 3.0, ok=True)
+        router.observe("alterno", 2.0, ok=True)
+
+        assert router.choose().name == "chico"
+
+    def test_fallback_not_used_when_primary_is_fast(self):
+        router = build_router(fallback_latency=1.0)
+        router.observe("grande", 0.5, ok=True)
+        router.observe("alterno", 0.8, ok=True)
+
+        assert router.choose().name == "grande"
+
+    def test_override_bypasses_selection(self):
+        router = build_router()
+
+        assert router.choose("chico").name == "chico"
+        with pytest.raises(KeyError):
+            router.choose("no-existe")
+
+    def test_latency_is_ewma(self):
+        router = build_router()
+        router.observe("grande", 1.0, ok=True)
+        router.observe("grande", 3.0, ok=True)
+
+        stats = {entry["name"]: entry for entry in router.stats()}
+        assert stats["grande"]["latency_ewma"] == 2.0
+        assert stats["grande"]["requests"] == 2
+
+    def test_requires_endpoints(self):
+        with pytest.raises(ValueError):
+            ModelRouter([])
+
+
+class TestGetModelRouter:
+    @patch("app.core.model_router.get_settings")
+    def test_default_endpoint_without_configuration(self, mock_settings):
+        mock_settings.return_value = MagicMock(
+            llm_endpoints=[], llm_router_alpha=0.2, llm_router_exploration=0.0, llm_fallback_latency=None
+        )
+        reset_model_router()
+
+        router = get_model_router()
+
+        assert router.choose().name == DEFAULT_ENDPOINT
+        assert router.get(DEFAULT_ENDPOINT).model == ""
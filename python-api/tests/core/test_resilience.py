@@ -0,0 +1,245 @@
+import asyncio
+import httpx
+import pytest
+from app.core.limiter import LLMOverloadedError
+from app.core.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    ResilientCaller,
+    is_retryable
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def status_error(status_code: int, headers: dict | None = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://llm.test/v1/chat/completions")
+    response = httpx.Response(status_code, headers=headers, request=request)
+    return httpx.HTTPStatusError(f"{status_code}", request=request, response=response)
+
+
+def build_caller(**overrides) -> ResilientCaller:
+    options = {
+        "breaker": CircuitBreaker(failure_threshold=5, reset_timeout=30.0),
+        "max_attempts": 3,
+        "base_delay": 0.001,
+        "max_delay": 0.01,
+        "deadline": 5.0
+    }
+    options.update(overrides)
+    return ResilientCaller(**options)
+
+
+class Scripted:
+    """Llamada que recorre una secuencia de resultados o excepciones."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.timeouts: list[float] = []
+
+    async def __call__(self, timeout: float):
+        self.timeouts.append(timeout)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+class TestIsRetryable:
+    def test_transient_errors_are_retryable(self):
+        assert is_retryable(status_error(502))
+        assert is_retryable(status_error(429))
+        assert is_retryable(httpx.ConnectError("caído"))
+
+    def test_client_errors_are_not_retryable(self):
+        assert not is_retryable(status_error(400))
+        assert not is_retryable(status_error(401))
+        assert not is_retryable(ValueError("json"))
+
+
+class TestCircuitBreaker:
+    """Tests para las transiciones cerrado → abierto → semiabierto."""
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10.0, clock=FakeClock())
+
+        for _ in range(3):
+            breaker.before_call()
+            breaker.record_failure()
+
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError) as exc:
+            breaker.before_call()
+        assert exc.value.retry_after == 10.0
+
+    def test_success_resets_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10.0)
+
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert breaker.state == "closed"
+
+    def test_half_open_allows_single_probe(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0, clock=clock)
+        breaker.record_failure()
+
+        clock.now = 10.0
+        breaker.before_call()
+
+        assert breaker.state == "half_open"
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_failed_probe_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0, clock=clock)
+        breaker.record_failure()
+        clock.now = 10.0
+        breaker.before_call()
+
+        breaker.record_failure()
+
+        assert breaker.state == "open"
+        assert breaker.remaining_open() == 10.0
+
+
+class TestResilientCaller:
+    """Tests para reintentos, presupuesto total y hedging."""
+
+    async def test_retries_transient_error_then_succeeds(self):
+        caller = build_caller()
+        call = Scripted(status_error(502), "ok")
+
+        assert await caller.call(call) == "ok"
+        assert caller.retries == 1
+        assert caller.breaker.failures == 0
+
+    async def test_does_not_retry_client_errors(self):
+        caller = build_caller()
+        call = Scripted(status_error(400), "ok")
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await caller.call(call)
+        assert len(call.timeouts) == 1
+        assert caller.breaker.failures == 0
+
+    async def test_does_not_retry_local_overload(self):
+        caller = build_caller()
+        call = Scripted(LLMOverloadedError(5.0), "ok")
+
+        with pytest.raises(LLMOverloadedError):
+            await caller.call(call)
+        assert len(call.timeouts) == 1
+
+    async def test_gives_up_after_max_attempts(self):
+        caller = build_caller(max_attempts=2)
+        call = Scripted(status_error(503), status_error(503), "ok")
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await caller.call(call)
+        assert len(call.timeouts) == 2
+
+    async def test_retry_after_beyond_deadline_is_not_waited(self):
+        """Un Retry-After que no cabe en el presupuesto debe fallar de inmediato."""
+        caller = build_caller(deadline=1.0)
+        call = Scripted(status_error(429, {"Retry-After": "30"}), "ok")
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await caller.call(call)
+        assert len(call.timeouts) == 1
+
+    async def test_attempt_timeout_is_remaining_budget(self):
+        caller = build_caller(deadline=2.0)
+        call = Scripted("ok")
+
+        await caller.call(call)
+
+        assert 1.9 < call.timeouts[0] <= 2.0
+
+    async def test_open_circuit_stops_retries(self):
+        caller = build_caller(breaker=CircuitBreaker(failure_threshold=1, reset_timeout=30.0), max_attempts=5)
+        call = Scripted(status_error(502), "ok")
+
+        with pytest.raises(CircuitOpenError):
+            await caller.call(call)
+        assert len(call.timeouts) == 1
+
+    async def test_client_error_on_probe_closes_circuit(self):
+        """Un 400 en la prueba muestra que el proveedor responde; no debe dejar el circuito trabado."""
+        clock = FakeClock()
+        caller = build_caller(breaker=CircuitBreaker(failure_threshold=1, reset_timeout=30.0, clock=clock), max_attempts=1)
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await caller.call(Scripted(status_error(503)))
+        clock.now = 1030.0
+        with pytest.raises(httpx.HTTPStatusError):
+            await caller.call(Scripted(status_error(400)))
+
+        assert caller.breaker.state == "closed"
+        assert await caller.call(Scripted("ok")) == "ok"
+
+    @pytest.mark.parametrize("outcome", [LLMOverloadedError(5.0), asyncio.CancelledError()])
+    async def test_probe_without_verdict_is_released(self, outcome):
+        """Un rechazo del limitador o una cancelación liberan la prueba para la siguiente llamada."""
+        clock = FakeClock()
+        caller = build_caller(breaker=CircuitBreaker(failure_threshold=1, reset_timeout=30.0, clock=clock), max_attempts=1)
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await caller.call(Scripted(status_error(503)))
+        clock.now = 30.0
+        with pytest.raises(type(outcome)):
+            await caller.call(Scripted(outcome))
+
+        assert caller.breaker.state == "half_open"
+        assert await caller.call(Scripted("ok")) == "ok"
+        assert caller.breaker.state == "closed"
+
+    async def test_hedges_slow_request_after_p95(self):
+        """Si la primera petición tarda más que el p95, la segunda debe ganar."""
+        caller = build_caller(hedge=True, hedge_min_samples=1)
+        caller.latencies.record(0.01)
+        calls = 0
+
+        async def call(timeout: float) -> str:
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                await asyncio.sleep(10)
+                return "lenta"
+            return "rápida"
+
+        assert await asyncio.wait_for(caller.call(call), 1) == "rápida"
+        assert caller.hedges == 1
+        assert caller.hedge_wins == 1
+
+    async def test_no_hedge_without_enough_samples(self):
+        caller = build_caller(hedge=True, hedge_min_samples=20)
+        call = Scripted("ok")
+
+        await caller.call(call)
+
+        assert caller.hedges == 0
+
+
+class TestLatencyTracker:
+    def test_percentile(self):
+        tracker = LatencyTracker()
+        for value in range(1, 101):
+            tracker.record(value / 100)
+
+        assert tracker.percentile(95) == 0.96
+        assert LatencyTracker().percentile(95) is None
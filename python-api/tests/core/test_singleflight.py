@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+from app.core.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """Tests para la coalescencia de llamadas concurrentes."""
+
+    async def test_concurrent_calls_share_one_execution(self):
+        """Las llamadas simultáneas con la misma clave deben ejecutar el trabajo una vez."""
+        flights = SingleFlight("test")
+        calls = 0
+        release = asyncio.Event()
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "resultado"
+
+        waiters = [asyncio.create_task(flights.do("clave", work)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(*waiters) == ["resultado"] * 5
+        assert calls == 1
+        assert flights.stats() == {"calls": 1, "coalesced": 4, "in_flight": 0}
+
+    async def test_different_keys_run_independently(self):
+        """Claves distintas no deben compartir resultado."""
+        flights = SingleFlight("test")
+
+        async def work(value):
+            await asyncio.sleep(0)
+            return value
+
+        results = await asyncio.gather(
+            flights.do("a", lambda: work(1)),
+            flights.do("b", lambda: work(2))
+        )
+
+        assert results == [1, 2]
+        assert flights.coalesced == 0
+
+    async def test_exception_is_shared_and_key_released(self):
+        """Un error debe llegar a todos los que esperan y liberar la clave."""
+        flights = SingleFlight("test")
+
+        async def failing():
+            await asyncio.sleep(0)
+            raise ValueError("fallo")
+
+        results = await asyncio.gather(
+            flights.do("clave", failing),
+            flights.do("clave", failing),
+            return_exceptions=True
+        )
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert flights.in_flight == 0
+        assert await flights.do("clave", lambda: asyncio.sleep(0, result="ok")) == "ok"
+
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """Si quien originó la llamada se cancela, el resto sigue recibiendo el resultado."""
+        flights = SingleFlight("test")
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "ok"
+
+        first = asyncio.create_task(flights.do("clave", work))
+        second = asyncio.create_task(flights.do("clave", work))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        release.set()
+
+        assert await second == "ok"
+        with pytest.raises(asyncio.CancelledError):
+            await first
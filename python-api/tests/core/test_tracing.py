@@ -0,0 +1,143 @@
+import json
+import logging
+import pytest
+from unittest.mock import patch
+from app.core.config import get_settings
+from app.core.metrics import Registry
+from app.core.tracing import (
+    FileSpanExporter,
+    Trace,
+    current_trace,
+    finish_stage,
+    finish_trace,
+    record_span,
+    trace_to_otlp
+)
+
+
+def make_scope(*headers: tuple[bytes, bytes]) -> dict:
+    return {"type": "http", "method": "POST", "path": "/process-ticket", "headers": list(headers)}
+
+
+class TestTrace:
+    """Tests para la traza por petición."""
+
+    def test_generates_ids(self):
+        trace = Trace.from_scope(make_scope())
+
+        assert len(trace.trace_id) == 32
+        assert trace.request_id == trace.trace_id
+        assert trace.parent_span_id is None
+
+    def test_reuses_request_id_and_traceparent(self):
+        trace = Trace.from_scope(make_scope(
+            (b"x-request-id", b"abc-123"),
+            (b"traceparent", b"00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01")
+        ))
+
+        assert trace.request_id == "abc-123"
+        assert trace.trace_id == "0af7651916cd43dd8448eb211c80319c"
+        assert trace.parent_span_id == "b7ad6b7169203331"
+
+    def test_rejects_unsafe_request_id(self):
+        trace = Trace.from_scope(make_scope((b"x-request-id", b"a\r\nSet-Cookie: x")))
+
+        assert trace.request_id == trace.trace_id
+
+    def test_server_timing_sums_repeated_stages(self):
+        trace = Trace("POST", "/analyze-batch", "r", "t" * 32)
+        token = current_trace.set(trace)
+        for name, start, end in (("llm_call", 0.0, 0.2), ("parse", 0.2, 0.2005), ("llm_call", 0.3, 0.4)):
+            record_span(name, trace.start + start, trace.start + end)
+        current_trace.reset(token)
+        trace.end = trace.start + 0.5
+
+        assert trace.server_timing() == "llm_call;dur=300.0, parse;dur=0.5, total;dur=500.0"
+
+
+class TestStages:
+    def test_finish_stage_observes_and_records(self):
+        histogram = Registry().histogram("stage_seconds", "Etapas")
+        trace = Trace("POST", "/process-ticket", "r", "t" * 32)
+        token = current_trace.set(trace)
+        try:
+            finish_stage("supabase_fetch", histogram, trace.start)
+        finally:
+            current_trace.reset(token)
+
+        assert histogram.labels().count == 1
+        assert [span.name for span in trace.spans] == ["supabase_fetch"]
+
+    def test_record_span_without_trace_is_noop(self):
+        record_span("llm_call", 0.0, 1.0)
+
+        assert current_trace.get() is None
+
+
+class TestExport:
+    def make_trace(self) -> Trace:
+        trace = Trace("POST", "/process-ticket", "req-1", "0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331")
+        token = current_trace.set(trace)
+        record_span("supabase_fetch", trace.start + 0.01, trace.start + 0.02)
+        record_span("llm_call", trace.start + 0.02, trace.start + 0.5)
+        current_trace.reset(token)
+        trace.end = trace.start + 0.6
+        trace.status_code = 200
+        return trace
+
+    def test_otlp_shape(self):
+        trace = self.make_trace()
+
+        spans = trace_to_otlp(trace, "svc")["resourceSpans"][0]["scopeSpans"][0]["spans"]
+
+        root, fetch, llm = spans
+        assert root["traceId"] == fetch["traceId"] == trace.trace_id
+        assert root["parentSpanId"] == "b7ad6b7169203331"
+        assert fetch["parentSpanId"] == llm["parentSpanId"] == root["spanId"]
+        assert int(llm["endTimeUnixNano"]) - int(llm["startTimeUnixNano"]) == pytest.approx(480_000_000, abs=1000)
+        assert {"key": "http.response.status_code", "value": {"intValue": "200"}} in root["attributes"]
+        assert root["status"] == {}
+
+    def test_file_exporter_appends_lines(self, tmp_path):
+        path = tmp_path / "spans.jsonl"
+        exporter = FileSpanExporter(str(path), "svc")
+
+        exporter.export(self.make_trace())
+        exporter.export(self.make_trace())
+        exporter.close()
+
+        lines = path.read_text().splitlines()
+        assert len(lines) == 2
+        resource = json.loads(lines[0])["resourceSpans"][0]["resource"]
+        assert resource["attributes"][0]["value"]["stringValue"] == "svc"
+
+    def test_slow_request_is_logged_with_breakdown(self, caplog):
+        trace = self.make_trace()
+
+        with patch.object(get_settings(), "slow_request_threshold", 0.5):
+            with caplog.at_level(logging.WARNING, logger="app.core.tracing"):
+                finish_trace(trace)
+
+        assert "Petición lenta POST /process-ticket" in caplog.text
+        assert "request_id=req-1" in caplog.text
+        assert "llm_call=480.0ms" in caplog.text
+
+    def test_event_stream_is_not_logged_as_slow(self, caplog):
+        """Una conexión SSE dura lo que el cliente siga conectado."""
+        trace = self.make_trace()
+        trace.streaming = True
+
+        with patch.object(get_settings(), "slow_request_threshold", 0.5):
+            with caplog.at_level(logging.WARNING, logger="app.core.tracing"):
+                finish_trace(trace)
+
+        assert caplog.text == ""
+
+    def test_fast_request_is_not_logged(self, caplog):
+        trace = self.make_trace()
+
+        with patch.object(get_settings(), "slow_request_threshold", 5.0):
+            with caplog.at_level(logging.WARNING, logger="app.core.tracing"):
+                finish_trace(trace)
+
+        assert caplog.text == ""
@@ -0,0 +1,40 @@
+import pytest
+from app.core.webhooks import WebhookSignatureError, sign_payload, verify_signature
+
+SECRET = "secreto"
+BODY = b'{"type":"INSERT","table":"tickets","record":{"id":"t1"}}'
+
+
+class TestVerifySignature:
+    """Tests para la verificación HMAC de los webhooks."""
+
+    def test_accepts_valid_signature(self):
+        signature = sign_payload(SECRET, "1700000000", BODY)
+
+        assert signature.startswith("sha256=")
+        verify_signature(SECRET, BODY, signature, "1700000000", tolerance=300, now=1700000100)
+
+    @pytest.mark.parametrize("body, secret", [(BODY + b" ", SECRET), (BODY, "otro-secreto")])
+    def test_rejects_tampered_body_or_wrong_secret(self, body, secret):
+        signature = sign_payload(secret, "1700000000", body)
+
+        with pytest.raises(WebhookSignatureError, match="inválida"):
+            verify_signature(SECRET, BODY, signature, "1700000000", tolerance=300, now=1700000000)
+
+    def test_timestamp_is_part_of_the_signature(self):
+        """Reusar una firma con otro timestamp no debe validar."""
+        signature = sign_payload(SECRET, "1700000000", BODY)
+
+        with pytest.raises(WebhookSignatureError):
+            verify_signature(SECRET, BODY, signature, "1700000200", tolerance=300, now=1700000200)
+
+    def test_rejects_old_timestamp(self):
+        signature = sign_payload(SECRET, "1700000000", BODY)
+
+        with pytest.raises(WebhookSignatureError, match="tolerancia"):
+            verify_signature(SECRET, BODY, signature, "1700000000", tolerance=300, now=1700000301)
+
+    @pytest.mark.parametrize("signature, timestamp", [(None, "1700000000"), ("sha256=abc", None), ("sha256=abc", "ayer")])
+    def test_rejects_missing_or_malformed_headers(self, signature, timestamp):
+        with pytest.raises(WebhookSignatureError):
+            verify_signature(SECRET, BODY, signature, timestamp, tolerance=300, now=1700000000)
@@ -1,6 +1,19 @@
+import asyncio
+import json
+import httpx
 import pytest
-from unittest.mock import patch, MagicMock
-from app.services.ai_service import parse_llm_response, analyze_ticket, CATEGORIES, SENTIMENTS
+from unittest.mock import patch, MagicMock, AsyncMock
+from app.core.config import LLMEndpoint, get_settings
+from app.core.model_router import ModelRouter
+from app.services.ai_service import (
+    parse_llm_response,
+    parse_batch_response,
+    analyze_ticket,
+    analyze_batch,
+    model_cache_name,
+    CATEGORIES,
+    SENTIMENTS
+)
 
 
 class TestParseLlmResponse:
@@ -94,79 +107,360 @@ class TestParseLlmResponse:
         assert result["sentiment"] == sentiment
 
 
+class TestParseBatchResponse:
+    """Tests para la función parse_batch_response."""
+
+    def test_parse_indexed_array(self):
+        """Debe ubicar cada análisis según su índice."""
+        response = (
+            '[{"index": 1, "category": "ventas", "sentiment": "positivo"},'
+            ' {"index": 0, "category": "quejas", "sentiment": "negativo"}]'
+        )
+        result = parse_batch_response(response, 2)
+
+        assert result[0] == {"category": "quejas", "sentiment": "negativo"}
+        assert result[1] == {"category": "ventas", "sentiment": "positivo"}
+
+    def test_parse_array_with_surrounding_text(self):
+        """Debe extraer el arreglo aunque el modelo agregue texto."""
+        response = 'Resultado:\n[{"index": 0, "category": "devoluciones", "sentiment": "neutro"}]\nFin'
+        result = parse_batch_response(response, 1)
+
+        assert result == [{"category": "devoluciones", "sentiment": "neutro"}]
+
+    def test_partial_response_leaves_missing_items_as_none(self):
+        """Los índices ausentes deben quedar en None."""
+        response = '[{"index": 0, "category": "ventas", "sentiment": "positivo"}]'
+        result = parse_batch_response(response, 3)
+
+        assert result[0] is not None
+        assert result[1] is None
+        assert result[2] is None
+
+    def test_out_of_range_and_invalid_items_are_ignored(self):
+        """Debe descartar índices fuera de rango y elementos que no son objetos."""
+        response = '[{"index": 7, "category": "ventas"}, "basura", {"index": 0, "category": 3}]'
+        result = parse_batch_response(response, 1)
+
+        assert result == [None]
+
+    def test_malformed_json_returns_all_none(self):
+        """Un arreglo malformado no debe producir resultados."""
+        assert parse_batch_response('[{"index": 0, "category": ', 2) == [None, None]
+
+    def test_invalid_labels_default(self):
+        """Etiquetas fuera de catálogo deben normalizarse como en el caso individual."""
+        response = '[{"index": 0, "category": "inventada", "sentiment": "eufórico"}]'
+
+        assert parse_batch_response(response, 1) == [{"category": "otros", "sentiment": "neutro"}]
+
+
 class TestAnalyzeTicket:
     """Tests para la función analyze_ticket."""
 
-    @patch("app.services.ai_service.httpx.Client")
+    @patch("app.services.ai_service.get_http_client")
     @patch("app.services.ai_service.get_settings")
-    def test_analyze_ticket_success(self, mock_settings, mock_client_class):
+    async def test_analyze_ticket_success(self, mock_settings, mock_get_client):
         """Debe analizar un ticket correctamente con respuesta válida del LLM."""
-        settings = MagicMock()
-        settings.huggingface_api_token = "test-token"
-        mock_settings.return_value = settings
-
-        mock_response = MagicMock()
-        mock_response.json.return_value = [
-            {"generated_text": '{"category": "facturación", "sentiment": "negativo"}'}
-        ]
+        mock_settings.return_value = get_settings().model_copy(update={"huggingface_api_token": "test-token"})
+
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {
+            "choices": [
+                {"message": {"content": '{"category": "facturación", "sentiment": "negativo"}'}}
+            ]
+        }
         mock_response.raise_for_status = MagicMock()
 
         mock_client = MagicMock()
-        mock_client.post.return_value = mock_response
-        mock_client.__enter__ = MagicMock(return_value=mock_client)
-        mock_client.__exit__ = MagicMock(return_value=False)
-        mock_client_class.return_value = mock_client
+        mock_client.post = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value = mock_client
 
-        result = analyze_ticket("Mi factura está mal")
+        result = await analyze_ticket("Mi factura está mal")
 
         assert result["category"] == "facturación"
         assert result["sentiment"] == "negativo"
 
-    @patch("app.services.ai_service.httpx.Client")
+    @patch("app.services.ai_service.get_http_client")
     @patch("app.services.ai_service.get_settings")
-    def test_analyze_ticket_empty_response_returns_defaults(self, mock_settings, mock_client_class):
+    async def test_analyze_ticket_empty_response_returns_defaults(self, mock_settings, mock_get_client):
         """Debe retornar valores por defecto si la respuesta está vacía."""
-        settings = MagicMock()
-        settings.huggingface_api_token = "test-token"
-        mock_settings.return_value = settings
+        mock_settings.return_value = get_settings().model_copy(update={"huggingface_api_token": "test-token"})
 
-        mock_response = MagicMock()
+        mock_response = MagicMock(status_code=200)
         mock_response.json.return_value = []
         mock_response.raise_for_status = MagicMock()
 
         mock_client = MagicMock()
-        mock_client.post.return_value = mock_response
-        mock_client.__enter__ = MagicMock(return_value=mock_client)
-        mock_client.__exit__ = MagicMock(return_value=False)
-        mock_client_class.return_value = mock_client
+        mock_client.post = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value = mock_client
 
-        result = analyze_ticket("Texto cualquiera")
+        result = await analyze_ticket("Texto cualquiera")
 
         assert result["category"] == "otros"
         assert result["sentiment"] == "neutro"
 
-    @patch("app.services.ai_service.httpx.Client")
+    @patch("app.services.ai_service.get_http_client")
     @patch("app.services.ai_service.get_settings")
-    def test_analyze_ticket_sends_correct_headers(self, mock_settings, mock_client_class):
+    async def test_analyze_ticket_sends_correct_headers(self, mock_settings, mock_get_client):
         """Debe enviar los headers correctos a la API de HuggingFace."""
-        settings = MagicMock()
-        settings.huggingface_api_token = "my-secret-token"
-        mock_settings.return_value = settings
+        mock_settings.return_value = get_settings().model_copy(update={"huggingface_api_token": "my-secret-token"})
 
-        mock_response = MagicMock()
+        mock_response = MagicMock(status_code=200)
         mock_response.json.return_value = [{"generated_text": '{"category": "otros", "sentiment": "neutro"}'}]
         mock_response.raise_for_status = MagicMock()
 
         mock_client = MagicMock()
-        mock_client.post.return_value = mock_response
-        mock_client.__enter__ = MagicMock(return_value=mock_client)
-        mock_client.__exit__ = MagicMock(return_value=False)
-        mock_client_class.return_value = mock_client
+        mock_client.post = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value = mock_client
 
-        analyze_ticket("Test")
+        await analyze_ticket("Test")
 
         call_args = mock_client.post.call_args
         headers = call_args.kwargs["headers"]
 
         assert headers["Authorization"] == "Bearer my-secret-token"
         assert headers["Content-Type"] == "application/json"
+
+    @patch("app.services.ai_service.get_http_client")
+    @patch("app.services.ai_service.get_settings")
+    async def test_analyze_ticket_reuses_shared_client(self, mock_settings, mock_get_client):
+        """Debe usar el cliente compartido sin cerrarlo entre llamadas."""
+        mock_settings.return_value = get_settings().model_copy(update={"huggingface_api_token": "test-token"})
+
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {"choices": []}
+
+        mock_client = MagicMock()
+        mock_client.post = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value = mock_client
+
+        await analyze_ticket("Uno")
+        await analyze_ticket("Dos")
+
+        assert mock_client.post.call_count == 2
+        mock_client.close.assert_not_called()
+
+    @patch("app.services.ai_service.get_http_client")
+    async def test_transient_502_is_retried(self, mock_get_client):
+        """Un 502 pasajero del router no debe llegar al cliente de la API."""
+        request = httpx.Request("POST", "https://router.test")
+        failed = httpx.Response(502, request=request)
+        ok = httpx.Response(200, request=request, json={
+            "choices": [{"message": {"content": '{"category": "ventas", "sentiment": "positivo"}'}}]
+        })
+        mock_client = MagicMock()
+        mock_client.post = AsyncMock(side_effect=[failed, ok])
+        mock_get_client.return_value = mock_client
+
+        result = await analyze_ticket("Quiero comprar el plan anual")
+
+        assert result == {"category": "ventas", "sentiment": "positivo"}
+        assert mock_client.post.await_count == 2
+
+    @patch("app.services.ai_service.get_model_router")
+    @patch("app.services.ai_service.get_http_client")
+    async def test_model_override_selects_endpoint(self, mock_get_client, mock_get_router):
+        """Con `model` debe enviar el modelo y la URL de ese endpoint."""
+        mock_get_router.return_value = ModelRouter([
+            LLMEndpoint(name="principal", model="org/grande"),
+            LLMEndpoint(name="rapido", model="org/chico", url="https://otro.test/v1/chat/completions")
+        ])
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {"choices": []}
+        mock_client = MagicMock()
+        mock_client.post = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value = mock_client
+
+        await analyze_ticket("Hola", model="rapido")
+
+        call = mock_client.post.call_args
+        assert call.args[0] == "https://otro.test/v1/chat/completions"
+        assert call.kwargs["json"]["model"] == "org/chico"
+
+    @patch("app.services.ai_service.get_model_router")
+    @patch("app.services.ai_service.get_http_client")
+    async def test_retry_is_routed_away_from_failing_endpoint(self, mock_get_client, mock_get_router):
+        """Tras un 502, el reintento debe ir al endpoint que no falló."""
+        router = ModelRouter([LLMEndpoint(name="a", model="org/a"), LLMEndpoint(name="b", model="org/b")])
+        router.observe("a", 0.1, ok=True)
+        router.observe("b", 0.2, ok=True)
+        mock_get_router.return_value = router
+
+        request = httpx.Request("POST", "https://router.test")
+        ok = httpx.Response(200, request=request, json={"choices": []})
+        mock_client = MagicMock()
+        mock_client.post = AsyncMock(side_effect=[httpx.Response(502, request=request), ok])
+        mock_get_client.return_value = mock_client
+
+        await analyze_ticket("Otro ticket")
+
+        models = [call.kwargs["json"]["model"] for call in mock_client.post.call_args_list]
+        assert models == ["org/a", "org/b"]
+
+    @patch("app.services.ai_service.get_model_router")
+    def test_routed_cache_key_covers_every_endpoint_model(self, mock_get_router):
+        """Sin `model`, la clave de caché es el conjunto de modelos del router, no HF_MODEL."""
+        mock_get_router.return_value = ModelRouter([LLMEndpoint(name="b", model="org/b"), LLMEndpoint(name="a", model="org/a")])
+
+        assert model_cache_name(None) == "router:org/a,org/b"
+        assert model_cache_name("b") == "org/b"
+
+    @patch("app.services.ai_service.get_http_client")
+    async def test_streaming_stops_reading_after_json(self, mock_get_client):
+        """En streaming debe cortar la respuesta en cuanto llega el objeto JSON."""
+        pieces = ['{"category": ', '"quejas", "sentiment"', ': "negativo"}', " Explicación", " larga", " ..."]
+        sent = []
+
+        async def events():
+            for piece in pieces:
+                sent.append(piece)
+                yield f'data: {{"choices": [{{"delta": {{"content": {json.dumps(piece)}}}}}]}}\n\n'.encode()
+            yield b"data: [DONE]\n\n"
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert json.loads(request.content)["stream"] is True
+            return httpx.Response(200, content=events(), headers={"Content-Type": "text/event-stream"})
+
+        mock_get_client.return_value = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        with patch.object(get_settings(), "llm_streaming", True):
+            result = await analyze_ticket("El servicio es pésimo", use_cache=False)
+
+        assert result == {"category": "quejas", "sentiment": "negativo"}
+        assert len(sent) == 3
+
+    @patch("app.services.ai_service.get_http_client")
+    async def test_repeated_ticket_is_served_from_cache(self, mock_get_client):
+        """Un ticket repetido no debe volver a llamar al LLM."""
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {
+            "choices": [{"message": {"content": '{"category": "soporte técnico", "sentiment": "negativo"}'}}]
+        }
+        mock_client = MagicMock()
+        mock_client.post = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value = mock_client
+
+        first = await analyze_ticket("No puedo acceder a mi cuenta")
+        second = await analyze_ticket("no puedo acceder a mi  cuenta")
+
+        assert first == second
+        assert mock_client.post.await_count == 1
+
+    @patch("app.services.ai_service.get_http_client")
+    async def test_use_cache_false_bypasses_cache(self, mock_get_client):
+        """Con use_cache=False siempre debe llamar al LLM."""
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {"choices": []}
+        mock_client = MagicMock()
+        mock_client.post = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value = mock_client
+
+        await analyze_ticket("Texto", use_cache=False)
+        await analyze_ticket("Texto", use_cache=False)
+
+        assert mock_client.post.await_count == 2
+
+    @patch("app.services.ai_service.get_http_client")
+    async def test_concurrent_identical_tickets_share_one_call(self, mock_get_client):
+        """Los análisis simultáneos del mismo texto deben hacer una sola llamada al LLM."""
+        release = asyncio.Event()
+
+        async def slow_post(*args, **kwargs):
+            await release.wait()
+            return chat_response('{"category": "facturación", "sentiment": "negativo"}')
+
+        mock_client = MagicMock()
+        mock_client.post = AsyncMock(side_effect=slow_post)
+        mock_get_client.return_value = mock_client
+
+        tasks = [asyncio.create_task(analyze_ticket("Me cobraron doble")) for _ in range(3)]
+        tasks.append(asyncio.create_task(analyze_ticket("me cobraron  DOBLE")))
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        assert all(result == {"category": "facturación", "sentiment": "negativo"} for result in results)
+        assert mock_client.post.await_count == 1
+
+    @patch("app.services.ai_service.get_http_client")
+    async def test_bypass_does_not_join_cached_analysis(self, mock_get_client):
+        """Un análisis con use_cache=False no debe sumarse a uno en vuelo que usa la caché."""
+        release = asyncio.Event()
+
+        async def slow_post(*args, **kwargs):
+            await release.wait()
+            return chat_response('{"category": "facturación", "sentiment": "negativo"}')
+
+        mock_client = MagicMock()
+        mock_client.post = AsyncMock(side_effect=slow_post)
+        mock_get_client.return_value = mock_client
+
+        tasks = [
+            asyncio.create_task(analyze_ticket("Me cobraron doble")),
+            asyncio.create_task(analyze_ticket("Me cobraron doble", use_cache=False))
+        ]
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(*tasks)
+
+        assert mock_client.post.await_count == 2
+
+
+def chat_response(content: str) -> MagicMock:
+    """Construye una respuesta de chat-completions con el contenido dado."""
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"choices": [{"message": {"content": content}}]}
+    return response
+
+
+class TestAnalyzeBatch:
+    """Tests para la función analyze_batch."""
+
+    @patch("app.services.ai_service.get_http_client")
+    async def test_packs_texts_into_one_call(self, mock_get_client):
+        """Varios textos deben resolverse con una sola llamada al LLM."""
+        mock_client = MagicMock()
+        mock_client.post = AsyncMock(return_value=chat_response(
+            '[{"index": 0, "category": "facturación", "sentiment": "negativo"},'
+            ' {"index": 1, "category": "ventas", "sentiment": "positivo"}]'
+        ))
+        mock_get_client.return_value = mock_client
+
+        result = await analyze_batch(["Me cobraron doble", "Quiero comprar"])
+
+        assert result == [
+            {"category": "facturación", "sentiment": "negativo"},
+            {"category": "ventas", "sentiment": "positivo"}
+        ]
+        assert mock_client.post.await_count == 1
+
+    @patch("app.services.ai_service.get_http_client")
+    async def test_missing_items_fall_back_to_single_calls(self, mock_get_client):
+        """Los textos omitidos por el modelo deben analizarse individualmente."""
+        mock_client = MagicMock()
+        mock_client.post = AsyncMock(side_effect=[
+            chat_response('[{"index": 0, "category": "ventas", "sentiment": "positivo"}]'),
+            chat_response('{"category": "quejas", "sentiment": "negativo"}')
+        ])
+        mock_get_client.return_value = mock_client
+
+        result = await analyze_batch(["Quiero comprar", "Pésimo servicio"])
+
+        assert result[1] == {"category": "quejas", "sentiment": "negativo"}
+        assert mock_client.post.await_count == 2
+
+    @patch("app.services.ai_service.get_http_client")
+    async def test_cached_and_duplicate_texts_are_not_resent(self, mock_get_client):
+        """Los textos cacheados o repetidos en el lote no deben reenviarse."""
+        mock_client = MagicMock()
+        mock_client.post = AsyncMock(return_value=chat_response(
+            '{"category": "soporte técnico", "sentiment": "negativo"}'
+        ))
+        mock_get_client.return_value = mock_client
+
+        await analyze_ticket("No puedo entrar")
+        result = await analyze_batch(["No puedo entrar", "Error 500", "error  500"])
+
+        assert result[1] == result[2]
+        assert mock_client.post.await_count == 2
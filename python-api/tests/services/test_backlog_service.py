@@ -0,0 +1,159 @@
+import json
+import pytest
+from unittest.mock import patch
+from app.core.config import get_settings
+from app.core.resilience import CircuitOpenError
+from app.services import backlog_service
+from app.services.backlog_service import BacklogProgress, process_backlog, save_checkpoint, load_checkpoint
+
+
+def make_tickets(count: int) -> list[dict]:
+    return [
+        {
+            "id": f"id-{i:04d}",
+            "description": f"Ticket {i}",
+            "created_at": f"2024-01-01T00:00:{i:02d}+00:00"
+        }
+        for i in range(count)
+    ]
+
+
+class FakeStore:
+    """Simula la tabla de tickets con paginación por keyset."""
+
+    def __init__(self, tickets: list[dict]):
+        self.tickets = tickets
+        self.updated: list[dict] = []
+        self.cursors: list[dict | None] = []
+
+    async def list_unprocessed(self, limit: int, after: dict | None = None) -> list[dict]:
+        self.cursors.append(after)
+        done = {row["id"] for row in self.updated}
+        rows = [t for t in self.tickets if t["id"] not in done]
+        if after:
+            rows = [t for t in rows if (t["created_at"], t["id"]) > (after["created_at"], after["id"])]
+        return rows[:limit]
+
+    async def bulk_update(self, classifications: list[dict]) -> dict:
+        self.updated.extend(classifications)
+        return {"updated": [row["id"] for row in classifications], "failed": []}
+
+
+async def fake_analyze_batch(texts: list[str]) -> list[dict]:
+    return [{"category": "ventas", "sentiment": "neutro"} for _ in texts]
+
+
+@pytest.fixture
+def store():
+    store = FakeStore(make_tickets(25))
+    with patch.object(backlog_service, "list_unprocessed_tickets", store.list_unprocessed), \
+            patch.object(backlog_service, "bulk_update_classifications", store.bulk_update), \
+            patch.object(backlog_service, "analyze_batch", fake_analyze_batch):
+        yield store
+
+
+class TestProcessBacklog:
+    """Tests para el procesador de backlog."""
+
+    async def test_drains_all_pages(self, store):
+        """Debe clasificar y guardar todos los tickets pendientes."""
+        progress = await process_backlog(page_size=10, concurrency=2)
+
+        assert progress.status == "completed"
+        assert progress.processed == 25
+        assert progress.pages == 3
+        assert len(store.updated) == 25
+
+    async def test_uses_keyset_cursor_between_pages(self, store):
+        """Cada página debe pedirse después del último (created_at, id) visto."""
+        await process_backlog(page_size=10, concurrency=2)
+
+        assert store.cursors[0] is None
+        assert store.cursors[1] == {"created_at": store.tickets[9]["created_at"], "id": "id-0009"}
+
+    async def test_respects_limit(self, store):
+        """No debe recorrer más tickets que el límite indicado."""
+        progress = await process_backlog(page_size=10, concurrency=2, limit=12)
+
+        assert progress.processed == 12
+
+    async def test_reports_progress_per_page(self, store):
+        """Debe invocar el callback tras cada página."""
+        pages = []
+
+        await process_backlog(page_size=10, concurrency=2, on_page=lambda p: pages.append(p.processed))
+
+        assert pages == [10, 20, 25]
+
+    async def test_failed_batches_are_counted(self, store):
+        """Un lote que falla no debe detener la corrida."""
+        async def flaky(texts):
+            if "Ticket 0" in texts:
+                raise RuntimeError("LLM caído")
+            return await fake_analyze_batch(texts)
+
+        with patch.object(backlog_service, "analyze_batch", flaky):
+            progress = await process_backlog(page_size=10, concurrency=2)
+
+        assert progress.status == "completed"
+        assert progress.failed > 0
+        assert progress.processed + progress.failed == 25
+
+    async def test_open_circuit_pauses_without_advancing(self, store, tmp_path):
+        """Con el LLM caído la corrida se detiene y la próxima retoma los tickets pendientes."""
+        checkpoint = str(tmp_path / "backlog.json")
+        calls = 0
+
+        async def outage(texts):
+            nonlocal calls
+            calls += 1
+            if calls > 2:
+                raise CircuitOpenError(30.0)
+            return await fake_analyze_batch(texts)
+
+        with patch.object(backlog_service, "analyze_batch", outage), \
+                patch.object(get_settings(), "llm_batch_size", 5):
+            progress = await process_backlog(page_size=10, concurrency=1, checkpoint_path=checkpoint)
+
+        assert progress.status == "paused"
+        assert progress.processed == 10
+        assert progress.failed == 0
+        assert progress.cursor["id"] == "id-0009"
+        assert load_checkpoint(checkpoint)["id"] == "id-0009"
+
+        progress = await process_backlog(page_size=10, concurrency=2, checkpoint_path=checkpoint)
+
+        assert progress.status == "completed"
+        assert progress.processed == 15
+
+    async def test_resumes_from_checkpoint(self, store, tmp_path):
+        """Con checkpoint debe continuar desde el cursor guardado."""
+        checkpoint = str(tmp_path / "backlog.json")
+        save_checkpoint(checkpoint, {"created_at": store.tickets[19]["created_at"], "id": "id-0019"})
+
+        progress = await process_backlog(page_size=10, concurrency=2, checkpoint_path=checkpoint)
+
+        assert progress.processed == 5
+        assert load_checkpoint(checkpoint) is None
+
+    async def test_checkpoint_kept_when_stopped_early(self, store, tmp_path):
+        """Si la corrida no agota el backlog, el cursor debe quedar guardado."""
+        checkpoint = str(tmp_path / "backlog.json")
+
+        await process_backlog(page_size=10, concurrency=2, checkpoint_path=checkpoint, limit=10)
+
+        with open(checkpoint) as file:
+            assert json.load(file)["cursor"]["id"] == "id-0009"
+
+
+class TestBacklogProgress:
+    """Tests para el reporte de progreso."""
+
+    def test_to_dict_reports_rate(self):
+        """Debe calcular tickets por segundo a partir del tiempo transcurrido."""
+        progress = BacklogProgress(status="completed", processed=100, started_at=10.0, finished_at=20.0)
+
+        data = progress.to_dict()
+
+        assert data["elapsed_seconds"] == 10.0
+        assert data["tickets_per_second"] == 10.0
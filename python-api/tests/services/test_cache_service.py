@@ -0,0 +1,107 @@
+from app.services.cache_service import (
+    AnalysisCache,
+    SQLiteCacheBackend,
+    cache_key,
+    normalize_text
+)
+
+
+class FakeClock:
+    """Reloj controlable para probar expiraciones."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestCacheKey:
+    """Tests para la normalización y la clave de caché."""
+
+    def test_normalize_collapses_case_and_whitespace(self):
+        """Debe ignorar mayúsculas y espacios repetidos."""
+        assert normalize_text("  No puedo\n ACCEDER   a mi cuenta ") == "no puedo acceder a mi cuenta"
+
+    def test_near_verbatim_texts_share_key(self):
+        """Textos casi idénticos deben producir la misma clave."""
+        first = cache_key("No puedo acceder a mi cuenta", "model", "1")
+        second = cache_key("no puedo  acceder a mi CUENTA", "model", "1")
+
+        assert first == second
+
+    def test_key_changes_with_model_and_prompt_version(self):
+        """Cambiar modelo o versión del prompt debe invalidar la clave."""
+        base = cache_key("texto", "model-a", "1")
+
+        assert cache_key("texto", "model-b", "1") != base
+        assert cache_key("texto", "model-a", "2") != base
+
+
+class TestAnalysisCache:
+    """Tests para la caché LRU en proceso."""
+
+    async def test_miss_then_hit_updates_counters(self):
+        """Debe contar fallos y aciertos."""
+        cache = AnalysisCache(max_entries=10, ttl=60)
+
+        assert await cache.get("k") is None
+        await cache.set("k", {"category": "ventas", "sentiment": "positivo"})
+        assert await cache.get("k") == {"category": "ventas", "sentiment": "positivo"}
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    async def test_evicts_least_recently_used(self):
+        """Al superar el máximo debe descartar la entrada menos usada."""
+        cache = AnalysisCache(max_entries=2, ttl=60)
+        await cache.set("a", {"n": 1})
+        await cache.set("b", {"n": 2})
+        await cache.get("a")
+        await cache.set("c", {"n": 3})
+
+        assert await cache.get("b") is None
+        assert await cache.get("a") == {"n": 1}
+
+    async def test_entries_expire_after_ttl(self):
+        """Las entradas expiradas no deben devolverse."""
+        clock = FakeClock()
+        cache = AnalysisCache(max_entries=10, ttl=5, clock=clock)
+        await cache.set("k", {"n": 1})
+
+        clock.now = 6
+        assert await cache.get("k") is None
+
+    async def test_returned_value_is_a_copy(self):
+        """Modificar el resultado no debe alterar la entrada cacheada."""
+        cache = AnalysisCache(max_entries=10, ttl=60)
+        await cache.set("k", {"category": "ventas"})
+
+        (await cache.get("k"))["category"] = "otros"
+
+        assert (await cache.get("k"))["category"] == "ventas"
+
+
+class TestSQLiteCacheBackend:
+    """Tests para el backend compartido en SQLite."""
+
+    async def test_shared_backend_survives_new_process_cache(self, tmp_path):
+        """Otra instancia en memoria debe encontrar el valor en SQLite."""
+        path = str(tmp_path / "cache.sqlite3")
+        writer = AnalysisCache(max_entries=10, ttl=60, backend=SQLiteCacheBackend(path, ttl=60))
+        await writer.set("k", {"category": "quejas", "sentiment": "negativo"})
+
+        reader = AnalysisCache(max_entries=10, ttl=60, backend=SQLiteCacheBackend(path, ttl=60))
+        result = await reader.get("k")
+
+        assert result == {"category": "quejas", "sentiment": "negativo"}
+        assert reader.stats()["shared_hits"] == 1
+
+    def test_expired_rows_are_ignored(self, tmp_path):
+        """No debe devolver filas cuyo TTL ya venció."""
+        backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), ttl=-1)
+        backend.set("k", {"n": 1})
+
+        assert backend.get("k") is None
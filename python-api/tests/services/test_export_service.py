@@ -0,0 +1,93 @@
+import pytest
+from unittest.mock import patch
+from app.services import export_service
+from app.services.export_service import export_tickets, iter_ticket_pages
+
+
+def make_tickets(count: int) -> list[dict]:
+    return [
+        {
+            "id": f"id-{i:04d}",
+            "created_at": f"2024-01-01T00:00:{i:02d}+00:00",
+            "description": f"Ticket, {i}",
+            "category": "ventas",
+            "sentiment": None,
+            "processed": i % 2 == 0
+        }
+        for i in range(count)
+    ]
+
+
+class FakeTable:
+    """Simula list_tickets con paginación por keyset ascendente."""
+
+    def __init__(self, tickets: list[dict]):
+        self.tickets = tickets
+        self.calls: list[dict] = []
+
+    async def list_tickets(self, limit: int, after: dict | None = None, fields=None, **filters) -> list[dict]:
+        self.calls.append({"limit": limit, "after": after, "fields": fields, **filters})
+        rows = self.tickets
+        if after:
+            rows = [t for t in rows if (t["created_at"], t["id"]) > (after["created_at"], after["id"])]
+        return rows[:limit]
+
+
+@pytest.fixture
+def table():
+    table = FakeTable(make_tickets(25))
+    with patch.object(export_service, "list_tickets", table.list_tickets):
+        yield table
+
+
+async def collect(iterator) -> list:
+    return [item async for item in iterator]
+
+
+class TestIterTicketPages:
+    """Tests para el recorrido por páginas."""
+
+    async def test_walks_all_pages_by_keyset(self, table):
+        pages = await collect(iter_ticket_pages(10, processed=True))
+
+        assert [len(page) for page in pages] == [10, 10, 5]
+        assert table.calls[1]["after"] == {"created_at": table.tickets[9]["created_at"], "id": "id-0009"}
+        assert all(call["processed"] is True for call in table.calls)
+
+    async def test_exact_multiple_ends_with_empty_page(self, table):
+        pages = await collect(iter_ticket_pages(5))
+
+        assert [len(page) for page in pages] == [5] * 5
+        assert len(table.calls) == 6
+
+    async def test_closing_early_cancels_prefetch(self, table):
+        """Si el cliente corta, la página pedida por adelantado se cancela."""
+        pages = iter_ticket_pages(10)
+        await pages.__anext__()
+        await pages.aclose()
+
+        assert len(table.calls) == 1
+
+
+class TestExportTickets:
+    """Tests para la serialización de la exportación."""
+
+    async def test_ndjson_only_selected_columns(self, table):
+        chunks = await collect(export_tickets("ndjson", 10, columns=["sentiment", "description"]))
+
+        lines = b"".join(chunks).decode().splitlines()
+        assert len(chunks) == 3
+        assert len(lines) == 25
+        assert lines[0] == '{"description":"Ticket, 0","sentiment":null}'
+
+    async def test_csv_header_comes_before_first_query(self, table):
+        """El encabezado sale antes de consultar la base."""
+        chunks = export_tickets("csv", 10, columns=["id", "description", "processed"])
+
+        assert await chunks.__anext__() == b"id,description,processed\n"
+        assert table.calls == []
+
+        rest = b"".join(await collect(chunks)).decode().splitlines()
+        assert rest[0] == 'id-0000,"Ticket, 0",true'
+        assert len(rest) == 25
+        assert table.calls[0]["fields"] == ["id", "description", "processed"]
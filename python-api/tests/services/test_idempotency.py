@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+from app.services.idempotency import IdempotencyConflictError, IdempotencyStore, request_fingerprint
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestIdempotencyStore:
+    """Tests para el almacén de respuestas por Idempotency-Key."""
+
+    async def test_repeated_key_returns_stored_response(self):
+        """La segunda petición con la misma clave no vuelve a ejecutarse."""
+        store = IdempotencyStore(max_entries=10, ttl=60)
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            return {"ticket_id": "t1"}
+
+        first = await store.run("k", "f", compute)
+        second = await store.run("k", "f", compute)
+
+        assert first == ({"ticket_id": "t1"}, False)
+        assert second == ({"ticket_id": "t1"}, True)
+        assert calls == 1
+        assert store.stats()["replays"] == 1
+
+    async def test_concurrent_requests_wait_for_the_first(self):
+        store = IdempotencyStore(max_entries=10, ttl=60)
+        release = asyncio.Event()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"ticket_id": "t1"}
+
+        waiters = [asyncio.create_task(store.run("k", "f", compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+
+        results = await asyncio.gather(*waiters)
+        assert calls == 1
+        assert [replayed for _, replayed in results] == [False, True, True]
+
+    async def test_reused_key_with_other_request_is_rejected(self):
+        store = IdempotencyStore(max_entries=10, ttl=60)
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return {}
+
+        running = asyncio.create_task(store.run("k", "f1", compute))
+        await asyncio.sleep(0)
+        with pytest.raises(IdempotencyConflictError):
+            await store.run("k", "f2", compute)
+
+        release.set()
+        await running
+        with pytest.raises(IdempotencyConflictError):
+            await store.run("k", "f2", compute)
+
+    async def test_failure_is_not_stored(self):
+        """Si la primera ejecución falla, la misma clave puede reintentarse."""
+        store = IdempotencyStore(max_entries=10, ttl=60)
+
+        async def fail():
+            raise RuntimeError("LLM caído")
+
+        async def succeed():
+            return {"ok": True}
+
+        with pytest.raises(RuntimeError):
+            await store.run("k", "f", fail)
+
+        assert await store.run("k", "f", succeed) == ({"ok": True}, False)
+
+    async def test_entries_expire_and_are_bounded(self):
+        clock = FakeClock()
+        store = IdempotencyStore(max_entries=2, ttl=60, clock=clock)
+
+        async def compute():
+            return {}
+
+        for key in ("a", "b", "c"):
+            await store.run(key, "f", compute)
+        assert store.stats()["size"] == 2
+        assert (await store.run("a", "f", compute))[1] is False
+
+        clock.now = 61
+        assert (await store.run("c", "f", compute))[1] is False
+
+    def test_fingerprint_ignores_key_order(self):
+        assert request_fingerprint({"a": 1, "b": 2}) == request_fingerprint({"b": 2, "a": 1})
+        assert request_fingerprint({"a": 1}) != request_fingerprint({"a": 2})
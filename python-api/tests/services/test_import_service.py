@@ -0,0 +1,226 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+from app.services import import_service
+from app.services.import_service import (
+    format_from_content_type,
+    import_tickets,
+    iter_csv_records,
+    iter_lines,
+    iter_ndjson_records,
+    validate_row
+)
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(iterator) -> list:
+    return [item async for item in iterator]
+
+
+class FakeStore:
+    """Simula la inserción masiva y registra el tamaño de cada bloque."""
+
+    def __init__(self, fail_descriptions: set[str] = frozenset()):
+        self.fail_descriptions = fail_descriptions
+        self.inserted: list[dict] = []
+        self.chunks: list[int] = []
+        self.active = 0
+        self.max_active = 0
+
+    async def bulk_create(self, tickets: list[dict]) -> dict:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0)
+        self.active -= 1
+        self.chunks.append(len(tickets))
+        created, failed = [], []
+        for index, ticket in enumerate(tickets):
+            if ticket["description"] in self.fail_descriptions:
+                failed.append({"index": index, "error": "No se pudo crear el ticket"})
+            else:
+                created.append(ticket)
+        self.inserted.extend(created)
+        return {"created": created, "failed": failed}
+
+
+async def fake_analyze_batch(texts: list[str], use_cache: bool = True) -> list[dict]:
+    return [{"category": "ventas", "sentiment": "neutro"} for _ in texts]
+
+
+@pytest.fixture
+def store():
+    store = FakeStore()
+    with patch.object(import_service, "bulk_create_tickets", store.bulk_create), \
+            patch.object(import_service, "analyze_batch", fake_analyze_batch):
+        yield store
+
+
+class TestReaders:
+    """Tests para la lectura incremental de CSV y NDJSON."""
+
+    async def test_lines_split_across_chunks(self):
+        """Una línea o un carácter multibyte partidos entre bloques deben reconstruirse."""
+        data = "título\r\nañadir\nfin".encode("utf-8")
+
+        lines = await collect(iter_lines(stream(*(data[i:i + 3] for i in range(0, len(data), 3)))))
+
+        assert lines == ["título", "añadir", "fin"]
+
+    async def test_csv_multiline_quoted_field(self):
+        """Un campo entre comillas puede ocupar varias líneas sin perder la numeración."""
+        data = b'description,category\n"Linea uno\nlinea ""dos""",ventas\nOtro,\n'
+
+        records = await collect(iter_csv_records(stream(data)))
+
+        assert records == [
+            (2, {"description": 'Linea uno\nlinea "dos"', "category": "ventas"}, None),
+            (4, {"description": "Otro", "category": ""}, None)
+        ]
+
+    async def test_csv_wrong_column_count_is_reported(self):
+        records = await collect(iter_csv_records(stream(b"description,category\nuno,dos,tres\n")))
+
+        assert records[0][0] == 2
+        assert "columnas" in records[0][2]
+
+    async def test_csv_without_description_column(self):
+        records = await collect(iter_csv_records(stream(b"texto\nhola\n")))
+
+        assert records == [(1, None, "El encabezado del CSV no tiene la columna description")]
+
+    async def test_csv_stray_quote_does_not_swallow_the_file(self):
+        """Una comilla suelta se reporta en su línea y las siguientes se leen igual."""
+        lines = [b"description,category", b'Mi pantalla dice "error,,'] + [b"Ticket %d,ventas" % i for i in range(10)]
+
+        records = await collect(iter_csv_records(stream(b"\n".join(lines) + b"\n"), max_record_lines=4))
+
+        assert records[0] == (2, None, "Campo entre comillas sin cerrar")
+        assert [record[0] for record in records[1:]] == list(range(3, 13))
+        assert records[-1][1] == {"description": "Ticket 9", "category": "ventas"}
+
+    async def test_csv_record_size_is_capped(self):
+        """Un registro sin cerrar no crece más allá del tope de caracteres."""
+        data = b'description\n"abierto\n' + b"x" * 50 + b"\n" + b"y\n"
+
+        records = await collect(iter_csv_records(stream(data), max_record_chars=40))
+
+        assert records == [
+            (2, None, "Campo entre comillas sin cerrar"),
+            (3, {"description": "x" * 50}, None),
+            (4, {"description": "y"}, None)
+        ]
+
+    async def test_ndjson_reports_invalid_lines(self):
+        data = b'{"description": "uno"}\n\nno es json\n[1]\n'
+
+        records = await collect(iter_ndjson_records(stream(data)))
+
+        assert records[0] == (1, {"description": "uno"}, None)
+        assert records[1][0] == 3 and "JSON inválido" in records[1][2]
+        assert records[2] == (4, None, "Cada línea debe ser un objeto JSON")
+
+    def test_format_from_content_type(self):
+        assert format_from_content_type("text/csv; charset=utf-8") == "csv"
+        assert format_from_content_type("application/x-ndjson") == "ndjson"
+        assert format_from_content_type("application/json") is None
+
+
+class TestValidateRow:
+    """Tests para la validación de filas."""
+
+    def test_empty_labels_count_as_missing(self):
+        row = validate_row({"description": " Hola ", "category": "", "sentiment": " "})
+
+        assert row == {"description": "Hola", "category": None, "sentiment": None}
+
+    def test_blank_description_is_rejected(self):
+        with pytest.raises(ValueError, match="vacía"):
+            validate_row({"description": "   "})
+
+    def test_wrong_type_is_rejected(self):
+        with pytest.raises(ValueError, match="description"):
+            validate_row({"description": 42})
+
+
+class TestImportTickets:
+    """Tests para la importación por bloques."""
+
+    async def test_imports_in_chunks_with_bounded_concurrency(self, store):
+        """Todas las filas válidas deben insertarse en bloques, con a lo sumo `concurrency` en vuelo."""
+        data = "".join(json.dumps({"description": f"Ticket {i}"}) + "\n" for i in range(25)).encode()
+
+        events = await collect(import_tickets(stream(data), "ndjson", chunk_size=10, concurrency=2))
+
+        assert store.chunks == [10, 10, 5]
+        assert store.max_active <= 2
+        assert all(ticket["category"] == "ventas" and ticket["processed"] for ticket in store.inserted)
+        assert [event["type"] for event in events] == ["progress", "progress", "progress", "summary"]
+        assert events[-1]["status"] == "completed"
+        assert events[-1]["created"] == 25
+
+    async def test_reports_invalid_rows_and_insert_failures_by_line(self, store):
+        store.fail_descriptions = {"falla"}
+        data = b"description,category,sentiment\nbien,ventas,neutro\n  ,,\nfalla,,\n"
+
+        events = await collect(import_tickets(stream(data), "csv", chunk_size=10, concurrency=2))
+
+        errors = [event for event in events if event["type"] == "error"]
+        assert [(error["line"], error["error"]) for error in errors] == [
+            (3, "La descripción no puede estar vacía"),
+            (4, "No se pudo crear el ticket")
+        ]
+        assert events[-1]["rows"] == 3
+        assert events[-1]["created"] == 1
+        assert events[-1]["failed"] == 2
+
+    async def test_labeled_rows_skip_analysis(self, store):
+        """Las filas con categoría o sentimiento se insertan tal cual."""
+        data = b'{"description": "Precios", "category": "ventas", "sentiment": "neutro"}\n'
+
+        with patch.object(import_service, "analyze_batch") as mock_analyze:
+            await collect(import_tickets(stream(data), "ndjson", chunk_size=10, concurrency=1))
+
+        mock_analyze.assert_not_called()
+        assert store.inserted[0]["category"] == "ventas"
+
+    async def test_failed_analysis_inserts_rows_unprocessed(self, store):
+        """Si la clasificación falla, las filas quedan pendientes para el backlog."""
+        async def broken_analyze_batch(texts, use_cache=True):
+            raise RuntimeError("LLM caído")
+
+        with patch.object(import_service, "analyze_batch", broken_analyze_batch):
+            events = await collect(import_tickets(stream(b'{"description": "Hola"}\n'), "ndjson", 10, 1))
+
+        assert store.inserted[0]["processed"] is False
+        assert events[-1]["unclassified"] == 1
+
+    async def test_invalid_utf8_aborts_after_inserting_read_rows(self, store):
+        data = [b'{"description": "uno"}\n', b"\xff\xfe\n"]
+
+        events = await collect(import_tickets(stream(*data), "ndjson", chunk_size=10, concurrency=1))
+
+        assert events[-1]["status"] == "aborted"
+        assert events[-1]["created"] == 1
+        assert any(event.get("error") == "El archivo no está codificado en UTF-8" for event in events)
+
+    async def test_stops_reading_while_chunks_are_in_flight(self, store):
+        """Con el cupo lleno no se lee más entrada hasta que termine un bloque."""
+        read = 0
+
+        async def counting_stream():
+            nonlocal read
+            for i in range(100):
+                read += 1
+                yield json.dumps({"description": f"Ticket {i}"}).encode() + b"\n"
+
+        events = import_tickets(counting_stream(), "ndjson", chunk_size=10, concurrency=2)
+        first = await events.__anext__()
+        await events.aclose()
+
+        assert first["type"] == "progress"
+        assert read <= 21
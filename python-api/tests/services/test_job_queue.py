@@ -0,0 +1,190 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import patch
+from app.services.job_queue import SQLiteJobStore, JobQueue, PermanentJobError, DeferJobError, JOB_HANDLERS
+
+
+@pytest.fixture
+def store():
+    job_store = SQLiteJobStore(":memory:")
+    yield job_store
+    job_store.close()
+
+
+def build_queue(store: SQLiteJobStore, **overrides) -> JobQueue:
+    options = {
+        "concurrency": 2,
+        "max_attempts": 3,
+        "retry_base_delay": 0.0,
+        "lease": 60.0,
+        "poll_interval": 0.01
+    }
+    options.update(overrides)
+    return JobQueue(store, **options)
+
+
+class TestSQLiteJobStore:
+    """Tests para la cola durable en SQLite."""
+
+    def test_enqueue_and_claim(self, store):
+        """Un trabajo encolado debe poder reclamarse una sola vez."""
+        job = store.enqueue("demo", {"n": 1}, max_attempts=3)
+
+        claimed = store.claim(lease=60)
+
+        assert claimed["id"] == job["id"]
+        assert claimed["status"] == "running"
+        assert claimed["attempts"] == 1
+        assert claimed["payload"] == {"n": 1}
+        assert store.claim(lease=60) is None
+
+    def test_dedupe_key_returns_pending_job(self, store):
+        """Mientras un trabajo esté pendiente, la misma clave debe retornar ese trabajo."""
+        first = store.enqueue("demo", {}, max_attempts=3, dedupe_key="ticket:1")
+        second = store.enqueue("demo", {}, max_attempts=3, dedupe_key="ticket:1")
+        store.complete(first["id"], {})
+        third = store.enqueue("demo", {}, max_attempts=3, dedupe_key="ticket:1")
+
+        assert second["id"] == first["id"]
+        assert third["id"] != first["id"]
+
+    def test_failed_job_waits_until_retry_time(self, store):
+        """Un trabajo reprogramado no debe reclamarse antes de su hora."""
+        job = store.enqueue("demo", {}, max_attempts=3)
+        store.claim(lease=60)
+
+        store.fail(job["id"], "502", retry_at=time.time() + 60)
+
+        assert store.claim(lease=60) is None
+        assert store.get(job["id"])["status"] == "queued"
+        assert store.get(job["id"])["error"] == "502"
+
+    def test_expired_lease_is_reclaimed(self, store):
+        """Si el worker muere, el trabajo debe volver a reclamarse al vencer el lease."""
+        job = store.enqueue("demo", {}, max_attempts=3)
+        store.claim(lease=0)
+
+        reclaimed = store.claim(lease=60)
+
+        assert reclaimed["id"] == job["id"]
+        assert reclaimed["attempts"] == 2
+
+    def test_jobs_survive_reopening_the_file(self, tmp_path):
+        """Los trabajos deben persistir entre reinicios del proceso."""
+        path = str(tmp_path / "jobs.sqlite3")
+        first = SQLiteJobStore(path)
+        job = first.enqueue("demo", {"n": 1}, max_attempts=3)
+        first.close()
+
+        second = SQLiteJobStore(path)
+        try:
+            assert second.claim(lease=60)["id"] == job["id"]
+        finally:
+            second.close()
+
+
+class TestJobQueue:
+    """Tests para los workers, reintentos y dead-letter."""
+
+    async def test_workers_process_enqueued_jobs(self, store):
+        """Los workers deben procesar los trabajos y guardar el resultado."""
+        async def handler(payload):
+            return {"double": payload["n"] * 2}
+
+        queue = build_queue(store)
+        with patch.dict(JOB_HANDLERS, {"demo": handler}):
+            queue.start()
+            try:
+                job = await queue.enqueue("demo", {"n": 21})
+                for _ in range(100):
+                    if (await queue.get(job["id"]))["status"] == "succeeded":
+                        break
+                    await asyncio.sleep(0.01)
+            finally:
+                await queue.stop()
+
+        finished = await queue.get(job["id"])
+        assert finished["status"] == "succeeded"
+        assert finished["result"] == {"double": 42}
+
+    async def test_transient_error_is_retried_then_dead_lettered(self, store):
+        """Un error transitorio debe reintentarse hasta `max_attempts` y luego ir a dead."""
+        async def handler(payload):
+            raise RuntimeError("502 Bad Gateway")
+
+        queue = build_queue(store, max_attempts=2)
+        with patch.dict(JOB_HANDLERS, {"demo": handler}):
+            job = await queue.enqueue("demo", {})
+
+            await queue.run_job(store.claim(lease=60))
+            assert store.get(job["id"])["status"] == "queued"
+
+            await queue.run_job(store.claim(lease=60))
+
+        dead = store.get(job["id"])
+        assert dead["status"] == "dead"
+        assert dead["attempts"] == 2
+        assert dead["error"] == "502 Bad Gateway"
+
+    async def test_permanent_error_is_not_retried(self, store):
+        async def handler(payload):
+            raise PermanentJobError("Ticket no encontrado")
+
+        queue = build_queue(store)
+        with patch.dict(JOB_HANDLERS, {"demo": handler}):
+            job = await queue.enqueue("demo", {})
+            await queue.run_job(store.claim(lease=60))
+
+        assert store.get(job["id"])["status"] == "dead"
+        assert store.get(job["id"])["attempts"] == 1
+
+    async def test_deferred_job_keeps_its_attempts(self, store):
+        """Un trabajo reprogramado no debe gastar intentos."""
+        async def handler(payload):
+            raise DeferJobError(30.0, "Circuito abierto")
+
+        queue = build_queue(store)
+        with patch.dict(JOB_HANDLERS, {"demo": handler}):
+            job = await queue.enqueue("demo", {})
+            await queue.run_job(store.claim(lease=60))
+
+        deferred = store.get(job["id"])
+        assert deferred["status"] == "queued"
+        assert deferred["attempts"] == 0
+        assert deferred["available_at"] > time.time() + 20
+        assert store.claim(lease=60) is None
+
+    async def test_stop_returns_running_job_to_queue(self, store):
+        """Al detener los workers, el trabajo en curso debe volver a la cola."""
+        started = asyncio.Event()
+
+        async def handler(payload):
+            started.set()
+            await asyncio.sleep(60)
+
+        queue = build_queue(store, concurrency=1)
+        with patch.dict(JOB_HANDLERS, {"demo": handler}):
+            queue.start()
+            job = await queue.enqueue("demo", {})
+            await asyncio.wait_for(started.wait(), 1)
+            await queue.stop()
+
+        assert store.get(job["id"])["status"] == "queued"
+        assert store.get(job["id"])["attempts"] == 0
+
+    async def test_unknown_kind_is_rejected(self, store):
+        with pytest.raises(ValueError):
+            await build_queue(store).enqueue("desconocido", {})
+
+    async def test_stats_reads_counts_off_the_event_loop(self, store):
+        """El conteo de SQLite debe ir por to_thread, como el resto de la cola."""
+        store.enqueue("process_ticket", {}, 3)
+        queue = build_queue(store)
+
+        with patch("app.services.job_queue.asyncio.to_thread", wraps=asyncio.to_thread) as to_thread:
+            stats = await queue.stats()
+
+        to_thread.assert_called_once_with(store.counts)
+        assert stats["queued"] == 1
+        assert queue.counts["queued"] == 1
@@ -0,0 +1,197 @@
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+from app.services.local_classifier import (
+    tokenize,
+    LocalClassifier,
+    classify_locally,
+    fast_path_stats,
+    init_local_classifier,
+    set_local_classifier
+)
+from app.core.resilience import CircuitOpenError
+from app.services.ai_service import analyze_ticket
+from app.services.cache_service import get_analysis_cache
+
+TRAINING_ROWS = [
+    {"description": f"Me cobraron doble en la factura {i}", "category": "facturación", "sentiment": "negativo"}
+    for i in range(20)
+] + [
+    {"description": f"Quiero comprar el plan premium {i}, gracias", "category": "ventas", "sentiment": "positivo"}
+    for i in range(20)
+]
+
+
+@pytest.fixture
+def classifier():
+    """Clasificador entrenado con dos clases bien separadas, cargado como global."""
+    model = LocalClassifier.train(TRAINING_ROWS)
+    set_local_classifier(model)
+    fast_path_stats.local = fast_path_stats.delegated = fast_path_stats.fallback = 0
+    yield model
+    set_local_classifier(None)
+
+
+class TestTokenize:
+    """Tests para la función tokenize."""
+
+    def test_strips_accents_and_case(self):
+        """Debe tratar igual las palabras con y sin acento."""
+        assert tokenize("FACTURACIÓN") == tokenize("facturacion")
+
+    def test_adds_prefixes_for_long_words(self):
+        """Debe agregar el prefijo de las palabras largas."""
+        assert "cobra~" in tokenize("cobraron")
+
+
+class TestLocalClassifier:
+    """Tests para el entrenamiento y la predicción local."""
+
+    def test_predicts_trained_labels_with_high_confidence(self, classifier):
+        """Debe reconocer con confianza textos parecidos a los de entrenamiento."""
+        prediction = classifier.predict("me cobraron doble la factura")
+
+        assert prediction.category == "facturación"
+        assert prediction.sentiment == "negativo"
+        assert prediction.confidence > 0.9
+
+    def test_unknown_text_has_low_confidence(self, classifier):
+        """Un texto sin términos conocidos no debe superar el umbral."""
+        assert classifier.predict("xyz").confidence < 0.9
+
+    def test_ignores_rows_with_invalid_labels(self):
+        """Debe descartar filas con etiquetas fuera de CATEGORIES o SENTIMENTS."""
+        model = LocalClassifier.train(TRAINING_ROWS + [
+            {"description": "algo", "category": "inventada", "sentiment": "negativo"}
+        ])
+
+        assert model.samples == len(TRAINING_ROWS)
+        assert "inventada" not in model.category_model.labels
+
+    def test_train_without_rows_raises(self):
+        with pytest.raises(ValueError):
+            LocalClassifier.train([])
+
+    def test_train_with_single_label_raises(self):
+        """Con una sola categoría la confianza sería siempre 1 y todo evitaría el LLM."""
+        rows = [dict(row, category="facturación") for row in TRAINING_ROWS]
+
+        with pytest.raises(ValueError, match="dos categorías"):
+            LocalClassifier.train(rows)
+
+    def test_save_and_load_round_trip(self, classifier, tmp_path):
+        """El modelo guardado debe predecir lo mismo al cargarse."""
+        path = str(tmp_path / "modelo.json")
+        classifier.save(path)
+
+        loaded = LocalClassifier.load(path)
+
+        assert loaded.predict("quiero comprar el plan") == classifier.predict("quiero comprar el plan")
+
+
+class TestClassifyLocally:
+    """Tests para el umbral de confianza y su integración con analyze_ticket."""
+
+    def test_returns_none_without_classifier(self):
+        assert classify_locally("Me cobraron doble") is None
+
+    def test_low_confidence_is_delegated(self, classifier):
+        """Por debajo del umbral debe delegar en el LLM."""
+        assert classify_locally("xyz") is None
+        assert fast_path_stats.stats()["delegated"] == 1
+
+    @patch("app.services.ai_service.get_http_client")
+    async def test_confident_ticket_skips_llm(self, mock_get_client, classifier):
+        """Un ticket con confianza suficiente no debe llamar al LLM."""
+        mock_client = MagicMock()
+        mock_client.post = AsyncMock()
+        mock_get_client.return_value = mock_client
+
+        result = await analyze_ticket("Me cobraron doble en la factura")
+
+        assert result == {"category": "facturación", "sentiment": "negativo"}
+        mock_client.post.assert_not_called()
+        assert fast_path_stats.stats()["local"] == 1
+
+    @patch("app.services.ai_service.get_http_client")
+    async def test_bypass_cache_skips_local_classifier(self, mock_get_client, classifier):
+        """Con use_cache=False siempre debe llamar al LLM."""
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {"choices": []}
+        mock_client = MagicMock()
+        mock_client.post = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value = mock_client
+
+        await analyze_ticket("Me cobraron doble en la factura", use_cache=False)
+
+        assert mock_client.post.await_count == 1
+
+    @patch("app.services.ai_service.request_analysis")
+    async def test_open_circuit_falls_back_without_caching(self, mock_request, classifier):
+        """Con el circuito abierto debe usar la estimación local sin cachearla."""
+        mock_request.side_effect = CircuitOpenError(30.0)
+
+        result = await analyze_ticket("xyz")
+
+        assert result["category"] in ("facturación", "soporte técnico")
+        assert fast_path_stats.stats()["fallback"] == 1
+        assert get_analysis_cache().stats()["size"] == 0
+
+    @patch("app.services.ai_service.request_analysis")
+    async def test_open_circuit_without_classifier_raises(self, mock_request):
+        mock_request.side_effect = CircuitOpenError(30.0)
+
+        with pytest.raises(CircuitOpenError):
+            await analyze_ticket("xyz")
+
+
+class TestInitLocalClassifier:
+    """Tests para la carga del clasificador al arrancar."""
+
+    @patch("app.services.local_classifier.get_settings")
+    async def test_disabled_by_default(self, mock_settings):
+        mock_settings.return_value = MagicMock(local_classifier_enabled=False)
+
+        assert await init_local_classifier() is None
+
+    @patch("app.services.local_classifier.list_classified_tickets")
+    @patch("app.services.local_classifier.get_settings")
+    async def test_trains_and_saves_model(self, mock_settings, mock_list, tmp_path):
+        """Sin modelo guardado debe entrenar con Supabase y guardarlo."""
+        path = tmp_path / "modelo.json"
+        mock_settings.return_value = MagicMock(
+            local_classifier_enabled=True,
+            local_classifier_path=str(path),
+            local_classifier_training_rows=1000,
+            local_classifier_min_samples=10
+        )
+        mock_list.return_value = TRAINING_ROWS
+
+        try:
+            classifier = await init_local_classifier()
+            assert classifier.samples == len(TRAINING_ROWS)
+            assert path.exists()
+        finally:
+            set_local_classifier(None)
+
+    @patch("app.services.local_classifier.list_classified_tickets")
+    @patch("app.services.local_classifier.get_settings")
+    async def test_too_few_samples_keeps_llm_only(self, mock_settings, mock_list):
+        """Con pocos tickets clasificados no debe activar el clasificador."""
+        mock_settings.return_value = MagicMock(
+            local_classifier_enabled=True,
+            local_classifier_path=None,
+            local_classifier_training_rows=1000,
+            local_classifier_min_samples=200
+        )
+        mock_list.return_value = TRAINING_ROWS
+
+        assert await init_local_classifier() is None
+
+    @patch("app.services.local_classifier.list_classified_tickets")
+    @patch("app.services.local_classifier.get_settings")
+    async def test_failure_does_not_raise(self, mock_settings, mock_list):
+        """Un fallo al entrenar no debe impedir arrancar."""
+        mock_settings.return_value = MagicMock(local_classifier_enabled=True, local_classifier_path=None)
+        mock_list.side_effect = Exception("Supabase caído")
+
+        assert await init_local_classifier() is None
@@ -0,0 +1,150 @@
+import asyncio
+import email
+import pytest
+from email.policy import default as default_policy
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.job_queue import PermanentJobError
+from app.services.notifier import (
+    ALERT_SUBJECT,
+    LogNotifier,
+    SmtpNotifier,
+    dispatch_negative_alert,
+    get_notifier,
+    negative_alert_job,
+    set_notifier
+)
+
+TICKET = {
+    "id": "t1",
+    "description": "Llevo una semana sin servicio <y nadie responde>",
+    "category": "quejas",
+    "sentiment": "negativo"
+}
+
+
+class LocalSmtpServer:
+    """Servidor SMTP mínimo en memoria que guarda los mensajes recibidos."""
+
+    def __init__(self, reject_recipients: bool = False):
+        self.reject_recipients = reject_recipients
+        self.messages: list[dict] = []
+        self.server: asyncio.AbstractServer | None = None
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    async def __aenter__(self) -> "LocalSmtpServer":
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        envelope = {"from": None, "to": [], "data": b""}
+
+        def reply(line: str) -> None:
+            writer.write(line.encode() + b"\r\n")
+
+        reply("220 localhost SMTP de prueba")
+        while line := await reader.readline():
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                reply("250 localhost")
+            elif verb == "MAIL":
+                envelope["from"] = command.split(":", 1)[1].strip(" <>")
+                reply("250 OK")
+            elif verb == "RCPT":
+                if self.reject_recipients:
+                    reply("550 Buzón inexistente")
+                else:
+                    envelope["to"].append(command.split(":", 1)[1].strip(" <>"))
+                    reply("250 OK")
+            elif verb == "DATA":
+                reply("354 Fin con <CRLF>.<CRLF>")
+                await writer.drain()
+                envelope["data"] = await reader.readuntil(b"\r\n.\r\n")
+                self.messages.append(dict(envelope))
+                reply("250 OK")
+            elif verb == "QUIT":
+                reply("221 Adiós")
+                await writer.drain()
+                break
+            else:
+                reply("250 OK")
+            await writer.drain()
+        writer.close()
+
+
+class TestSmtpNotifier:
+    """Tests del envío de alertas contra un servidor SMTP local."""
+
+    async def test_sends_alert_email(self):
+        async with LocalSmtpServer() as server:
+            notifier = SmtpNotifier("127.0.0.1", server.port, "alertas@ejemplo.com", ["soporte@ejemplo.com"])
+            await notifier.notify(TICKET)
+
+        assert len(server.messages) == 1
+        envelope = server.messages[0]
+        assert envelope["from"] == "alertas@ejemplo.com"
+        assert envelope["to"] == ["soporte@ejemplo.com"]
+
+        message = email.message_from_bytes(envelope["data"][:-5], policy=default_policy)
+        assert message["Subject"] == ALERT_SUBJECT
+        assert "ID del Ticket: t1" in message.get_body(("plain",)).get_content()
+        assert "&lt;y nadie responde&gt;" in message.get_body(("html",)).get_content()
+
+    async def test_rejected_recipient_is_permanent(self):
+        """Un 5xx del servidor no se arregla reintentando."""
+        async with LocalSmtpServer(reject_recipients=True) as server:
+            notifier = SmtpNotifier("127.0.0.1", server.port, "alertas@ejemplo.com", ["nadie@ejemplo.com"])
+            with pytest.raises(PermanentJobError):
+                await notifier.notify(TICKET)
+
+    async def test_without_recipients_is_permanent(self):
+        with pytest.raises(PermanentJobError):
+            await SmtpNotifier("127.0.0.1", 25, "alertas@ejemplo.com", []).notify(TICKET)
+
+
+class TestNegativeAlerts:
+    """Tests para el despacho de alertas por la cola de trabajos."""
+
+    def setup_method(self):
+        set_notifier(None)
+
+    def teardown_method(self):
+        set_notifier(None)
+
+    def test_default_notifier_is_log(self):
+        assert isinstance(get_notifier(), LogNotifier)
+
+    def test_unknown_notifier_is_rejected(self):
+        settings = MagicMock(alert_notifier="paloma")
+        with patch("app.services.notifier.get_settings", return_value=settings):
+            with pytest.raises(ValueError):
+                get_notifier()
+
+    @patch("app.services.notifier.get_job_queue")
+    async def test_dispatch_enqueues_one_alert_per_ticket(self, mock_get_queue):
+        mock_get_queue.return_value.enqueue = AsyncMock(return_value={"id": "job-1"})
+
+        await dispatch_negative_alert({**TICKET, "processed": True})
+
+        kind, payload = mock_get_queue.return_value.enqueue.await_args.args
+        assert kind == "negative_alert"
+        assert payload["ticket"]["id"] == "t1"
+        assert "processed" not in payload["ticket"]
+        assert mock_get_queue.return_value.enqueue.await_args.kwargs["dedupe_key"] == "negative_alert:t1"
+
+    async def test_job_uses_configured_notifier(self):
+        notifier = LogNotifier()
+        notifier.notify = AsyncMock()
+        set_notifier(notifier)
+
+        result = await negative_alert_job({"ticket": TICKET})
+
+        notifier.notify.assert_awaited_once_with(TICKET)
+        assert result == {"notifier": "log"}
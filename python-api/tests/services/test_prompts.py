@@ -0,0 +1,49 @@
+import pytest
+from unittest.mock import patch
+from app.core.config import get_settings
+from app.services.prompts import ANALYSIS_PROMPT, SYSTEM_PROMPT, PromptTemplate, prompt_version, render_batch
+
+
+class TestPromptTemplate:
+    """Tests para las plantillas de prompt."""
+
+    def test_render_inserts_value(self):
+        template = PromptTemplate("prueba", SYSTEM_PROMPT, 'Ticket: "{input}" fin')
+
+        assert template.render("hola") == 'Ticket: "hola" fin'
+
+    def test_placeholder_required_once(self):
+        with pytest.raises(ValueError):
+            PromptTemplate("sin", SYSTEM_PROMPT, "Ticket")
+        with pytest.raises(ValueError):
+            PromptTemplate("doble", SYSTEM_PROMPT, "{input} {input}")
+
+    def test_version_changes_with_content(self):
+        first = PromptTemplate("prueba", SYSTEM_PROMPT, "A {input}")
+        same = PromptTemplate("prueba", SYSTEM_PROMPT, "A {input}")
+        edited = PromptTemplate("prueba", SYSTEM_PROMPT, "B {input}")
+
+        assert first.version == same.version
+        assert first.version != edited.version
+        assert first.version.startswith("prueba-")
+
+    def test_analysis_prompt_lists_categories(self):
+        prompt = ANALYSIS_PROMPT.render("No funciona")
+
+        assert 'Ticket: "No funciona"' in prompt
+        assert "facturación" in prompt and "negativo" in prompt
+
+    def test_render_batch_indexes_tickets(self):
+        prompt = render_batch(["uno", 'dos "citado"'])
+
+        assert '[0] "uno"' in prompt
+        assert '[1] "dos \\"citado\\""' in prompt
+
+
+class TestPromptVersion:
+    def test_includes_trimming_settings(self):
+        before = prompt_version()
+
+        with patch.object(get_settings(), "ticket_max_tokens", 50):
+            assert prompt_version() != before
+        assert ANALYSIS_PROMPT.version in before
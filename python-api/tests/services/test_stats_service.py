@@ -0,0 +1,127 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from unittest.mock import patch, MagicMock, AsyncMock
+from zoneinfo import ZoneInfo
+from app.services.stats_service import StatsCache, fetch_stats, fetch_trends, trends_range
+
+UTC = ZoneInfo("UTC")
+
+
+def rpc_client(data: list[dict]) -> MagicMock:
+    client = MagicMock()
+    client.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data=data))
+    return client
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestFetchStats:
+    """Tests para los totales del dashboard."""
+
+    @patch("app.services.stats_service.get_supabase_client")
+    async def test_sums_aggregate_rows(self, mock_get_client):
+        mock_get_client.return_value = rpc_client([
+            {"category": "", "sentiment": "", "processed": False, "tickets": 4},
+            {"category": "ventas", "sentiment": "positivo", "processed": True, "tickets": 3},
+            {"category": "quejas", "sentiment": "negativo", "processed": True, "tickets": 2},
+            {"category": "ventas", "sentiment": "negativo", "processed": True, "tickets": 1}
+        ])
+
+        stats = await fetch_stats()
+
+        assert (stats["total"], stats["pending"], stats["processed"], stats["negative"]) == (10, 4, 6, 3)
+        assert stats["by_category"] == {"ventas": 4, "quejas": 2}
+        assert stats["by_sentiment"] == {"positivo": 3, "negativo": 3}
+        assert stats["by_category_sentiment"]["ventas"] == {"positivo": 3, "negativo": 1}
+        mock_get_client.return_value.rpc.assert_called_once_with("ticket_stats_totals", {})
+
+
+class TestTrends:
+    def test_default_range_covers_current_bucket(self):
+        now = datetime(2024, 5, 10, 15, 30, tzinfo=timezone.utc)
+
+        since, until = trends_range("day", None, None, UTC, now=now)
+
+        assert since == datetime(2024, 5, 4, tzinfo=timezone.utc)
+        assert until == datetime(2024, 5, 11, tzinfo=timezone.utc)
+
+    @patch("app.services.stats_service.get_supabase_client")
+    async def test_fills_empty_buckets(self, mock_get_client):
+        mock_get_client.return_value = rpc_client([
+            {"bucket": "2024-05-02T00:00:00+00:00", "cells": [["ventas", "negativo", True, 2], ["", "", False, 1]]}
+        ])
+        since, until = trends_range("day", datetime(2024, 5, 1, tzinfo=UTC), datetime(2024, 5, 4, tzinfo=UTC), UTC)
+
+        trends = await fetch_trends("day", since, until, UTC)
+
+        assert [point["total"] for point in trends["points"]] == [0, 3, 0]
+        point = trends["points"][1]
+        assert point["start"] == "2024-05-02T00:00:00+00:00"
+        assert (point["processed"], point["pending"], point["negative"]) == (2, 1, 2)
+        assert point["by_category"] == {"ventas": 2}
+
+    @patch("app.services.stats_service.get_supabase_client")
+    async def test_days_follow_local_time(self, mock_get_client):
+        madrid = ZoneInfo("Europe/Madrid")
+        mock_get_client.return_value = rpc_client([
+            {"bucket": "2024-03-31T22:00:00+00:00", "cells": [["otros", "neutro", True, 5]]}
+        ])
+        since, until = trends_range("day", datetime(2024, 3, 31, tzinfo=madrid), datetime(2024, 4, 2, tzinfo=madrid), madrid)
+
+        trends = await fetch_trends("day", since, until, madrid)
+
+        assert [point["start"] for point in trends["points"]] == [
+            "2024-03-31T00:00:00+01:00",
+            "2024-04-01T00:00:00+02:00"
+        ]
+        assert trends["points"][1]["total"] == 5
+        assert mock_get_client.return_value.rpc.call_args.args[1]["p_tz"] == "Europe/Madrid"
+
+
+class TestStatsCache:
+    async def test_reuses_entry_until_ttl(self):
+        clock = FakeClock()
+        cache = StatsCache(ttl=10, clock=clock)
+        compute = AsyncMock(return_value={"total": 1})
+
+        first = await cache.get("stats", compute)
+        clock.now = 5
+        second = await cache.get("stats", compute)
+        clock.now = 11
+        third = await cache.get("stats", compute)
+
+        assert first is second
+        assert compute.await_count == 2
+        assert json.loads(third.body) == {"total": 1}
+        assert third.etag == first.etag
+
+    async def test_etag_changes_with_content(self):
+        cache = StatsCache(ttl=10)
+
+        first = await cache.get("stats", AsyncMock(return_value={"total": 1}))
+        cache.clear()
+        second = await cache.get("stats", AsyncMock(return_value={"total": 2}))
+
+        assert first.etag != second.etag
+
+    async def test_concurrent_refreshes_share_one_query(self):
+        cache = StatsCache(ttl=10)
+        calls = 0
+
+        async def compute() -> dict:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"total": calls}
+
+        results = await asyncio.gather(*(cache.get("stats", compute) for _ in range(5)))
+
+        assert calls == 1
+        assert len({result.etag for result in results}) == 1
@@ -0,0 +1,59 @@
+from app.services.stream_parser import JsonObjectScanner, AnalysisStreamParser, sse_delta, SSE_DONE
+
+
+def feed_in_pieces(scanner: JsonObjectScanner, text: str, size: int) -> list[str]:
+    completed = []
+    for start in range(0, len(text), size):
+        completed.extend(scanner.feed(text[start:start + size]))
+    return completed
+
+
+class TestJsonObjectScanner:
+    """Tests para la detección incremental de objetos JSON."""
+
+    def test_detects_object_split_across_chunks(self):
+        text = 'Claro: {"category": "ventas", "sentiment": "positivo"} y algo más'
+
+        for size in (1, 3, 7, len(text)):
+            assert feed_in_pieces(JsonObjectScanner(), text, size) == [
+                '{"category": "ventas", "sentiment": "positivo"}'
+            ]
+
+    def test_ignores_braces_inside_strings(self):
+        text = '{"category": "otros", "nota": "usa } y { y \\" escapadas"}'
+
+        assert feed_in_pieces(JsonObjectScanner(), text, 2) == [text]
+
+    def test_nested_objects_complete_at_top_level(self):
+        text = '{"a": {"b": 1}, "c": 2}{"d": 3}'
+
+        assert feed_in_pieces(JsonObjectScanner(), text, 4) == ['{"a": {"b": 1}, "c": 2}', '{"d": 3}']
+
+    def test_incomplete_object_is_not_emitted(self):
+        assert JsonObjectScanner().feed('{"category": "ventas"') == []
+
+
+class TestAnalysisStreamParser:
+    def test_returns_first_object_with_both_fields(self):
+        parser = AnalysisStreamParser()
+
+        assert parser.feed('{"paso": 1} ') is None
+        assert parser.feed('{"category": "quejas", ') is None
+        match = parser.feed('"sentiment": "negativo"} sigue...')
+
+        assert match == '{"category": "quejas", "sentiment": "negativo"}'
+        assert parser.match == match
+
+
+class TestSseDelta:
+    def test_extracts_content(self):
+        line = 'data: {"choices": [{"delta": {"content": "{\\"cat"}}]}'
+
+        assert sse_delta(line) == '{"cat'
+
+    def test_done_and_noise(self):
+        assert sse_delta("data: [DONE]") == SSE_DONE
+        assert sse_delta("") is None
+        assert sse_delta(": keep-alive") is None
+        assert sse_delta('data: {"choices": [{"delta": {"role": "assistant"}}]}') is None
+        assert sse_delta("data: no-es-json") is None
@@ -0,0 +1,55 @@
+from unittest.mock import patch
+from app.services.ticket_events import (
+    TICKET_CREATED,
+    TICKET_PROCESSED,
+    get_event_broker,
+    handle_postgres_change,
+    publish_local
+)
+
+
+def published() -> list[tuple[str, dict]]:
+    return [(event.type, event.data) for event in get_event_broker().history]
+
+
+class TestHandlePostgresChange:
+    """Tests para la traducción de cambios de Supabase Realtime a eventos."""
+
+    def test_insert_publishes_created(self):
+        handle_postgres_change({"data": {"type": "INSERT", "record": {"id": "t1", "processed": False, "extra": 1}}})
+
+        assert published() == [(TICKET_CREATED, {"id": "t1", "processed": False})]
+
+    def test_update_to_processed_publishes_processed(self):
+        record = {"id": "t1", "category": "ventas", "sentiment": "positivo", "processed": True}
+        handle_postgres_change({"data": {"type": "UPDATE", "record": record, "old_record": {"id": "t1"}}})
+
+        assert published() == [(TICKET_PROCESSED, record)]
+
+    def test_other_changes_are_ignored(self):
+        """Un ticket que sigue pendiente o que ya estaba procesado no genera evento."""
+        handle_postgres_change({"data": {"type": "UPDATE", "record": {"id": "t1", "processed": False}}})
+        handle_postgres_change({"data": {
+            "type": "UPDATE",
+            "record": {"id": "t1", "processed": True},
+            "old_record": {"id": "t1", "processed": True}
+        }})
+        handle_postgres_change({"data": {"type": "DELETE", "old_record": {"id": "t1"}}})
+
+        assert published() == []
+
+
+class TestPublishLocal:
+    """Tests para la publicación de las escrituras hechas por esta API."""
+
+    def test_publishes_each_row(self):
+        publish_local(TICKET_CREATED, [{"id": "t1"}, {"id": "t2"}])
+
+        assert published() == [(TICKET_CREATED, {"id": "t1"}), (TICKET_CREATED, {"id": "t2"})]
+
+    def test_skipped_while_realtime_subscription_is_active(self):
+        """Con la suscripción activa, la misma escritura ya llega por Realtime."""
+        with patch("app.services.ticket_events._channel", object()):
+            publish_local(TICKET_CREATED, [{"id": "t1"}])
+
+        assert published() == []
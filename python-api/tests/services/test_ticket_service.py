@@ -1,13 +1,24 @@
 import pytest
-from unittest.mock import patch, MagicMock
-from app.services.ticket_service import get_ticket_by_id, update_ticket
+from unittest.mock import patch, MagicMock, AsyncMock
+from app.services.ticket_service import (
+    get_ticket_by_id,
+    update_ticket,
+    list_unprocessed_tickets,
+    list_classified_tickets,
+    bulk_create_tickets,
+    bulk_update_classifications,
+    decode_cursor,
+    encode_cursor,
+    list_tickets
+)
+from app.services.ticket_events import TICKET_PROCESSED, get_event_broker
 
 
 class TestGetTicketById:
     """Tests para la función get_ticket_by_id."""
 
     @patch("app.services.ticket_service.get_supabase_client")
-    def test_get_existing_ticket(self, mock_get_client):
+    async def test_get_existing_ticket(self, mock_get_client):
         """Debe retornar el ticket si existe."""
         sample_ticket = {
             "id": "550e8400-e29b-41d4-a716-446655440000",
@@ -22,39 +33,39 @@ class TestGetTicketById:
         mock_response = MagicMock()
         mock_response.data = [sample_ticket]
 
-        mock_client.table.return_value.select.return_value.eq.return_value.execute.return_value = mock_response
+        mock_client.table.return_value.select.return_value.eq.return_value.execute = AsyncMock(return_value=mock_response)
         mock_get_client.return_value = mock_client
 
-        result = get_ticket_by_id("550e8400-e29b-41d4-a716-446655440000")
+        result = await get_ticket_by_id("550e8400-e29b-41d4-a716-446655440000")
 
         assert result == sample_ticket
         mock_client.table.assert_called_with("tickets")
 
     @patch("app.services.ticket_service.get_supabase_client")
-    def test_get_nonexistent_ticket_returns_none(self, mock_get_client):
+    async def test_get_nonexistent_ticket_returns_none(self, mock_get_client):
         """Debe retornar None si el ticket no existe."""
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.data = []
 
-        mock_client.table.return_value.select.return_value.eq.return_value.execute.return_value = mock_response
+        mock_client.table.return_value.select.return_value.eq.return_value.execute = AsyncMock(return_value=mock_response)
         mock_get_client.return_value = mock_client
 
-        result = get_ticket_by_id("nonexistent-id")
+        result = await get_ticket_by_id("nonexistent-id")
 
         assert result is None
 
     @patch("app.services.ticket_service.get_supabase_client")
-    def test_get_ticket_with_none_data_returns_none(self, mock_get_client):
+    async def test_get_ticket_with_none_data_returns_none(self, mock_get_client):
         """Debe retornar None si response.data es None."""
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.data = None
 
-        mock_client.table.return_value.select.return_value.eq.return_value.execute.return_value = mock_response
+        mock_client.table.return_value.select.return_value.eq.return_value.execute = AsyncMock(return_value=mock_response)
         mock_get_client.return_value = mock_client
 
-        result = get_ticket_by_id("some-id")
+        result = await get_ticket_by_id("some-id")
 
         assert result is None
 
@@ -63,7 +74,7 @@ class TestUpdateTicket:
     """Tests para la función update_ticket."""
 
     @patch("app.services.ticket_service.get_supabase_client")
-    def test_update_ticket_success(self, mock_get_client):
+    async def test_update_ticket_success(self, mock_get_client):
         """Debe actualizar el ticket correctamente."""
         updated_ticket = {
             "id": "550e8400-e29b-41d4-a716-446655440000",
@@ -76,10 +87,10 @@ class TestUpdateTicket:
         mock_response = MagicMock()
         mock_response.data = [updated_ticket]
 
-        mock_client.table.return_value.update.return_value.eq.return_value.execute.return_value = mock_response
+        mock_client.table.return_value.update.return_value.eq.return_value.execute = AsyncMock(return_value=mock_response)
         mock_get_client.return_value = mock_client
 
-        result = update_ticket(
+        result = await update_ticket(
             ticket_id="550e8400-e29b-41d4-a716-446655440000",
             category="facturación",
             sentiment="negativo"
@@ -93,17 +104,17 @@ class TestUpdateTicket:
         })
 
     @patch("app.services.ticket_service.get_supabase_client")
-    def test_update_ticket_not_found_raises_exception(self, mock_get_client):
+    async def test_update_ticket_not_found_raises_exception(self, mock_get_client):
         """Debe lanzar excepción si el ticket no se puede actualizar."""
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.data = []
 
-        mock_client.table.return_value.update.return_value.eq.return_value.execute.return_value = mock_response
+        mock_client.table.return_value.update.return_value.eq.return_value.execute = AsyncMock(return_value=mock_response)
         mock_get_client.return_value = mock_client
 
         with pytest.raises(Exception) as exc_info:
-            update_ticket(
+            await update_ticket(
                 ticket_id="nonexistent-id",
                 category="otros",
                 sentiment="neutro"
@@ -112,18 +123,251 @@ class TestUpdateTicket:
         assert "No se pudo actualizar el ticket" in str(exc_info.value)
 
     @patch("app.services.ticket_service.get_supabase_client")
-    def test_update_ticket_with_none_data_raises_exception(self, mock_get_client):
+    async def test_update_ticket_with_none_data_raises_exception(self, mock_get_client):
         """Debe lanzar excepción si response.data es None."""
         mock_client = MagicMock()
         mock_response = MagicMock()
         mock_response.data = None
 
-        mock_client.table.return_value.update.return_value.eq.return_value.execute.return_value = mock_response
+        mock_client.table.return_value.update.return_value.eq.return_value.execute = AsyncMock(return_value=mock_response)
         mock_get_client.return_value = mock_client
 
         with pytest.raises(Exception):
-            update_ticket(
+            await update_ticket(
                 ticket_id="some-id",
                 category="otros",
                 sentiment="neutro"
             )
+
+
+class TestListUnprocessedTickets:
+    """Tests para la función list_unprocessed_tickets."""
+
+    @patch("app.services.ticket_service.get_supabase_client")
+    async def test_first_page_has_no_cursor_filter(self, mock_get_client):
+        """La primera página no debe filtrar por cursor."""
+        mock_client = MagicMock()
+        query = mock_client.table.return_value.select.return_value.not_.is_.return_value.order.return_value.order.return_value.limit.return_value
+        query.execute = AsyncMock(return_value=MagicMock(data=[{"id": "a"}]))
+        mock_get_client.return_value = mock_client
+
+        result = await list_unprocessed_tickets(100)
+
+        assert result == [{"id": "a"}]
+        query.or_.assert_not_called()
+
+    @patch("app.services.ticket_service.get_supabase_client")
+    async def test_next_page_uses_keyset_filter(self, mock_get_client):
+        """Las páginas siguientes deben pedir filas posteriores a (created_at, id)."""
+        mock_client = MagicMock()
+        query = mock_client.table.return_value.select.return_value.not_.is_.return_value.order.return_value.order.return_value.limit.return_value
+        query.or_.return_value.execute = AsyncMock(return_value=MagicMock(data=[]))
+        mock_get_client.return_value = mock_client
+
+        await list_unprocessed_tickets(100, {"created_at": "2024-01-01T00:00:00+00:00", "id": "abc"})
+
+        query.or_.assert_called_once_with(
+            'created_at.gt."2024-01-01T00:00:00+00:00",'
+            'and(created_at.eq."2024-01-01T00:00:00+00:00",id.gt.abc)'
+        )
+
+
+class RecordingQuery:
+    """Query de PostgREST falsa que registra los métodos encadenados."""
+
+    def __init__(self, data: list[dict]):
+        self.calls: list[tuple] = []
+        self.data = data
+
+    def __getattr__(self, name: str):
+        def method(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return method
+
+    @property
+    def not_(self):
+        self.calls.append(("not_", (), {}))
+        return self
+
+    async def execute(self):
+        return MagicMock(data=self.data)
+
+
+class TestListTickets:
+    """Tests para la función list_tickets."""
+
+    @patch("app.services.ticket_service.get_supabase_client")
+    async def test_sparse_columns_and_filters(self, mock_get_client):
+        query = RecordingQuery([{"id": "a"}])
+        mock_get_client.return_value = MagicMock(**{"table.return_value": query})
+
+        result = await list_tickets(
+            21,
+            fields=["category"],
+            category="ventas",
+            processed=False,
+            created_from="2024-01-01T00:00:00+00:00"
+        )
+
+        assert result == [{"id": "a"}]
+        assert query.calls[0] == ("select", ("id", "created_at", "category"), {})
+        assert ("eq", ("category", "ventas"), {}) in query.calls
+        assert ("is_", ("processed", "true"), {}) in query.calls
+        assert ("gte", ("created_at", "2024-01-01T00:00:00+00:00"), {}) in query.calls
+        assert query.calls[-3:] == [
+            ("order", ("created_at",), {"desc": True}),
+            ("order", ("id",), {"desc": True}),
+            ("limit", (21,), {})
+        ]
+
+    @patch("app.services.ticket_service.get_supabase_client")
+    async def test_descending_keyset(self, mock_get_client):
+        query = RecordingQuery([])
+        mock_get_client.return_value = MagicMock(**{"table.return_value": query})
+
+        await list_tickets(10, after={"created_at": "2024-01-01T00:00:00+00:00", "id": "abc"})
+
+        assert ("or_", (
+            'created_at.lt."2024-01-01T00:00:00+00:00",'
+            'and(created_at.eq."2024-01-01T00:00:00+00:00",id.lt.abc)',
+        ), {}) in query.calls
+        assert query.calls[0][1] == ("id", "created_at", "description", "category", "sentiment", "processed")
+
+
+class TestCursor:
+    def test_round_trip(self):
+        row = {"id": "550e8400-e29b-41d4-a716-446655440000", "created_at": "2024-01-01T00:00:00.123+00:00"}
+
+        assert decode_cursor(encode_cursor(row)) == {"created_at": row["created_at"], "id": row["id"]}
+
+    def test_invalid_cursor_raises(self):
+        for cursor in ("???", "bm9wZQ", encode_cursor({"id": 1, "created_at": "x"})):
+            with pytest.raises(ValueError):
+                decode_cursor(cursor)
+
+
+class TestBulkCreateTickets:
+    """Tests para la función bulk_create_tickets."""
+
+    @patch("app.services.ticket_service.get_supabase_client")
+    async def test_inserts_one_request_per_chunk(self, mock_get_client):
+        """Debe enviar un INSERT multi-fila por bloque."""
+        tickets = [{"description": f"Ticket {i}"} for i in range(5)]
+        mock_client = MagicMock()
+        insert = mock_client.table.return_value.insert
+        insert.return_value.execute = AsyncMock(side_effect=[
+            MagicMock(data=[{"id": "a"}, {"id": "b"}]),
+            MagicMock(data=[{"id": "c"}, {"id": "d"}]),
+            MagicMock(data=[{"id": "e"}])
+        ])
+        mock_get_client.return_value = mock_client
+
+        result = await bulk_create_tickets(tickets, chunk_size=2)
+
+        assert [row["id"] for row in result["created"]] == ["a", "b", "c", "d", "e"]
+        assert result["failed"] == []
+        assert insert.call_count == 3
+        assert insert.call_args_list[0].args[0] == tickets[:2]
+
+    @patch("app.services.ticket_service.get_supabase_client")
+    async def test_failed_chunk_reports_row_positions(self, mock_get_client):
+        """Si un bloque falla, debe reportar la posición de cada fila y seguir."""
+        tickets = [{"description": f"Ticket {i}"} for i in range(4)]
+        mock_client = MagicMock()
+        mock_client.table.return_value.insert.return_value.execute = AsyncMock(side_effect=[
+            Exception("violación de restricción"),
+            MagicMock(data=[{"id": "c"}, {"id": "d"}])
+        ])
+        mock_get_client.return_value = mock_client
+
+        result = await bulk_create_tickets(tickets, chunk_size=2)
+
+        assert [row["id"] for row in result["created"]] == ["c", "d"]
+        assert [failure["index"] for failure in result["failed"]] == [0, 1]
+        assert "violación" in result["failed"][0]["error"]
+
+    async def test_empty_list_skips_database(self):
+        """Sin filas no debe llamar a la base de datos."""
+        assert await bulk_create_tickets([]) == {"created": [], "failed": []}
+
+
+class TestBulkUpdateClassifications:
+    """Tests para la función bulk_update_classifications."""
+
+    @patch("app.services.ticket_service.get_supabase_client")
+    async def test_updates_in_one_rpc_call_per_chunk(self, mock_get_client):
+        """Debe enviar una llamada RPC por bloque."""
+        rows = [
+            {"id": "a", "category": "ventas", "sentiment": "neutro"},
+            {"id": "b", "category": "quejas", "sentiment": "negativo"},
+            {"id": "c", "category": "otros", "sentiment": "neutro"}
+        ]
+        mock_client = MagicMock()
+        mock_client.rpc.return_value.execute = AsyncMock(side_effect=[
+            MagicMock(data=[{"id": "a"}, {"id": "b"}]),
+            MagicMock(data=[{"id": "c"}])
+        ])
+        mock_get_client.return_value = mock_client
+
+        result = await bulk_update_classifications(rows, chunk_size=2)
+
+        assert result == {"updated": ["a", "b", "c"], "failed": []}
+        mock_client.rpc.assert_any_call("bulk_update_classifications", {"payload": rows[:2]})
+
+    @patch("app.services.ticket_service.get_supabase_client")
+    async def test_publishes_processed_event_per_updated_ticket(self, mock_get_client):
+        """Solo los tickets actualizados deben publicarse como procesados."""
+        rows = [
+            {"id": "a", "category": "ventas", "sentiment": "neutro"},
+            {"id": "x", "category": "quejas", "sentiment": "negativo"}
+        ]
+        mock_client = MagicMock()
+        mock_client.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data=[{"id": "a"}]))
+        mock_get_client.return_value = mock_client
+
+        await bulk_update_classifications(rows)
+
+        events = [(event.type, event.data) for event in get_event_broker().history]
+        assert events == [(TICKET_PROCESSED, {**rows[0], "processed": True})]
+
+    @patch("app.services.ticket_service.get_supabase_client")
+    async def test_missing_ids_are_reported_as_failed(self, mock_get_client):
+        """Los IDs que no devuelve la base de datos deben reportarse."""
+        rows = [
+            {"id": "a", "category": "ventas", "sentiment": "neutro"},
+            {"id": "x", "category": "quejas", "sentiment": "negativo"}
+        ]
+        mock_client = MagicMock()
+        mock_client.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data=[{"id": "a"}]))
+        mock_get_client.return_value = mock_client
+
+        result = await bulk_update_classifications(rows)
+
+        assert result["updated"] == ["a"]
+        assert result["failed"][0]["id"] == "x"
+
+    async def test_empty_list_skips_database(self):
+        """Sin filas no debe llamar a la base de datos."""
+        assert await bulk_update_classifications([]) == {"updated": [], "failed": []}
+
+
+class TestListClassifiedTickets:
+    """Tests para la función list_classified_tickets."""
+
+    @patch("app.services.ticket_service.get_supabase_client")
+    async def test_returns_labeled_rows(self, mock_get_client):
+        """Debe pedir solo tickets procesados con categoría y sentimiento."""
+        rows = [{"description": "Me cobraron doble", "category": "facturación", "sentiment": "negativo"}]
+        mock_client = MagicMock()
+        select = mock_client.table.return_value.select
+        ordered = select.return_value.eq.return_value.not_.is_.return_value.not_.is_.return_value.order.return_value
+        query = ordered.limit.return_value
+        query.execute = AsyncMock(return_value=MagicMock(data=rows))
+        mock_get_client.return_value = mock_client
+
+        result = await list_classified_tickets(500)
+
+        assert result == rows
+        select.return_value.eq.assert_called_once_with("processed", True)
+        ordered.limit.assert_called_once_with(500)
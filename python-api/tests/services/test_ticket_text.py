@@ -0,0 +1,82 @@
+from app.services.ticket_text import (
+    CHARS_PER_TOKEN,
+    TRIM_MARKER,
+    collapse_whitespace,
+    fit_token_budget,
+    prepare_ticket_text,
+    strip_replies
+)
+
+
+class TestStripReplies:
+    """Tests para la limpieza de hilos de correo."""
+
+    def test_cuts_quoted_thread(self):
+        text = (
+            "No puedo pagar la factura de mayo.\n\n"
+            "El lun, 3 may 2024 a las 10:00, Soporte <soporte@empresa.com> escribió:\n"
+            "> Hola, ¿en qué podemos ayudarle?\n"
+        )
+
+        assert strip_replies(text).strip() == "No puedo pagar la factura de mayo."
+
+    def test_cuts_outlook_headers_and_signature(self):
+        outlook = "Quiero devolver el pedido.\n\nDe: Ana\nEnviado: lunes\nPara: soporte\n\nTexto anterior"
+        signature = "La app se cierra al abrir.\n-- \nJuan Pérez\nGerente"
+
+        assert strip_replies(outlook).strip() == "Quiero devolver el pedido."
+        assert strip_replies(signature).strip() == "La app se cierra al abrir."
+
+    def test_drops_quoted_lines_and_mobile_footer(self):
+        text = "Sigue sin funcionar.\n> respuesta anterior\nEnviado desde mi iPhone"
+
+        assert strip_replies(text).strip() == "Sigue sin funcionar."
+
+    def test_keeps_ticket_without_own_text(self):
+        text = "-----Mensaje original-----\nNecesito una factura"
+
+        assert strip_replies(text) == text
+
+
+class TestFitTokenBudget:
+    def test_short_text_unchanged(self):
+        assert fit_token_budget("El pago fue rechazado", 100) == "El pago fue rechazado"
+        assert fit_token_budget("x" * 1000, 0) == "x" * 1000
+
+    def test_keeps_head_and_tail(self):
+        text = "inicio del problema " + "línea de log repetida " * 500 + "última petición del cliente"
+
+        trimmed = fit_token_budget(text, 100, head_ratio=0.7)
+
+        assert trimmed.startswith("inicio del problema")
+        assert trimmed.endswith("última petición del cliente")
+        assert TRIM_MARKER in trimmed
+        assert len(trimmed) <= 100 * CHARS_PER_TOKEN + len(TRIM_MARKER)
+
+    def test_cuts_at_word_boundaries(self):
+        text = " ".join(f"palabra{index}" for index in range(1000))
+
+        head, tail = fit_token_budget(text, 50).split(TRIM_MARKER)
+
+        assert all(word.startswith("palabra") and word[7:].isdigit() for word in head.split() + tail.split())
+
+
+class TestPrepareTicketText:
+    def test_collapses_whitespace(self):
+        assert collapse_whitespace("a   b\t c\r\n\r\n\r\n d ") == "a b c\n\nd"
+
+    def test_long_log_fits_budget(self):
+        text = "Error al pagar:\n" + "2024-05-01 ERROR conexión rechazada   id=1\n" * 2000 + "¿Pueden ayudarme?"
+
+        prepared = prepare_ticket_text(text, max_tokens=200)
+
+        assert prepared.startswith("Error al pagar:")
+        assert prepared.endswith("¿Pueden ayudarme?")
+        assert len(prepared) <= 200 * CHARS_PER_TOKEN + len(TRIM_MARKER)
+        assert "   " not in prepared
+
+    def test_strip_can_be_disabled(self):
+        text = "Hola\n> cita"
+
+        assert prepare_ticket_text(text, 100, strip=False) == text
+        assert prepare_ticket_text(text, 100) == "Hola"